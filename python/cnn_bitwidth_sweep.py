@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+CNN Bit-width Sweep - Fixed-point word sizes versus classification agreement
+
+Every weight ROM and engine of the CNN uses DATA_WIDTH => 16 (Q8.8). This
+tool checks how far that can shrink. It re-quantizes the .mif weights and
+the activations to candidate (width, fractional bits) formats and runs the
+fixed-point model (zolotyhnet_model.py) on every bundled record. Each
+configuration is scored by its agreement with the 16-bit baseline:
+
+    class %     windows with the baseline's class
+    balanced %  mean over the baseline's classes of the agreement on that
+                class's windows. The baseline gives class 0 to almost every
+                window of the bundled records, so class % is dominated by
+                it; balanced % is the ranking metric (Pareto front, --target)
+    other %     agreement on the windows the baseline does not put in its
+                most common class
+    group %     windows with the baseline's 2-bit display group
+    const       the configuration gives every window the same class
+
+Configurations:
+    uniform     one (width, fractional bits) format for the input and all layers
+    per-layer   one layer (or the input) narrowed, the rest kept at Q8.8
+    mixed       each layer at its cheapest per-layer format that still
+                keeps --target % balanced agreement (needs --per-layer)
+
+The record windows go into one multiprocessing.shared_memory block. Each
+configuration is one task of a process pool, and each worker builds its own
+model from the shared windows.
+
+Cost columns, for ROMs sized to their contents (the tops instantiate every
+ROM with ADDR_WIDTH => 14):
+    ROM kbit    weight and bias bits
+    M4K         Cyclone II M4K blocks, best aspect ratio per ROM
+    mult        9x9 multiplier elements per MAC (1 up to 9 bits, else 2)
+
+Rows marked * are on the Pareto front (no cheaper row has a higher balanced
+agreement).
+
+Usage:
+    python cnn_bitwidth_sweep.py --widths 8 10 12 16 --workers 0
+    python cnn_bitwidth_sweep.py --per-layer --csv sweep.csv
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import csv
+import math
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+from ecg_dat_reader import bundled_records
+from zolotyhnet_model import (BASE_FORMAT, CLASS_GROUPS, LAYER_NAMES, WEIGHTS_DIR, WINDOW,
+                              ZolotyhNet, check_formats, load_weights, record_windows, to_q88)
+
+# Cyclone II M4K aspect ratios (depth, width)
+M4K_SHAPES = [(4096, 1), (2048, 2), (1024, 4), (512, 9), (256, 18), (128, 36)]
+
+# Group index per class, for the display-level agreement
+_GROUP_OF = np.unique(CLASS_GROUPS, return_inverse=True)[1]
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+def m4k_blocks(depth, width):
+    """M4K blocks for a depth x width ROM, best aspect ratio"""
+    return min(math.ceil(depth / d) * math.ceil(width / w) for d, w in M4K_SHAPES)
+
+
+def config_cost(formats, weights):
+    """
+    Hardware cost of a format table
+
+    Args:
+        formats: Complete table (see zolotyhnet_model.check_formats)
+        weights: dict from load_weights()
+
+    Returns:
+        dict with rom_bits, m4k and mult (9x9 elements per MAC)
+    """
+    rom_bits, m4k, mult = 0, 0, 1
+    previous = {'conv0': 'input', 'linear0': 'input', 'classifier': 'linear2'}
+    for i, name in enumerate(LAYER_NAMES):
+        width = formats[name][0]
+        for kind in ('weight', 'bias'):
+            size = weights[f'{name}_{kind}'].size
+            rom_bits += size * width
+            m4k += m4k_blocks(size, width)
+        source = previous.get(name, LAYER_NAMES[i - 1])
+        if max(width, formats[source][0]) > 9:
+            mult = 2
+    return {'rom_bits': rom_bits, 'm4k': m4k, 'mult': mult}
+
+
+def format_name(fmt):
+    """(width, frac) -> 'Q4.8 (12b)'"""
+    width, frac = fmt
+    return f"Q{width - frac}.{frac} ({width}b)"
+
+
+def candidate_formats(widths, int_bits):
+    """(width, frac) for every width and integer-bit count that fits"""
+    return sorted({(w, w - i) for w in widths for i in int_bits if 2 <= w <= 16 and 0 <= w - i},
+                  reverse=True)
+
+
+def uniform_configs(candidates):
+    """One format for the input and every layer"""
+    return [(f"all {format_name(fmt)}", {n: fmt for n in ['input'] + LAYER_NAMES})
+            for fmt in candidates if fmt != BASE_FORMAT]
+
+
+def per_layer_configs(candidates):
+    """One layer narrowed at a time"""
+    return [(f"{name} {format_name(fmt)}", {name: fmt})
+            for name in ['input'] + LAYER_NAMES for fmt in candidates if fmt != BASE_FORMAT]
+
+
+def mixed_config(results, candidates, target):
+    """
+    Cheapest per-layer format that alone keeps at least target % balanced agreement
+
+    Args:
+        results: Balanced agreement per label of a per-layer sweep
+        candidates: Formats that were tried
+        target: Minimum balanced agreement in percent
+
+    Returns:
+        (label, formats) or None if no layer can be narrowed
+    """
+    formats = {}
+    for name in ['input'] + LAYER_NAMES:
+        ok = [fmt for fmt in candidates
+              if fmt != BASE_FORMAT and results.get(f"{name} {format_name(fmt)}", 0) >= target]
+        if ok:
+            formats[name] = min(ok, key=lambda f: (f[0], -f[1]))
+    if not formats:
+        return None
+    return f"mixed >= {target:g}%", formats
+
+
+def _init_worker(shm_name, shape, weights, baseline):
+    """Attach to the shared windows once per process"""
+    # The parent owns the block and unlinks it; workers only attach
+    shm = shared_memory.SharedMemory(name=shm_name)
+    windows = np.ndarray(shape, dtype=np.int16, buffer=shm.buf)
+    _worker.update(shm=shm, windows=windows, weights=weights, baseline=baseline)
+
+
+def evaluate(formats, windows, weights, baseline):
+    """
+    Agreement of one configuration with the baseline classes
+
+    Returns:
+        (class %, balanced %, other %, group %, wrapped results, constant output)
+        other % is NaN when the baseline gives every window one class
+    """
+    model = ZolotyhNet(weights, formats=formats)
+    classes = np.argmax(model.forward(windows), axis=1)
+    match = classes == baseline
+    same = np.mean(match) * 100
+    present, counts = np.unique(baseline, return_counts=True)
+    balanced = np.mean([np.mean(match[baseline == c]) for c in present]) * 100
+    other = baseline != present[np.argmax(counts)]
+    other_same = np.mean(match[other]) * 100 if other.any() else float('nan')
+    same_group = np.mean(_GROUP_OF[classes] == _GROUP_OF[baseline]) * 100
+    constant = len(windows) > 1 and bool(np.all(classes == classes[0]))
+    return same, balanced, other_same, same_group, sum(model.overflow.values()), constant
+
+
+def _evaluate_task(task):
+    index, formats = task
+    return index, evaluate(formats, _worker['windows'], _worker['weights'], _worker['baseline'])
+
+
+def _worker_count(workers):
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def run_sweep(configs, windows, weights, baseline, workers=1):
+    """
+    Evaluate configurations, in a process pool when workers > 1
+
+    Args:
+        configs: List of (label, formats)
+        windows: int16 (N, 128) Q8.8 windows
+        weights: dict from load_weights()
+        baseline: int (N,) classes of the 16-bit model
+        workers: Processes (1 = in this process, 0 = one per CPU)
+
+    Returns:
+        list of evaluate() results in config order
+    """
+    workers = min(_worker_count(workers), len(configs))
+    tasks = [(i, formats) for i, (_, formats) in enumerate(configs)]
+    results = [None] * len(configs)
+
+    if workers <= 1:
+        for i, formats in tasks:
+            results[i] = evaluate(formats, windows, weights, baseline)
+        return results
+
+    shm = shared_memory.SharedMemory(create=True, size=max(windows.nbytes, 1))
+    try:
+        np.ndarray(windows.shape, dtype=np.int16, buffer=shm.buf)[:] = windows
+        with multiprocessing.Pool(workers, initializer=_init_worker,
+                                  initargs=(shm.name, windows.shape, weights, baseline)) as pool:
+            for i, result in pool.imap_unordered(_evaluate_task, tasks):
+                results[i] = result
+    finally:
+        shm.close()
+        shm.unlink()
+    return results
+
+
+def pareto_front(rows):
+    """Mark rows that no cheaper (or equally cheap) row beats on balanced agreement"""
+    best = -1.0
+    for row in sorted(rows, key=lambda r: (r['rom_bits'], -r['balanced'])):
+        row['pareto'] = row['balanced'] > best
+        best = max(best, row['balanced'])
+    return rows
+
+
+def print_table(rows):
+    """Rows sorted by ROM size"""
+    print(f"\n  {'':1} {'configuration':<26} {'ROM kbit':>9} {'M4K':>5} {'mult':>5}"
+          f" {'class %':>8} {'balanced %':>10} {'other %':>8} {'group %':>8} {'wrapped':>8}")
+    for row in sorted(rows, key=lambda r: (r['rom_bits'], -r['balanced'])):
+        mark = '*' if row['pareto'] else ''
+        print(f"  {mark:1} {row['label']:<26} {row['rom_bits'] / 1000:>9.1f} {row['m4k']:>5}"
+              f" {row['mult']:>5} {row['agree']:>8.2f} {row['balanced']:>10.2f} {row['other']:>8.2f}"
+              f" {row['group']:>8.2f} {row['wrapped']:>8}{'  const' if row['constant'] else ''}")
+    if any(row['constant'] for row in rows):
+        print("  const: every window gets the same class")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Sweep fixed-point word sizes of the CNN against the 16-bit baseline',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Uniform formats on all bundled records, all cores
+  python cnn_bitwidth_sweep.py --workers 0
+
+  # Also narrow one layer at a time, and propose a mixed-precision set
+  python cnn_bitwidth_sweep.py --per-layer --target 99.5 --csv sweep.csv
+
+  # Only 8-bit formats with 2 to 5 integer bits, on one record
+  python cnn_bitwidth_sweep.py "../ECG signals/PVC/208" --widths 8 --int-bits 2 3 4 5
+        """
+    )
+
+    parser.add_argument('records', nargs='*',
+                        help='MIT-BIH records (default: every bundled record)')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Signal index to use (default: 0)')
+    parser.add_argument('--stride', type=int, default=WINDOW,
+                        help=f'Samples between windows (default: {WINDOW})')
+    parser.add_argument('--widths', type=int, nargs='+', default=[6, 8, 10, 12, 14, 16],
+                        help='Word widths to try (default: 6 8 10 12 14 16)')
+    parser.add_argument('--int-bits', type=int, nargs='+', default=[4, 6, 8],
+                        help='Integer bits (incl. sign) to try per width (default: 4 6 8)')
+    parser.add_argument('--per-layer', action='store_true',
+                        help='Also narrow each layer alone and build a mixed configuration')
+    parser.add_argument('--target', type=float, default=99.0,
+                        help='Balanced agreement %% a layer must keep in the mixed configuration '
+                             '(default: 99)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes, 0 = one per CPU (default: 0)')
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--csv', default=None,
+                        help='Also write every row to this CSV file')
+
+    args = parser.parse_args()
+
+    if args.stride < 1:
+        print("✗ --stride must be at least 1")
+        sys.exit(1)
+    candidates = candidate_formats(args.widths, args.int_bits)
+    if not candidates:
+        print("✗ No valid (width, fractional bits) pair, widths must be 2..16")
+        sys.exit(1)
+
+    try:
+        weights = load_weights(args.weights)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    records = [Path(r) for r in args.records]
+    if not records:
+        records, missing = bundled_records()
+        for record in missing:
+            print(f"⚠ Skipping {record.name}: no .dat file")
+
+    parts = []
+    for record in records:
+        try:
+            parts.append(to_q88(record_windows(record, args.lead, args.stride)))
+        except (FileNotFoundError, ValueError, NotImplementedError) as e:
+            print(f"⚠ Skipping {record}: {e}")
+            continue
+        print(f"✓ {record.name}: {len(parts[-1])} windows")
+    if not parts:
+        print("✗ No records to evaluate")
+        sys.exit(1)
+    windows = np.ascontiguousarray(np.concatenate(parts))
+
+    baseline = np.argmax(ZolotyhNet(weights).forward(windows), axis=1)
+    workers = _worker_count(args.workers)
+    print(f"✓ Baseline {format_name(BASE_FORMAT)} on {len(windows)} windows, "
+          f"{len(candidates)} candidate formats, {workers} worker{'s' if workers > 1 else ''}")
+
+    configs = uniform_configs(candidates)
+    if args.per_layer:
+        configs += per_layer_configs(candidates)
+
+    start = time.perf_counter()
+    results = run_sweep(configs, windows, weights, baseline, workers)
+    if args.per_layer:
+        mixed = mixed_config({label: r[1] for (label, _), r in zip(configs, results)},
+                             candidates, args.target)
+        if mixed:
+            configs.append(mixed)
+            results.append(evaluate(mixed[1], windows, weights, baseline))
+            print(f"▶ {mixed[0]}: " + ', '.join(f"{n} {format_name(f)}" for n, f in mixed[1].items()))
+    elapsed = time.perf_counter() - start
+    print(f"✓ {len(configs)} configurations in {elapsed:.1f} s")
+
+    base_constant = len(baseline) > 1 and bool(np.all(baseline == baseline[0]))
+    rows = [dict(label=f"baseline {format_name(BASE_FORMAT)}", agree=100.0, balanced=100.0,
+                 other=float('nan') if base_constant else 100.0, group=100.0, wrapped=0,
+                 constant=base_constant, **config_cost(check_formats(), weights))]
+    for (label, formats), (agree, balanced, other, group, wrapped, constant) in zip(configs, results):
+        rows.append(dict(label=label, agree=agree, balanced=balanced, other=other, group=group,
+                         wrapped=wrapped, constant=constant,
+                         **config_cost(check_formats(formats), weights)))
+    print_table(pareto_front(rows))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['label', 'rom_bits', 'm4k', 'mult',
+                                                   'agree', 'balanced', 'other', 'group',
+                                                   'wrapped', 'constant', 'pareto'])
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\n✓ Saved {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
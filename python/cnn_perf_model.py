@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+CNN Performance Model - Cycle counts and window throughput of the FPGA CNN
+
+Analytic model of the ZolotyhNet hardware schedule, to size engine
+parallelism before a Quartus run. Everything is read from the VHDL sources:
+    - layer generics (IN/OUT_CHANNELS, INPUT_LENGTH, KERNEL_SIZE, *_FEATURES)
+      of every conv1d_engine / linear_engine instance in the top level
+    - the top FSM's states and their layer_counter timeouts
+    - SDRAM timing (tRCD, tRP, tRC, CAS latency, refresh period) from
+      src/sdram/sdram_controller.vhd
+
+Engine FSM costs (one MAC = LOAD_WEIGHT, LOAD_INPUT, MULTIPLY, ACCUMULATE):
+
+    conv1d_engine   OUT * LEN * (4 * IN * K + 3) + 2      (+3: ADD_BIAS, WRITE_OUTPUT, NEXT_POS)
+    linear_engine   OUT * (4 * IN + 4) + 2                (+4: ADD_BIAS .. NEXT_OUTPUT)
+                    (+2: IDLE with start, DONE_STATE)
+
+A top FSM state leaves on done or when layer_counter exceeds its timeout, so
+it takes min(engine + 1, timeout + 2) cycles. Pool, fusion, argmax and
+result-hold states cost their fixed counts. A layer whose engine needs more
+than its timeout is cut short, and the model flags it.
+
+For the SDRAM design every weight and bias read is an SDRAM fetch through
+weight_rom_sdram. A fetch takes the wrapper's request/capture cycles plus the
+controller's ACTIVATE / tRCD / READ / CAS / precharge sequence in the
+SDRAM clock, with refresh amortized. The engine itself never waits, so two
+cases are reported:
+    as built     4 cycles per MAC; any fetch slower than that returns a stale weight
+    with stall   the MAC waits for the fetch: 3 + fetch cycles per MAC
+
+Usage:
+    python cnn_perf_model.py                         # both designs, 50 and 100 MHz
+    python cnn_perf_model.py --design 9engines --clock 50 --stride 32
+    python cnn_perf_model.py --macs 4                # 4 parallel MACs per engine
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import math
+import re
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+DESIGNS = {
+    '9engines': SRC_DIR / 'cnn' / 'zolotyhnet_complete_9engines.vhd',
+    'sdram': SRC_DIR / 'cnn' / 'zolotyhnet_top.vhd',
+}
+SDRAM_CONTROLLER = SRC_DIR / 'sdram' / 'sdram_controller.vhd'
+
+# Cycles per MAC and per output of the engine FSMs
+MAC_CYCLES = 4
+CONV_OUTPUT_CYCLES = 3
+LINEAR_OUTPUT_CYCLES = 4
+ENGINE_OVERHEAD = 2
+
+# weight_rom_sdram: IDLE (address change seen) + REQUEST, then WAIT captures data_valid
+WRAPPER_CYCLES = 3
+
+WINDOW = 128
+
+
+def _strip_comments(text):
+    return re.sub(r'--[^\n]*', '', text)
+
+
+def parse_engines(text):
+    """
+    Engine instances of a top-level file
+
+    Returns:
+        dict {instance prefix: {'type': 'conv'|'linear', generic: value, ...}}
+    """
+    engines = {}
+    pattern = r'(\w+)_inst\s*:\s*(conv1d_engine|linear_engine)\s*generic map\s*\((.*?)\)\s*port map'
+    for name, entity, generics in re.findall(pattern, text, re.S | re.I):
+        layer = {k.upper(): int(v) for k, v in re.findall(r'(\w+)\s*=>\s*(\d+)', generics)}
+        layer['type'] = 'conv' if entity.lower() == 'conv1d_engine' else 'linear'
+        engines[name.lower()] = layer
+    return engines
+
+
+def parse_states(text):
+    """
+    States of the main CNN FSM in order, with their layer_counter timeouts
+
+    Returns:
+        list of (state name, timeout or None)
+    """
+    declared = re.search(r'type\s+cnn_state_type\s+is\s*\((.*?)\)\s*;', text, re.S | re.I)
+    if not declared:
+        raise ValueError("No cnn_state_type in the top-level file")
+    names = [s.strip() for s in declared.group(1).split(',') if s.strip()]
+
+    states = []
+    for name in names:
+        body = re.search(r'when\s+' + name + r'\s*=>(.*?)(?=when\s+\w+\s*=>|end\s+case)', text, re.S | re.I)
+        timeout = re.search(r'layer_counter\s*>\s*(\d+)', body.group(1)) if body else None
+        states.append((name, int(timeout.group(1)) if timeout else None))
+    return states
+
+
+def parse_sdram(text):
+    """SDRAM controller timing constants and generics"""
+    values = {k.upper(): int(v) for k, v in
+              re.findall(r'(\w+)\s*:\s*integer\s*:=\s*(\d+)', text, re.I)}
+    return {
+        'clock_mhz': values.get('CLK_FREQ_MHZ', 100),
+        'cas': values.get('CAS_LATENCY', 2),
+        'trcd': values.get('TRCD', 2),
+        'trp': values.get('TRP', 2),
+        'trc': values.get('TRC', 7),
+        'refresh_period': values.get('REFRESH_PERIOD', 780),
+    }
+
+
+def sdram_fetch_cycles(sdram, clock_mhz):
+    """
+    Cycles (in the CNN clock) from a weight address change to the next fetch
+
+    The controller, in its own clock, spends IDLE, ACTIVATE, tRCD + 1,
+    READ, CAS + 1 and COMPLETE before data_valid, then tRP + 1 precharging
+    before it accepts the next read. Refresh (tRC + 1 every refresh_period
+    cycles) is spread over all reads.
+
+    Returns:
+        (latency to data, period between fetches) in CNN clock cycles
+    """
+    to_data = 1 + 1 + (sdram['trcd'] + 1) + 1 + (sdram['cas'] + 1) + 1
+    busy = to_data + sdram['trp'] + 1
+    refresh = 1 + (sdram['trc'] + 1) / sdram['refresh_period']
+    ratio = clock_mhz / sdram['clock_mhz']
+    latency = WRAPPER_CYCLES + math.ceil(to_data * refresh * ratio)
+    period = WRAPPER_CYCLES + math.ceil(busy * refresh * ratio)
+    return latency, max(latency, period)
+
+
+def engine_cycles(layer, mac_cycles=MAC_CYCLES, macs=1, fetch_extra=0):
+    """
+    Cycles of one engine run
+
+    Args:
+        layer: Parsed generics (see parse_engines)
+        mac_cycles: Cycles per MAC step
+        macs: Parallel MAC units, each taking a share of the output channels
+        fetch_extra: Extra cycles per bias read (SDRAM fetch stall)
+
+    Returns:
+        (cycles, MAC count)
+    """
+    if layer['type'] == 'conv':
+        outputs = math.ceil(layer['OUT_CHANNELS'] / macs) * layer['INPUT_LENGTH']
+        per_output = layer['IN_CHANNELS'] * layer['KERNEL_SIZE']
+        tail = CONV_OUTPUT_CYCLES
+        total_macs = layer['OUT_CHANNELS'] * layer['INPUT_LENGTH'] * per_output
+    else:
+        outputs = math.ceil(layer['OUTPUT_FEATURES'] / macs)
+        per_output = layer['INPUT_FEATURES']
+        tail = LINEAR_OUTPUT_CYCLES
+        total_macs = layer['OUTPUT_FEATURES'] * per_output
+    return outputs * (mac_cycles * per_output + tail + fetch_extra) + ENGINE_OVERHEAD, total_macs
+
+
+def describe(layer):
+    if layer['type'] == 'conv':
+        return (f"conv {layer['IN_CHANNELS']}->{layer['OUT_CHANNELS']} "
+                f"x{layer['INPUT_LENGTH']} k{layer['KERNEL_SIZE']}")
+    return f"linear {layer['INPUT_FEATURES']}->{layer['OUTPUT_FEATURES']}"
+
+
+def schedule(design_file, clock_mhz, macs=1, sdram=None, stall=True):
+    """
+    Per-state cycle counts of one window through a top-level design
+
+    Args:
+        design_file: Top-level VHDL file
+        clock_mhz: CNN clock
+        macs: Parallel MAC units per engine
+        sdram: Parsed SDRAM timing if weights come from SDRAM, else None
+        stall: SDRAM design only - engines wait for each fetch
+
+    Returns:
+        list of dicts: state, what, cycles, engine (cycles needed), macs, truncated
+    """
+    text = _strip_comments(Path(design_file).read_text())
+    engines = parse_engines(text)
+    mac_cycles, fetch_extra = MAC_CYCLES, 0
+    if sdram is not None and stall:
+        latency, period = sdram_fetch_cycles(sdram, clock_mhz)
+        mac_cycles = max(MAC_CYCLES, 3 + period)
+        fetch_extra = latency - 1
+
+    rows = []
+    for state, timeout in parse_states(text):
+        if state.upper() == 'IDLE':
+            continue
+        layer = engines.get(state.lower())
+        row = {'state': state, 'engine': None, 'macs': 0, 'truncated': False}
+        if layer is not None:
+            need, count = engine_cycles(layer, mac_cycles, macs, fetch_extra)
+            row.update(what=describe(layer), engine=need + 1, macs=count)
+            row['cycles'] = need + 1 if timeout is None else min(need + 1, timeout + 2)
+            row['truncated'] = timeout is not None and need + 1 > timeout + 2
+        elif timeout is not None:
+            what = 'result hold' if 'OUTPUT' in state.upper() else 'fixed wait'
+            row.update(what=what, cycles=timeout + 2)
+        else:
+            row.update(what='1 cycle', cycles=1)
+        rows.append(row)
+    return rows
+
+
+def report(name, rows, clock_mhz, required_rate, sample_rate, notes=()):
+    """
+    Print one design at one clock
+
+    Returns:
+        Sustainable windows/s (every engine run to completion)
+    """
+    total = sum(r['cycles'] for r in rows)
+    needed = sum(r['engine'] if r['engine'] else r['cycles'] for r in rows)
+    layers = [r for r in rows if r['engine']]
+    bottleneck = max(layers, key=lambda r: r['engine']) if layers else None
+
+    print(f"\n▶ {name} @ {clock_mhz:g} MHz")
+    for note in notes:
+        print(f"  {note}")
+    print(f"  {'state':15s} {'layer':24s} {'MACs':>7s} {'cycles':>8s} {'µs':>8s} {'share':>6s}")
+    for r in rows:
+        flag = '  ⚠ timeout before done' if r['truncated'] else ''
+        macs = f"{r['macs']:7d}" if r['macs'] else f"{'':7s}"
+        print(f"  {r['state']:15s} {r['what']:24s} {macs} {r['cycles']:8d} "
+              f"{r['cycles'] / clock_mhz:8.1f} {100 * r['cycles'] / total:5.1f}%{flag}")
+
+    window_us = total / clock_mhz
+    rate = 1e6 / window_us
+    print(f"  Window: {total} cycles = {window_us:.1f} µs -> {rate:.0f} windows/s "
+          f"(as scheduled by the top FSM)")
+
+    truncated = [r for r in rows if r['truncated']]
+    if truncated:
+        full_rate = clock_mhz * 1e6 / needed
+        print(f"  ⚠ {len(truncated)} layer(s) time out before done; running every engine to "
+              f"completion takes {needed} cycles -> {full_rate:.0f} windows/s")
+        rate = min(rate, full_rate)
+
+    if bottleneck:
+        pipelined = clock_mhz * 1e6 / bottleneck['engine']
+        print(f"  Bottleneck: {bottleneck['state']} ({bottleneck['what']}), "
+              f"{bottleneck['engine']} cycles = {100 * bottleneck['engine'] / needed:.0f}% of a complete window")
+        print(f"  With all engines overlapped on successive windows: {pipelined:.0f} windows/s")
+
+    if rate >= required_rate:
+        print(f"  ✓ Keeps up with {required_rate:.1f} windows/s ({rate / required_rate:.1f}x margin)")
+    else:
+        speedup = required_rate / rate
+        print(f"  ✗ Needs {required_rate:.1f} windows/s: {speedup:.1f}x short "
+              f"(about {math.ceil(speedup)} parallel MACs per engine)")
+
+    # The top FSM only starts on the 128th sample of a block and only when idle
+    hardware_rate = sample_rate / WINDOW
+    if required_rate > hardware_rate:
+        print(f"  ⚠ buffer_ready fires once per {WINDOW} samples ({hardware_rate:.2f} windows/s); "
+              f"a stride below {WINDOW} also needs a new input buffer scheme")
+    return rate
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Cycle-count and throughput model of the FPGA CNN schedule',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Both designs at 50 and 100 MHz, one window per 128 samples at 360 Hz
+  python cnn_perf_model.py
+
+  # Can the 9-engine design keep up with a window every 32 samples at 50 MHz?
+  python cnn_perf_model.py --design 9engines --clock 50 --stride 32
+
+  # Effect of 4 parallel MAC units per engine
+  python cnn_perf_model.py --macs 4
+        """
+    )
+
+    parser.add_argument('--design', choices=['9engines', 'sdram', 'both'], default='both',
+                        help='Top level to model (default: both)')
+    parser.add_argument('--clock', type=float, nargs='+', default=[50, 100],
+                        help='CNN clock(s) in MHz (default: 50 100)')
+    parser.add_argument('--rate', type=float, default=360,
+                        help='ECG sample rate in Hz (default: 360)')
+    parser.add_argument('--stride', type=int, default=WINDOW,
+                        help=f'Samples between windows (default: {WINDOW})')
+    parser.add_argument('--macs', type=int, default=1,
+                        help='Parallel MAC units per engine (default: 1, as built)')
+    parser.add_argument('--no-stall', action='store_true',
+                        help='SDRAM design as built: engines do not wait for weight fetches')
+
+    args = parser.parse_args()
+
+    if args.stride < 1 or args.macs < 1:
+        print("✗ --stride and --macs must be at least 1")
+        sys.exit(1)
+
+    try:
+        sdram = parse_sdram(_strip_comments(SDRAM_CONTROLLER.read_text()))
+    except FileNotFoundError:
+        print(f"✗ SDRAM controller not found: {SDRAM_CONTROLLER}")
+        sys.exit(1)
+
+    required = args.rate / args.stride
+    print(f"✓ Target: {required:.2f} windows/s ({args.rate:g} Hz, stride {args.stride}), "
+          f"{args.macs} MAC unit{'s' if args.macs > 1 else ''} per engine")
+
+    designs = ['9engines', 'sdram'] if args.design == 'both' else [args.design]
+    for design in designs:
+        path = DESIGNS[design]
+        if not path.exists():
+            print(f"✗ Top level not found: {path}")
+            continue
+        for clock in args.clock:
+            uses_sdram = design == 'sdram'
+            rows = schedule(path, clock, args.macs, sdram if uses_sdram else None,
+                            stall=not args.no_stall)
+            notes = []
+            if uses_sdram:
+                latency, period = sdram_fetch_cycles(sdram, clock)
+                mode = 'as built, no stall' if args.no_stall else 'engines stall on fetch'
+                notes.append(f"SDRAM weights @ {sdram['clock_mhz']} MHz: "
+                             f"{latency}-cycle fetch, one every {period} cycles ({mode})")
+                if args.no_stall and period > MAC_CYCLES:
+                    notes.append(f"⚠ A MAC every {MAC_CYCLES} cycles: about "
+                                 f"{100 * (1 - MAC_CYCLES / period):.0f}% of MACs use a stale weight")
+            report(path.name, rows, clock, required, args.rate, notes)
+
+
+if __name__ == '__main__':
+    main()
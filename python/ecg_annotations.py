@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+ECG Annotations - Beat-label overlay for the live and static plots
+
+AnnotationIndex keeps a record's beat annotations (.atr) as sorted NumPy
+arrays, so the beats inside a window are found with two np.searchsorted
+calls (O(log n)) instead of a scan, even on dense records like 208.
+
+AnnotationOverlay draws them with a single PathCollection created once:
+every beat is its label glyph (N, V, L, ...) at the top of the axes,
+colored by beat class. Glyph paths are built once per symbol, so a frame
+only updates offsets, per-point paths and colors - one artist and one
+draw call however many beats are visible. When more than `max_labels`
+beats are visible the glyphs turn into colored ticks.
+
+Usage:
+    index = AnnotationIndex.for_record('../ECG signals/PVC/208')
+    overlay = AnnotationOverlay(ax, index)
+    overlay.update(start, stop)                  # x in sample numbers
+    overlay.update(start, stop, origin, 1 / fs)  # x in seconds from origin
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+from pathlib import Path
+
+import numpy as np
+from matplotlib.collections import PathCollection
+from matplotlib.colors import to_rgba_array
+from matplotlib.font_manager import FontProperties
+from matplotlib.path import Path as MplPath
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import IdentityTransform, blended_transform_factory
+
+from ecg_dat_reader import BEAT_CODES, open_record, read_annotation_file
+from ecg_synth import is_synth_path
+
+# Beat classes (AAMI grouping) and their overlay colors
+BEAT_CLASSES = {
+    'N': 'normal', 'L': 'normal', 'R': 'normal', 'e': 'normal', 'j': 'normal',
+    'A': 'supraventricular', 'a': 'supraventricular', 'J': 'supraventricular',
+    'S': 'supraventricular',
+    'V': 'ventricular', 'E': 'ventricular',
+    'F': 'fusion',
+}
+CLASS_COLORS = {
+    'normal': '0.35',
+    'supraventricular': 'darkorange',
+    'ventricular': 'red',
+    'fusion': 'magenta',
+    'other': 'royalblue',
+}
+CLASS_ORDER = list(CLASS_COLORS)
+
+# Label height in points and position (axes fraction)
+LABEL_SIZE = 11
+LABEL_Y = 0.95
+
+
+class AnnotationIndex:
+    """Sorted beat annotations of one record"""
+
+    def __init__(self, samples, symbols):
+        """
+        Args:
+            samples: Annotation sample numbers (ascending)
+            symbols: Label per annotation ('N', 'V', ...)
+        """
+        self.sample = np.asarray(samples, dtype=np.int64)
+        self.symbol = np.asarray(symbols, dtype='<U1')
+        self.beat_class = np.array(
+            [CLASS_ORDER.index(BEAT_CLASSES.get(s, 'other')) for s in self.symbol.tolist()],
+            dtype=np.int8)
+
+    def __len__(self):
+        return len(self.sample)
+
+    @classmethod
+    def from_file(cls, path, beats_only=True):
+        """
+        Load a .atr file
+
+        Args:
+            path: Annotation file
+            beats_only: Drop non-beat annotations (rhythm changes, noise, ...)
+        """
+        ann = read_annotation_file(path)
+        keep = np.isin(ann['code'], list(BEAT_CODES)) if beats_only else slice(None)
+        return cls(ann['sample'][keep], ann['symbol'][keep])
+
+    @classmethod
+    def for_record(cls, record_path, extension='atr'):
+        """
+        Beat annotations stored next to a record, or None if it has none
+
+        Args:
+            record_path: Record path with or without extension, or a
+                "synth:..." pseudo-record (the generator's own beats)
+            extension: Annotator (default: atr)
+        """
+        if is_synth_path(record_path):
+            ann = open_record(record_path).read_annotations()
+            return cls(ann['sample'], ann['symbol'])
+        path = Path(record_path).with_suffix('.' + extension)
+        if not path.exists():
+            return None
+        index = cls.from_file(path)
+        print(f"✓ Loaded {len(index)} beat annotations from {path.name}")
+        return index
+
+    def window(self, start, stop):
+        """
+        Index range of the annotations with start <= sample < stop
+
+        Returns:
+            (i0, i1) so that self.sample[i0:i1] are the visible beats
+        """
+        i0, i1 = np.searchsorted(self.sample, (start, stop))
+        return int(i0), int(i1)
+
+
+def _glyph_path(symbol, prop):
+    """Label glyph as a path centred on (0, 0), 1 unit = 1 point at size 1"""
+    path = TextPath((0, 0), symbol, size=1, prop=prop)
+    box = path.get_extents()
+    centre = ((box.x0 + box.x1) / 2, (box.y0 + box.y1) / 2)
+    return MplPath(path.vertices - centre, path.codes)
+
+
+class AnnotationOverlay:
+    """Beat labels for one axes, drawn as a single reusable artist"""
+
+    def __init__(self, ax, index, max_labels=80, animated=False):
+        """
+        Args:
+            ax: Matplotlib axes to draw into
+            index: AnnotationIndex of the displayed record
+            max_labels: Above this many visible beats draw ticks instead of glyphs
+            animated: True when the caller blits the artist itself
+        """
+        self.ax = ax
+        self.index = index
+        self.max_labels = max_labels
+
+        # One glyph path per distinct symbol, built once
+        prop = FontProperties(family='monospace', weight='bold')
+        symbols = np.unique(index.symbol).tolist() if len(index) else []
+        self._glyphs = [_glyph_path(s, prop) for s in symbols]
+        self._glyph_of = (np.searchsorted(symbols, index.symbol).astype(np.int32)
+                          if symbols else np.empty(0, dtype=np.int32))
+        self._tick = MplPath([(0, -0.5), (0, 0.5)], [MplPath.MOVETO, MplPath.LINETO])
+        self._colors = to_rgba_array([CLASS_COLORS[c] for c in CLASS_ORDER])
+
+        # x in data coordinates, y as a fraction of the axes height
+        self.collection = PathCollection(
+            [], sizes=[LABEL_SIZE ** 2], offsets=np.empty((0, 2)),
+            offset_transform=blended_transform_factory(ax.transData, ax.transAxes),
+            linewidths=0.0, animated=animated, zorder=5)
+        self.collection.set_transform(IdentityTransform())
+        ax.add_collection(self.collection, autolim=False)
+        self.visible_count = 0
+        self._shown = None
+
+    @property
+    def artists(self):
+        """Artists to hand back to a blitting animation"""
+        return [self.collection]
+
+    def _visible(self, start, stop, period):
+        """Indices and stream sample numbers of the beats in [start, stop)"""
+        if period is None:
+            i0, i1 = self.index.window(start, stop)
+            return np.arange(i0, i1), self.index.sample[i0:i1]
+
+        # Looping playback: the window may cover the end of one pass and the
+        # start of the next
+        idx, pos = [], []
+        cycle = int(start // period)
+        while cycle * period < stop:
+            base = cycle * period
+            i0, i1 = self.index.window(max(start, base) - base, min(stop, base + period) - base)
+            idx.append(np.arange(i0, i1))
+            pos.append(self.index.sample[i0:i1] + base)
+            cycle += 1
+        if len(idx) == 1:
+            return idx[0], pos[0]
+        return np.concatenate(idx), np.concatenate(pos)
+
+    def update(self, start, stop, origin=0, scale=1.0, period=None):
+        """
+        Show the beats between stream samples start and stop
+
+        Args:
+            start, stop: Visible sample range (stream sample numbers)
+            origin: Sample number drawn at x = 0
+            scale: x units per sample (e.g. 1 / sample_rate for seconds)
+            period: Record length when playback loops (None = no wrap)
+
+        Returns:
+            Number of beats shown
+        """
+        idx, pos = self._visible(start, stop, period)
+        k = len(idx)
+
+        offsets = np.empty((k, 2))
+        offsets[:, 0] = (pos - origin) * scale
+        offsets[:, 1] = LABEL_Y
+        self.collection.set_offsets(offsets)
+
+        # Glyphs and colors only change when beats enter or leave the window
+        shown = (k, int(idx[0]) if k else -1, int(idx[-1]) if k else -1)
+        if shown == self._shown:
+            return k
+        self._shown = shown
+        self.visible_count = k
+
+        if k <= self.max_labels:
+            glyphs = self._glyphs
+            self.collection.set_paths([glyphs[g] for g in self._glyph_of[idx].tolist()])
+            self.collection.set_linewidth(0.0)
+        else:
+            self.collection.set_paths([self._tick])
+            self.collection.set_linewidth(1.0)
+        colors = self._colors[self.index.beat_class[idx]]
+        self.collection.set_facecolor(colors)
+        self.collection.set_edgecolor(colors)
+        return k
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+ECG Batch Classify - Offline ZolotyhNet class timelines for whole records
+
+Runs the fixed-point CNN model (zolotyhnet_model.py) over every 128-sample
+window of an MIT-BIH record, without streaming to the board. It gives a
+per-window class timeline, for example the PVC burden of record 208.
+With --beats the windows are centred on the R peaks found by qrs_detector.py
+instead, one per heartbeat, which is far fewer windows to classify.
+
+The record is converted once to the Q8.8 samples the board would see
+(streamer 12-bit scaling, then buffer_128's >> 4). Those samples go into one
+multiprocessing.shared_memory block. Each worker process attaches to it,
+takes a zero-copy sliding_window_view of the windows and classifies
+contiguous ranges of a few thousand windows per task. Only the small
+per-window results travel back through the pool.
+
+Output per record (<name>_classes.npz):
+
+    classes     uint8 (N,)      class of window i (samples i*stride .. +128)
+    scores      int16 (N, 8)    classifier outputs (only with --scores)
+    beats       int64 (N,)      R peak of window i (only with --beats, stride 0;
+                                window i is samples beats[i]-64 .. +128)
+    stride, window, sample_rate, lead
+
+Usage:
+    python ecg_batch_classify.py "../ECG signals/PVC/208" --stride 32 --workers 0
+    python ecg_batch_classify.py "../ECG signals/PVC/208" --beats
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ecg_dat_reader import BEAT_CODES, open_record, read_annotation_file, record_name
+from ecg_synth import is_synth_path
+from qrs_detector import beat_windows, detect
+from zolotyhnet_model import (CLASS_GROUPS, NUM_CLASSES, WINDOW, WEIGHTS_DIR,
+                              ZolotyhNet, load_weights, to_q88, to_uart_samples)
+
+# Windows per pool task
+TASK_WINDOWS = 4096
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+
+def _windows(samples, stride, starts=None):
+    """128-sample windows at the given stride (a view), or at the given starts"""
+    view = sliding_window_view(samples, WINDOW)
+    return view[::stride] if starts is None else view[starts]
+
+
+def _init_worker(shm_name, length, stride, weights, starts=None):
+    """Attach to the shared record and build the model once per process"""
+    # The parent owns the block and unlinks it; workers only attach
+    shm = shared_memory.SharedMemory(name=shm_name)
+    samples = np.ndarray((length,), dtype=np.int16, buffer=shm.buf)
+    _worker.update(shm=shm, windows=_windows(samples, stride, starts), model=ZolotyhNet(weights))
+
+
+def _classify_range(task):
+    """Classify windows [start, stop) of the shared record"""
+    start, stop = task
+    scores = _worker['model'].forward(_worker['windows'][start:stop])
+    return start, scores
+
+
+def _worker_count(workers):
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def classify_samples(q88, stride=32, workers=1, weights=None, starts=None):
+    """
+    Class scores of every window of a Q8.8 record
+
+    Args:
+        q88: int16 samples (see zolotyhnet_model.to_q88)
+        stride: Samples between window starts
+        workers: Processes (1 = in this process, 0 = one per CPU)
+        weights: dict from load_weights() (default: the .mif files)
+        starts: Explicit window starts instead of the stride (e.g. beats)
+
+    Returns:
+        int16 (N, 8) classifier outputs, window i starting at i * stride
+        (or at starts[i])
+    """
+    weights = weights if weights is not None else load_weights()
+    count = len(_windows(q88, stride)) if starts is None else len(starts)
+    workers = _worker_count(workers)
+    tasks = [(a, min(a + TASK_WINDOWS, count)) for a in range(0, count, TASK_WINDOWS)]
+
+    if workers <= 1 or len(tasks) <= 1:
+        return ZolotyhNet(weights).forward(_windows(q88, stride, starts))
+
+    scores = np.empty((count, NUM_CLASSES), dtype=np.int16)
+    shm = shared_memory.SharedMemory(create=True, size=max(q88.nbytes, 1))
+    try:
+        np.ndarray(q88.shape, dtype=np.int16, buffer=shm.buf)[:] = q88
+        with multiprocessing.Pool(min(workers, len(tasks)), initializer=_init_worker,
+                                  initargs=(shm.name, len(q88), stride, weights, starts)) as pool:
+            for start, part in pool.imap_unordered(_classify_range, tasks):
+                scores[start:start + len(part)] = part
+    finally:
+        shm.close()
+        shm.unlink()
+    return scores
+
+
+def record_burden(record_path):
+    """
+    Share of annotated beats that are ventricular (V/E), if the record has a .atr
+
+    Returns:
+        (ventricular beats, all beats) or None
+    """
+    if is_synth_path(record_path):
+        ann = open_record(record_path).read_annotations()
+    else:
+        path = Path(record_path).with_suffix('.atr')
+        if not path.exists():
+            return None
+        ann = read_annotation_file(path)
+    beats = np.isin(ann['code'], list(BEAT_CODES))
+    ventricular = np.isin(ann['symbol'][beats], ['V', 'E'])
+    return int(ventricular.sum()), int(beats.sum())
+
+
+def classify_record(record_path, lead=0, stride=32, workers=1, weights=None, beats=False):
+    """
+    Classify a whole MIT-BIH record
+
+    Args:
+        record_path: Record path without extension
+        lead: Signal index
+        stride, workers, weights: See classify_samples()
+        beats: One window centred on each detected R peak instead of the stride
+
+    Returns:
+        (scores int16 (N, 8), sample_rate, R peaks per window or None)
+    """
+    reader = open_record(record_path)
+    signal = reader.read_signal(lead)
+    q88 = to_q88(to_uart_samples(signal))
+    if not beats:
+        return classify_samples(q88, stride, workers, weights), reader.sample_rate, None
+    # Detect on the physical signal: the 12-bit stream is clipped at +-1 SD
+    peaks = detect(signal, reader.sample_rate)
+    starts = beat_windows(peaks, len(q88))
+    blind = len(_windows(q88, stride))
+    print(f"✓ {len(starts)} beat-centred windows instead of {blind} at stride {stride} "
+          f"({blind / max(len(starts), 1):.1f}x fewer)")
+    scores = classify_samples(q88, stride, workers, weights, starts)
+    return scores, reader.sample_rate, starts + WINDOW // 2
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Offline ZolotyhNet classification of whole records',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Class timeline of record 208, one window every 32 samples, all cores
+  python ecg_batch_classify.py "../ECG signals/PVC/208" --stride 32 --workers 0
+
+  # One window per detected heartbeat instead of a fixed stride
+  python ecg_batch_classify.py "../ECG signals/PVC/208" --beats
+
+  # Several records, keep the raw classifier scores
+  python ecg_batch_classify.py "../ECG signals/Normal/100" "../ECG signals/PVC/208" --scores --out-dir results
+        """
+    )
+
+    parser.add_argument('records', nargs='+',
+                        help='MIT-BIH records (paths without extension)')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Signal index to classify (default: 0)')
+    parser.add_argument('--stride', type=int, default=32,
+                        help='Samples between windows (default: 32)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes, 0 = one per CPU (default: 0)')
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--out-dir', default='.',
+                        help='Where to write <record>_classes.npz (default: .)')
+    parser.add_argument('--scores', action='store_true',
+                        help='Also store the 8 classifier outputs per window')
+    parser.add_argument('--beats', action='store_true',
+                        help='Classify beat-centred windows (qrs_detector.py) instead of --stride')
+
+    args = parser.parse_args()
+
+    if args.stride < 1:
+        print("✗ --stride must be at least 1")
+        sys.exit(1)
+
+    try:
+        weights = load_weights(args.weights)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    workers = _worker_count(args.workers)
+
+    for record in args.records:
+        print(f"\n▶ {record}")
+        try:
+            start = time.perf_counter()
+            scores, rate, beats = classify_record(record, args.lead, args.stride, workers,
+                                                  weights, args.beats)
+            elapsed = time.perf_counter() - start
+        except (FileNotFoundError, ValueError, NotImplementedError) as e:
+            print(f"✗ {e}")
+            continue
+
+        classes = np.argmax(scores, axis=1).astype(np.uint8)
+        print(f"✓ {len(classes)} windows in {elapsed:.2f} s "
+              f"({len(classes) / elapsed:.0f} windows/s, {workers} worker{'s' if workers > 1 else ''})")
+
+        counts = np.bincount(classes, minlength=NUM_CLASSES)
+        for c in np.flatnonzero(counts):
+            print(f"  class {c} ({CLASS_GROUPS[c]}): {counts[c]} ({100 * counts[c] / len(classes):.1f}%)")
+        abnormal = sum(counts[c] for c in range(NUM_CLASSES) if CLASS_GROUPS[c] == 'PVC/Abnormal')
+        print(f"  CNN PVC/Abnormal windows: {100 * abnormal / len(classes):.1f}%")
+        burden = record_burden(record)
+        if burden:
+            print(f"  Annotated ventricular beats: {burden[0]}/{burden[1]} "
+                  f"({100 * burden[0] / burden[1]:.1f}%)")
+
+        result = {'classes': classes, 'stride': 0 if args.beats else args.stride,
+                  'window': WINDOW, 'sample_rate': rate, 'lead': args.lead}
+        if beats is not None:
+            result['beats'] = beats
+        if args.scores:
+            result['scores'] = scores
+        out_path = out_dir / f'{record_name(record)}_classes.npz'
+        np.savez_compressed(out_path, **result)
+        print(f"✓ Saved {out_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,548 @@
+#!/usr/bin/env python3
+"""
+ECG Benchmark - Classifier accuracy and throughput against .atr ground truth
+
+Runs every record under ECG signals/ and reports "accuracy at X windows/s"
+for one build, in a JSON file that can be compared between commits.
+
+Each annotated beat is aligned with the CNN window centred nearest to it.
+The CNN's 3-bit class goes through the same 2-bit display mapping as the
+board (cnn_interface.vhd, user_interface_controller.vhd):
+
+    class 0     -> Normal   (LEDG7)
+    classes 1-3 -> PVC      (LEDG5)
+    classes 4-6 -> LBBB     (LEDG6, shared with AFib)
+    class 7     -> Unknown
+
+Ground truth: N -> Normal, V -> PVC, L -> LBBB. Other beat labels are
+counted but not scored. Beats without a window within tolerance (beat mode:
+no detection within 150 ms) land in a Missed column.
+
+Class outputs come from the NumPy reference model (zolotyhnet_model.py),
+or from --classes DIR, which holds <record>_classes.npz files in the
+ecg_batch_classify.py format (classes plus stride or beats). That is how
+class timelines read back from the board or an emulator get scored.
+
+Every stage (load, detect, classify, score) records its wall time and its
+own peak RSS: on Linux the high-water mark is reset before the stage
+(/proc/self/clear_refs) and read after it (VmHWM). Worker processes of the
+parallel classify path get worker_peak_rss_mb, the largest worker's peak.
+Elsewhere a stage's peak is only known when it raised the process maximum
+(getrusage), otherwise it is null. The classify stage also records
+windows/s. The JSON carries a schema version, the git commit, the
+weights' SHA-1 and the configuration. --compare prints the change against
+an earlier file.
+
+Usage:
+    python ecg_benchmark.py                         # beat-centred windows
+    python ecg_benchmark.py --mode stride --stride 32 --workers 0
+    python ecg_benchmark.py --compare benchmarks/<earlier>.json
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:          # Windows: no getrusage
+    resource = None
+
+from ecg_batch_classify import classify_samples
+from ecg_dat_reader import (BEAT_CODES, bundled_records, open_record, read_annotation_file,
+                            record_name)
+from ecg_synth import is_synth_path
+from qrs_detector import MATCH_TOLERANCE, beat_windows, detect, match_beats
+from zolotyhnet_model import (CLASS_GROUPS, WEIGHTS_DIR, WINDOW, load_weights, to_q88,
+                              to_uart_samples)
+
+# 2: peak_rss_mb per stage instead of the process maximum so far
+SCHEMA_VERSION = 2
+RESULTS_DIR = Path(__file__).resolve().parent / 'benchmarks'
+
+TRUE_CLASSES = ['Normal', 'PVC', 'LBBB']
+PREDICTED = TRUE_CLASSES + ['Unknown', 'Missed']
+
+# Annotation symbol -> row of the confusion matrix
+BEAT_LABELS = {'N': 0, 'V': 1, 'L': 2}
+
+# CNN class -> column, through the 2-bit display groups
+_DISPLAY = ['Normal', 'PVC/Abnormal', 'AFib/Other', 'Unknown']
+CLASS_COLUMN = np.array([_DISPLAY.index(g) for g in CLASS_GROUPS])
+MISSED = PREDICTED.index('Missed')
+
+# Regressions flagged by --compare
+ACCURACY_DROP = 0.1          # percentage points
+THROUGHPUT_DROP = 0.10       # fraction of windows/s
+
+# Seconds between polls of the worker processes' peak RSS
+RSS_POLL_S = 0.05
+
+
+def _maxrss_kb(who):
+    """getrusage ru_maxrss in kB (RUSAGE_SELF or RUSAGE_CHILDREN), or None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _peak_rss_mb(children=False):
+    """Peak resident set size of this process (or its largest child) so far, or None"""
+    if resource is None:
+        return None
+    peak = _maxrss_kb(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    return round(peak / 1024, 1)
+
+
+def _status_kb(pid, field):
+    """A kB field ('VmHWM', 'VmRSS') of /proc/<pid>/status, or None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _reset_peak_rss():
+    """Reset this process's VmHWM to its current RSS; False if not supported"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _child_pids():
+    """PIDs of this process's children (Linux), or an empty list"""
+    pids = []
+    try:
+        for task in os.listdir('/proc/self/task'):
+            with open(f'/proc/self/task/{task}/children') as f:
+                pids.extend(f.read().split())
+    except OSError:
+        pass
+    return pids
+
+
+class _RssMonitor:
+    """Peak RSS of this process and of its worker processes over a with block"""
+
+    def __enter__(self):
+        self.reset = _reset_peak_rss()
+        self.self_before = _maxrss_kb(resource.RUSAGE_SELF) if resource else None
+        self.children_before = _maxrss_kb(resource.RUSAGE_CHILDREN) if resource else None
+        self.workers = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def _poll(self):
+        # A worker's VmHWM is its lifetime peak; keep the last value seen
+        while not self._stop.wait(RSS_POLL_S):
+            for pid in _child_pids():
+                peak = _status_kb(pid, 'VmHWM')
+                if peak is not None:
+                    self.workers[pid] = max(peak, self.workers.get(pid, 0))
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = _status_kb('self', 'VmHWM') if self.reset else None
+        if self.peak_kb is None and self.self_before is not None:
+            after = _maxrss_kb(resource.RUSAGE_SELF)
+            self.peak_kb = after if after > self.self_before else None
+        self.worker_peak_kb = max(self.workers.values(), default=None)
+        if self.children_before is not None:
+            # Workers reaped in this stage that set a new maximum, between polls
+            after = _maxrss_kb(resource.RUSAGE_CHILDREN)
+            if after > self.children_before:
+                self.worker_peak_kb = max(after, self.worker_peak_kb or 0)
+        return False
+
+
+class _Stages:
+    """Wall time and peak RSS per named stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        with _RssMonitor() as rss:
+            result = func(*args, **kwargs)
+        stage = {'wall_s': round(time.perf_counter() - start, 4),
+                 'peak_rss_mb': None if rss.peak_kb is None else round(rss.peak_kb / 1024, 1)}
+        if rss.worker_peak_kb is not None:
+            stage['worker_peak_rss_mb'] = round(rss.worker_peak_kb / 1024, 1)
+        self.stages[name] = stage
+        return result
+
+
+def git_version():
+    """Commit of the working tree, or None outside git"""
+    root = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {'commit': commit, 'dirty': bool(dirty)}
+
+
+def weights_sha1(weights):
+    """SHA-1 over the weight arrays, in name order"""
+    digest = hashlib.sha1()
+    for name in sorted(weights):
+        digest.update(name.encode() + b'\0' + np.ascontiguousarray(weights[name]).tobytes())
+    return digest.hexdigest()
+
+
+def ground_truth(record_path):
+    """
+    Annotated beats of a record (the generated beats of a "synth:" record)
+
+    Returns:
+        (beat samples, row per beat or -1 for unscored labels)
+    """
+    if is_synth_path(record_path):
+        ann = open_record(record_path).read_annotations()
+    else:
+        ann = read_annotation_file(Path(record_path).with_suffix('.atr'))
+    beats = np.isin(ann['code'], list(BEAT_CODES))
+    rows = np.array([BEAT_LABELS.get(s, -1) for s in ann['symbol'][beats].tolist()], dtype=np.int64)
+    return ann['sample'][beats], rows
+
+
+def align(beats, centres, classes, tolerance):
+    """
+    Column for every beat: the class of the nearest window centre
+
+    Args:
+        beats: Annotated beat samples
+        centres: Sorted window centre samples
+        classes: CNN class per window
+        tolerance: Largest beat-to-centre distance, in samples
+
+    Returns:
+        int array of PREDICTED columns (MISSED when no window is close enough)
+    """
+    columns = np.full(len(beats), MISSED, dtype=np.int64)
+    if not len(centres):
+        return columns
+    right = np.minimum(np.searchsorted(centres, beats), len(centres) - 1)
+    left = np.maximum(right - 1, 0)
+    nearest = np.where(np.abs(centres[left] - beats) <= np.abs(centres[right] - beats), left, right)
+    close = np.abs(centres[nearest] - beats) <= tolerance
+    columns[close] = CLASS_COLUMN[classes[nearest[close]]]
+    return columns
+
+
+def confusion_matrix(rows, columns):
+    """Rows: TRUE_CLASSES, columns: PREDICTED"""
+    matrix = np.zeros((len(TRUE_CLASSES), len(PREDICTED)), dtype=np.int64)
+    scored = rows >= 0
+    np.add.at(matrix, (rows[scored], columns[scored]), 1)
+    return matrix
+
+
+def metrics(matrix):
+    """Accuracy, and sensitivity / PPV per class, in percent"""
+    matrix = np.asarray(matrix)
+    total = matrix.sum()
+    result = {'beats': int(total),
+              'accuracy': round(100 * np.trace(matrix[:, :len(TRUE_CLASSES)]) / total, 3) if total else None}
+    for i, name in enumerate(TRUE_CLASSES):
+        row, col = matrix[i].sum(), matrix[:, i].sum()
+        result[name] = {'sensitivity': round(100 * matrix[i, i] / row, 3) if row else None,
+                        'ppv': round(100 * matrix[i, i] / col, 3) if col else None}
+    return result
+
+
+def load_classes(directory, record_path):
+    """
+    Class timeline from <directory>/<record>_classes.npz
+
+    Returns:
+        (classes, window centres)
+    """
+    data = np.load(Path(directory) / f'{record_name(record_path)}_classes.npz')
+    classes = data['classes'].astype(np.int64)
+    window = int(data['window']) if 'window' in data else WINDOW
+    if 'beats' in data:
+        return classes, data['beats'].astype(np.int64)
+    return classes, np.arange(len(classes), dtype=np.int64) * int(data['stride']) + window // 2
+
+
+def benchmark_record(record_path, args, weights):
+    """
+    All stages for one record
+
+    Returns:
+        dict for the JSON file
+    """
+    stages = _Stages()
+
+    def load():
+        reader = open_record(record_path)
+        signal = reader.read_signal(args.lead)
+        return reader.sample_rate, signal, to_q88(to_uart_samples(signal))
+
+    fs, signal, q88 = stages.run('load', load)
+    beats, rows = ground_truth(record_path)
+    result = {'samples': len(signal), 'sample_rate': fs}
+
+    if args.classes:
+        classes, centres = stages.run('classify', load_classes, args.classes, record_path)
+        tolerance = round(MATCH_TOLERANCE * fs)
+    elif args.mode == 'beats':
+        peaks = stages.run('detect', detect, signal, fs)
+        tp, fp, fn = match_beats(beats, peaks, round(MATCH_TOLERANCE * fs))
+        result['detection'] = {'tp': tp, 'fp': fp, 'fn': fn,
+                               'f1': round(200 * tp / max(2 * tp + fp + fn, 1), 3)}
+        starts = beat_windows(peaks, len(q88))
+        scores = stages.run('classify', classify_samples, q88, args.stride, args.workers,
+                            weights, starts)
+        classes, centres = np.argmax(scores, axis=1), starts + WINDOW // 2
+        tolerance = round(MATCH_TOLERANCE * fs)
+    else:
+        scores = stages.run('classify', classify_samples, q88, args.stride, args.workers, weights)
+        classes = np.argmax(scores, axis=1)
+        centres = np.arange(len(classes), dtype=np.int64) * args.stride + WINDOW // 2
+        tolerance = max(round(MATCH_TOLERANCE * fs), args.stride // 2)
+
+    classify = stages.stages['classify']
+    classify['windows'] = len(classes)
+    if not args.classes:
+        classify['windows_per_s'] = round(len(classes) / max(classify['wall_s'], 1e-9), 1)
+
+    columns = stages.run('score', align, beats, centres, classes, tolerance)
+    matrix = confusion_matrix(rows, columns)
+    result.update(stages=stages.stages, confusion=matrix.tolist(), metrics=metrics(matrix),
+                  unscored_beats=int(np.count_nonzero(rows < 0)))
+    return result
+
+
+def print_record(name, result):
+    """Confusion matrix and headline numbers of one record"""
+    m = result['metrics']
+    classify = result['stages']['classify']
+    rate = f", {classify['windows_per_s']:.0f} windows/s" if 'windows_per_s' in classify else ''
+    accuracy = f"{m['accuracy']:.2f}%" if m['accuracy'] is not None else 'n/a'
+    print(f"✓ {name}: accuracy {accuracy} on {m['beats']} beats, "
+          f"{classify['windows']} windows{rate}")
+    if 'detection' in result:
+        print(f"  QRS detection F1 {result['detection']['f1']:.2f}%")
+    print(f"  {'':8}" + ''.join(f"{p:>9}" for p in PREDICTED))
+    for label, row in zip(TRUE_CLASSES, result['confusion']):
+        if sum(row):
+            print(f"  {label:8}" + ''.join(f"{v:>9}" for v in row))
+    stages = ', '.join(f"{k} {v['wall_s']:.2f} s" for k, v in result['stages'].items())
+    print(f"  {stages}")
+    peaks = []
+    for k, v in result['stages'].items():
+        if v['peak_rss_mb'] is not None:
+            peaks.append(f"{k} {v['peak_rss_mb']}")
+        if 'worker_peak_rss_mb' in v:
+            peaks.append(f"{k} workers {v['worker_peak_rss_mb']}")
+    if peaks:
+        print(f"  peak RSS MB: {', '.join(peaks)}")
+
+
+def _max_stage(records, key, current):
+    """Largest value of a stage field over all records, or current (getrusage)"""
+    # Resetting VmHWM also resets ru_maxrss, so current alone can be too low
+    values = [s[key] for r in records.values() for s in r['stages'].values()
+              if s.get(key) is not None]
+    if current is not None:
+        values.append(current)
+    return max(values, default=None)
+
+
+def summarize(records):
+    """Totals over all records"""
+    matrix = np.sum([r['confusion'] for r in records.values()], axis=0)
+    windows = sum(r['stages']['classify']['windows'] for r in records.values())
+    wall = sum(r['stages']['classify']['wall_s'] for r in records.values())
+    timed = all('windows_per_s' in r['stages']['classify'] for r in records.values())
+    total = {'confusion': matrix.tolist(), 'metrics': metrics(matrix), 'windows': windows,
+             'classify_wall_s': round(wall, 4),
+             'windows_per_s': round(windows / wall, 1) if wall and timed else None,
+             'wall_s': round(sum(s['wall_s'] for r in records.values()
+                                 for s in r['stages'].values()), 4),
+             'peak_rss_mb': _max_stage(records, 'peak_rss_mb', _peak_rss_mb()),
+             'worker_peak_rss_mb': _max_stage(records, 'worker_peak_rss_mb',
+                                              _peak_rss_mb(children=True))}
+    detections = [r['detection'] for r in records.values() if 'detection' in r]
+    if detections:
+        tp, fp, fn = (sum(d[k] for d in detections) for k in ('tp', 'fp', 'fn'))
+        total['detection_f1'] = round(200 * tp / max(2 * tp + fp + fn, 1), 3)
+    return total
+
+
+def compare(current, previous_path):
+    """Print the change against an earlier result file"""
+    previous = json.loads(Path(previous_path).read_text())
+    if previous.get('schema') != SCHEMA_VERSION:
+        print(f"⚠ {previous_path} has schema {previous.get('schema')}, expected {SCHEMA_VERSION}")
+    if previous.get('config') != current['config']:
+        print("⚠ Configurations differ, the comparison may not be like for like")
+    old, new = previous['total'], current['total']
+    commit = (previous.get('git') or {}).get('commit', '?')[:7]
+    print(f"\n▶ Against {Path(previous_path).name} ({commit})")
+
+    def delta(label, a, b, unit, drop=None, relative=False):
+        if a is None or b is None:
+            return
+        change = (b - a) / a if relative and a else b - a
+        worse = drop is not None and -change > drop
+        text = f"{change:+.1%}" if relative else f"{change:+.3f}{unit}"
+        print(f"  {'⚠' if worse else ' '} {label:<24} {a:>10} -> {b:<10} ({text})")
+
+    delta('accuracy %', old['metrics']['accuracy'], new['metrics']['accuracy'], ' pt', ACCURACY_DROP)
+    for name in TRUE_CLASSES:
+        for key in ('sensitivity', 'ppv'):
+            delta(f"{name} {key} %", old['metrics'][name][key], new['metrics'][name][key],
+                  ' pt', ACCURACY_DROP)
+    delta('windows/s', old.get('windows_per_s'), new.get('windows_per_s'), '',
+          THROUGHPUT_DROP, relative=True)
+    delta('detection F1 %', old.get('detection_f1'), new.get('detection_f1'), ' pt', ACCURACY_DROP)
+    delta('peak RSS MB', old.get('peak_rss_mb'), new.get('peak_rss_mb'), ' MB')
+    delta('worker peak RSS MB', old.get('worker_peak_rss_mb'), new.get('worker_peak_rss_mb'), ' MB')
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Classifier accuracy and throughput against .atr annotations',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Reference model on beat-centred windows, all bundled records
+  python ecg_benchmark.py
+
+  # Blind windows every 32 samples on all cores
+  python ecg_benchmark.py --mode stride --stride 32 --workers 0
+
+  # Score class timelines captured elsewhere (board, emulator, ecg_batch_classify.py)
+  python ecg_benchmark.py --classes captures/
+
+  # Compare with an earlier run
+  python ecg_benchmark.py --compare benchmarks/bench_20261019T120000_ddb60bc.json
+        """
+    )
+
+    parser.add_argument('records', nargs='*',
+                        help='MIT-BIH records (default: every bundled record with a .atr)')
+    parser.add_argument('--mode', choices=['beats', 'stride'], default='beats',
+                        help='Beat-centred windows (qrs_detector.py) or a fixed stride (default: beats)')
+    parser.add_argument('--stride', type=int, default=32,
+                        help='Samples between windows in stride mode (default: 32)')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Signal index to classify (default: 0)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes for the model, 0 = one per CPU (default: 1)')
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--classes', metavar='DIR', default=None,
+                        help='Score <record>_classes.npz files from DIR instead of running the model')
+    parser.add_argument('--out', default=None,
+                        help=f'Result file (default: {RESULTS_DIR.name}/bench_<time>_<commit>.json)')
+    parser.add_argument('--compare', metavar='JSON', default=None,
+                        help='Earlier result file to compare with')
+
+    args = parser.parse_args()
+
+    if args.stride < 1:
+        print("✗ --stride must be at least 1")
+        sys.exit(1)
+
+    try:
+        weights = load_weights(args.weights)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    records = [Path(r) for r in args.records]
+    if not records:
+        records, missing = bundled_records()
+        for record in missing:
+            print(f"⚠ Skipping {record.name}: no .dat file")
+    scored = [r for r in records if is_synth_path(r) or r.with_suffix('.atr').exists()]
+    for record in sorted(set(records) - set(scored)):
+        print(f"⚠ Skipping {record.name}: no .atr annotations")
+
+    results = {}
+    for record in scored:
+        print(f"\n▶ {record}")
+        try:
+            results[record.name] = benchmark_record(record, args, weights)
+        except (FileNotFoundError, ValueError, NotImplementedError, KeyError) as e:
+            print(f"✗ {e}")
+            continue
+        print_record(record.name, results[record.name])
+    if not results:
+        print("✗ No records benchmarked")
+        sys.exit(1)
+
+    created = datetime.datetime.now(datetime.timezone.utc)
+    git = git_version()
+    report = {
+        'schema': SCHEMA_VERSION,
+        'created': created.isoformat(timespec='seconds'),
+        'git': git,
+        'host': {'python': platform.python_version(), 'numpy': np.__version__,
+                 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'config': {'source': f"classes:{args.classes}" if args.classes else 'model',
+                   'mode': 'classes' if args.classes else args.mode,
+                   'stride': args.stride if args.mode == 'stride' else None,
+                   'lead': args.lead, 'workers': args.workers,
+                   'weights_sha1': weights_sha1(weights)},
+        'records': results,
+        'total': summarize(results),
+    }
+
+    total = report['total']
+    def percent(value):
+        return 'n/a' if value is None else f"{value:.2f}%"
+
+    print(f"\n✓ Total: accuracy {percent(total['metrics']['accuracy'])} on {total['metrics']['beats']} beats"
+          + (f" at {total['windows_per_s']:.0f} windows/s" if total['windows_per_s'] else ''))
+    for name in TRUE_CLASSES:
+        m = total['metrics'][name]
+        print(f"  {name:7} Se {percent(m['sensitivity'])}  PPV {percent(m['ppv'])}")
+
+    out = Path(args.out) if args.out else RESULTS_DIR / (
+        f"bench_{created.strftime('%Y%m%dT%H%M%S')}_{git['commit'][:7] if git else 'nogit'}"
+        f"{'-dirty' if git and git['dirty'] else ''}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"✓ Saved {out}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+ECG CSV - Fast loading of the ECG column of a CSV file
+
+Every streamer used to pd.read_csv() the whole file (all columns, float64)
+and then pick the first of ECG_COLUMNS. load_csv() returns the same column:
+
+    1. The first 64 KiB are sniffed for the delimiter, a header row and the
+       ECG column. A first row that is all numbers is data, unless it names
+       one of ECG_COLUMNS ("0", as written by pd.Series.to_csv) or is all
+       integers above a row that is not (integer column names of a
+       DataFrame).
+    2. Only that column is parsed, straight into float32: pandas with
+       usecols (pyarrow engine when installed, else the C engine), or a
+       chunked np.loadtxt reader when pandas is not installed.
+    3. The result is cached in a sidecar next to the CSV,
+       <name>.csv.col<N>.npy, whose mtime is set to the CSV's. Later loads
+       read the sidecar (no parsing, no pandas import) as long as the CSV's
+       mtime still matches. Files under CACHE_MIN_BYTES are not cached.
+
+pandas is imported only when a file actually has to be parsed.
+
+Usage:
+    python ecg_csv.py data/normal_ecg.csv
+    python ecg_csv.py export.csv --column V1 --compare
+    python ecg_csv.py --verify
+
+    from ecg_csv import load_csv
+    ecg = load_csv('export.csv')      # float32 samples
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import csv
+import importlib.util
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Column names tried in this order; the first column if none matches
+ECG_COLUMNS = ('ECG', 'ecg', 'signal', 'value', '0')
+ENGINES = ('auto', 'pyarrow', 'c', 'numpy')
+
+SNIFF_BYTES = 1 << 16
+# Files smaller than this are parsed every time (sidecar not worth it)
+CACHE_MIN_BYTES = 1 << 20
+# Lines per np.loadtxt call of the fallback reader
+NUMPY_CHUNK_LINES = 1 << 20
+
+
+def _is_number(field):
+    try:
+        float(field)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_integer(field):
+    try:
+        int(field)
+        return True
+    except ValueError:
+        return False
+
+
+def _is_header(first, second):
+    """True if the first row (fields) is a header, given the second row (or None)"""
+    if not all(_is_number(field) for field in first):
+        return True
+    if any(field in ECG_COLUMNS for field in first):
+        return True                             # pd.Series(x).to_csv(index=False) -> "0"
+    return (second is not None and all(_is_integer(field) for field in first)
+            and not all(_is_integer(field) for field in second))
+
+
+def sniff_csv(path, column=None):
+    """
+    Delimiter, header and ECG column of a CSV file
+
+    Args:
+        path: CSV file
+        column: Column name or index (default: first of ECG_COLUMNS, else 0)
+
+    Returns:
+        (delimiter, has_header, column index, column name or None)
+
+    Raises:
+        ValueError if the file is empty or the column does not exist
+    """
+    with open(path, 'rb') as f:
+        sample = f.read(SNIFF_BYTES).decode('utf-8', errors='replace').lstrip('\ufeff')
+    lines = [line for line in sample.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError(f"{path} is empty")
+    try:
+        delimiter = csv.Sniffer().sniff('\n'.join(lines[:20]), delimiters=',;\t').delimiter
+    except csv.Error:
+        delimiter = ','                         # single column
+    rows = [[field.strip().strip('"\'') for field in row]
+            for row in csv.reader(lines[:2], delimiter=delimiter)]
+    first = rows[0]
+    has_header = _is_header(first, rows[1] if len(rows) > 1 else None)
+    names = first if has_header else []
+
+    if column is None:
+        index = next((names.index(c) for c in ECG_COLUMNS if c in names), 0)
+    elif isinstance(column, int) or (str(column).isdigit() and str(column) not in names):
+        index = int(column)
+    elif str(column) in names:
+        index = names.index(str(column))
+    else:
+        raise ValueError(f"{path} has no column {column!r} (columns: {', '.join(names)})")
+    if index >= len(first):
+        raise ValueError(f"{path} has {len(first)} columns, no column {index}")
+    return delimiter, has_header, index, names[index] if names else None
+
+
+def cache_path(path, index):
+    """Sidecar of column index of a CSV file"""
+    path = Path(path)
+    return path.with_name(f'{path.name}.col{index}.npy')
+
+
+def _read_pandas(path, delimiter, has_header, index, engine):
+    import pandas as pd
+    df = pd.read_csv(path, sep=delimiter, header=0 if has_header else None,
+                     usecols=[index], dtype=np.float32, engine=engine)
+    return df.iloc[:, 0].to_numpy()
+
+
+def _read_numpy(path, delimiter, has_header, index):
+    parts = []
+    with open(path, 'rb') as f:
+        if has_header:
+            f.readline()
+        while True:
+            lines = f.readlines(NUMPY_CHUNK_LINES * 16)
+            if not lines:
+                break
+            parts.append(np.loadtxt(lines, delimiter=delimiter, usecols=index,
+                                    dtype=np.float32, ndmin=1, encoding='utf-8'))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+
+
+def parse_csv(path, column=None, engine='auto'):
+    """
+    Parse one column of a CSV file (no cache)
+
+    Args:
+        path: CSV file
+        column: See sniff_csv()
+        engine: 'auto' (pyarrow, else c, else numpy), 'pyarrow', 'c' or 'numpy'
+
+    Returns:
+        (float32 samples, column index)
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, use one of {', '.join(ENGINES)}")
+    delimiter, has_header, index, _ = sniff_csv(path, column)
+    if engine == 'auto':
+        if importlib.util.find_spec('pandas') is None:
+            engine = 'numpy'
+        elif importlib.util.find_spec('pyarrow') is not None:
+            engine = 'pyarrow'
+        else:
+            engine = 'c'
+    if engine == 'numpy':
+        return _read_numpy(path, delimiter, has_header, index), index
+    try:
+        return _read_pandas(path, delimiter, has_header, index, engine), index
+    except ValueError:
+        if engine != 'pyarrow':
+            raise
+        # Options the pyarrow engine does not support: the C engine has them all
+        return _read_pandas(path, delimiter, has_header, index, 'c'), index
+
+
+def load_csv(path, column=None, cache=True, engine='auto'):
+    """
+    ECG column of a CSV file as float32, from the sidecar cache when current
+
+    Args:
+        path: CSV file
+        column: Column name or index (default: first of ECG_COLUMNS, else 0)
+        cache: Read and write the .npy sidecar
+        engine: See parse_csv()
+
+    Returns:
+        float32 numpy array
+
+    Raises:
+        FileNotFoundError, ValueError (empty file, missing column, non-numeric data)
+    """
+    path = Path(path)
+    stat = path.stat()
+    cache = cache and stat.st_size >= CACHE_MIN_BYTES
+    if cache:
+        _, _, index, _ = sniff_csv(path, column)
+        sidecar = cache_path(path, index)
+        try:
+            if sidecar.stat().st_mtime_ns == stat.st_mtime_ns:
+                return np.load(sidecar)
+        except (OSError, ValueError):
+            pass
+
+    data, index = parse_csv(path, column, engine)
+    if cache:
+        sidecar = cache_path(path, index)
+        try:
+            tmp = sidecar.with_suffix('.tmp.npy')
+            np.save(tmp, data)
+            os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp, sidecar)
+        except OSError as e:
+            print(f"⚠ Cannot cache {path.name}: {e}")
+    return data
+
+
+# (file contents, expected samples) for --verify; None = what pd.read_csv picks
+VERIFY_CASES = {
+    'ECG header': ('ECG\n0.5\n-1.25\n2\n', [0.5, -1.25, 2]),
+    'no header': ('0.5\n-1.25\n2\n', [0.5, -1.25, 2]),
+    'no header, integers': ('512\n515\n-3\n', [512, 515, -3]),
+    'Series.to_csv "0" header': ('0\n1.5\n2.5\n3.5\n', None),
+    'Series.to_csv of integers': ('0\n512\n515\n', None),
+    'integer column names': ('0,1\n1.5,9.5\n2.5,8.5\n', None),
+    'time and ECG': ('time,ECG\n0,0.1\n1,0.2\n', None),
+    'semicolon, value': ('t;value;x\n0;7.5;1\n1;6.5;2\n', None),
+}
+
+
+def verify():
+    """
+    Check the sniffer and both parsers on small files of known shape
+
+    Returns:
+        True if every case matches
+    """
+    import tempfile
+    try:
+        import pandas as pd
+    except ImportError:
+        pd = None
+    ok = True
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, (text, expected) in VERIFY_CASES.items():
+            path = Path(tmp) / 'case.csv'
+            path.write_text(text)
+            if expected is None:
+                if pd is None:
+                    print(f"⚠ {name}: skipped, needs pandas")
+                    continue
+                df = pd.read_csv(path, sep=None, engine='python')
+                column = next((c for c in ECG_COLUMNS if c in df.columns), df.columns[0])
+                expected = df[column].to_numpy()
+            expected = np.asarray(expected, dtype=np.float32)
+            failed = False
+            for engine in ('c', 'numpy') if pd is not None else ('numpy',):
+                data = load_csv(path, cache=False, engine=engine)
+                if not np.array_equal(data, expected):
+                    print(f"✗ {name} ({engine}): {data.tolist()} != {expected.tolist()}")
+                    failed = True
+            if not failed:
+                print(f"✓ {name}")
+            ok &= not failed
+    return ok
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Load the ECG column of a CSV file (and build its cache)',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Sniff, parse and cache the ECG column
+  python ecg_csv.py export.csv
+
+  # Another column, timed against pd.read_csv of the whole file
+  python ecg_csv.py export.csv --column V1 --compare
+
+  # Check the header sniffer on files of known shape
+  python ecg_csv.py --verify
+        """
+    )
+
+    parser.add_argument('file', nargs='?', help='CSV file')
+    parser.add_argument('--column', '-c',
+                        help='Column name or index (default: ECG, ecg, signal, value, 0 or the first)')
+    parser.add_argument('--engine', choices=ENGINES, default='auto',
+                        help='Parser (default: auto = pyarrow, c or numpy, whichever is installed)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Neither read nor write the .npy sidecar')
+    parser.add_argument('--compare', action='store_true',
+                        help='Also time a full pd.read_csv and a cold (uncached) parse')
+    parser.add_argument('--verify', action='store_true',
+                        help='Check the header sniffer and parsers against known files')
+
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify() else 1)
+    if args.file is None:
+        parser.error('a CSV file is required (unless --verify)')
+
+    try:
+        delimiter, has_header, index, name = sniff_csv(args.file, args.column)
+        print(f"✓ {args.file}: delimiter {delimiter!r}, "
+              f"{'header' if has_header else 'no header'}, column {index}"
+              f"{f' ({name})' if name else ''}")
+        if args.compare:
+            start = time.perf_counter()
+            import pandas as pd
+            df = pd.read_csv(args.file)
+            print(f"  pd.read_csv, all columns: {time.perf_counter() - start:.2f} s, "
+                  f"{df.memory_usage(index=False).sum() / 1e6:.0f} MB")
+            del df
+            start = time.perf_counter()
+            data, _ = parse_csv(args.file, args.column, args.engine)
+            print(f"  parse one column:         {time.perf_counter() - start:.2f} s, "
+                  f"{data.nbytes / 1e6:.0f} MB")
+        start = time.perf_counter()
+        data = load_csv(args.file, args.column, not args.no_cache, args.engine)
+        elapsed = time.perf_counter() - start
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print(f"✓ {len(data)} samples in {elapsed:.2f} s "
+          f"(min {data.min() if len(data) else 0:.4g}, max {data.max() if len(data) else 0:.4g})")
+    sidecar = cache_path(args.file, index)
+    if not args.no_cache and sidecar.exists():
+        start = time.perf_counter()
+        load_csv(args.file, args.column, engine=args.engine)
+        print(f"✓ Cached in {sidecar.name}: reloads in {time.perf_counter() - start:.3f} s")
+
+
+if __name__ == '__main__':
+    main()
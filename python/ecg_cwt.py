@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+ECG CWT - Batched continuous wavelet transform scalograms of beat windows
+
+Turns the beat windows of an ecg_dataset_builder.py dataset into CWT
+scalograms, the 2-D inputs of the CNN+CWT classifiers, without a Python
+loop per window or per scale:
+
+    * The wavelet bank is built once: one row per scale, the time-domain
+      wavelet conj(psi(-n / s)) / sqrt(s) (Torrence & Compo normalization,
+      s in samples) at the lags |n| < window, FFT'd to NFFT points.
+      Longer lags never meet a sample of the window, so cutting them
+      loses nothing. A bank sampled in the frequency domain would instead
+      wrap the wavelets that are wider than NFFT (the low frequencies)
+      around the grid.
+    * A batch of windows is zero-padded to NFFT (a power of two >=
+      2 * window - 1, so the circular convolution of window and lags does
+      not wrap), FFT'd once, multiplied with the whole bank by broadcasting
+      and inverse-FFT'd along the last axis: (batch, scales, NFFT) in one
+      call. The result equals the direct sum of x[n] conj(psi((n - t) / s))
+      / sqrt(s) at every scale (--verify checks it).
+
+Wavelets:
+    morlet      Morlet (omega0 = 6), scalogram = |W|
+    ricker      Mexican hat (DOG m=2), real, scalogram = W (signed);
+                uses the half-size rfft/irfft
+
+Scales are log-spaced between --fmin and --fmax (Hz), converted with each
+wavelet's Fourier period, so row 0 is the highest frequency.
+
+Output, next to the dataset (or --out):
+
+    scalograms.npy      float16 (N, scales, window), row i = window i of the
+                        dataset (labels.npy etc. still apply)
+    scalograms.json     wavelet, frequencies, scales, normalization; written
+                        last, a store without it is incomplete
+
+Every worker process transforms the windows of one record at a time and
+writes them straight into the preallocated memmap. Each window is
+standardized first (zero mean, unit SD, --no-normalize keeps the dataset
+units), which keeps the coefficients well inside float16.
+
+Usage:
+    python ecg_dataset_builder.py --window 256 --out dataset/
+    python ecg_cwt.py dataset/ --wavelet morlet --scales 64
+    python ecg_cwt.py --verify
+
+    from ecg_cwt import CWT
+    cwt = CWT(window=128, fs=360)
+    images = cwt(windows)             # (N, 64, 128) float32
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from ecg_dataset_builder import load_dataset
+
+WAVELETS = ('morlet', 'ricker')
+MORLET_OMEGA0 = 6.0
+# Gamma(2.5), normalization of the m=2 derivative of Gaussian
+DOG2_GAMMA = 1.329340388179137
+FLOAT16_MAX = float(np.finfo(np.float16).max)
+# --verify: largest error allowed, relative to a scale's largest coefficient
+VERIFY_TOLERANCE = 1e-4
+
+STORE_NAME = 'scalograms'
+# 2: bank built from the time-domain wavelet (1 wrapped the low frequencies)
+SCHEMA_VERSION = 2
+
+
+def fourier_factor(wavelet):
+    """Fourier period / scale of a wavelet (Torrence & Compo, table 1)"""
+    if wavelet == 'morlet':
+        return 4 * np.pi / (MORLET_OMEGA0 + np.sqrt(2 + MORLET_OMEGA0 ** 2))
+    if wavelet == 'ricker':
+        return 2 * np.pi / np.sqrt(2.5)
+    raise ValueError(f"Unknown wavelet {wavelet!r}, use one of {', '.join(WAVELETS)}")
+
+
+def mother_wavelet(eta, wavelet='morlet'):
+    """psi0(eta) of a wavelet (Torrence & Compo, table 1)"""
+    if wavelet == 'morlet':
+        return np.pi ** -0.25 * np.exp(1j * MORLET_OMEGA0 * eta - 0.5 * eta ** 2)
+    if wavelet == 'ricker':
+        return (1 - eta ** 2) * np.exp(-0.5 * eta ** 2) / np.sqrt(DOG2_GAMMA)
+    raise ValueError(f"Unknown wavelet {wavelet!r}, use one of {', '.join(WAVELETS)}")
+
+
+def wavelet_bank(nfft, scales, window, wavelet='morlet'):
+    """
+    Frequency-domain filters of a wavelet at the given scales
+
+    Args:
+        nfft: FFT length, at least 2 * window - 1
+        scales: Scales in samples
+        window: Samples per window (lags kept: |n| < window)
+        wavelet: 'morlet' or 'ricker'
+
+    Returns:
+        (scales, nfft) complex64 for morlet, (scales, nfft // 2 + 1)
+        complex64 for ricker (rfft bins); multiply with the FFT of the signal
+    """
+    if nfft < 2 * window - 1:
+        raise ValueError(f"NFFT {nfft} is too short for {window}-sample windows")
+    scales = np.asarray(scales, dtype=np.float64)[:, None]
+    lag = np.fft.fftfreq(nfft, 1 / nfft)          # 0, 1, ..., -2, -1 (circular)
+    kernel = np.conj(mother_wavelet(-lag / scales, wavelet)) / np.sqrt(scales)
+    kernel[:, np.abs(lag) >= window] = 0
+    if wavelet == 'ricker':
+        return np.fft.rfft(kernel.real, axis=1).astype(np.complex64)
+    return np.fft.fft(kernel, axis=1).astype(np.complex64)
+
+
+class CWT:
+    """Continuous wavelet transform of many equal-length windows per call"""
+
+    def __init__(self, window=128, fs=360, scales=64, fmin=None, fmax=None,
+                 wavelet='morlet', normalize=True):
+        """
+        Args:
+            window: Samples per window
+            fs: Sample rate (Hz)
+            scales: Number of scales
+            fmin: Lowest frequency (default: one cycle per window)
+            fmax: Highest frequency (default: fs / 4)
+            wavelet: 'morlet' or 'ricker'
+            normalize: Standardize every window before the transform
+        """
+        fmin = fmin or fs / window
+        fmax = fmax or fs / 4
+        if not 0 < fmin < fmax <= fs / 2:
+            raise ValueError(f"Need 0 < fmin < fmax <= fs/2, got {fmin:g}..{fmax:g} Hz at {fs:g} Hz")
+        self.window = window
+        self.wavelet = wavelet
+        self.normalize = normalize
+        self.frequencies = np.geomspace(fmax, fmin, scales)
+        self.scales = fs / self.frequencies / fourier_factor(wavelet)
+        self.nfft = 1 << int(np.ceil(np.log2(2 * window - 1)))
+        self.bank = wavelet_bank(self.nfft, self.scales, window, wavelet)
+
+    def __call__(self, windows):
+        """
+        Scalograms of a batch
+
+        Args:
+            windows: (N, window) samples
+
+        Returns:
+            (N, scales, window) float32
+        """
+        x = np.asarray(windows, dtype=np.float32).reshape(-1, self.window)
+        x = x - x.mean(axis=1, keepdims=True)
+        if self.normalize:
+            x /= np.maximum(x.std(axis=1, keepdims=True), 1e-6)
+        if self.wavelet == 'ricker':
+            spectrum = np.fft.rfft(x, self.nfft, axis=1)
+            return np.fft.irfft(spectrum[:, None, :] * self.bank, self.nfft, axis=2)[:, :, :self.window]
+        spectrum = np.fft.fft(x, self.nfft, axis=1)
+        return np.abs(np.fft.ifft(spectrum[:, None, :] * self.bank, axis=2)[:, :, :self.window])
+
+
+def direct_cwt(x, cwt):
+    """
+    Reference transform of one window: the direct sum at every scale and lag
+
+    Args:
+        x: (window,) samples, already centred / standardized as cwt does
+        cwt: CWT whose scales and wavelet to use
+
+    Returns:
+        (scales, window) like one scalogram of cwt
+    """
+    n = np.arange(cwt.window)
+    eta = (n[None, :] - n[:, None])[None] / cwt.scales[:, None, None]    # (scale, t, n)
+    coefs = np.einsum('n,stn->st', np.asarray(x, dtype=np.float64),
+                      np.conj(mother_wavelet(eta, cwt.wavelet))) / np.sqrt(cwt.scales)[:, None]
+    return coefs.real if cwt.wavelet == 'ricker' else np.abs(coefs)
+
+
+def verify(windows=(128, 256), fs=360, count=4, seed=0):
+    """
+    Compare the batched transform with direct_cwt() on random windows
+
+    Every scale is checked, the widest (lowest frequency) included.
+
+    Returns:
+        Largest error relative to the largest coefficient of its scale
+    """
+    rng = np.random.default_rng(seed)
+    worst = 0.0
+    for window in windows:
+        for wavelet in WAVELETS:
+            cwt = CWT(window, fs, wavelet=wavelet, normalize=False)
+            x = rng.normal(size=(count, window))
+            x -= x.mean(axis=1, keepdims=True)
+            fast = cwt(x)
+            errors = []
+            for i in range(count):
+                ref = direct_cwt(x[i], cwt)
+                errors.append(np.abs(fast[i] - ref).max(axis=1) / np.abs(ref).max(axis=1))
+            errors = np.max(errors, axis=0)
+            print(f"  {wavelet:<7} {window:>4} samples: max error {errors.max():.1e}, "
+                  f"lowest scale (s = {cwt.scales[-1]:.0f}, {cwt.frequencies[-1]:.2f} Hz) "
+                  f"{errors[-1]:.1e}")
+            worst = max(worst, float(errors.max()))
+    return worst
+
+
+def _fill_record(task):
+    """Worker: transform the windows of one record into the scalogram memmap"""
+    dataset, out_path, offset, count, fs, options, batch = task
+    data, _ = load_dataset(dataset)
+    windows = data['windows']
+    out = np.load(out_path, mmap_mode='r+')
+    cwt = CWT(windows.shape[1], fs, **options)
+    clipped = 0
+    for start in range(offset, offset + count, batch):
+        stop = min(start + batch, offset + count)
+        images = cwt(windows[start:stop])
+        clipped += int((np.abs(images) > FLOAT16_MAX).sum())
+        out[start:stop] = np.clip(images, -FLOAT16_MAX, FLOAT16_MAX)
+    out.flush()
+    del out
+    return count, clipped
+
+
+def build_scalograms(dataset, out=None, scales=64, fmin=None, fmax=None, wavelet='morlet',
+                     normalize=True, workers=0, batch=256):
+    """
+    Scalogram store of every window of a dataset
+
+    Args:
+        dataset: ecg_dataset_builder.py output directory
+        out: Store path without extension (default: <dataset>/scalograms)
+        scales, fmin, fmax, wavelet, normalize: See CWT
+        workers: Processes (1 = in this process, 0 = one per CPU)
+        batch: Windows per FFT call
+
+    Returns:
+        The metadata dict (also written to <out>.json)
+    """
+    data, manifest = load_dataset(dataset)
+    out = Path(out) if out else Path(dataset) / STORE_NAME
+    meta_path = out.with_suffix('.json')
+    if meta_path.exists():
+        meta_path.unlink()                        # incomplete until rewritten
+    window = manifest['window']
+    options = {'scales': scales, 'fmin': fmin, 'fmax': fmax, 'wavelet': wavelet,
+               'normalize': normalize}
+    CWT(window, manifest['records'][0]['sample_rate'] if manifest['records'] else 360,
+        **options)                                 # validate before allocating
+
+    npy_path = out.with_suffix('.npy')
+    shape = (manifest['windows'], scales, window)
+    if manifest['windows']:
+        open_memmap(npy_path, mode='w+', dtype=np.float16, shape=shape).flush()
+    else:
+        np.save(npy_path, np.empty(shape, dtype=np.float16))
+    tasks = [(str(dataset), str(npy_path), r['offset'], r['beats'], r['sample_rate'], options, batch)
+             for r in manifest['records'] if r['beats']]
+
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, max(len(tasks), 1))
+    if workers <= 1:
+        results = [_fill_record(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = list(pool.imap_unordered(_fill_record, tasks))
+
+    rates = sorted({r['sample_rate'] for r in manifest['records']})
+    cwt = CWT(window, rates[0] if rates else 360, **options)
+    meta = {
+        'schema': SCHEMA_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'dataset': str(dataset),
+        'shape': list(shape),
+        'dtype': 'float16',
+        'wavelet': wavelet,
+        'normalize': normalize,
+        'frequencies': cwt.frequencies.round(4).tolist(),
+        'sample_rates': rates,
+        'nfft': cwt.nfft,
+        'bank': 'time-domain, lags < window',
+        'clipped': sum(r[1] for r in results),
+    }
+    meta_path.write_text(json.dumps(meta, indent=2))
+    return meta
+
+
+def load_scalograms(path, mode='r'):
+    """
+    Open a scalogram store without reading it
+
+    Args:
+        path: Store path without extension, or a dataset directory
+        mode: numpy mmap_mode
+
+    Returns:
+        (memmapped (N, scales, window) float16, metadata dict)
+
+    Raises:
+        FileNotFoundError if the store is missing or was not finished
+    """
+    path = Path(path)
+    if path.is_dir():
+        path = path / STORE_NAME
+    meta_path = path.with_suffix('.json')
+    if not meta_path.exists():
+        raise FileNotFoundError(f"No complete scalogram store at {path} ({meta_path.name} missing)")
+    return np.load(path.with_suffix('.npy'), mmap_mode=mode), json.loads(meta_path.read_text())
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='CWT scalograms of every beat window of a dataset',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # 128-sample beat windows of all bundled records, Morlet, 64 scales
+  python ecg_dataset_builder.py --out dataset/
+  python ecg_cwt.py dataset/
+
+  # 256-sample windows, Mexican hat between 1 and 50 Hz, 32 scales
+  python ecg_dataset_builder.py --window 256 --out dataset256/
+  python ecg_cwt.py dataset256/ --wavelet ricker --scales 32 --fmin 1 --fmax 50
+
+  # Check the batched transform against a direct sum at every scale
+  python ecg_cwt.py --verify
+        """
+    )
+
+    parser.add_argument('dataset', nargs='?', help='Directory written by ecg_dataset_builder.py')
+    parser.add_argument('--out',
+                        help='Store path without extension (default: <dataset>/scalograms)')
+    parser.add_argument('--wavelet', choices=WAVELETS, default='morlet',
+                        help='Mother wavelet (default: morlet)')
+    parser.add_argument('--scales', type=int, default=64,
+                        help='Number of scales (default: 64)')
+    parser.add_argument('--fmin', type=float,
+                        help='Lowest frequency in Hz (default: one cycle per window)')
+    parser.add_argument('--fmax', type=float,
+                        help='Highest frequency in Hz (default: sample rate / 4)')
+    parser.add_argument('--no-normalize', action='store_true',
+                        help='Keep the dataset units instead of standardizing each window')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes, 0 = one per CPU (default: 0)')
+    parser.add_argument('--batch', type=int, default=256,
+                        help='Windows per FFT call (default: 256)')
+    parser.add_argument('--verify', action='store_true',
+                        help='Compare the batched transform with a direct sum and exit')
+
+    args = parser.parse_args()
+
+    if args.verify:
+        print("▶ Batched CWT vs direct sum (random windows, default scales)")
+        worst = verify()
+        if worst > VERIFY_TOLERANCE:
+            print(f"✗ Error {worst:.1e} above {VERIFY_TOLERANCE:.0e}")
+            sys.exit(1)
+        print(f"✓ All scales within {VERIFY_TOLERANCE:.0e}")
+        return
+    if args.dataset is None:
+        parser.error('a dataset directory is required (unless --verify)')
+
+    if args.scales < 1 or args.batch < 1:
+        print("✗ --scales and --batch must be at least 1")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    try:
+        meta = build_scalograms(args.dataset, args.out, args.scales, args.fmin, args.fmax,
+                                args.wavelet, not args.no_normalize, args.workers, args.batch)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    n, scales, window = meta['shape']
+    print(f"✓ {n} scalograms of {scales} x {window} ({meta['wavelet']}, "
+          f"{meta['frequencies'][-1]:g}-{meta['frequencies'][0]:g} Hz) in {elapsed:.2f} s "
+          f"({n / max(elapsed, 1e-9):.0f} windows/s)")
+    print(f"  {n * scales * window * 2 / 1e6:.1f} MB float16")
+    if meta['clipped']:
+        print(f"⚠ {meta['clipped']} coefficients clipped to the float16 range")
+    print(f"✓ Saved {Path(args.out) if args.out else Path(args.dataset) / STORE_NAME}.npy")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 MIT-BIH ECG Data Reader
-Reads MIT-BIH format ECG files (.dat and .hea)
+Reads MIT-BIH format ECG files (.dat and .hea) and annotation files (.atr)
 
 Author: Marly
 Date: February 26, 2026
@@ -9,9 +9,120 @@ Version: 1.0
 """
 
 import numpy as np
-import struct
 from pathlib import Path
 
+from ecg_synth import SynthReader, is_synth_path
+
+# MIT annotation codes (WFDB ecgcodes.h) → mnemonic
+ANNOTATION_SYMBOLS = {
+    0: ' ', 1: 'N', 2: 'L', 3: 'R', 4: 'a', 5: 'V', 6: 'F', 7: 'J', 8: 'A',
+    9: 'S', 10: 'E', 11: 'j', 12: '/', 13: 'Q', 14: '~', 16: '|', 18: 's',
+    19: 'T', 20: '*', 21: 'D', 22: '"', 23: '=', 24: 'p', 25: 'B', 26: '^',
+    27: 't', 28: '+', 29: 'u', 30: '?', 31: '!', 32: '[', 33: ']', 34: 'e',
+    35: 'n', 36: '@', 37: 'x', 38: 'f', 39: '(', 40: ')', 41: 'r',
+}
+
+# Codes that label a QRS complex (WFDB isqrs)
+BEAT_CODES = frozenset({1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13,
+                        25, 30, 34, 35, 37, 38, 41})
+
+# Records shipped with the repository
+SIGNALS_DIR = Path(__file__).resolve().parent.parent / 'ECG signals'
+
+# Pseudo-codes in the annotation stream that modify the previous entry
+_SKIP, _NUM, _SUB, _CHN, _AUX = 59, 60, 61, 62, 63
+
+
+def read_annotation_file(path):
+    """
+    Parse a MIT-format annotation file (.atr)
+    
+    Each entry is a 16-bit little-endian word: the top 6 bits are the
+    annotation code, the low 10 bits the sample interval since the previous
+    annotation. SKIP carries a longer 32-bit interval; NUM/SUB/CHN/AUX
+    attach fields to the preceding annotation (only AUX text is kept, e.g.
+    rhythm labels like "(AFIB").
+    
+    Args:
+        path: .atr file path
+    
+    Returns:
+        dict with 'sample' (int64 array, ascending), 'code' (uint8 array),
+        'symbol' (str array) and 'aux' (list of str, '' if none)
+    """
+    words = np.fromfile(path, dtype='<u2')
+    samples, codes, aux = [], [], []
+    position = 0
+    i = 0
+    n = len(words)
+    
+    while i < n:
+        word = int(words[i])
+        code, interval = word >> 10, word & 0x3FF
+        if code == 0 and interval == 0:
+            break                                   # end of file marker
+        
+        if code == _SKIP:
+            # 32-bit interval in the next two words, high word first
+            skip = (int(words[i + 1]) << 16) | int(words[i + 2])
+            if skip >= 1 << 31:
+                skip -= 1 << 32
+            position += skip
+            i += 3
+        elif code == _AUX:
+            raw = words[i + 1:i + 1 + (interval + 1) // 2].tobytes()[:interval]
+            if aux:
+                aux[-1] = raw.split(b'\0', 1)[0].decode('latin-1')
+            i += 1 + (interval + 1) // 2
+        elif code in (_NUM, _SUB, _CHN):
+            i += 1
+        else:
+            position += interval
+            samples.append(position)
+            codes.append(code)
+            aux.append('')
+            i += 1
+    
+    codes = np.array(codes, dtype=np.uint8)
+    return {
+        'sample': np.array(samples, dtype=np.int64),
+        'code': codes,
+        'symbol': np.array([ANNOTATION_SYMBOLS.get(c, '?') for c in codes.tolist()], dtype='<U1'),
+        'aux': aux,
+    }
+
+
+def bundled_records(directory=SIGNALS_DIR):
+    """
+    MIT-BIH records under directory (default: the repository's ECG signals)
+    
+    Returns:
+        (records with signal data, headers whose .dat file is missing),
+        as paths without extension
+    """
+    records, missing = [], []
+    for header in sorted(Path(directory).rglob('*.hea')):
+        record = header.with_suffix('')
+        (records if record.with_suffix('.dat').exists() else missing).append(record)
+    return records, missing
+
+
+def open_record(record_path):
+    """
+    Reader for a record path: MITBIHReader, or ecg_synth.SynthReader for a
+    "synth:..." pseudo-record (same interface)
+    """
+    if is_synth_path(record_path):
+        return SynthReader(record_path)
+    return MITBIHReader(record_path)
+
+
+def record_name(record_path):
+    """Short name of a record for titles and output files ("synth:pvc=0.1" -> "synth_pvc=0.1")"""
+    if is_synth_path(record_path):
+        return str(record_path).replace(':', '_').replace(',', '_')
+    return Path(record_path).with_suffix('').name
+
 
 class MITBIHReader:
     """Read MIT-BIH format ECG data files"""
@@ -76,122 +187,134 @@ class MITBIHReader:
         Returns:
             numpy array of signal samples in physical units
         """
-        if not self.data_file.exists():
-            raise FileNotFoundError(f"Data file not found: {self.data_file}")
-        
         if signal_num >= self.num_signals:
             raise ValueError(f"Signal {signal_num} not found (only {self.num_signals} signals)")
         
-        signal_info = self.signal_info[signal_num]
-        format_code = signal_info['format']
+        physical = self._to_physical(self.read_raw()[:, signal_num], signal_num)
+        
+        print(f"✓ Read signal {signal_num}: {len(physical)} samples")
+        print(f"  Range: {physical.min():.2f} to {physical.max():.2f} mV")
+        
+        return physical
+    
+    def read_signals(self):
+        """
+        Read all signals in one pass over the .dat file
+        
+        Returns:
+            (num_frames, num_signals) float array in physical units
+        """
+        raw = self.read_raw()
+        physical = np.empty(raw.shape, dtype=np.float64)
+        for i in range(raw.shape[1]):
+            physical[:, i] = self._to_physical(raw[:, i], i)
+        
+        print(f"✓ Read {raw.shape[1]} signals: {raw.shape[0]} samples each")
+        return physical
+    
+    def read_raw(self):
+        """
+        Decode the .dat file to ADC values
+        
+        Returns:
+            (num_frames, num_signals) int32 array
+        """
+        if not self.data_file.exists():
+            raise FileNotFoundError(f"Data file not found: {self.data_file}")
+        
+        format_code = self.signal_info[0]['format']
         
         # Format 310: 3 signals, 10-bit resolution, packed
         # Format 212: 2 signals, 12-bit resolution
-        # Format 16: 1 signal, 16-bit
+        # Format 16: 16-bit per sample
         
         if format_code == 310:
             # 3 signals, 10-bit each, packed into 4 bytes per 3 samples
-            samples = self._read_format_310(signal_num)
+            samples = self._read_format_310()
         elif format_code == 212:
             # 2 signals, 12-bit each
-            samples = self._read_format_212(signal_num)
+            samples = self._read_format_212()
         elif format_code == 16:
-            # Single 16-bit signal
             samples = self._read_format_16()
         else:
             raise NotImplementedError(f"Format {format_code} not implemented")
         
-        # Convert ADC values to physical units
+        return samples
+    
+    def _to_physical(self, samples, signal_num):
+        """Convert ADC values of one signal to physical units"""
+        signal_info = self.signal_info[signal_num]
         gain = signal_info['gain']
         baseline = signal_info['baseline']
         adc_zero = signal_info['adc_zero']
         
         # Physical value = (ADC - ADC_zero - baseline) / gain
-        physical = (samples - adc_zero - baseline) / gain
-        
-        print(f"✓ Read signal {signal_num}: {len(physical)} samples")
-        print(f"  Range: {physical.min():.2f} to {physical.max():.2f} mV")
-        
-        return physical
+        return (samples - adc_zero - baseline) / gain
+    
+    def _read_bytes(self, group_size):
+        """Read the .dat file as rows of group_size bytes (partial group dropped)"""
+        data = np.fromfile(self.data_file, dtype=np.uint8)
+        groups = len(data) // group_size
+        return data[:groups * group_size].reshape(groups, group_size).astype(np.int32)
     
-    def _read_format_310(self, signal_num):
+    def _read_format_310(self):
         """Read format 310 (3 signals, 10-bit)"""
-        with open(self.data_file, 'rb') as f:
-            data = f.read()
+        g = self._read_bytes(4)  # 4 bytes for 3 10-bit samples
+        b0, b1, b2, b3 = g[:, 0], g[:, 1], g[:, 2], g[:, 3]
         
-        samples = []
-        bytes_per_sample_group = 4  # 4 bytes for 3 10-bit samples
-        
-        for i in range(0, len(data), bytes_per_sample_group):
-            if i + 3 >= len(data):
-                break
-            
-            # Read 4 bytes
-            b0, b1, b2, b3 = struct.unpack('BBBB', data[i:i+4])
-            
-            # Decode 3 10-bit samples from 4 bytes
-            # Sample 0: b0 and lower 2 bits of b1
-            # Sample 1: upper 6 bits of b1 and lower 4 bits of b2
-            # Sample 2: upper 4 bits of b2 and b3
-            
-            s0 = b0 | ((b1 & 0x03) << 8)
-            s1 = ((b1 >> 2) & 0x3F) | ((b2 & 0x0F) << 6)
-            s2 = ((b2 >> 4) & 0x0F) | (b3 << 4)
-            
-            # Sign extend 10-bit to signed integer
-            if s0 & 0x200:  # Negative
-                s0 = s0 - 1024
-            if s1 & 0x200:
-                s1 = s1 - 1024
-            if s2 & 0x200:
-                s2 = s2 - 1024
-            
-            samples.append([s0, s1, s2])
+        # Decode 3 10-bit samples from 4 bytes
+        # Sample 0: b0 and lower 2 bits of b1
+        # Sample 1: upper 6 bits of b1 and lower 4 bits of b2
+        # Sample 2: upper 4 bits of b2 and b3
+        samples = np.empty((len(g), 3), dtype=np.int32)
+        samples[:, 0] = b0 | ((b1 & 0x03) << 8)
+        samples[:, 1] = ((b1 >> 2) & 0x3F) | ((b2 & 0x0F) << 6)
+        samples[:, 2] = ((b2 >> 4) & 0x0F) | (b3 << 4)
         
-        # Convert to numpy array and extract requested signal
-        samples = np.array(samples)
-        return samples[:, signal_num]
+        # Sign extend 10-bit to signed integer
+        samples -= np.where(samples & 0x200, 1024, 0).astype(np.int32)
+        return samples
     
-    def _read_format_212(self, signal_num):
+    def _read_format_212(self):
         """Read format 212 (2 signals, 12-bit)"""
-        with open(self.data_file, 'rb') as f:
-            data = f.read()
+        g = self._read_bytes(3)  # 3 bytes containing 2 12-bit samples
+        b0, b1, b2 = g[:, 0], g[:, 1], g[:, 2]
         
-        samples = []
-        
-        for i in range(0, len(data), 3):
-            if i + 2 >= len(data):
-                break
-            
-            # Read 3 bytes containing 2 12-bit samples
-            b0, b1, b2 = struct.unpack('BBB', data[i:i+3])
-            
-            # Sample 0: b0 and lower 4 bits of b1
-            # Sample 1: upper 4 bits of b1 and b2
-            s0 = b0 | ((b1 & 0x0F) << 8)
-            s1 = ((b1 >> 4) & 0x0F) | (b2 << 4)
-            
-            # Sign extend 12-bit
-            if s0 & 0x800:
-                s0 = s0 - 4096
-            if s1 & 0x800:
-                s1 = s1 - 4096
-            
-            samples.append([s0, s1])
+        # Sample 0: b0 and lower 4 bits of b1
+        # Sample 1: upper 4 bits of b1 and b2
+        samples = np.empty((len(g), 2), dtype=np.int32)
+        samples[:, 0] = b0 | ((b1 & 0x0F) << 8)
+        samples[:, 1] = ((b1 >> 4) & 0x0F) | (b2 << 4)
         
-        samples = np.array(samples)
-        return samples[:, signal_num]
+        # Sign extend 12-bit
+        samples -= np.where(samples & 0x800, 4096, 0).astype(np.int32)
+        return samples
     
     def _read_format_16(self):
-        """Read format 16 (single 16-bit signal)"""
-        with open(self.data_file, 'rb') as f:
-            data = f.read()
-        
+        """Read format 16 (16-bit samples, interleaved per signal)"""
         # Read as signed 16-bit integers
-        num_samples = len(data) // 2
-        samples = np.frombuffer(data, dtype=np.int16, count=num_samples)
+        samples = np.fromfile(self.data_file, dtype='<i2').astype(np.int32)
+        frames = len(samples) // self.num_signals
+        return samples[:frames * self.num_signals].reshape(frames, self.num_signals)
+    
+    def read_annotations(self, extension='atr'):
+        """
+        Read the record's annotation file (e.g. 100.atr)
         
-        return samples
+        Args:
+            extension: Annotator name / file extension (default: atr)
+        
+        Returns:
+            dict as returned by read_annotation_file()
+        """
+        path = self.record_path.with_suffix('.' + extension)
+        if not path.exists():
+            raise FileNotFoundError(f"Annotation file not found: {path}")
+        
+        ann = read_annotation_file(path)
+        beats = np.isin(ann['code'], list(BEAT_CODES)).sum()
+        print(f"✓ Read {len(ann['sample'])} annotations ({beats} beats) from {path.name}")
+        return ann
     
     def get_info(self):
         """Get record information"""
@@ -231,3 +354,11 @@ if __name__ == '__main__':
     print(f"  Std: {signal.std():.2f}")
     print(f"  Min: {signal.min():.2f}")
     print(f"  Max: {signal.max():.2f}")
+    
+    # Beat labels, if the record has them
+    if reader.record_path.with_suffix('.atr').exists():
+        ann = reader.read_annotations()
+        symbols, counts = np.unique(ann['symbol'], return_counts=True)
+        print(f"\nAnnotations:")
+        for symbol, count in zip(symbols, counts):
+            print(f"  {symbol}: {count}")
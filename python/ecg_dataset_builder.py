@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+ECG Dataset Builder - Labeled beat windows of many records in one memmap
+
+Every training or evaluation run of a ZolotyhNet variant used to re-read
+the MIT-BIH records through MITBIHReader and cut the 128-sample windows
+around the annotated beats in Python loops. This builds them once, from
+MIT-BIH records with a .atr file or from "synth:..." records (ecg_synth.py,
+labelled with the beats the generator placed):
+
+    windows.npy     int16 (N, window)   one window per annotated beat
+    labels.npy      uint8 (N,)          MIT annotation code of the beat
+                                        (symbol: manifest 'symbols')
+    records.npy     uint16 (N,)         index into manifest 'records'
+    samples.npy     int64 (N,)          R peak sample in the record
+    manifest.json   window, lead, quantize, per-record info and counts
+
+Window i covers samples[i] - window//2 .. + window of its record. Beats too
+close to either end of a record are skipped (and counted in the manifest).
+
+The annotations are read first, in this process, which fixes the size and
+offset of every record. windows.npy is then created at full size and every
+worker process decodes one record at a time and writes its rows straight
+into the memmap, so no window travels back through the pool.
+manifest.json is written last: a dataset without it is incomplete.
+
+Sample values (--quantize):
+    adc     ADC counts minus the baseline (physical mV = value / gain)
+    12bit   the streamer's 12-bit samples (to_uart_samples, i.e.
+            convert_to_12bit over the whole record)
+    q88     the Q8.8 values buffer_128 feeds the CNN (12bit >> 4)
+
+Usage:
+    python ecg_dataset_builder.py --out dataset/
+    python ecg_dataset_builder.py "../ECG signals/PVC/208" --quantize q88 --symbols N,V,L --out q88/
+    python ecg_dataset_builder.py synth:pvc=0.2,duration=1800 synth:hr=110,seed=1 --out synth/
+
+    from ecg_dataset_builder import load_dataset
+    data, manifest = load_dataset('dataset/')     # memmapped, no parsing
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from ecg_dat_reader import (ANNOTATION_SYMBOLS, BEAT_CODES, bundled_records, open_record,
+                            record_name)
+from ecg_synth import is_synth_path
+from zolotyhnet_model import WINDOW, to_q88, to_uart_samples
+
+SCHEMA_VERSION = 1
+QUANTIZE_MODES = ('adc', '12bit', 'q88')
+ARRAYS = ('windows', 'labels', 'records', 'samples')
+
+
+def has_annotations(record_path):
+    """True if a record has beat labels (.atr file, or a synth: record)"""
+    return is_synth_path(record_path) or Path(record_path).with_suffix('.atr').exists()
+
+
+def beat_index(reader, window=WINDOW, symbols=None):
+    """
+    Annotated beats of a record whose window fits inside it
+
+    Args:
+        reader: open_record() reader of the record
+        window: Window length
+        symbols: Keep only these beat symbols (default: every beat)
+
+    Returns:
+        (beat samples int64, codes uint8, beats skipped at the record ends)
+    """
+    num_samples = reader.num_samples
+    ann = reader.read_annotations()
+    keep = np.isin(ann['code'], list(BEAT_CODES))
+    if symbols:
+        keep &= np.isin(ann['symbol'], list(symbols))
+    samples, codes = ann['sample'][keep], ann['code'][keep]
+    start = samples - window // 2
+    fits = (start >= 0) & (start + window <= num_samples)
+    return samples[fits], codes[fits], int((~fits).sum())
+
+
+def record_samples(reader, lead, quantize):
+    """One lead of a record as int16, scaled as --quantize says"""
+    if quantize == 'adc':
+        raw = reader.read_raw()[:, lead]
+        return (raw - reader.signal_info[lead]['baseline']).astype(np.int16)
+    signal = reader.read_signal(lead)
+    samples = to_uart_samples(signal)
+    return to_q88(samples) if quantize == 'q88' else samples.astype(np.int16)
+
+
+def _fill_record(task):
+    """Worker: decode one record and write its windows into the memmap"""
+    path, record, lead, quantize, offset, beats, window = task
+    reader = open_record(record)
+    samples = record_samples(reader, lead, quantize)
+    windows = np.load(path, mmap_mode='r+')
+    starts = beats - window // 2
+    windows[offset:offset + len(beats)] = samples[starts[:, None] + np.arange(window)]
+    windows.flush()
+    del windows
+    return record, len(beats)
+
+
+def build_dataset(records, out_dir, lead=0, window=WINDOW, quantize='adc', symbols=None,
+                  workers=0):
+    """
+    Write the dataset of the given records into out_dir
+
+    Args:
+        records: Record paths without extension (with .dat and .atr), or
+            "synth:..." records
+        out_dir: Output directory (created if missing)
+        lead: Signal index
+        window: Samples per window
+        quantize: One of QUANTIZE_MODES
+        symbols: Beat symbols to keep (default: all beats)
+        workers: Processes (1 = in this process, 0 = one per CPU)
+
+    Returns:
+        The manifest dict
+    """
+    if quantize not in QUANTIZE_MODES:
+        raise ValueError(f"Unknown quantize mode {quantize!r}, use one of {', '.join(QUANTIZE_MODES)}")
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = out_dir / 'manifest.json'
+    if manifest_path.exists():
+        manifest_path.unlink()                    # incomplete until rewritten
+
+    # Pass 1: annotations only, fixes every record's offset
+    entries, tasks, parts = [], [], []
+    offset = 0
+    windows_path = out_dir / 'windows.npy'
+    for index, record in enumerate(records):
+        reader = open_record(record)
+        if lead >= reader.num_signals:
+            raise ValueError(f"{record} has no lead {lead}")
+        beats, codes, skipped = beat_index(reader, window, symbols)
+        entries.append({'name': record_name(record), 'path': str(record),
+                        'sample_rate': reader.sample_rate, 'num_samples': reader.num_samples,
+                        'gain': reader.signal_info[lead]['gain'],
+                        'offset': offset, 'beats': len(beats), 'skipped': skipped})
+        parts.append((codes, np.full(len(beats), index, dtype=np.uint16), beats))
+        tasks.append((str(windows_path), str(record), lead, quantize, offset, beats, window))
+        offset += len(beats)
+
+    labels = np.concatenate([p[0] for p in parts]) if parts else np.empty(0, np.uint8)
+    np.save(out_dir / 'labels.npy', labels.astype(np.uint8))
+    np.save(out_dir / 'records.npy', np.concatenate([p[1] for p in parts]) if parts
+            else np.empty(0, np.uint16))
+    np.save(out_dir / 'samples.npy', np.concatenate([p[2] for p in parts]) if parts
+            else np.empty(0, np.int64))
+
+    # Pass 2: every worker writes its records' rows into the preallocated memmap
+    if offset:
+        open_memmap(windows_path, mode='w+', dtype=np.int16, shape=(offset, window)).flush()
+    else:
+        np.save(windows_path, np.empty((0, window), dtype=np.int16))   # empty files cannot be mapped
+    tasks = [t for t in tasks if len(t[5])]
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+    workers = min(workers, max(len(tasks), 1))
+    if workers <= 1:
+        for task in tasks:
+            _fill_record(task)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for _ in pool.imap_unordered(_fill_record, tasks):
+                pass
+
+    codes, counts = np.unique(labels, return_counts=True)
+    manifest = {
+        'schema': SCHEMA_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'windows': offset,
+        'window': window,
+        'lead': lead,
+        'quantize': quantize,
+        'symbols': {int(c): ANNOTATION_SYMBOLS.get(int(c), '?') for c in codes},
+        'counts': {ANNOTATION_SYMBOLS.get(int(c), '?'): int(n) for c, n in zip(codes, counts)},
+        'records': entries,
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_dataset(directory, mode='r'):
+    """
+    Open a built dataset without reading it
+
+    Args:
+        directory: Dataset directory
+        mode: numpy mmap_mode ('r', 'r+', 'c')
+
+    Returns:
+        (dict of memmapped arrays, manifest dict)
+
+    Raises:
+        FileNotFoundError if the dataset is missing or was not finished
+    """
+    directory = Path(directory)
+    manifest_path = directory / 'manifest.json'
+    if not manifest_path.exists():
+        raise FileNotFoundError(f"No complete dataset in {directory} (manifest.json missing)")
+    manifest = json.loads(manifest_path.read_text())
+    data = {name: np.load(directory / f'{name}.npy', mmap_mode=mode) for name in ARRAYS}
+    return data, manifest
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Build a memory-mapped dataset of labeled beat windows',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Every bundled record with annotations, ADC values, all cores
+  python ecg_dataset_builder.py --out dataset/
+
+  # N/V/L beats of two records as the Q8.8 values the CNN sees
+  python ecg_dataset_builder.py "../ECG signals/Normal/100" "../ECG signals/PVC/208" \\
+      --quantize q88 --symbols N,V,L --out q88/
+
+  # Labelled windows from two synthetic records (see ecg_synth.py)
+  python ecg_dataset_builder.py synth:pvc=0.2,duration=1800 synth:hr=110,seed=1 --out synth/
+        """
+    )
+
+    parser.add_argument('records', nargs='*',
+                        help='MIT-BIH records (paths without extension) or synth:... '
+                             'records (default: all bundled)')
+    parser.add_argument('--out', required=True,
+                        help='Output directory')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Signal index (default: 0)')
+    parser.add_argument('--window', type=int, default=WINDOW,
+                        help=f'Samples per window (default: {WINDOW})')
+    parser.add_argument('--quantize', choices=QUANTIZE_MODES, default='adc',
+                        help='Sample values: adc, 12bit or q88 (default: adc)')
+    parser.add_argument('--symbols',
+                        help='Comma-separated beat symbols to keep, e.g. N,V,L (default: all)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Worker processes, 0 = one per CPU (default: 0)')
+
+    args = parser.parse_args()
+
+    if args.records:
+        records = [r if is_synth_path(r) else Path(r) for r in args.records]
+    else:
+        records, _ = bundled_records()
+    annotated = [r for r in records if has_annotations(r)]
+    for record in records:
+        if record not in annotated:
+            print(f"⚠ Skipping {record}: no .atr annotations")
+    if not annotated:
+        print("✗ No annotated records")
+        sys.exit(1)
+    symbols = args.symbols.split(',') if args.symbols else None
+
+    print(f"▶ Building {args.out} from {len(annotated)} records ({args.quantize})")
+    start = time.perf_counter()
+    try:
+        manifest = build_dataset(annotated, args.out, args.lead, args.window, args.quantize,
+                                 symbols, args.workers)
+    except (FileNotFoundError, ValueError, NotImplementedError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    size = manifest['windows'] * manifest['window'] * 2
+    print(f"\n✓ {manifest['windows']} windows ({size / 1e6:.1f} MB) in {elapsed:.2f} s")
+    for symbol, count in sorted(manifest['counts'].items(), key=lambda item: -item[1]):
+        print(f"  {symbol}: {count}")
+    skipped = sum(r['skipped'] for r in manifest['records'])
+    if skipped:
+        print(f"  ({skipped} beats too close to a record end skipped)")
+    print(f"✓ Saved {args.out}")
+
+
+if __name__ == '__main__':
+    main()
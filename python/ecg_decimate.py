@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+ECG Decimation - Min/max envelope reduction to screen resolution
+
+A plot axis is only ~1,400 pixels wide, so drawing a 50,000-sample window
+vertex by vertex wastes almost all of the render time. Splitting the window
+into one bucket per pixel column and keeping each bucket's minimum and
+maximum (in the order they occur) draws an identical-looking trace from
+about 2 points per column: every QRS peak and trough survives because it is
+the extreme of its bucket.
+
+minmax_decimate() reduces a whole array in one vectorized pass (static
+plots). MinMaxEnvelope does the same incrementally for live plots: completed
+buckets are computed once, as samples arrive, and kept in ring buffers, so
+each frame only copies ~2 points per column regardless of window length.
+With leads=L it reduces (n, L) frames for all leads in the same vectorized
+calls, so extra leads add array width rather than Python work.
+
+Usage:
+    x, y = minmax_decimate(signal, columns=1400)
+
+    env = MinMaxEnvelope(window_size=50000, columns=pixel_columns(ax))
+    env.extend(chunk)                 # as samples arrive
+    x, y = env.envelope()             # per frame
+    line.set_data(x, y)
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import math
+import numpy as np
+
+from ecg_ring_buffer import RingBuffer
+
+
+def pixel_columns(ax):
+    """Width of a matplotlib axes in device pixels (at least 1)"""
+    return max(1, int(round(ax.bbox.width)))
+
+
+def bucket_size_for(num_samples, columns):
+    """Samples per bucket so num_samples fit in `columns` buckets"""
+    return max(1, math.ceil(num_samples / max(1, columns)))
+
+
+def _ordered_extremes(blocks, first_index, bucket):
+    """
+    Min and max of each row of `blocks`, in the order they occur
+
+    Args:
+        blocks: (m, bucket) array of complete buckets, or (m, bucket, leads)
+        first_index: Sample number of blocks[0, 0]
+        bucket: Samples per bucket
+
+    Returns:
+        (x, y) arrays of length 2*m (x (2*m, leads) for multi-lead blocks),
+        interleaved per bucket
+    """
+    m = blocks.shape[0]
+    rows = np.arange(m)
+    lanes = ()
+    if blocks.ndim == 3:
+        rows = rows[:, None]
+        lanes = (np.arange(blocks.shape[2]),)
+    i_min = blocks.argmin(axis=1)
+    i_max = blocks.argmax(axis=1)
+
+    first = np.minimum(i_min, i_max)
+    second = np.maximum(i_min, i_max)
+
+    base = first_index + rows * bucket
+    x = np.empty((2 * m,) + blocks.shape[2:], dtype=np.float64)
+    y = np.empty((2 * m,) + blocks.shape[2:], dtype=blocks.dtype)
+    x[0::2] = base + first
+    x[1::2] = base + second
+    y[0::2] = blocks[(rows, first) + lanes]
+    y[1::2] = blocks[(rows, second) + lanes]
+    return x, y
+
+
+def minmax_decimate(y, columns, x0=0):
+    """
+    Reduce a signal to a min/max envelope of about 2 points per column
+
+    Args:
+        y: 1-D signal
+        columns: Number of buckets (pixel columns of the target axis)
+        x0: Sample number of y[0]
+
+    Returns:
+        (x, y) - x are sample numbers of the kept points. Signals that
+        already fit in 2*columns points are returned undecimated.
+    """
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * columns:
+        return np.arange(x0, x0 + n, dtype=np.float64), y
+
+    bucket = bucket_size_for(n, columns)
+    full = n // bucket
+    x_out, y_out = _ordered_extremes(y[:full * bucket].reshape(full, bucket), x0, bucket)
+
+    tail = y[full * bucket:]
+    if len(tail):
+        tx, ty = _ordered_extremes(tail.reshape(1, -1), x0 + full * bucket, len(tail))
+        x_out = np.concatenate((x_out, tx))
+        y_out = np.concatenate((y_out, ty))
+    return x_out, y_out
+
+
+class MinMaxEnvelope:
+    """Incrementally maintained min/max envelope of a scrolling window"""
+
+    def __init__(self, window_size, columns, dtype=np.float64, leads=None):
+        """
+        Args:
+            window_size: Samples in the scrolling window
+            columns: Target number of buckets (pixel columns)
+            dtype: Sample dtype
+            leads: None for a 1-D signal, else leads per (n, leads) frame
+        """
+        self.window_size = window_size
+        self.dtype = np.dtype(dtype)
+        self.leads = leads
+        # Internally every sample is a frame; 1-D input is one lead wide
+        self._width = 1 if leads is None else int(leads)
+        self.reset(columns)
+
+    def reset(self, columns=None):
+        """Drop all state (and optionally change the column count)"""
+        if columns is not None:
+            self.columns = max(1, int(columns))
+        self.bucket = bucket_size_for(self.window_size, self.columns)
+        num_buckets = math.ceil(self.window_size / self.bucket)
+
+        # Two points per completed bucket
+        w = self._width
+        self._x = RingBuffer(2 * num_buckets, dtype=np.float64, width=w)
+        self._y = RingBuffer(2 * num_buckets, dtype=self.dtype, width=w)
+
+        # Output arrays: completed buckets + the partial one
+        self._out_x = np.empty((2 * num_buckets + 2, w), dtype=np.float64)
+        self._out_y = np.empty((2 * num_buckets + 2, w), dtype=self.dtype)
+
+        # Partial bucket, one entry per lead
+        self._p_min = np.empty(w, dtype=self.dtype)
+        self._p_max = np.empty(w, dtype=self.dtype)
+        self._p_imin = np.zeros(w, dtype=np.int64)
+        self._p_imax = np.zeros(w, dtype=np.int64)
+        self._p_x = np.empty((2, w), dtype=np.float64)
+        self._p_y = np.empty((2, w), dtype=self.dtype)
+        self._lanes = np.arange(w)
+
+        self.next_index = 0          # sample number expected next
+        self._reset_partial()
+
+    def _reset_partial(self):
+        self._p_count = 0
+
+    @property
+    def max_points(self):
+        """Upper bound on the length of envelope()"""
+        return len(self._out_x)
+
+    @property
+    def last_index(self):
+        """Sample number of the newest sample (-1 if empty)"""
+        return self.next_index - 1
+
+    def _partial_points(self):
+        """The partial bucket's two points per lead, in time order: (x, y), each (2, leads)"""
+        x, y = self._p_x, self._p_y
+        x[0], x[1] = self._p_imin, self._p_imax
+        y[0], y[1] = self._p_min, self._p_max
+        swap = self._p_imin > self._p_imax
+        if swap.any():
+            x[:, swap] = x[::-1, swap]
+            y[:, swap] = y[::-1, swap]
+        return x, y
+
+    def _emit_partial(self):
+        """Close the current bucket early (gap or flush)"""
+        if self._p_count == 0:
+            return
+        x, y = self._partial_points()
+        self._x.extend(x)
+        self._y.extend(y)
+        self._reset_partial()
+
+    def _accumulate(self, values, first):
+        """Fold (n, leads) values (all in the current bucket) into the partial bucket"""
+        k = values.argmin(axis=0)
+        j = values.argmax(axis=0)
+        vmin = values[k, self._lanes]
+        vmax = values[j, self._lanes]
+        if self._p_count == 0:
+            self._p_min[:] = vmin
+            self._p_max[:] = vmax
+            self._p_imin[:] = first + k
+            self._p_imax[:] = first + j
+        else:
+            lower = vmin < self._p_min
+            higher = vmax > self._p_max
+            np.copyto(self._p_min, vmin, where=lower)
+            np.copyto(self._p_imin, first + k, where=lower)
+            np.copyto(self._p_max, vmax, where=higher)
+            np.copyto(self._p_imax, first + j, where=higher)
+        self._p_count += len(values)
+
+    def extend(self, values, first=None):
+        """
+        Add samples
+
+        Args:
+            values: 1-D array of new samples ((n, leads) for multi-lead)
+            first: Sample number of values[0] (default: continues from the
+                   previous call). A jump starts a new bucket, so dropped
+                   samples show as a gap instead of being bridged.
+        """
+        values = np.asarray(values, dtype=self.dtype).reshape(-1, self._width)
+        n = len(values)
+        if n == 0:
+            return
+        if first is None:
+            first = self.next_index
+        elif first != self.next_index:
+            self._emit_partial()
+
+        # Skip what would scroll out anyway
+        if n > self.window_size + self.bucket:
+            skip = n - self.window_size - self.bucket
+            values = values[skip:]
+            first += skip
+            n = len(values)
+            self._emit_partial()
+
+        B = self.bucket
+        pos = 0
+
+        # 1. Top up the partial bucket up to its boundary (aligned to B)
+        boundary = (first // B + 1) * B
+        head = min(n, boundary - first)
+        self._accumulate(values[:head], first)
+        pos = head
+        if first + head == boundary:
+            self._emit_partial()
+
+        # 2. Complete buckets in one vectorized pass
+        full = (n - pos) // B
+        if full:
+            bx, by = _ordered_extremes(values[pos:pos + full * B].reshape(full, B, -1),
+                                       first + pos, B)
+            self._x.extend(bx)
+            self._y.extend(by)
+            pos += full * B
+
+        # 3. Remainder starts the next partial bucket
+        if pos < n:
+            self._accumulate(values[pos:], first + pos)
+
+        self.next_index = first + n
+
+    def sync(self, ring):
+        """
+        Pull samples added to a RingBuffer since the last call
+
+        Args:
+            ring: ecg_ring_buffer.RingBuffer being filled by a producer
+        """
+        new = ring.total_written - self.next_index
+        if new < 0:
+            # Ring was cleared - start over
+            self.reset()
+            new = ring.total_written
+        if new > 0:
+            new = min(new, len(ring))
+            self.extend(ring.latest(new), ring.total_written - new)
+
+    def rebuild(self, ring, columns=None):
+        """Recompute from a ring's contents (e.g. after the axes were resized)"""
+        self.reset(columns)
+        self.next_index = ring.total_written - len(ring)
+        self.sync(ring)
+
+    def envelope(self):
+        """
+        Current envelope as (x, y) views into preallocated arrays
+
+        x are sample numbers. With leads set both are (points, leads), since
+        every lead keeps its own extremes. The views are overwritten by the
+        next call.
+        """
+        m = len(self._x)
+        self._out_x[:m] = self._x.latest()
+        self._out_y[:m] = self._y.latest()
+
+        if self._p_count:
+            self._out_x[m:m + 2], self._out_y[m:m + 2] = self._partial_points()
+            m += 2
+
+        if self.leads is None:
+            return self._out_x[:m, 0], self._out_y[:m, 0]
+        return self._out_x[:m], self._out_y[:m]
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+ECG Export - Headless high-speed rendering of the ECG display
+
+Renders a record with the Agg backend as fast as the CPU allows instead of
+in real time, so a 30-minute record no longer takes 30 minutes to capture.
+
+Two outputs:
+
+    video   The scrolling live view, frame by frame, written to an MP4
+            through a local ffmpeg pipe (raw RGBA frames on stdin). Without
+            ffmpeg the frames are saved as a numbered PNG sequence.
+    strips  Paper-style PNG pages of `rows` strips of `strip_seconds` each
+
+Each video frame blits only the trace and a time stamp over a cached
+background (axes, grid, labels never move: the x axis is the window's own
+0..window seconds), and the trace is a MinMaxEnvelope at ~2 points per
+pixel column, advanced incrementally from frame to frame.
+
+Both outputs split the record into disjoint time ranges that can be
+rendered in parallel worker processes (--workers). MP4 parts are joined
+with ffmpeg's concat demuxer, without re-encoding.
+
+Usage:
+    from ecg_export import add_export_args, run_export
+    add_export_args(parser)
+    ...
+    run_export(args, signal, sample_rate, window_size)
+
+    python ecg_visualizer.py --file "../ECG signals/Normal/100" --export 100.mp4 --workers 4
+    python ecg_visualizer.py --file "../ECG signals/Normal/100" --export strips/
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import os
+import time
+import shutil
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+import matplotlib.style
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection
+
+from ecg_annotations import AnnotationOverlay
+from ecg_decimate import MinMaxEnvelope, minmax_decimate, pixel_columns
+
+VIDEO_SUFFIXES = ('.mp4', '.mkv', '.mov', '.avi')
+
+# Video frame size in pixels (even, as yuv420p requires)
+VIDEO_SIZE = (1280, 720)
+STRIP_SIZE = (1600, 1000)
+DPI = 100
+
+# Stacked leads: same lane layout as ecg_visualizer --leads (lead 0 on top)
+LANE_HALF_HEIGHT = 0.45
+
+STYLE = 'seaborn-v0_8-darkgrid'
+
+
+def add_export_args(parser):
+    """Add --export and its options to a visualizer CLI"""
+    parser.add_argument('--export', metavar='PATH', default=None,
+                        help='Render headless to PATH instead of opening a window '
+                             '(.mp4 = scrolling video, otherwise a directory of PNG strips)')
+    parser.add_argument('--export-fps', type=int, default=30,
+                        help='Video frame rate (default: 30)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='Video playback speed, e.g. 10 = 10x real time (default: 1)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Render in N parallel processes (0 = one per CPU, default: 1)')
+    parser.add_argument('--strip-seconds', type=float, default=10.0,
+                        help='Seconds per strip (default: 10)')
+    parser.add_argument('--strip-rows', type=int, default=6,
+                        help='Strips per PNG page (default: 6)')
+
+
+def find_ffmpeg():
+    """Path of the ffmpeg executable, or None"""
+    return shutil.which('ffmpeg')
+
+
+def _worker_count(workers):
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _split(n, parts):
+    """Split range(n) into up to `parts` contiguous (start, stop) ranges"""
+    edges = np.linspace(0, n, min(parts, n) + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _run_jobs(fn, jobs, workers):
+    """Run fn over jobs, in a process pool if more than one worker"""
+    if workers <= 1 or len(jobs) == 1:
+        return [fn(job) for job in jobs]
+    with multiprocessing.Pool(min(workers, len(jobs))) as pool:
+        return pool.map(fn, jobs)
+
+
+def _lane_labels(num_leads, lead_names):
+    names = list(lead_names or [])
+    return names + [f'Signal {k}' for k in range(len(names), num_leads)]
+
+
+def _setup_axes(ax, num_leads, lead_names):
+    """y axis for one normalized lead or stacked lanes"""
+    if num_leads == 1:
+        ax.set_ylim(-1.2, 1.2)
+        ax.set_ylabel('Amplitude (normalized)', fontsize=12)
+        return None
+    offsets = np.arange(num_leads - 1, -1, -1, dtype=np.float64)
+    ax.set_ylim(-0.6, num_leads - 0.4)
+    ax.set_yticks(offsets)
+    ax.set_yticklabels(_lane_labels(num_leads, lead_names))
+    return offsets
+
+
+def _rgb_image(canvas):
+    """Current Agg buffer as a PIL RGB image"""
+    from PIL import Image
+    w, h = canvas.get_width_height()
+    return Image.frombuffer('RGBA', (w, h), canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1).convert('RGB')
+
+
+# ---------------------------------------------------------------------------
+# Video
+# ---------------------------------------------------------------------------
+
+class FrameRenderer:
+    """Renders frames of the scrolling view into an Agg buffer"""
+
+    def __init__(self, window_size, sample_rate, num_leads=1, lead_names=None,
+                 title='ECG', size=VIDEO_SIZE, annotations=None):
+        """
+        Args:
+            window_size: Samples shown per frame
+            sample_rate: Hz (time axis and time stamp)
+            num_leads: 1, or leads stacked in lanes
+            lead_names: Optional lane labels
+            title: Figure title
+            size: Frame size in pixels (width, height)
+            annotations: Optional AnnotationIndex for beat labels
+        """
+        self.window_size = window_size
+        self.sample_rate = sample_rate
+        self.num_leads = num_leads
+
+        with matplotlib.style.context(STYLE):
+            self.fig = Figure(figsize=(size[0] / DPI, size[1] / DPI), dpi=DPI)
+            self.canvas = FigureCanvasAgg(self.fig)
+            self.ax = self.fig.add_subplot()
+            self.ax.set_xlim(0, window_size / sample_rate)
+            self.ax.set_xlabel('Time in window (seconds)', fontsize=12)
+            self.ax.set_title(title, fontsize=14, fontweight='bold')
+            self.ax.grid(True, alpha=0.4, linestyle='--', linewidth=0.8)
+            self.offsets = _setup_axes(self.ax, num_leads, lead_names)
+
+            if num_leads == 1:
+                self.line, = self.ax.plot([], [], 'g-', linewidth=1.5, animated=True)
+            else:
+                self.line = LineCollection([], linewidths=1.2, animated=True,
+                                           colors=[f'C{k}' for k in range(num_leads)])
+                self.ax.add_collection(self.line)
+
+            self.stamp = self.ax.text(
+                0.02, 0.97, '', transform=self.ax.transAxes,
+                verticalalignment='top', fontsize=11, family='monospace',
+                bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.9),
+                animated=True
+            )
+            self.overlay = (AnnotationOverlay(self.ax, annotations, animated=True)
+                            if annotations is not None else None)
+            self.fig.tight_layout()
+
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.envelope = MinMaxEnvelope(window_size, pixel_columns(self.ax), dtype=np.float32,
+                                       leads=num_leads if num_leads > 1 else None)
+        self._segments = np.empty((num_leads, self.envelope.max_points, 2))
+
+    def advance(self, signal, end, first=0):
+        """
+        Move the window so it ends at sample `end`
+
+        Args:
+            signal: Samples (or (samples, leads) frames) starting at sample `first`
+            end: Absolute sample number one past the newest sample shown
+            first: Absolute sample number of signal[0]
+        """
+        start = max(self.envelope.next_index, end - self.window_size, first)
+        if self.envelope.next_index == 0:
+            # Fresh envelope (e.g. a worker's first frame): start on a bucket
+            # boundary so buckets match those of an uninterrupted render
+            bucket = self.envelope.bucket
+            start = max(first, start // bucket * bucket)
+        if end > start:
+            self.envelope.extend(signal[start - first:end - first], start)
+
+    def render(self):
+        """Draw the current window; returns the frame's RGBA buffer"""
+        x, y = self.envelope.envelope()
+        origin = max(0, self.envelope.next_index - self.window_size)
+        t = (x - origin) / self.sample_rate
+
+        if self.num_leads == 1:
+            self.line.set_data(t, y)
+        else:
+            seg = self._segments[:, :len(t)]
+            seg[:, :, 0] = t.T
+            seg[:, :, 1] = y.T * LANE_HALF_HEIGHT + self.offsets[:, None]
+            self.line.set_segments(seg)
+        self.stamp.set_text(f'{self.envelope.next_index / self.sample_rate:9.2f} s')
+
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.line)
+        if self.overlay is not None:
+            self.overlay.update(origin, self.envelope.next_index, origin, 1.0 / self.sample_rate)
+            self.ax.draw_artist(self.overlay.collection)
+        self.ax.draw_artist(self.stamp)
+        return self.canvas.buffer_rgba()
+
+
+def _ffmpeg_command(ffmpeg, size, fps, path):
+    return [ffmpeg, '-y', '-loglevel', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{size[0]}x{size[1]}',
+            '-r', str(fps), '-i', '-',
+            '-c:v', 'libx264', '-preset', 'veryfast', '-pix_fmt', 'yuv420p',
+            str(path)]
+
+
+def _render_video_part(job):
+    """Worker: render frames [i0, i1) to an MP4 part or PNG files"""
+    t0 = time.perf_counter()
+    renderer = FrameRenderer(job['window_size'], job['sample_rate'], job['num_leads'],
+                             job['lead_names'], job['title'], annotations=job['annotations'])
+    signal, first = job['signal'], job['first']
+    ends = job['ends']
+
+    proc = None
+    if job['ffmpeg']:
+        proc = subprocess.Popen(_ffmpeg_command(job['ffmpeg'], VIDEO_SIZE, job['fps'],
+                                                job['target']),
+                                stdin=subprocess.PIPE)
+    try:
+        for k, end in enumerate(ends):
+            renderer.advance(signal, int(end), first)
+            frame = renderer.render()
+            if proc is not None:
+                proc.stdin.write(frame)
+            else:
+                path = Path(job['target']) / f"frame_{job['i0'] + k:06d}.png"
+                _rgb_image(renderer.canvas).save(path, compress_level=1)
+    finally:
+        if proc is not None:
+            proc.stdin.close()
+            if proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg failed on {job['target']}")
+
+    elapsed = time.perf_counter() - t0
+    print(f"  ✓ Frames {job['i0']}-{job['i0'] + len(ends) - 1} "
+          f"in {elapsed:.1f}s ({len(ends) / elapsed:.0f} fps)")
+    return len(ends)
+
+
+def export_video(signal, path, sample_rate, window_size=1000, fps=30, speed=1.0,
+                 workers=1, lead_names=None, title='ECG', annotations=None):
+    """
+    Render the scrolling display of a whole signal to a video
+
+    Args:
+        signal: (N,) normalized samples, or (N, leads) for stacked lanes
+        path: Output .mp4 (a PNG sequence directory is used without ffmpeg)
+        sample_rate: Hz
+        window_size: Samples visible per frame
+        fps: Video frame rate
+        speed: Playback speed relative to real time
+        workers: Parallel render processes (0 = one per CPU)
+        lead_names: Lane labels for multi-lead signals
+        title: Figure title
+        annotations: Optional AnnotationIndex for beat labels
+
+    Returns:
+        Path of the video (or of the frame directory)
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    num_leads = 1 if signal.ndim == 1 else signal.shape[1]
+    n = len(signal)
+    path = Path(path)
+
+    # Frame k shows the window ending at sample ends[k]
+    step = sample_rate * speed / fps
+    num_frames = max(1, int(np.ceil(n / step)))
+    ends = np.minimum(np.round(np.arange(1, num_frames + 1) * step).astype(np.int64), n)
+
+    workers = _worker_count(workers)
+    ffmpeg = find_ffmpeg()
+    if ffmpeg is None:
+        frame_dir = path.with_suffix('')
+        frame_dir = frame_dir.with_name(frame_dir.name + '_frames')
+        frame_dir.mkdir(parents=True, exist_ok=True)
+        print(f"⚠ ffmpeg not found - writing PNG frames to {frame_dir}/")
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"▶ Exporting {num_frames} frames ({n / sample_rate:.1f}s of signal at "
+          f"{speed:g}x, {fps} fps) with {workers} worker(s)")
+
+    jobs = []
+    for k, (i0, i1) in enumerate(_split(num_frames, workers)):
+        # Each part gets only the samples its frames can show (plus a
+        # window of lead-in for bucket alignment)
+        first = max(0, int(ends[i0]) - 2 * window_size)
+        target = (path.with_name(f'{path.stem}.part{k:03d}{path.suffix}')
+                  if ffmpeg else frame_dir)
+        jobs.append({
+            'signal': signal[first:int(ends[i1 - 1])], 'first': first,
+            'ends': ends[i0:i1], 'i0': i0, 'window_size': window_size,
+            'sample_rate': sample_rate, 'num_leads': num_leads,
+            'lead_names': lead_names, 'title': title, 'fps': fps,
+            'ffmpeg': ffmpeg, 'target': target, 'annotations': annotations,
+        })
+
+    t0 = time.perf_counter()
+    _run_jobs(_render_video_part, jobs, workers)
+
+    if ffmpeg is None:
+        print(f"✓ Wrote {num_frames} frames in {time.perf_counter() - t0:.1f}s")
+        print(f"  Assemble with: ffmpeg -r {fps} -i {frame_dir}/frame_%06d.png "
+              f"-pix_fmt yuv420p {path}")
+        return frame_dir
+
+    parts = [job['target'] for job in jobs]
+    if len(parts) == 1:
+        os.replace(parts[0], path)
+    else:
+        listing = path.with_name(f'{path.stem}.parts.txt')
+        listing.write_text(''.join(f"file '{p.resolve()}'\n" for p in parts))
+        subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                        '-i', str(listing), '-c', 'copy', str(path)], check=True)
+        listing.unlink()
+        for p in parts:
+            p.unlink()
+
+    elapsed = time.perf_counter() - t0
+    print(f"✓ Wrote {path} ({num_frames} frames in {elapsed:.1f}s, "
+          f"{n / sample_rate / elapsed:.0f}x real time)")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# PNG strips
+# ---------------------------------------------------------------------------
+
+def _render_strip_pages(job):
+    """Worker: render pages [p0, p1) of strips"""
+    signal, first = job['signal'], job['first']
+    rate, rows = job['sample_rate'], job['rows']
+    per_strip = int(round(job['strip_seconds'] * rate))
+    num_leads = 1 if signal.ndim == 1 else signal.shape[1]
+
+    with matplotlib.style.context(STYLE):
+        fig = Figure(figsize=(STRIP_SIZE[0] / DPI, STRIP_SIZE[1] / DPI), dpi=DPI)
+        canvas = FigureCanvasAgg(fig)
+        axes = fig.subplots(rows, 1, squeeze=False)[:, 0]
+        title = fig.suptitle('', fontsize=14, fontweight='bold')
+        lines = []
+        for ax in axes:
+            ax.grid(True, alpha=0.4, linestyle='--', linewidth=0.8)
+            offsets = _setup_axes(ax, num_leads, job['lead_names'])
+            ax.set_ylabel('')
+            lines.append([ax.plot([], [], color='g' if num_leads == 1 else f'C{k}',
+                                  linewidth=0.8)[0] for k in range(num_leads)])
+        overlays = ([AnnotationOverlay(ax, job['annotations']) for ax in axes]
+                    if job['annotations'] is not None else None)
+        axes[-1].set_xlabel('Time (seconds)', fontsize=12)
+        fig.tight_layout()
+
+    written = []
+    for page in range(job['p0'], job['p1']):
+        for row, ax in enumerate(axes):
+            s0 = (page * rows + row) * per_strip
+            s1 = min(s0 + per_strip, job['num_samples'])
+            ax.set_xlim(s0 / rate, (s0 + per_strip) / rate)
+            for k, line in enumerate(lines[row]):
+                if s1 <= s0:
+                    line.set_data([], [])
+                    continue
+                y = signal[s0 - first:s1 - first]
+                if num_leads > 1:
+                    y = y[:, k]
+                x, y = minmax_decimate(y, pixel_columns(ax), s0)
+                if offsets is not None:
+                    y = y * LANE_HALF_HEIGHT + offsets[k]
+                line.set_data(x / rate, y)
+            if overlays is not None:
+                overlays[row].update(s0, s1, scale=1.0 / rate)
+        t_page = page * rows * per_strip / rate
+        title.set_text(f"{job['title']} - {t_page:.0f}-{t_page + rows * job['strip_seconds']:.0f} s")
+        canvas.draw()
+        out = Path(job['out_dir']) / f"{job['stem']}_p{page:04d}.png"
+        _rgb_image(canvas).save(out, compress_level=1)
+        written.append(out)
+
+    print(f"  ✓ Pages {job['p0']}-{job['p1'] - 1}")
+    return written
+
+
+def export_strips(signal, out_dir, sample_rate, strip_seconds=10.0, rows=6,
+                  workers=1, lead_names=None, title='ECG', stem='ecg', annotations=None):
+    """
+    Render a whole signal as pages of static strips
+
+    Args:
+        signal: (N,) normalized samples, or (N, leads) for stacked lanes
+        out_dir: Directory for the PNG pages
+        sample_rate: Hz
+        strip_seconds: Length of one strip
+        rows: Strips per page
+        workers: Parallel render processes (0 = one per CPU)
+        lead_names: Lane labels for multi-lead signals
+        title: Page title prefix
+        stem: File name prefix (<stem>_p0000.png, ...)
+        annotations: Optional AnnotationIndex for beat labels
+
+    Returns:
+        List of written page paths
+    """
+    signal = np.asarray(signal, dtype=np.float32)
+    n = len(signal)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    per_page = int(round(strip_seconds * sample_rate)) * rows
+    num_pages = max(1, int(np.ceil(n / per_page)))
+    workers = _worker_count(workers)
+    print(f"▶ Exporting {num_pages} page(s) of {rows} x {strip_seconds:g}s strips "
+          f"with {workers} worker(s)")
+
+    jobs = []
+    for p0, p1 in _split(num_pages, workers):
+        first = p0 * per_page
+        jobs.append({
+            'signal': signal[first:p1 * per_page], 'first': first, 'num_samples': n,
+            'p0': p0, 'p1': p1, 'sample_rate': sample_rate, 'rows': rows,
+            'strip_seconds': strip_seconds, 'lead_names': lead_names,
+            'title': title, 'out_dir': out_dir, 'stem': stem,
+            'annotations': annotations,
+        })
+
+    t0 = time.perf_counter()
+    written = [p for part in _run_jobs(_render_strip_pages, jobs, workers) for p in part]
+    print(f"✓ Wrote {len(written)} page(s) to {out_dir}/ in {time.perf_counter() - t0:.1f}s")
+    return written
+
+
+def run_export(args, signal, sample_rate, window_size, lead_names=None, title='ECG',
+               stem='ecg', annotations=None):
+    """
+    Dispatch --export PATH from a visualizer CLI
+
+    Args:
+        args: Parsed arguments (see add_export_args)
+        signal: Normalized (N,) or (N, leads) signal as it would be displayed
+        sample_rate: Hz
+        window_size: Display window of the live view (video frames)
+        lead_names: Lane labels for multi-lead signals
+        title: Figure title
+        stem: File name prefix for strip pages
+        annotations: Optional AnnotationIndex for beat labels
+
+    Returns:
+        Output path(s)
+    """
+    path = Path(args.export)
+    if path.suffix.lower() in VIDEO_SUFFIXES:
+        return export_video(signal, path, sample_rate, window_size, args.export_fps,
+                            args.speed, args.workers, lead_names, title, annotations)
+    return export_strips(signal, path, sample_rate, args.strip_seconds, args.strip_rows,
+                         args.workers, lead_names, title, stem, annotations)
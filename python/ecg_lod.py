@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+ECG Level-of-Detail Pyramid - Min/max pyramid for browsing whole records
+
+Browsing a 30-minute (650k-sample) or 22-hour (10M-sample) record needs a
+redraw to touch only about 2 points per pixel column, whatever the zoom. The
+pyramid stores the raw samples followed by min/max levels with a
+power-of-two reduction per level (bucket = 4, 8, 16, ... samples), down to a
+few hundred buckets. Everything lives in one memmapped .npy file next to the
+record, so opening a record reads nothing up front and a redraw reads only
+the rows of the visible range at the chosen level.
+
+File layout (<record>.lod.npy, float32, one column per lead):
+
+    rows [0, N)                   raw samples
+    level L (bucket 2**L)         2 * ceil(N / 2**L) rows: min, max per bucket
+
+Offsets follow from N alone (level_layout()); N, the sample rate and the
+source file's size/mtime are kept in <record>.lod.json so a stale pyramid is
+rebuilt automatically.
+
+Usage:
+    pyramid = LODPyramid.for_record('../ECG signals/Normal/100')
+    x, y, level = pyramid.fetch(start, stop, columns=1400, lead=0)
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import json
+import math
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from ecg_dat_reader import open_record, record_name
+from ecg_synth import is_synth_path
+
+LOD_SUFFIX = '.lod.npy'
+META_SUFFIX = '.lod.json'
+LOD_VERSION = 1
+
+# First min/max level (bucket of 4; a bucket of 2 saves nothing over raw)
+MIN_LEVEL = 2
+# Stop adding levels once a level has this few buckets
+TOP_BUCKETS = 512
+
+
+def level_layout(num_samples):
+    """
+    Row offsets of every level
+
+    Args:
+        num_samples: Raw samples per lead (N)
+
+    Returns:
+        (levels, total_rows) where levels is a list of
+        (level, bucket, offset, num_buckets)
+    """
+    levels = []
+    offset = num_samples
+    level = MIN_LEVEL
+    while True:
+        bucket = 1 << level
+        num_buckets = math.ceil(num_samples / bucket)
+        levels.append((level, bucket, offset, num_buckets))
+        offset += 2 * num_buckets
+        if num_buckets <= TOP_BUCKETS:
+            break
+        level += 1
+    return levels, offset
+
+
+def _source_stamp(source):
+    """Size and mtime of the file the pyramid was built from"""
+    st = Path(source).stat()
+    return {'size': st.st_size, 'mtime': st.st_mtime}
+
+
+class LODPyramid:
+    """Memmapped min/max pyramid of a (samples x leads) record"""
+
+    def __init__(self, path, meta):
+        """Open an existing pyramid (use build() / for_record() to create one)"""
+        self.path = Path(path)
+        self.num_samples = meta['num_samples']
+        self.num_leads = meta['num_leads']
+        self.sample_rate = meta['sample_rate']
+        self.lead_names = meta.get('lead_names', [])
+        self.levels, _ = level_layout(self.num_samples)
+        self.data = np.load(self.path, mmap_mode='r')
+
+    @staticmethod
+    def paths_for(source):
+        """(pyramid path, metadata path) stored next to a record or CSV"""
+        source = Path(source)
+        base = source.with_suffix('') if source.suffix in ('.dat', '.csv') else source
+        return Path(str(base) + LOD_SUFFIX), Path(str(base) + META_SUFFIX)
+
+    @classmethod
+    def build(cls, signals, path, sample_rate, source=None, lead_names=None):
+        """
+        Compute the pyramid and write it to a memmapped .npy file
+
+        Args:
+            signals: (N,) or (N, leads) array
+            path: Output .lod.npy path (metadata goes next to it)
+            sample_rate: Hz, stored in the metadata
+            source: File the signals came from (staleness check)
+            lead_names: Optional list of lead names
+
+        Returns:
+            LODPyramid opened on the new file
+        """
+        signals = np.asarray(signals, dtype=np.float32)
+        if signals.ndim == 1:
+            signals = signals[:, None]
+        n, leads = signals.shape
+        levels, total_rows = level_layout(n)
+
+        path = Path(path)
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                        shape=(total_rows, leads))
+        out[:n] = signals
+
+        # First level straight from the raw samples (tail padded with the last
+        # sample so it cannot widen the envelope)
+        level, bucket, offset, nb = levels[0]
+        padded = np.empty((nb * bucket, leads), dtype=np.float32)
+        padded[:n] = signals
+        padded[n:] = signals[-1]
+        blocks = padded.reshape(nb, bucket, leads)
+        mins = blocks.min(axis=1)
+        maxs = blocks.max(axis=1)
+        out[offset:offset + 2 * nb:2] = mins
+        out[offset + 1:offset + 2 * nb:2] = maxs
+
+        # Each further level halves the previous one
+        for level, bucket, offset, nb in levels[1:]:
+            prev = len(mins)
+            if prev % 2:
+                mins = np.concatenate((mins, mins[-1:]))
+                maxs = np.concatenate((maxs, maxs[-1:]))
+            mins = mins.reshape(-1, 2, leads).min(axis=1)[:nb]
+            maxs = maxs.reshape(-1, 2, leads).max(axis=1)[:nb]
+            out[offset:offset + 2 * nb:2] = mins
+            out[offset + 1:offset + 2 * nb:2] = maxs
+
+        out.flush()
+        del out
+
+        meta = {
+            'version': LOD_VERSION,
+            'num_samples': n,
+            'num_leads': leads,
+            'sample_rate': sample_rate,
+            'lead_names': lead_names or [],
+            'source': _source_stamp(source) if source else None,
+        }
+        meta_path = Path(str(path)[:-len(LOD_SUFFIX)] + META_SUFFIX)
+        meta_path.write_text(json.dumps(meta, indent=2))
+
+        print(f"✓ Built LOD pyramid: {n} samples x {leads} lead(s), "
+              f"{len(levels)} levels → {path.name}")
+        return cls(path, meta)
+
+    @classmethod
+    def open(cls, source):
+        """
+        Open the pyramid stored next to `source` if it is current
+
+        Returns:
+            LODPyramid, or None if missing or stale
+        """
+        path, meta_path = cls.paths_for(source)
+        if not path.exists() or not meta_path.exists():
+            return None
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+
+        if meta.get('version') != LOD_VERSION:
+            return None
+        data_file = Path(source)
+        if data_file.suffix not in ('.dat', '.csv'):
+            data_file = data_file.with_suffix('.dat')
+        if meta.get('source') and data_file.exists():
+            if meta['source'] != _source_stamp(data_file):
+                return None
+        return cls(path, meta)
+
+    @classmethod
+    def for_record(cls, record_path, rebuild=False):
+        """
+        Open (or build on first use) the pyramid of a MIT-BIH record
+
+        Args:
+            record_path: Record path without extension, or a "synth:..."
+                pseudo-record (pyramid kept in the temp directory)
+            rebuild: Ignore an existing pyramid
+        """
+        synth = is_synth_path(record_path)
+        base = Path(tempfile.gettempdir()) / record_name(record_path) if synth else record_path
+        if not rebuild:
+            pyramid = cls.open(base)
+            if pyramid is not None:
+                print(f"✓ Opened LOD pyramid: {pyramid.path.name}")
+                return pyramid
+
+        reader = open_record(record_path)
+        signals = reader.read_signals()
+        path, _ = cls.paths_for(base)
+        return cls.build(signals, path, reader.sample_rate, source=None if synth else reader.data_file,
+                         lead_names=reader.get_info()['signal_names'])
+
+    @classmethod
+    def for_signal(cls, signal, source, sample_rate, rebuild=False):
+        """Open or build the pyramid for a signal loaded from `source` (e.g. CSV)"""
+        if not rebuild:
+            pyramid = cls.open(source)
+            if pyramid is not None and pyramid.num_samples == len(signal):
+                print(f"✓ Opened LOD pyramid: {pyramid.path.name}")
+                return pyramid
+        path, _ = cls.paths_for(source)
+        return cls.build(signal, path, sample_rate, source=source)
+
+    def level_for(self, span, columns):
+        """
+        Coarsest detail that still gives >= 1 bucket per pixel column
+
+        Returns:
+            None for raw samples, else the (level, bucket, offset, nb) tuple
+        """
+        per_column = span / max(1, columns)
+        if per_column <= 2:
+            return None
+        for entry in reversed(self.levels):
+            if entry[1] <= per_column:
+                return entry
+        return None
+
+    def fetch(self, start, stop, columns, lead=0):
+        """
+        Points to draw samples [start, stop) of one lead at `columns` pixels
+
+        Reads only the rows of the visible range from the memmap.
+
+        Returns:
+            (x, y, level) - x in sample numbers, level 0 = raw samples
+        """
+        start = max(0, int(math.floor(start)))
+        stop = min(self.num_samples, int(math.ceil(stop)))
+        if stop <= start:
+            return np.empty(0), np.empty(0, dtype=np.float32), 0
+
+        entry = self.level_for(stop - start, columns)
+        if entry is None:
+            y = np.array(self.data[start:stop, lead])
+            return np.arange(start, stop, dtype=np.float64), y, 0
+
+        level, bucket, offset, nb = entry
+        b0 = start // bucket
+        b1 = min(nb, -(-stop // bucket))
+        y = np.array(self.data[offset + 2 * b0:offset + 2 * b1, lead])
+
+        # Both points of a bucket at its centre: a vertical min-max stroke
+        x = np.repeat((np.arange(b0, b1) + 0.5) * bucket, 2)
+        return x, y, level
+
+    def lead_range(self, lead=0):
+        """(min, max) of a whole lead, from the top level"""
+        level, bucket, offset, nb = self.levels[-1]
+        top = self.data[offset:offset + 2 * nb, lead]
+        return float(top.min()), float(top.max())
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+ECG Realtime Helpers - CPU pinning and real-time scheduling for the pacing loop
+
+On a loaded Linux host the UART pacing loop can be descheduled for tens of
+milliseconds, which shows up as glitches on the VGA display. These helpers
+pin the calling thread to one core, request SCHED_FIFO / SCHED_RR priority
+and lock the process memory so the transmit buffers never page out.
+Every step falls back gracefully when the OS or permissions do not allow it.
+
+The benchmark mode measures the pacing jitter distribution with and without
+these options so the gain can be quantified on the actual lab hardware.
+
+Usage:
+    python ecg_realtime.py --benchmark --rate 360 --duration 10
+    python ecg_realtime.py --benchmark --cpu 2 --rt-priority 50 --load 4
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import os
+import sys
+import time
+import ctypes
+import ctypes.util
+import argparse
+import threading
+import multiprocessing
+import numpy as np
+
+# Scheduling policies (Linux only)
+SCHED_POLICIES = {}
+if hasattr(os, 'SCHED_FIFO'):
+    SCHED_POLICIES['fifo'] = os.SCHED_FIFO
+if hasattr(os, 'SCHED_RR'):
+    SCHED_POLICIES['rr'] = os.SCHED_RR
+
+# mlockall() flags from <sys/mman.h>
+MCL_CURRENT = 1
+MCL_FUTURE = 2
+
+# Jitter histogram bucket edges (ms)
+JITTER_BUCKETS_MS = [0.1, 0.5, 1.0, 5.0, 10.0]
+
+
+def add_realtime_args(parser):
+    """Add --cpu / --rt-priority / --rt-policy options to a streamer CLI"""
+    parser.add_argument('--cpu', type=int, default=None,
+                        help='Pin the transmit thread to this CPU core')
+    parser.add_argument('--rt-priority', type=int, default=None,
+                        help='Real-time priority for the transmit thread (1-99)')
+    parser.add_argument('--rt-policy', choices=['fifo', 'rr'], default='fifo',
+                        help='Real-time scheduling policy (default: fifo)')
+
+
+def _lock_memory():
+    """Lock current and future pages of the process in RAM"""
+    libc_name = ctypes.util.find_library('c')
+    if libc_name is None:
+        return False, 'libc not found'
+
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'mlockall'):
+        return False, 'mlockall not available'
+
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+        return False, os.strerror(ctypes.get_errno())
+    return True, None
+
+
+def _unlock_memory():
+    """Undo _lock_memory()"""
+    libc_name = ctypes.util.find_library('c')
+    if libc_name is not None:
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if hasattr(libc, 'munlockall'):
+            libc.munlockall()
+
+
+def apply_realtime(cpu=None, rt_priority=None, policy='fifo',
+                   lock_memory=True, verbose=True):
+    """
+    Apply real-time settings to the calling thread
+
+    On Linux, affinity and scheduling policy are per-thread, so calling this
+    at the top of the transmit thread only affects that thread. Called from
+    the main thread of a single-threaded streamer it covers the process.
+
+    Args:
+        cpu: CPU core to pin to (None = leave affinity alone)
+        rt_priority: Real-time priority 1-99 (None = keep normal scheduling)
+        policy: 'fifo' or 'rr'
+        lock_memory: Lock process memory with mlockall() when requesting RT
+        verbose: Print what was applied
+
+    Returns:
+        dict with the previous settings, for restore_realtime()
+    """
+    previous = {'affinity': None, 'policy': None, 'param': None, 'locked': False}
+
+    def report(ok, what, reason=None):
+        if not verbose:
+            return
+        if ok:
+            print(f"✓ {what}")
+        else:
+            print(f"⚠ {what} not applied ({reason}) - continuing without it")
+
+    # CPU pinning
+    if cpu is not None:
+        if hasattr(os, 'sched_setaffinity'):
+            try:
+                previous['affinity'] = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, {cpu})
+                report(True, f"Pinned transmit thread to CPU {cpu}")
+            except (OSError, ValueError) as e:
+                previous['affinity'] = None
+                report(False, f"CPU pinning to core {cpu}", e)
+        else:
+            report(False, "CPU pinning", "not supported on this OS")
+
+    # Real-time scheduling
+    if rt_priority is not None:
+        if policy in SCHED_POLICIES and hasattr(os, 'sched_setscheduler'):
+            sched_policy = SCHED_POLICIES[policy]
+            try:
+                lo = os.sched_get_priority_min(sched_policy)
+                hi = os.sched_get_priority_max(sched_policy)
+                priority = min(max(rt_priority, lo), hi)
+                previous['policy'] = os.sched_getscheduler(0)
+                previous['param'] = os.sched_getparam(0)
+                os.sched_setscheduler(0, sched_policy, os.sched_param(priority))
+                report(True, f"Scheduling SCHED_{policy.upper()} priority {priority}")
+            except (OSError, PermissionError) as e:
+                previous['policy'] = None
+                report(False, f"SCHED_{policy.upper()} scheduling", e)
+        else:
+            report(False, "Real-time scheduling", "not supported on this OS")
+
+        # Memory locking (process-wide)
+        if lock_memory:
+            ok, reason = _lock_memory()
+            previous['locked'] = ok
+            report(ok, "Locked process memory (mlockall)", reason)
+
+    return previous
+
+
+def restore_realtime(previous):
+    """Restore settings returned by apply_realtime() on the calling thread"""
+    if previous.get('policy') is not None:
+        try:
+            os.sched_setscheduler(0, previous['policy'], previous['param'])
+        except OSError:
+            pass
+
+    if previous.get('affinity') is not None:
+        try:
+            os.sched_setaffinity(0, previous['affinity'])
+        except OSError:
+            pass
+
+    if previous.get('locked'):
+        _unlock_memory()
+
+
+# ---------------------------------------------------------------------------
+# JITTER BENCHMARK
+# ---------------------------------------------------------------------------
+
+def measure_pacing_jitter(sample_rate=360, duration=10.0):
+    """
+    Run a pacing loop like the streamers do and record send-time jitter
+
+    Args:
+        sample_rate: Samples per second
+        duration: Seconds to run
+
+    Returns:
+        numpy array of interval errors in milliseconds (actual - nominal)
+    """
+    period = 1.0 / sample_rate
+    num_samples = int(duration * sample_rate)
+    timestamps = np.empty(num_samples, dtype=np.float64)
+
+    for i in range(num_samples):
+        timestamps[i] = time.perf_counter()
+        time.sleep(period)
+
+    intervals = np.diff(timestamps)
+    return (intervals - period) * 1000.0
+
+
+def summarize_jitter(errors_ms):
+    """Reduce interval errors to percentile/bucket statistics"""
+    abs_err = np.abs(errors_ms)
+    counts, _ = np.histogram(abs_err, bins=[0.0] + JITTER_BUCKETS_MS + [np.inf])
+    return {
+        'intervals': len(errors_ms),
+        'mean': float(np.mean(errors_ms)),
+        'p50': float(np.percentile(abs_err, 50)),
+        'p99': float(np.percentile(abs_err, 99)),
+        'p999': float(np.percentile(abs_err, 99.9)),
+        'max': float(abs_err.max()),
+        'buckets': counts.tolist(),
+    }
+
+
+def _busy_worker(stop_event):
+    """Burn one core until stopped (simulates a shared, loaded host)"""
+    x = 0
+    while not stop_event.is_set():
+        x += 1
+
+
+def _run_in_thread(sample_rate, duration, cpu=None, rt_priority=None, policy='fifo'):
+    """Measure jitter on a dedicated thread, the way the streamers transmit"""
+    result = {}
+
+    def worker():
+        previous = None
+        if cpu is not None or rt_priority is not None:
+            previous = apply_realtime(cpu, rt_priority, policy)
+        try:
+            result['errors'] = measure_pacing_jitter(sample_rate, duration)
+        finally:
+            if previous is not None:
+                restore_realtime(previous)
+
+    thread = threading.Thread(target=worker, name='JitterBenchmark')
+    thread.start()
+    thread.join()
+    return result['errors']
+
+
+def run_benchmark(sample_rate=360, duration=10.0, cpu=None, rt_priority=None,
+                  policy='fifo', load=0):
+    """
+    Compare pacing jitter with and without the real-time options
+
+    Args:
+        sample_rate: Pacing rate in Hz
+        duration: Seconds per run
+        cpu: CPU core for the tuned run
+        rt_priority: RT priority for the tuned run
+        policy: 'fifo' or 'rr'
+        load: Number of busy-loop processes to run alongside (0 = idle host)
+    """
+    print(f"\n{'='*60}")
+    print(f"  PACING JITTER BENCHMARK")
+    print(f"{'='*60}")
+    print(f"  Rate: {sample_rate} Hz  |  Duration: {duration:.0f}s per run")
+    print(f"  Tuned run: cpu={cpu}, rt-priority={rt_priority}, policy={policy}")
+    print(f"  Background load: {load} busy process(es)")
+    print(f"{'='*60}\n")
+
+    stop_event = multiprocessing.Event()
+    loaders = [multiprocessing.Process(target=_busy_worker, args=(stop_event,), daemon=True)
+               for _ in range(load)]
+    for p in loaders:
+        p.start()
+
+    try:
+        print("▶ Baseline run (default scheduling)...")
+        baseline = summarize_jitter(_run_in_thread(sample_rate, duration))
+        print("▶ Tuned run...")
+        tuned = summarize_jitter(_run_in_thread(sample_rate, duration, cpu,
+                                                rt_priority, policy))
+    finally:
+        stop_event.set()
+        for p in loaders:
+            p.join(timeout=2.0)
+
+    # Side-by-side table
+    print(f"\n  {'|interval error| (ms)':<24}{'baseline':>12}{'tuned':>12}")
+    print(f"  {'-'*48}")
+    for key, label in [('mean', 'mean (signed)'), ('p50', 'p50'), ('p99', 'p99'),
+                       ('p999', 'p99.9'), ('max', 'max')]:
+        print(f"  {label:<24}{baseline[key]:>12.3f}{tuned[key]:>12.3f}")
+
+    print(f"\n  {'Distribution':<24}{'baseline':>12}{'tuned':>12}")
+    print(f"  {'-'*48}")
+    edges = [0.0] + JITTER_BUCKETS_MS
+    for i, lo in enumerate(edges):
+        label = f"< {JITTER_BUCKETS_MS[i]} ms" if i < len(JITTER_BUCKETS_MS) else f">= {lo} ms"
+        print(f"  {label:<24}{baseline['buckets'][i]:>12d}{tuned['buckets'][i]:>12d}")
+    print()
+
+    return baseline, tuned
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Real-time pacing helpers and jitter benchmark',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python ecg_realtime.py --benchmark
+  python ecg_realtime.py --benchmark --cpu 2 --rt-priority 50
+  python ecg_realtime.py --benchmark --cpu 2 --rt-priority 50 --load 4 --duration 30
+        """
+    )
+
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare pacing jitter with and without RT options')
+    parser.add_argument('--rate', '-r', type=int, default=360,
+                        help='Pacing rate in Hz (default: 360)')
+    parser.add_argument('--duration', '-d', type=float, default=10.0,
+                        help='Seconds per benchmark run (default: 10)')
+    parser.add_argument('--load', type=int, default=0,
+                        help='Busy-loop processes to simulate a loaded host (default: 0)')
+    add_realtime_args(parser)
+
+    args = parser.parse_args()
+
+    if not args.benchmark:
+        parser.print_help()
+        sys.exit(0)
+
+    run_benchmark(args.rate, args.duration, args.cpu, args.rt_priority,
+                  args.rt_policy, args.load)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+ECG Relay - Forward a network ECG stream to a local COM port
+
+Runs on the lab machine the board is plugged into. A streamer on another
+host sends batched, timestamped frames (--port relay://labpc:5000, see
+ecg_transport.py); the relay buffers them for a fixed playout delay and paces
+the samples onto the local UART with its own clock, so network jitter and
+batching never reach the board.
+
+Pacing follows the sender's timestamps by default, reproducing the streamer's
+timing exactly. With --rate the relay ignores them and paces strictly by
+sample offset at a fixed rate.
+
+Usage:
+    python ecg_relay.py --listen 0.0.0.0:5000 --port /dev/ttyUSB0
+    python ecg_relay.py --listen 127.0.0.1:5000 --port loop://      (local test)
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import socket
+import threading
+import time
+import argparse
+import sys
+from collections import deque
+
+import serial
+
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_transport import (BYTES_PER_SAMPLE, RELAY_HEADER, RELAY_MAGIC,
+                           open_transport, parse_host_port)
+
+
+def _recv_exact(conn, size):
+    """Read exactly size bytes (None on EOF)"""
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = conn.recv(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+class ECGRelay:
+    """TCP → UART relay with a playout buffer and local pacing"""
+
+    def __init__(self, listen, port, baud=115200, delay=0.2, rate=None,
+                 late_threshold=0.05):
+        """
+        Open the local port and listening socket
+
+        Args:
+            listen: 'host:port' to listen on
+            port: Local serial port (or any open_transport URL)
+            baud: UART baud rate
+            delay: Playout delay in seconds (jitter buffer depth)
+            rate: Fixed output rate in Hz (None = follow sender timestamps)
+            late_threshold: Re-anchor the clock when a sample is this late (s)
+        """
+        self.listen = parse_host_port(listen)
+        self.delay = delay
+        self.rate = rate
+        self.late_threshold = late_threshold
+
+        try:
+            self.ser = open_transport(port, baud)
+            print(f"✓ Output: {port} at {baud} baud")
+        except serial.SerialException as e:
+            print(f"✗ Error opening serial port: {e}")
+            sys.exit(1)
+
+        # Frames waiting for playout: (sample_offset, t_first, t_last, payload)
+        self.frames = deque()
+        self.frames_ready = threading.Condition()
+        self.running = False
+
+        # Clock anchor: local play time = sender time + offset
+        self.clock_offset = None
+        self.anchor_sample = 0
+        self.anchor_time = 0.0
+        self.last_offset = -1
+
+        # Stats
+        self.samples_out = 0
+        self.frames_in = 0
+        self.late_events = 0
+        self.start_time = None
+
+    # ── network side ────────────────────────────────────────────────────────
+
+    def _reader(self, conn, peer):
+        """Receive frames from one client into the playout queue"""
+        print(f"✓ Streamer connected from {peer[0]}:{peer[1]}")
+        try:
+            while self.running:
+                header = _recv_exact(conn, RELAY_HEADER.size)
+                if header is None:
+                    break
+                magic, seq, offset, t_first, t_last, length = RELAY_HEADER.unpack(header)
+                if magic != RELAY_MAGIC:
+                    print(f"✗ Bad frame magic from {peer[0]} - dropping connection")
+                    break
+                payload = _recv_exact(conn, length)
+                if payload is None:
+                    break
+
+                with self.frames_ready:
+                    self.frames.append((offset, t_first, t_last, payload))
+                    self.frames_in += 1
+                    self.frames_ready.notify()
+        except OSError as e:
+            print(f"⚠ Connection error: {e}")
+        finally:
+            conn.close()
+            print(f"  Streamer {peer[0]}:{peer[1]} disconnected")
+
+    # ── UART side ───────────────────────────────────────────────────────────
+
+    def _anchor(self, offset, t_first):
+        """(Re)start the local playout clock at this frame"""
+        now = time.perf_counter()
+        self.clock_offset = now + self.delay - t_first
+        self.anchor_sample = offset
+        self.anchor_time = now + self.delay
+
+    def _play_time(self, offset, t_sender):
+        """Local perf_counter time at which a sample should go out"""
+        if self.rate:
+            return self.anchor_time + (offset - self.anchor_sample) / self.rate
+        return t_sender + self.clock_offset
+
+    def _writer(self, rt_options):
+        """Pace queued samples onto the UART"""
+        apply_realtime(*rt_options)
+
+        while self.running:
+            with self.frames_ready:
+                while self.running and not self.frames:
+                    self.frames_ready.wait(timeout=0.5)
+                if not self.running:
+                    break
+                offset, t_first, t_last, payload = self.frames.popleft()
+
+            n = len(payload) // BYTES_PER_SAMPLE
+            step = (t_last - t_first) / (n - 1) if n > 1 else 0.0
+
+            # New stream (offset went backwards) or first frame: anchor clock
+            if self.clock_offset is None or offset <= self.last_offset:
+                self._anchor(offset, t_first)
+
+            for j in range(n):
+                deadline = self._play_time(offset + j, t_first + j * step)
+                now = time.perf_counter()
+
+                if now - deadline > self.late_threshold:
+                    # Buffer ran dry (network stall) - restart the clock here
+                    self.late_events += 1
+                    self._anchor(offset + j, t_first + j * step)
+                    deadline = self._play_time(offset + j, t_first + j * step)
+                    now = time.perf_counter()
+
+                if deadline > now:
+                    time.sleep(deadline - now)
+
+                k = j * BYTES_PER_SAMPLE
+                self.ser.write(payload[k:k + BYTES_PER_SAMPLE])
+                self.samples_out += 1
+
+                if self.samples_out % 360 == 0:
+                    self._print_progress()
+
+            self.last_offset = offset + n - 1
+
+    def _print_progress(self):
+        elapsed = time.perf_counter() - self.start_time
+        with self.frames_ready:
+            queued = sum(len(f[3]) for f in self.frames) // BYTES_PER_SAMPLE
+        print(f"  Relayed: {self.samples_out:7d} | Frames in: {self.frames_in:5d} | "
+              f"Queued: {queued:5d} samples | Late: {self.late_events} | "
+              f"Rate: {self.samples_out / elapsed:.1f} Hz")
+
+    # ── main loop ───────────────────────────────────────────────────────────
+
+    def serve_forever(self, rt_options=(None, None, 'fifo')):
+        """Accept streamers one at a time until Ctrl+C"""
+        self.running = True
+        self.start_time = time.perf_counter()
+
+        writer = threading.Thread(target=self._writer, args=(rt_options,),
+                                  daemon=True, name='RelayWriter')
+        writer.start()
+
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(self.listen)
+        server.listen(1)
+        server.settimeout(0.5)
+
+        print(f"✓ Listening on {self.listen[0]}:{self.listen[1]}")
+        mode = f"fixed {self.rate} Hz" if self.rate else "sender timestamps"
+        print(f"  Playout delay: {self.delay*1000:.0f} ms | Pacing: {mode}")
+        print(f"  Press Ctrl+C to stop\n")
+
+        try:
+            while self.running:
+                try:
+                    conn, peer = server.accept()
+                except socket.timeout:
+                    continue
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # One streamer at a time; the reader returns on disconnect
+                self._reader(conn, peer)
+        except KeyboardInterrupt:
+            print("\n✓ Stopping relay")
+        finally:
+            self.running = False
+            with self.frames_ready:
+                self.frames_ready.notify_all()
+            writer.join(timeout=2.0)
+            server.close()
+
+    def close(self):
+        """Close the output port"""
+        self.ser.close()
+        print(f"✓ Relayed {self.samples_out} samples, {self.late_events} late event(s)")
+        print("✓ Serial port closed")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Relay a network ECG stream to a local COM port',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # On the lab PC with the board attached
+  python ecg_relay.py --listen 0.0.0.0:5000 --port /dev/ttyUSB0 --cpu 1 --rt-priority 50
+
+  # On the server with the records
+  python ecg_streamer.py --port relay://labpc:5000 --file data/normal_ecg.csv --loop
+
+  # Everything on localhost, no hardware
+  python ecg_relay.py --listen 127.0.0.1:5000 --port loop://
+        """
+    )
+
+    parser.add_argument('--listen', default='0.0.0.0:5000',
+                        help='Address to listen on (default: 0.0.0.0:5000)')
+    parser.add_argument('--port', '-p', required=True,
+                        help='Local serial port (e.g., COM3, /dev/ttyUSB0, loop://)')
+    parser.add_argument('--baud', '-b', type=int, default=115200,
+                        help='UART baud rate (default: 115200)')
+    parser.add_argument('--delay', type=float, default=0.2,
+                        help='Playout delay in seconds (default: 0.2)')
+    parser.add_argument('--rate', '-r', type=float, default=None,
+                        help='Pace at a fixed rate in Hz instead of sender timestamps')
+    add_realtime_args(parser)
+
+    args = parser.parse_args()
+
+    relay = ECGRelay(args.listen, args.port, args.baud, args.delay, args.rate)
+    try:
+        relay.serve_forever((args.cpu, args.rt_priority, args.rt_policy))
+    finally:
+        relay.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ECG Ring Buffer - Fixed-capacity NumPy ring buffer for the display windows
+
+Replaces collections.deque + list(...) in the visualizers. Storage is twice
+the capacity and every sample is written to both halves (the "mirror"), so
+the newest N samples are always one contiguous slice of the storage array:
+latest() returns a view, with no copy and no per-frame allocation. Handing
+that view to line.set_data() costs one memcpy inside matplotlib.
+
+extend() takes a whole NumPy chunk and writes it with at most four slice
+assignments, so producers can push batches instead of single samples.
+
+With width=L every slot holds one frame of L leads: the storage becomes
+(2 * capacity, L), extend() takes (n, L) chunks and latest() returns a
+(n, L) view, so all leads of a record share one buffer and one write.
+
+Usage:
+    from ecg_ring_buffer import RingBuffer
+    buf = RingBuffer(10000)
+    buf.extend(chunk)
+    line.set_data(x_buf.latest(), buf.latest())
+
+    frames = RingBuffer(10000, width=3)      # 3 leads
+    frames.extend(signals[i:j])               # (n, 3)
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO of scalars (or frames) with a zero-copy 'latest N' view"""
+
+    def __init__(self, capacity, dtype=np.float64, width=None):
+        """
+        Allocate the buffer
+
+        Args:
+            capacity: Number of samples kept (display window size)
+            dtype: NumPy dtype of the samples
+            width: None for scalar samples, else leads per frame
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity must be >= 1, got {capacity}")
+        self.capacity = int(capacity)
+        self.width = None if width is None else int(width)
+        self._frame = () if width is None else (self.width,)
+        self._data = np.zeros((2 * self.capacity,) + self._frame, dtype=dtype)
+        self._written = 0   # total samples ever written
+
+    def __len__(self):
+        return min(self._written, self.capacity)
+
+    @property
+    def total_written(self):
+        """Number of samples written since creation / clear()"""
+        return self._written
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def clear(self):
+        """Forget all samples (storage is kept)"""
+        self._written = 0
+
+    def append(self, value):
+        """Add one sample (one frame of `width` values for multi-lead buffers)"""
+        pos = self._written % self.capacity
+        self._data[pos] = value
+        self._data[pos + self.capacity] = value
+        self._written += 1
+
+    def extend(self, values):
+        """
+        Add a chunk of samples
+
+        Args:
+            values: 1-D array-like, or (n, width) for multi-lead buffers;
+                    if longer than the capacity only the newest `capacity`
+                    samples are kept
+        """
+        values = np.asarray(values, dtype=self._data.dtype).reshape((-1,) + self._frame)
+        n = len(values)
+        if n == 0:
+            return
+
+        cap = self.capacity
+        skipped = 0
+        if n > cap:
+            skipped = n - cap
+            values = values[skipped:]
+            n = cap
+
+        pos = (self._written + skipped) % cap
+        first = min(n, cap - pos)
+
+        # Both halves of the mirror, split at the wrap point
+        self._data[pos:pos + first] = values[:first]
+        self._data[pos + cap:pos + cap + first] = values[:first]
+        if first < n:
+            rest = n - first
+            self._data[:rest] = values[first:]
+            self._data[cap:cap + rest] = values[first:]
+
+        self._written += skipped + n
+
+    def latest(self, n=None):
+        """
+        Contiguous view of the newest samples, oldest first
+
+        The view aliases the storage and changes as new samples arrive;
+        copy it if it must stay fixed.
+
+        Args:
+            n: Number of samples (default: all held samples)
+
+        Returns:
+            numpy view of length min(n, len(self)) (shape (n, width) for
+            multi-lead buffers)
+        """
+        held = len(self)
+        n = held if n is None else min(int(n), held)
+        end = self._written % self.capacity + self.capacity
+        return self._data[end - n:end]
+
+    def __array__(self, dtype=None, copy=None):
+        view = self.latest()
+        return view.astype(dtype) if dtype is not None else view
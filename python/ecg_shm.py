@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+ECG Shared Memory Ring - Publish display samples to out-of-process viewers
+
+In split mode the streamer does no GUI work at all: it writes each display
+sample into a multiprocessing.shared_memory ring and goes back to pacing the
+UART. Any number of viewers or recorders (ecg_shm_viewer.py) attach to the
+ring read-only and render on their own schedule, so closing or stalling a
+viewer can never disturb the transmit timing.
+
+Layout of the shared block:
+
+    int64[8]   header: magic, version, capacity, seq, written, closed, -, -
+    float64[8] info:   sample_rate, -, ...
+    float32[capacity]  sample ring (slot = sample number % capacity)
+
+The writer bumps seq to an odd value before touching the ring and back to
+even afterwards (a seqlock). A reader copies what it needs and retries if
+seq changed or was odd, so it never returns a half-written chunk. A reader
+that falls more than one ring behind is told how many samples it lost.
+
+A writer that crashed leaves its block behind. A new writer of the same
+name removes it if its sample count does not move for STALE_CHECK_S, and
+refuses to start if it does (another writer is live).
+
+Usage:
+    writer = ShmRingWriter('ecg', sample_rate=360)      # streamer
+    writer.write(chunk)
+    reader = ShmRingReader('ecg')                        # viewer process
+    first, samples = reader.read_new()
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import time
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+SHM_MAGIC = 0x53474345          # 'ECGS'
+SHM_VERSION = 1
+
+# Header slots (int64)
+H_MAGIC, H_VERSION, H_CAPACITY, H_SEQ, H_WRITTEN, H_CLOSED = range(6)
+HEADER_WORDS = 8
+INFO_WORDS = 8
+DATA_OFFSET = (HEADER_WORDS + INFO_WORDS) * 8
+
+# Default ring: ~3 minutes at 360 Hz
+DEFAULT_CAPACITY = 65536
+
+# A leftover block whose sample count stays put this long has no writer
+STALE_CHECK_S = 0.5
+
+
+def _remove_stale(name):
+    """
+    Unlink a ring left behind by a writer that did not close it
+
+    Raises:
+        FileExistsError if a writer is still publishing to it, or it cannot
+        be removed
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return                              # gone in the meantime
+    header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=shm.buf) \
+        if shm.size >= HEADER_WORDS * 8 else None
+    live = False
+    if header is not None and header[H_MAGIC] == SHM_MAGIC and not header[H_CLOSED]:
+        written = int(header[H_WRITTEN])
+        time.sleep(STALE_CHECK_S)
+        live = int(header[H_WRITTEN]) != written
+    del header
+    if live:
+        # Attaching registered the block with our resource tracker; the
+        # live writer owns it
+        try:
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        shm.close()
+        raise FileExistsError(f"Shared memory '{name}' is in use by a running writer, "
+                              f"choose another name")
+    shm.close()
+    try:
+        shm.unlink()
+    except OSError as e:
+        raise FileExistsError(f"Stale shared memory '{name}' cannot be removed ({e}); "
+                              f"delete /dev/shm/{name} by hand") from e
+    print(f"⚠ Removed stale shared memory '{name}' left by an earlier writer")
+
+
+class ShmRingWriter:
+    """Single producer: owns and eventually unlinks the shared block"""
+
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, sample_rate=360):
+        """
+        Create the shared ring
+
+        Args:
+            name: Shared memory name viewers attach to
+            capacity: Ring size in samples
+            sample_rate: Stored for viewers (time axis, rate display)
+
+        Raises:
+            FileExistsError if a live writer already uses this name
+        """
+        self.name = name
+        self.capacity = int(capacity)
+        size = DATA_OFFSET + 4 * self.capacity
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            _remove_stale(name)
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self._header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+        self._info = np.ndarray((INFO_WORDS,), dtype=np.float64,
+                                buffer=self.shm.buf, offset=HEADER_WORDS * 8)
+        self._data = np.ndarray((self.capacity,), dtype=np.float32,
+                                buffer=self.shm.buf, offset=DATA_OFFSET)
+
+        self._header[:] = 0
+        self._info[:] = 0
+        self._info[0] = sample_rate
+        self._header[H_CAPACITY] = self.capacity
+        self._header[H_VERSION] = SHM_VERSION
+        self._header[H_MAGIC] = SHM_MAGIC   # last: marks the block as ready
+        self._written = 0
+
+    def append(self, value):
+        """Publish one sample"""
+        h = self._header
+        h[H_SEQ] += 1                       # odd: write in progress
+        self._data[self._written % self.capacity] = value
+        self._written += 1
+        h[H_WRITTEN] = self._written
+        h[H_SEQ] += 1                       # even: consistent again
+
+    def write(self, values):
+        """Publish a chunk of samples (1-D array-like)"""
+        values = np.asarray(values, dtype=np.float32).ravel()
+        n = len(values)
+        if n == 0:
+            return
+        if n > self.capacity:
+            self._written += n - self.capacity
+            values = values[-self.capacity:]
+            n = self.capacity
+
+        cap = self.capacity
+        pos = self._written % cap
+        first = min(n, cap - pos)
+
+        h = self._header
+        h[H_SEQ] += 1
+        self._data[pos:pos + first] = values[:first]
+        if first < n:
+            self._data[:n - first] = values[first:]
+        self._written += n
+        h[H_WRITTEN] = self._written
+        h[H_SEQ] += 1
+
+    @property
+    def total_written(self):
+        return self._written
+
+    def close(self):
+        """Tell viewers the stream ended, then remove the block"""
+        if self.shm is None:
+            return
+        self._header[H_CLOSED] = 1
+        # Drop our views before closing the mapping
+        del self._header, self._info, self._data
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+
+
+class ShmRingReader:
+    """Read-only consumer; any number may attach to one writer"""
+
+    def __init__(self, name, wait=0.0):
+        """
+        Attach to an existing ring
+
+        Args:
+            name: Shared memory name used by the writer
+            wait: Seconds to keep retrying if the writer has not started yet
+
+        Raises:
+            FileNotFoundError if the ring does not appear within `wait`
+            ValueError if the block is not an ECG ring
+        """
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                self.shm = shared_memory.SharedMemory(name=name)
+                break
+            except FileNotFoundError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.1)
+
+        # Attaching registers the block with this process's resource tracker,
+        # which would unlink it when the viewer exits - the writer owns it
+        try:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+
+        self._header = np.ndarray((HEADER_WORDS,), dtype=np.int64, buffer=self.shm.buf)
+        self._info = np.ndarray((INFO_WORDS,), dtype=np.float64,
+                                buffer=self.shm.buf, offset=HEADER_WORDS * 8)
+        if self._header[H_MAGIC] != SHM_MAGIC:
+            self.shm.close()
+            raise ValueError(f"Shared memory '{name}' is not an ECG ring")
+
+        self.name = name
+        self.capacity = int(self._header[H_CAPACITY])
+        self.sample_rate = float(self._info[0])
+        data = np.ndarray((self.capacity,), dtype=np.float32,
+                          buffer=self.shm.buf, offset=DATA_OFFSET)
+        data.flags.writeable = False
+        self._data = data
+        self._header.flags.writeable = False
+
+        # Start at the live edge; earlier samples are not replayed
+        self.next_sample = int(self._header[H_WRITTEN])
+        self.lost = 0
+
+    @property
+    def closed(self):
+        """True once the writer has finished"""
+        return bool(self._header[H_CLOSED])
+
+    @property
+    def total_written(self):
+        return int(self._header[H_WRITTEN])
+
+    def _copy_range(self, start, stop, out):
+        """Copy samples [start, stop) from the ring into out (wrap-aware)"""
+        cap = self.capacity
+        n = stop - start
+        pos = start % cap
+        first = min(n, cap - pos)
+        out[:first] = self._data[pos:pos + first]
+        if first < n:
+            out[first:n] = self._data[:n - first]
+
+    def _consistent_copy(self, copy_fn, retries=50):
+        """Seqlock read: retry until the copy did not overlap a write"""
+        h = self._header
+        for _ in range(retries):
+            seq = h[H_SEQ]
+            if seq & 1:
+                continue
+            result = copy_fn()
+            if h[H_SEQ] == seq:
+                return result
+        return copy_fn()   # writer is very busy; accept a best-effort copy
+
+    def latest(self, n, out=None):
+        """
+        Copy of the newest n samples, oldest first
+
+        Args:
+            n: Number of samples (clipped to what is available)
+            out: Optional preallocated float32 array of length >= n
+
+        Returns:
+            (first sample number, array of samples)
+        """
+        def copy():
+            written = int(self._header[H_WRITTEN])
+            k = min(n, written, self.capacity)
+            buf = out[:k] if out is not None else np.empty(k, dtype=np.float32)
+            self._copy_range(written - k, written, buf)
+            return written - k, buf
+
+        return self._consistent_copy(copy)
+
+    def read_from(self, start, max_samples=None, out=None):
+        """
+        Copy of the samples from sample number `start` up to the newest
+
+        Args:
+            start: First sample number wanted (clipped to what the ring holds)
+            max_samples: Optional upper bound on the number returned
+            out: Optional preallocated float32 array, long enough for the result
+
+        Returns:
+            (first sample number, array of samples)
+        """
+        def copy():
+            written = int(self._header[H_WRITTEN])
+            first = min(max(start, written - self.capacity), written)
+            stop = written if max_samples is None else min(written, first + max_samples)
+            buf = out[:stop - first] if out is not None else np.empty(stop - first, dtype=np.float32)
+            self._copy_range(first, stop, buf)
+            return first, buf
+
+        return self._consistent_copy(copy)
+
+    def read_new(self, max_samples=None):
+        """
+        Samples written since the previous call (for recorders)
+
+        Args:
+            max_samples: Optional upper bound per call
+
+        Returns:
+            (first sample number, array of samples); samples overwritten
+            before they could be read are added to self.lost
+        """
+        start, buf = self.read_from(self.next_sample, max_samples)
+        if start > self.next_sample:
+            self.lost += start - self.next_sample
+        self.next_sample = start + len(buf)
+        return start, buf
+
+    def close(self):
+        """Detach (never unlinks - the writer owns the block)"""
+        if self.shm is None:
+            return
+        del self._header, self._info, self._data
+        self.shm.close()
+        self.shm = None
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+ECG Shared Memory Viewer - Out-of-process live display and recorder
+
+Attaches read-only to the shared-memory ring published by a streamer running
+with --shm NAME (runner.py, ecg_streamer_live.py) and renders it in its own
+process, so plotting never competes with the UART pacing loop for the GIL.
+Several viewers and recorders can attach to the same ring; closing or
+stalling one has no effect on the streamer.
+
+Usage:
+    python runner.py --port COM3 --file data/normal_ecg.csv --shm ecg
+    python ecg_shm_viewer.py --shm ecg
+    python ecg_shm_viewer.py --shm ecg --record session.csv --no-plot
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import time
+import argparse
+import sys
+import numpy as np
+
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_shm import ShmRingReader
+
+
+class ECGShmViewer:
+    """Blitted live plot (and optional CSV recorder) fed from a shared ring"""
+
+    def __init__(self, reader, window_size=1000, fps=60, record=None):
+        """
+        Args:
+            reader: Attached ShmRingReader
+            window_size: Samples shown in the scrolling window
+            fps: Target frame rate
+            record: CSV path to append every received sample to (None = off)
+        """
+        self.reader = reader
+        self.window_size = min(window_size, reader.capacity)
+        self.sample_rate = reader.sample_rate or 360
+        self.fps = fps
+
+        # Min/max envelope of the window (~2 points per pixel column), fed
+        # incrementally from the ring, and its preallocated time axis
+        self.envelope = None
+        self._xt = None
+        self._chunk = np.empty(self.window_size, dtype=np.float32)
+        self._background = None
+        self._limits = None
+        self._last_status = 0.0
+        self._rate_mark = (time.perf_counter(), reader.total_written)
+        self.rate = 0.0
+
+        self.record_file = None
+        self.recorded = 0
+        if record:
+            self.record_file = open(record, 'w')
+            self.record_file.write("sample,ECG\n")
+            print(f"✓ Recording to {record}")
+
+    # ── recorder ────────────────────────────────────────────────────────────
+
+    def poll_recorder(self):
+        """Append samples written since the last poll to the CSV file"""
+        if self.record_file is None:
+            return
+        first, samples = self.reader.read_new()
+        if len(samples) == 0:
+            return
+        rows = np.column_stack((np.arange(first, first + len(samples)), samples))
+        np.savetxt(self.record_file, rows, fmt=['%d', '%.6f'], delimiter=',')
+        self.recorded += len(samples)
+
+    # ── renderer ────────────────────────────────────────────────────────────
+
+    def setup_plot(self):
+        """Create the figure with animated line and status text"""
+        import matplotlib.pyplot as plt
+        self.plt = plt
+
+        plt.ion()
+        self.fig, self.ax = plt.subplots(figsize=(12, 6))
+        self.line, = self.ax.plot([], [], 'g-', linewidth=1.5, animated=True)
+
+        self.ax.set_xlim(0, self.window_size / self.sample_rate)
+        self.ax.set_ylim(-1.2, 1.2)
+        self.ax.set_xlabel('Time (seconds)', fontsize=12)
+        self.ax.set_ylabel('Amplitude (normalized)', fontsize=12)
+        self.ax.set_title(f"ECG Live View (shared memory '{self.reader.name}')",
+                          fontsize=14, fontweight='bold')
+        self.ax.grid(True, alpha=0.3)
+
+        self.status_text = self.ax.text(
+            0.02, 0.95, '', transform=self.ax.transAxes,
+            verticalalignment='top', fontsize=10,
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
+            animated=True
+        )
+        self._limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+        plt.tight_layout()
+        self._reset_envelope()
+        plt.show(block=False)
+        plt.pause(0.1)
+
+    def _on_draw(self, event):
+        """Cache the static background after every full redraw"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.status_text)
+
+    def _reset_envelope(self):
+        """(Re)create the envelope for the current axes width"""
+        self.envelope = MinMaxEnvelope(self.window_size, pixel_columns(self.ax),
+                                       dtype=np.float32)
+        self._xt = np.empty(self.envelope.max_points, dtype=np.float64)
+        # Start from the newest full window in the ring
+        self.envelope.next_index = max(0, self.reader.total_written - self.window_size)
+
+    def _update_envelope(self):
+        """Pull samples written since the last frame and map onto the time axis"""
+        if pixel_columns(self.ax) != self.envelope.columns:
+            self._reset_envelope()
+
+        # Anything older than one window would scroll straight out
+        start = max(self.envelope.next_index,
+                    self.reader.total_written - self.window_size)
+        first, samples = self.reader.read_from(start, self.window_size, out=self._chunk)
+        if len(samples):
+            self.envelope.extend(samples, first)
+
+        x, y = self.envelope.envelope()
+        origin = max(0, self.envelope.next_index - self.window_size)
+        xt = self._xt[:len(x)]
+        np.subtract(x, origin, out=xt)
+        xt /= self.sample_rate
+        return xt, y
+
+    def _render_frame(self):
+        """Copy the newest window out of the ring and blit it"""
+        canvas = self.fig.canvas
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        if limits != self._limits or self._background is None:
+            self._limits = limits
+            canvas.draw()
+
+        self.line.set_data(*self._update_envelope())
+
+        now = time.perf_counter()
+        if now - self._last_status >= 0.25:
+            self._last_status = now
+            self._update_rate(now)
+            text = (f'Samples: {self.reader.total_written} | '
+                    f'Rate: {self.rate:.1f} Hz')
+            if self.record_file is not None:
+                text += f' | Recorded: {self.recorded} | Lost: {self.reader.lost}'
+            self.status_text.set_text(text)
+
+        canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.status_text)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+    def _update_rate(self, now):
+        """Publish rate over the last status interval"""
+        t0, n0 = self._rate_mark
+        n = self.reader.total_written
+        if now > t0:
+            self.rate = (n - n0) / (now - t0)
+        self._rate_mark = (now, n)
+
+    # ── main loops ──────────────────────────────────────────────────────────
+
+    def run(self, plot=True):
+        """Render (and record) until the window closes or the writer stops"""
+        frame_period = 1.0 / self.fps
+        if plot:
+            self.setup_plot()
+            print("📊 Viewer open - close the window to detach\n")
+        else:
+            print("▶ Recording without display - Ctrl+C to stop\n")
+
+        try:
+            while not self.reader.closed:
+                frame_start = time.perf_counter()
+                self.poll_recorder()
+
+                if plot:
+                    if not self.plt.fignum_exists(self.fig.number):
+                        break
+                    self._render_frame()
+                    remaining = frame_period - (time.perf_counter() - frame_start)
+                    self.fig.canvas.start_event_loop(max(remaining, 0.001))
+                else:
+                    remaining = frame_period - (time.perf_counter() - frame_start)
+                    if remaining > 0:
+                        time.sleep(remaining)
+                    now = time.perf_counter()
+                    if now - self._last_status >= 1.0:
+                        self._last_status = now
+                        self._update_rate(now)
+                        print(f"  Recorded: {self.recorded:7d} | Rate: {self.rate:6.1f} Hz | "
+                              f"Lost: {self.reader.lost}")
+
+            if self.reader.closed:
+                print("\n✓ Streamer finished")
+                self.poll_recorder()
+        except KeyboardInterrupt:
+            pass
+
+    def close(self):
+        """Flush the recording and detach from the ring"""
+        if self.record_file is not None:
+            self.record_file.close()
+            print(f"✓ Recorded {self.recorded} samples ({self.reader.lost} lost)")
+        self.reader.close()
+        print("✓ Detached from shared memory")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Live view / recorder for a streamer running with --shm',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Streamer publishes, viewer renders in its own process
+  python runner.py --port COM3 --file data/normal_ecg.csv --loop --shm ecg
+  python ecg_shm_viewer.py --shm ecg --window 5000
+
+  # Headless recorder alongside the viewer
+  python ecg_shm_viewer.py --shm ecg --record session.csv --no-plot
+        """
+    )
+
+    parser.add_argument('--shm', required=True,
+                        help='Shared memory name given to the streamer')
+    parser.add_argument('--window', '-w', type=int, default=1000,
+                        help='Display window size in samples (default: 1000)')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='Frames per second (default: 60)')
+    parser.add_argument('--record', default=None,
+                        help='Append received samples to this CSV file')
+    parser.add_argument('--no-plot', action='store_true',
+                        help='Record only, no window')
+    parser.add_argument('--wait', type=float, default=10.0,
+                        help='Seconds to wait for the streamer to start (default: 10)')
+
+    args = parser.parse_args()
+
+    if args.no_plot and not args.record:
+        print("✗ --no-plot needs --record")
+        sys.exit(1)
+
+    try:
+        reader = ShmRingReader(args.shm, wait=args.wait)
+    except FileNotFoundError:
+        print(f"✗ No shared memory ring named '{args.shm}' - is the streamer running with --shm?")
+        sys.exit(1)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    print(f"✓ Attached to '{args.shm}' ({reader.capacity} samples @ {reader.sample_rate:.0f} Hz)")
+
+    viewer = ECGShmViewer(reader, args.window, args.fps, args.record)
+    try:
+        viewer.run(plot=not args.no_plot)
+    finally:
+        viewer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -18,10 +18,8 @@ Version: 1.3
 
 import serial
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from collections import deque
 import threading
 import queue
 import time
@@ -31,10 +29,17 @@ from pathlib import Path
 
 # Optional MIT-BIH reader
 try:
-    from ecg_dat_reader import MITBIHReader
+    from ecg_dat_reader import MITBIHReader, open_record
 except ImportError:
     MITBIHReader = None
 
+from ecg_csv import load_csv
+from ecg_synth import is_synth_path
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_ring_buffer import RingBuffer
+from ecg_transport import open_transport
+
 
 # ---------------------------------------------------------------------------
 # Shared state between streamer thread and visualizer (main thread)
@@ -52,7 +57,7 @@ class ECGStreamer:
 
     def __init__(self, port, baud=115200):
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            self.ser = open_transport(port, baud, timeout=1)
             print(f"✓ Connected to {port} at {baud} baud")
         except serial.SerialException as e:
             print(f"✗ Error opening serial port: {e}")
@@ -62,13 +67,7 @@ class ECGStreamer:
 
     def load_ecg_csv(self, filename):
         try:
-            df = pd.read_csv(filename)
-            ecg_col = None
-            for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-                if col in df.columns:
-                    ecg_col = col
-                    break
-            data = df.iloc[:, 0].values if ecg_col is None else df[ecg_col].values
+            data = load_csv(filename)
             print(f"✓ Loaded {len(data)} samples from {filename}")
             return data
         except Exception as e:
@@ -79,7 +78,7 @@ class ECGStreamer:
         if MITBIHReader is None:
             print("✗ MIT-BIH reader not available (ecg_dat_reader.py missing)")
             sys.exit(1)
-        reader = MITBIHReader(record_path)
+        reader = open_record(record_path)
         signal = reader.read_signal(signal_num)
         if max_samples and len(signal) > max_samples:
             signal = signal[:max_samples]
@@ -121,7 +120,9 @@ class ECGStreamer:
 
     # ── main stream loop ─────────────────────────────────────────────────────
 
-    def stream_ecg(self, ecg_12bit, ecg_display, sample_rate=360, loop=False):
+    def stream_ecg(self, ecg_12bit, ecg_display, sample_rate=360, loop=False,
+                   cpu=None, rt_priority=None, rt_policy='fifo'):
+        apply_realtime(cpu, rt_priority, rt_policy)   # per-thread on Linux
         period = 1.0 / sample_rate
         count  = 0
         start  = time.perf_counter()
@@ -177,8 +178,7 @@ class ECGVisualizer:
         self.sample_count = 0
         self.start_time   = None
 
-        self.plot_buffer = deque(maxlen=window_size)
-        self.x_buffer    = deque(maxlen=window_size)
+        self.plot_buffer = RingBuffer(window_size)
 
         plt.style.use('seaborn-v0_8-darkgrid')
         self.fig, self.ax = plt.subplots(figsize=(14, 7))
@@ -201,8 +201,15 @@ class ECGVisualizer:
             family='monospace', fontweight='bold'
         )
         plt.tight_layout()
+
+        # Draw a min/max envelope at ~2 points per pixel column
+        self.envelope = MinMaxEnvelope(window_size, pixel_columns(self.ax))
+        self.fig.canvas.mpl_connect('resize_event', self._on_resize)
         self.fig.canvas.mpl_connect('close_event', self._on_close)
 
+    def _on_resize(self, event):
+        self.envelope.rebuild(self.plot_buffer, pixel_columns(self.ax))
+
     def _on_close(self, event):
         print("\n  Plot window closed — stopping streamer…")
         stop_event.set()
@@ -213,15 +220,15 @@ class ECGVisualizer:
             try:
                 sample = sample_queue.get_nowait()
                 self.plot_buffer.append(sample)
-                self.x_buffer.append(self.sample_count)
                 self.sample_count += 1
                 drained += 1
             except queue.Empty:
                 break
 
         if len(self.plot_buffer) > 0:
-            self.line.set_data(list(self.x_buffer), list(self.plot_buffer))
-            x_max = self.x_buffer[-1]
+            self.envelope.sync(self.plot_buffer)
+            self.line.set_data(*self.envelope.envelope())
+            x_max = self.envelope.last_index
             self.ax.set_xlim(max(0, x_max - self.window_size), x_max)
 
             if self.start_time:
@@ -268,10 +275,12 @@ Examples:
     parser.add_argument('--loop',        '-l', action='store_true')
     parser.add_argument('--window',      '-w', type=int, default=1000)
     parser.add_argument('--max-samples', '-m', type=int, default=None)
+    add_realtime_args(parser)
     args = parser.parse_args()
 
     file_path = Path(args.file)
-    is_dat    = file_path.suffix in ['.dat', '.hea'] or not file_path.suffix
+    is_synth  = is_synth_path(args.file)           # ecg_synth.py pseudo-record
+    is_dat    = is_synth or file_path.suffix in ['.dat', '.hea'] or not file_path.suffix
 
     if not is_dat and not file_path.exists():
         print(f"✗ File not found: {args.file}")
@@ -281,7 +290,7 @@ Examples:
     streamer = ECGStreamer(args.port, args.baud)
 
     if is_dat:
-        ecg_raw = streamer.load_dat(str(file_path.with_suffix('')),
+        ecg_raw = streamer.load_dat(args.file if is_synth else str(file_path.with_suffix('')),
                                     args.signal, args.max_samples)
     else:
         ecg_raw = streamer.load_ecg_csv(args.file)
@@ -307,7 +316,8 @@ Examples:
     # ── Streamer thread ─────────────────────────────────────────────────────
     stream_thread = threading.Thread(
         target=streamer.stream_ecg,
-        args=(ecg_12bit, ecg_display, args.rate, args.loop),
+        args=(ecg_12bit, ecg_display, args.rate, args.loop,
+              args.cpu, args.rt_priority, args.rt_policy),
         daemon=True, name='ECGStreamer'
     )
     stream_thread.start()
@@ -15,25 +15,30 @@ Version: 1.0
 
 import serial
 import numpy as np
-import pandas as pd
 import time
 import argparse
 import sys
 from pathlib import Path
 
+from ecg_csv import load_csv
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_transport import ResilientSerial, open_transport
+
 class ECGStreamer:
     """Stream ECG data to FPGA via UART"""
     
-    def __init__(self, port, baud=115200):
+    def __init__(self, port, baud=115200, reconnect=False):
         """
         Initialize UART connection
         
         Args:
             port: COM port (e.g., 'COM3' on Windows, '/dev/ttyUSB0' on Linux)
+                  or transport URL (socket://, rfc2217://, relay://)
             baud: Baud rate (default 115200)
+            reconnect: Re-open the port and resume after write failures
         """
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            self.ser = open_transport(port, baud, timeout=1, reconnect=reconnect)
             print(f"✓ Connected to {port} at {baud} baud")
         except serial.SerialException as e:
             print(f"✗ Error opening serial port: {e}")
@@ -50,21 +55,8 @@ class ECGStreamer:
             numpy array of ECG samples
         """
         try:
-            # Try to load with pandas
-            df = pd.read_csv(filename)
-            
-            # Look for common ECG column names
-            ecg_col = None
-            for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-                if col in df.columns:
-                    ecg_col = col
-                    break
-            
-            if ecg_col is None:
-                # Assume first column is ECG data
-                ecg_data = df.iloc[:, 0].values
-            else:
-                ecg_data = df[ecg_col].values
+            # ECG column (ECG, ecg, signal, value, 0 or else the first)
+            ecg_data = load_csv(filename)
             
             print(f"✓ Loaded {len(ecg_data)} samples from {filename}")
             return ecg_data
@@ -165,6 +157,13 @@ class ECGStreamer:
             elapsed = time.perf_counter() - start_time
             print(f"  Total time: {elapsed:.1f}s")
             print(f"  Average rate: {sample_count/elapsed:.1f} Hz")
+        
+        finally:
+            if isinstance(self.ser, ResilientSerial):
+                print(f"  Link: {self.ser.gap_summary()}")
+                for gap in self.ser.telemetry:
+                    print(f"    gap @ sample {gap['sample_offset']}: "
+                          f"{gap['duration']:.2f}s, {gap['attempts']} attempt(s)")
     
     def close(self):
         """Close serial port"""
@@ -182,12 +181,16 @@ def main():
 Examples:
   python ecg_streamer.py --port COM3 --file data/normal_ecg.csv
   python ecg_streamer.py --port /dev/ttyUSB0 --file data/pvc_ecg.csv --loop
+  python ecg_streamer.py --port /dev/ttyUSB0 --file data/normal_ecg.csv --loop --reconnect
+  python ecg_streamer.py --port relay://labpc:5000 --file data/normal_ecg.csv --loop
   python ecg_streamer.py --port COM3 --file data/afib_ecg.csv --rate 500
+  python ecg_streamer.py --port /dev/ttyUSB0 --file data/normal_ecg.csv --cpu 2 --rt-priority 50
         """
     )
     
     parser.add_argument('--port', '-p', required=True,
-                        help='Serial port (e.g., COM3, /dev/ttyUSB0)')
+                        help='Serial port or URL (e.g., COM3, /dev/ttyUSB0, '
+                             'socket://host:port, rfc2217://host:port, relay://host:port)')
     parser.add_argument('--file', '-f', required=True,
                         help='ECG data file (CSV format)')
     parser.add_argument('--rate', '-r', type=int, default=360,
@@ -196,6 +199,9 @@ Examples:
                         help='UART baud rate (default: 115200)')
     parser.add_argument('--loop', '-l', action='store_true',
                         help='Loop playback indefinitely')
+    parser.add_argument('--reconnect', action='store_true',
+                        help='Re-open the port and resume if the adapter resets')
+    add_realtime_args(parser)
     
     args = parser.parse_args()
     
@@ -205,7 +211,7 @@ Examples:
         sys.exit(1)
     
     # Create streamer
-    streamer = ECGStreamer(args.port, args.baud)
+    streamer = ECGStreamer(args.port, args.baud, args.reconnect)
     
     try:
         # Load ECG data
@@ -214,6 +220,9 @@ Examples:
         # Convert to 12-bit
         ecg_data_12bit = streamer.convert_to_12bit(ecg_data_raw)
         
+        # Pin / prioritise the (single) transmit thread
+        apply_realtime(args.cpu, args.rt_priority, args.rt_policy)
+        
         # Stream to FPGA
         streamer.stream_ecg(ecg_data_12bit, args.rate, args.loop)
         
@@ -3,7 +3,8 @@
 ECG Live Streamer - Stream ECG data to FPGA with real-time visualization
 
 Shows live scrolling ECG waveform on PC as data streams to FPGA.
-Supports both MIT-BIH .dat files and CSV files.
+Supports both MIT-BIH .dat files and CSV files. Records with a .atr file
+(and synth: records) get their beat labels drawn over the trace.
 
 Usage:
     python ecg_streamer_live.py --port COM3 --file "ECG signals/15814" --signal 0
@@ -16,10 +17,7 @@ Version: 1.0
 
 import serial
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from collections import deque
 import time
 import argparse
 import sys
@@ -27,7 +25,16 @@ import threading
 from pathlib import Path
 
 # Import our MIT-BIH reader
-from ecg_dat_reader import MITBIHReader
+from ecg_annotations import AnnotationIndex, AnnotationOverlay
+from ecg_dat_reader import open_record
+from ecg_csv import load_csv
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_ring_buffer import RingBuffer
+from ecg_shm import ShmRingWriter
+from ecg_synth import is_synth_path
+from ecg_transport import open_transport
+from qrs_detector import BEAT_FLAG, BeatMarkers
 
 
 class ECGLiveStreamer:
@@ -44,16 +51,24 @@ class ECGLiveStreamer:
         """
         # Serial connection
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            self.ser = open_transport(port, baud, timeout=1)
             print(f"✓ Connected to {port} at {baud} baud")
         except serial.SerialException as e:
             print(f"✗ Error opening serial port: {e}")
             sys.exit(1)
         
-        # Data buffers
+        # Data buffers: ring written by the stream thread, reduced by the
+        # renderer to a min/max envelope (~2 points per pixel column)
         self.window_size = window_size
-        self.plot_data = deque(maxlen=window_size)
-        self.time_data = deque(maxlen=window_size)
+        self.plot_data = RingBuffer(window_size, dtype=np.float32)
+        self.envelope = None
+        self._xt = None     # preallocated time axis for the envelope points
+        
+        # Renderer state
+        self.frame_rate = 60
+        self._background = None
+        self._status_interval = 0.25
+        self._last_status = 0.0
         
         # Streaming state
         self.streaming = False
@@ -65,9 +80,24 @@ class ECGLiveStreamer:
         self.ecg_data = None
         self.sample_rate = 360
         
+        # Real-time options for the transmit thread (see ecg_realtime.py)
+        self.rt_cpu = None
+        self.rt_priority = None
+        self.rt_policy = 'fifo'
+        
+        # Shared memory ring for out-of-process viewers (split mode)
+        self.shm = None
+        
+        # Beat-window flags (qrs_detector.BeatMarkers), None = off
+        self.markers = None
+        
+        # Beat labels (ecg_annotations.AnnotationIndex), None = off
+        self.annotations = None
+        self.overlay = None
+        
     def load_ecg_dat(self, record_path, signal_num=0):
         """Load MIT-BIH .dat file"""
-        reader = MITBIHReader(record_path)
+        reader = open_record(record_path)
         signal = reader.read_signal(signal_num)
         info = reader.get_info()
         
@@ -79,19 +109,8 @@ class ECGLiveStreamer:
     def load_ecg_csv(self, filename):
         """Load CSV file"""
         try:
-            df = pd.read_csv(filename)
-            
-            # Look for ECG column
-            ecg_col = None
-            for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-                if col in df.columns:
-                    ecg_col = col
-                    break
-            
-            if ecg_col is None:
-                ecg_data = df.iloc[:, 0].values
-            else:
-                ecg_data = df[ecg_col].values
+            # ECG column (ECG, ecg, signal, value, 0 or else the first)
+            ecg_data = load_csv(filename)
             
             print(f"✓ Loaded CSV: {len(ecg_data)} samples")
             return ecg_data
@@ -113,8 +132,8 @@ class ECGLiveStreamer:
         print(f"✓ Converted to 12-bit: range {ecg_12bit.min()} to {ecg_12bit.max()}")
         return ecg_12bit
     
-    def send_sample(self, sample):
-        """Send one 12-bit sample as 2 bytes"""
+    def send_sample(self, sample, marker=False):
+        """Send one 12-bit sample as 2 bytes (marker sets the beat flag bit)"""
         # Convert to unsigned 12-bit
         if sample < 0:
             sample_unsigned = (1 << 12) + sample
@@ -126,12 +145,17 @@ class ECGLiveStreamer:
         # Split into 2 bytes
         byte1 = sample_unsigned & 0xFF
         byte2 = (sample_unsigned >> 8) & 0x0F
+        if marker:
+            byte2 |= BEAT_FLAG
         
         # Send via UART
         self.ser.write(bytes([byte1, byte2]))
     
     def stream_worker(self, loop=False):
         """Worker thread for streaming data"""
+        # Affinity/priority are per-thread, so apply them here
+        apply_realtime(self.rt_cpu, self.rt_priority, self.rt_policy)
+        
         sample_period = 1.0 / self.sample_rate
         self.sample_count = 0
         self.start_time = time.perf_counter()
@@ -148,12 +172,13 @@ class ECGLiveStreamer:
                         break
                     
                     # Send sample
-                    self.send_sample(sample)
+                    self.send_sample(sample, self.markers is not None and self.markers(i))
                     
-                    # Update plot data
-                    self.plot_data.append(sample / 2047.0)  # Normalize for display
-                    current_time = time.perf_counter() - self.start_time
-                    self.time_data.append(current_time)
+                    # Update plot data (normalized for display)
+                    if self.shm is not None:
+                        self.shm.append(sample / 2047.0)
+                    else:
+                        self.plot_data.append(sample / 2047.0)
                     
                     self.sample_count += 1
                     
@@ -182,13 +207,16 @@ class ECGLiveStreamer:
             print(f"  Total time: {elapsed:.1f}s")
             if elapsed > 0:
                 print(f"  Average rate: {self.sample_count/elapsed:.1f} Hz")
+        if self.markers is not None:
+            print(f"  Beat markers: {self.markers.count}")
     
     def start_streaming(self, ecg_data, loop=False):
         """Start streaming in background thread"""
         self.ecg_data = ecg_data
         self.streaming = True
         self.plot_data.clear()
-        self.time_data.clear()
+        if self.envelope is not None:
+            self.envelope.reset()
         
         self.stream_thread = threading.Thread(
             target=self.stream_worker,
@@ -207,7 +235,9 @@ class ECGLiveStreamer:
         """Set up matplotlib live plot"""
         plt.ion()  # Enable interactive mode
         self.fig, self.ax = plt.subplots(figsize=(12, 6))
-        self.line, = self.ax.plot([], [], 'g-', linewidth=1.5)
+        
+        # Once the window fills, the newest sample is at the right edge
+        self.line, = self.ax.plot([], [], 'g-', linewidth=1.5, animated=True)
         
         self.ax.set_xlim(0, self.window_size / self.sample_rate)
         self.ax.set_ylim(-1.2, 1.2)
@@ -220,12 +250,90 @@ class ECGLiveStreamer:
         self.status_text = self.ax.text(
             0.02, 0.95, '', transform=self.ax.transAxes,
             verticalalignment='top', fontsize=10,
-            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5)
+            bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
+            animated=True
         )
+        self._limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        if self.annotations is not None:
+            self.overlay = AnnotationOverlay(self.ax, self.annotations, animated=True)
+        
+        # Re-cache the static background on every full redraw (first show,
+        # resize, limit change)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
         
         plt.tight_layout()
+        self.envelope = MinMaxEnvelope(self.window_size, pixel_columns(self.ax),
+                                       dtype=np.float32)
+        self._xt = np.empty(self.envelope.max_points, dtype=np.float64)
+        
         plt.show(block=False)  # Non-blocking show
         plt.pause(0.1)  # Give time to render
+    
+    def _on_draw(self, event):
+        """Cache axes, grid and labels so frames only redraw the animated artists"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        for artist in self._artists():
+            self.ax.draw_artist(artist)
+    
+    def _artists(self):
+        """Artists redrawn (blitted) each frame"""
+        if self.overlay is None:
+            return (self.line, self.status_text)
+        return (self.line, *self.overlay.artists, self.status_text)
+    
+    def _update_window(self):
+        """Fold new samples into the envelope and map it onto the time axis"""
+        columns = pixel_columns(self.ax)
+        if columns != self.envelope.columns:
+            # Window resized: re-bucket for the new width
+            self.envelope.rebuild(self.plot_data, columns)
+            self._xt = np.empty(self.envelope.max_points, dtype=np.float64)
+        
+        self.envelope.sync(self.plot_data)
+        x, y = self.envelope.envelope()
+        
+        # Sample numbers → seconds; the trace grows from the left edge
+        # until the window fills, then scrolls
+        origin = max(0, self.envelope.next_index - self.window_size)
+        xt = self._xt[:len(x)]
+        np.subtract(x, origin, out=xt)
+        xt /= self.sample_rate
+        if self.overlay is not None:
+            # Stream sample n is record sample n mod its length (looping)
+            self.overlay.update(origin, self.envelope.next_index, origin=origin,
+                                scale=1.0 / self.sample_rate, period=len(self.ecg_data))
+        return xt, y
+    
+    def _render_frame(self):
+        """Blit one frame: restore background, draw line and status, blit"""
+        canvas = self.fig.canvas
+        
+        # Full redraw only when the axes limits changed (e.g. zoom/pan)
+        limits = (self.ax.get_xlim(), self.ax.get_ylim())
+        if limits != self._limits or self._background is None:
+            self._limits = limits
+            canvas.draw()  # fires _on_draw → fresh background
+        
+        self.line.set_data(*self._update_window())
+        
+        # Status text changes a few times per second, not every frame
+        now = time.perf_counter()
+        if self.sample_count > 0 and self.start_time and \
+                now - self._last_status >= self._status_interval:
+            self._last_status = now
+            elapsed = now - self.start_time
+            rate = self.sample_count / elapsed if elapsed > 0 else 0
+            self.status_text.set_text(
+                f'Samples: {self.sample_count} | '
+                f'Time: {elapsed:.1f}s | '
+                f'Rate: {rate:.1f} Hz'
+            )
+        
+        canvas.restore_region(self._background)
+        for artist in self._artists():
+            self.ax.draw_artist(artist)
+        canvas.blit(self.fig.bbox)
+        canvas.flush_events()
         
     def run_live_stream(self, ecg_data, loop=False):
         """Run live streaming with visualization"""
@@ -238,41 +346,18 @@ class ECGLiveStreamer:
         # Set up plot
         self.setup_plot()
         
-        # Manual update loop (simpler than FuncAnimation)
+        # Blitted render loop at a fixed frame rate
         print("📊 Plot window open - streaming data...\n")
+        frame_period = 1.0 / self.frame_rate
         try:
             while self.streaming and plt.fignum_exists(self.fig.number):
-                # Update plot
-                if len(self.plot_data) > 0:
-                    y_data = list(self.plot_data)
-                    t_data = list(self.time_data)
-                    
-                    if len(t_data) > 0:
-                        t_min = t_data[0]
-                        t_relative = [t - t_min for t in t_data]
-                        
-                        self.line.set_data(t_relative, y_data)
-                        
-                        # Update x-axis to follow data
-                        if len(t_relative) > 0:
-                            self.ax.set_xlim(0, max(t_relative[-1], self.window_size / self.sample_rate))
-                        
-                        # Update status text
-                        if self.sample_count > 0 and self.start_time:
-                            elapsed = time.perf_counter() - self.start_time
-                            rate = self.sample_count / elapsed if elapsed > 0 else 0
-                            self.status_text.set_text(
-                                f'Samples: {self.sample_count} | '
-                                f'Time: {elapsed:.1f}s | '
-                                f'Rate: {rate:.1f} Hz'
-                            )
+                frame_start = time.perf_counter()
+                self._render_frame()
                 
-                # Redraw
-                self.fig.canvas.draw()
-                self.fig.canvas.flush_events()
-                
-                # Update every 100ms
-                plt.pause(0.1)
+                # Service GUI events for the rest of the frame; unlike
+                # plt.pause() this does not force a full redraw
+                remaining = frame_period - (time.perf_counter() - frame_start)
+                self.fig.canvas.start_event_loop(max(remaining, 0.001))
                 
         except KeyboardInterrupt:
             pass
@@ -280,6 +365,21 @@ class ECGLiveStreamer:
         # Stop streaming when window closes
         self.stop_streaming()
     
+    def run_headless(self, ecg_data, shm_name, loop=False):
+        """Stream on this thread and publish to shared memory - no GUI work"""
+        self.shm = ShmRingWriter(shm_name, sample_rate=self.sample_rate)
+        print(f"✓ Publishing to shared memory '{shm_name}' "
+              f"(view with: python ecg_shm_viewer.py --shm {shm_name})")
+        
+        self.ecg_data = ecg_data
+        self.streaming = True
+        try:
+            self.stream_worker(loop)
+        finally:
+            self.streaming = False
+            self.shm.close()
+            self.shm = None
+    
     def close(self):
         """Clean up"""
         self.stop_streaming()
@@ -302,32 +402,64 @@ Examples:
   
   # Loop playback
   python ecg_streamer_live.py --port COM3 --file "ECG signals/15814" --loop
+  
+  # Pin the transmit thread to core 2 with real-time priority
+  python ecg_streamer_live.py --port /dev/ttyUSB0 --file data/normal_ecg.csv --cpu 2 --rt-priority 50
+  
+  # Flag the last sample of each beat-centred window (qrs_detector.py)
+  python ecg_streamer_live.py --port COM3 --file "ECG signals/15814" --beat-markers
+  
+  # Live plot without the .atr beat labels
+  python ecg_streamer_live.py --port COM3 --file "ECG signals/PVC/208" --no-annotations
+  
+  # Plot in a separate process (python ecg_shm_viewer.py --shm ecg)
+  python ecg_streamer_live.py --port COM3 --file data/normal_ecg.csv --loop --shm ecg
         """
     )
     
     parser.add_argument('--port', '-p', required=True,
-                        help='Serial port (e.g., COM3)')
+                        help='Serial port or URL (e.g., COM3, socket://host:port, relay://host:port)')
     parser.add_argument('--file', '-f', required=True,
-                        help='ECG file (.dat record or .csv)')
+                        help='ECG file (.dat record, .csv or "synth:...", see ecg_synth.py)')
     parser.add_argument('--signal', '-s', type=int, default=0,
                         help='Signal number for .dat files (default: 0)')
     parser.add_argument('--baud', '-b', type=int, default=115200,
                         help='Baud rate (default: 115200)')
     parser.add_argument('--window', '-w', type=int, default=1000,
                         help='Display window size in samples (default: 1000)')
+    parser.add_argument('--fps', type=int, default=60,
+                        help='Plot refresh rate in frames per second (default: 60)')
     parser.add_argument('--loop', '-l', action='store_true',
                         help='Loop playback')
+    parser.add_argument('--shm', metavar='NAME', default=None,
+                        help='No local plot: publish to shared memory NAME for '
+                             'ecg_shm_viewer.py')
+    parser.add_argument('--beat-markers', action='store_true',
+                        help='Set bit 4 of the second byte on the sample that completes '
+                             'a beat-centred window')
+    parser.add_argument('--no-annotations', action='store_true',
+                        help='Do not draw the beat labels of the record (.atr)')
+    add_realtime_args(parser)
     
     args = parser.parse_args()
     
     # Create streamer
     streamer = ECGLiveStreamer(args.port, args.baud, args.window)
+    streamer.rt_cpu = args.cpu
+    streamer.rt_priority = args.rt_priority
+    streamer.rt_policy = args.rt_policy
+    streamer.frame_rate = args.fps
     
     try:
         # Determine file type and load
         file_path = Path(args.file)
         
-        if file_path.suffix in ['.dat', '.hea'] or not file_path.suffix:
+        record_path = None
+        if is_synth_path(args.file):
+            # Synthetic record (ecg_synth.py)
+            record_path = args.file
+            ecg_data_raw = streamer.load_ecg_dat(args.file, args.signal)
+        elif file_path.suffix in ['.dat', '.hea'] or not file_path.suffix:
             # MIT-BIH format (record without extension)
             record_path = str(file_path.with_suffix(''))
             ecg_data_raw = streamer.load_ecg_dat(record_path, args.signal)
@@ -337,15 +469,27 @@ Examples:
         
         # Convert to 12-bit
         ecg_data_12bit = streamer.convert_to_12bit(ecg_data_raw)
+        if args.beat_markers:
+            # Detection runs on the unclipped signal, ahead of the sender
+            streamer.markers = BeatMarkers(ecg_data_raw, streamer.sample_rate)
+        if record_path is not None and not args.shm and not args.no_annotations:
+            streamer.annotations = AnnotationIndex.for_record(record_path)
         
-        # Run live stream with visualization
-        print("\n📊 Starting live visualization...")
-        print("   Close the plot window to stop streaming\n")
-        
-        streamer.run_live_stream(ecg_data_12bit, args.loop)
+        if args.shm:
+            # Split mode: viewers run in their own processes
+            streamer.run_headless(ecg_data_12bit, args.shm, args.loop)
+        else:
+            # Run live stream with visualization
+            print("\n📊 Starting live visualization...")
+            print("   Close the plot window to stop streaming\n")
+            
+            streamer.run_live_stream(ecg_data_12bit, args.loop)
         
     except KeyboardInterrupt:
         print("\n\n✓ Interrupted by user")
+    except FileExistsError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
     except Exception as e:
         print(f"\n✗ Error: {e}")
         import traceback
@@ -13,9 +13,7 @@ Version: 1.0 (Simplified)
 
 import serial
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
-from collections import deque
 import time
 import argparse
 import sys
@@ -23,10 +21,17 @@ from pathlib import Path
 
 # Import our MIT-BIH reader
 try:
-    from ecg_dat_reader import MITBIHReader
+    from ecg_dat_reader import MITBIHReader, open_record
 except ImportError:
     MITBIHReader = None
 
+from ecg_csv import load_csv
+from ecg_synth import is_synth_path
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_ring_buffer import RingBuffer
+from ecg_transport import open_transport
+
 
 class ECGSimpleStreamer:
     """Simple ECG streamer with live plot - no threading"""
@@ -35,7 +40,7 @@ class ECGSimpleStreamer:
         """Initialize streamer"""
         # Serial connection
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            self.ser = open_transport(port, baud, timeout=1)
             print(f"✓ Connected to {port} at {baud} baud")
         except serial.SerialException as e:
             print(f"✗ Error opening serial port: {e}")
@@ -75,19 +80,8 @@ class ECGSimpleStreamer:
     
     def load_ecg_csv(self, filename, max_samples=None):
         """Load CSV file"""
-        df = pd.read_csv(filename)
-        
-        # Look for ECG column
-        ecg_col = None
-        for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-            if col in df.columns:
-                ecg_col = col
-                break
-        
-        if ecg_col is None:
-            ecg_data = df.iloc[:, 0].values
-        else:
-            ecg_data = df[ecg_col].values
+        # ECG column (ECG, ecg, signal, value, 0 or else the first)
+        ecg_data = load_csv(filename)
         
         # Limit samples if requested
         if max_samples and len(ecg_data) > max_samples:
@@ -104,7 +98,7 @@ class ECGSimpleStreamer:
             print("✗ MITBIHReader not available")
             sys.exit(1)
         
-        reader = MITBIHReader(record_path)
+        reader = open_record(record_path)
         signal = reader.read_signal(signal_num)
         info = reader.get_info()
         
@@ -151,8 +145,10 @@ class ECGSimpleStreamer:
         start_time = time.perf_counter()
         
         # Data buffers for display
-        plot_buffer = deque(maxlen=self.window_size)
-        x_buffer = deque(maxlen=self.window_size)
+        plot_buffer = RingBuffer(self.window_size)
+        
+        # Drawn as a min/max envelope at ~2 points per pixel column
+        envelope = MinMaxEnvelope(self.window_size, pixel_columns(self.ax))
         
         print(f"\n▶ Starting streaming at {self.sample_rate} Hz")
         print(f"  Total samples: {len(ecg_data)}")
@@ -177,16 +173,18 @@ class ECGSimpleStreamer:
                     
                     # Add to plot buffer
                     plot_buffer.append(sample / 2047.0)  # Normalize
-                    x_buffer.append(sample_count)
                     
                     # Update plot every 10 samples (36 Hz update rate)
                     if sample_count % 10 == 0:
                         # Update line data
-                        self.line.set_data(list(x_buffer), list(plot_buffer))
+                        if pixel_columns(self.ax) != envelope.columns:
+                            envelope.rebuild(plot_buffer, pixel_columns(self.ax))
+                        envelope.sync(plot_buffer)
+                        self.line.set_data(*envelope.envelope())
                         
                         # Update x-axis to follow data
-                        if len(x_buffer) > 0:
-                            x_max = x_buffer[-1]
+                        if len(plot_buffer) > 0:
+                            x_max = envelope.last_index
                             x_min = max(0, x_max - self.window_size)
                             self.ax.set_xlim(x_min, x_max)
                         
@@ -262,7 +260,7 @@ Examples:
     )
     
     parser.add_argument('--port', '-p', required=True,
-                        help='Serial port (e.g., COM4)')
+                        help='Serial port or URL (e.g., COM4, socket://host:port, relay://host:port)')
     parser.add_argument('--file', '-f', required=True,
                         help='ECG file (.dat or .csv)')
     parser.add_argument('--signal', '-s', type=int, default=0,
@@ -275,6 +273,7 @@ Examples:
                         help='Limit number of samples to stream (useful for large files)')
     parser.add_argument('--loop', '-l', action='store_true',
                         help='Loop playback')
+    add_realtime_args(parser)
     
     args = parser.parse_args()
     
@@ -285,7 +284,9 @@ Examples:
         # Load data
         file_path = Path(args.file)
         
-        if file_path.suffix in ['.dat', '.hea'] or not file_path.suffix:
+        if is_synth_path(args.file):
+            ecg_data_raw = streamer.load_ecg_dat(args.file, args.signal, args.max_samples)
+        elif file_path.suffix in ['.dat', '.hea'] or not file_path.suffix:
             record_path = str(file_path.with_suffix(''))
             ecg_data_raw = streamer.load_ecg_dat(record_path, args.signal, args.max_samples)
         else:
@@ -303,6 +304,9 @@ Examples:
         print(f"  Rate: {streamer.sample_rate} Hz")
         print("="*50 + "\n")
         
+        # No threading here: RT options apply to the whole streaming loop
+        apply_realtime(args.cpu, args.rt_priority, args.rt_policy)
+        
         # Stream and plot
         streamer.stream_and_plot(ecg_data_12bit, args.loop)
         
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+ECG Synth - Synthetic multi-lead ECG for load and soak testing
+
+A sum-of-Gaussians beat model (P, Q, R, S and T waves, after McSharry's
+ECGSYN) evaluated directly in time with NumPy, so hours of signal at any
+sample rate take seconds to make and nothing has to be stored on disk.
+The waves of a normal beat and a PVC are sampled once per lead; every
+chunk is then one scatter-add of those templates at the beats' R peaks
+(rounded to the sample grid) plus vectorized wander and noise.
+
+    heart rate      hr bpm, RR intervals modulated by hrv (LF 0.1 Hz and
+                    respiratory 0.25 Hz waves plus a random part)
+    PVCs            each beat is a PVC with probability pvc: premature
+                    (60% of RR), wide QRS, no P wave, inverted T, then a
+                    compensatory pause
+    noise           white noise of `noise` mV RMS
+    baseline        respiratory wander of `wander` mV amplitude
+    leads           each lead weights the waves differently
+
+Anywhere a record path is accepted (ecg_dat_reader.open_record: the
+streamers, visualizers, qrs_detector.py, ecg_batch_classify.py,
+ecg_benchmark.py, ecg_dataset_builder.py, the LOD pyramid and
+zolotyhnet_model.record_windows), a "synth:" pseudo-path selects this
+source instead, with options as comma-separated key=value pairs:
+
+    synth:hr=90,hrv=0.08,pvc=0.1,noise=0.02,leads=3,fs=1000,duration=3600
+
+SynthReader mimics MITBIHReader (read_signal, read_raw, read_annotations,
+get_info); the beats it placed are its annotations ('N' and 'V'). SynthECG
+produces the same signal in chunks of any size for unbounded streams.
+
+Usage:
+    python ecg_synth.py "synth:hr=75,pvc=0.05" --seconds 3600
+    python runner.py --port COM4 --file "synth:pvc=0.1,duration=7200" --loop
+    python qrs_detector.py "synth:hr=120,noise=0.05"
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+SYNTH_PREFIX = 'synth:'
+
+# Options of a synth: path and their defaults
+DEFAULTS = {
+    'hr': 72.0,          # mean heart rate, bpm
+    'hrv': 0.05,         # RR modulation, fraction of the mean RR
+    'pvc': 0.0,          # probability that a beat is a PVC
+    'noise': 0.01,       # white noise, mV RMS
+    'wander': 0.05,      # baseline wander amplitude, mV
+    'leads': 2,          # number of leads
+    'fs': 360,           # sample rate, Hz
+    'duration': 600.0,   # record length for SynthReader, s
+    'seed': 0,           # random seed
+}
+_INTEGER_OPTIONS = ('leads', 'fs', 'seed')
+
+# Wave parameters per beat type: (offset from R in s, width sigma in s, amplitude mV)
+# for P, Q, R, S, T. Offsets of P and T scale with sqrt(mean RR) (Bazett).
+NORMAL_WAVES = np.array([
+    (-0.200, 0.025, 0.15),
+    (-0.035, 0.010, -0.12),
+    (0.000, 0.010, 1.20),
+    (0.035, 0.010, -0.25),
+    (0.280, 0.060, 0.30),
+])
+PVC_WAVES = np.array([
+    (-0.200, 0.025, 0.00),          # no P wave
+    (-0.050, 0.020, -0.10),
+    (0.000, 0.035, 1.60),
+    (0.080, 0.040, -0.60),
+    (0.350, 0.080, -0.45),
+])
+RR_SCALED = np.array([True, False, False, False, True])
+
+# Lead weights of the P, Q, R, S, T waves (further leads are random around 1)
+LEAD_WEIGHTS = np.array([
+    (1.0, 1.0, 1.0, 1.0, 1.0),
+    (0.6, 0.4, 0.5, 1.6, 0.7),
+])
+
+# A beat's waves lie within this many seconds of its R peak
+SUPPORT = (-0.40, 0.75)
+PVC_COUPLING = 0.6
+# MIT annotation codes written for the beats
+BEAT_SYMBOLS = {1: 'N', 5: 'V'}
+# ADC counts per mV of SynthReader.read_raw (MIT-BIH's default gain)
+ADC_GAIN = 200.0
+# Beats scheduled per refill
+_BLOCK_BEATS = 256
+
+
+def is_synth_path(path):
+    """True for a "synth:..." pseudo-record"""
+    return str(path).startswith(SYNTH_PREFIX)
+
+
+def parse_synth_path(path):
+    """
+    Options of a "synth:key=value,..." path
+
+    Returns:
+        dict with every key of DEFAULTS
+
+    Raises:
+        ValueError on unknown keys or bad values
+    """
+    options = dict(DEFAULTS)
+    spec = str(path)[len(SYNTH_PREFIX):] if is_synth_path(path) else str(path)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, sep, value = item.partition('=')
+        if not sep or key not in DEFAULTS:
+            raise ValueError(f"Unknown synth option {item!r} (known: {', '.join(DEFAULTS)})")
+        try:
+            options[key] = int(value) if key in _INTEGER_OPTIONS else float(value)
+        except ValueError:
+            raise ValueError(f"Bad value for synth option {key}: {value!r}") from None
+    if options['hr'] <= 0 or options['fs'] <= 0 or options['leads'] < 1 or options['duration'] <= 0:
+        raise ValueError("synth: hr, fs, duration and leads must be positive")
+    if not 0 <= options['pvc'] <= 1:
+        raise ValueError("synth: pvc is a probability (0..1)")
+    return options
+
+
+class SynthECG:
+    """Chunked synthetic ECG; consecutive chunks join into one continuous signal"""
+
+    def __init__(self, hr=72.0, hrv=0.05, pvc=0.0, noise=0.01, wander=0.05, leads=2,
+                 fs=360, seed=0, **_):
+        """
+        Args:
+            hr, hrv, pvc, noise, wander, leads, fs, seed: See DEFAULTS
+        """
+        self.fs = fs
+        self.leads = leads
+        self.rr = 60.0 / hr
+        self.hrv = hrv
+        self.pvc = pvc
+        self.noise = noise
+        self.wander = wander
+
+        beat_seed, noise_seed, lead_seed = np.random.SeedSequence(seed).spawn(3)
+        self._beat_rng = np.random.default_rng(beat_seed)
+        self._noise_rng = np.random.default_rng(noise_seed)
+        extra = np.random.default_rng(lead_seed).uniform(0.4, 1.4, (max(leads - 2, 0), 5))
+        self.lead_weights = np.vstack([LEAD_WEIGHTS, extra])[:leads]
+        phase = np.random.default_rng(lead_seed).uniform(0, 2 * np.pi, (2, leads))
+        self._wander_cos, self._wander_sin = np.cos(phase), np.sin(phase)
+
+        # Beat templates (type, samples around R, lead); P/T offsets follow the mean RR
+        self._offsets = np.arange(int(np.floor(SUPPORT[0] * fs)), int(np.ceil(SUPPORT[1] * fs)) + 1)
+        dt = self._offsets / fs
+        scale = np.where(RR_SCALED, np.sqrt(self.rr), 1.0)
+        templates = []
+        for waves in (NORMAL_WAVES, PVC_WAVES):
+            mu, sigma, amp = waves[:, 0] * scale, waves[:, 1], waves[:, 2]
+            shapes = amp[:, None] * np.exp(-0.5 * ((dt - mu[:, None]) / sigma[:, None]) ** 2)
+            templates.append(shapes.T @ self.lead_weights.T)
+        self._templates = np.stack(templates)
+
+        self.position = 0                       # next sample to generate
+        self._times = np.empty(0)               # scheduled R peaks (s) not yet behind us
+        self._pvc = np.empty(0, dtype=bool)
+        self._last_time = 0.0
+        self._last_was_pvc = False
+        self.beat_times = []                    # every scheduled R peak, in order
+        self.beat_pvc = []
+
+    def _schedule(self, until):
+        """Add beats until the schedule reaches until (s)"""
+        while self._last_time < until:
+            n = _BLOCK_BEATS
+            t = self._last_time + self.rr * np.arange(1, n + 1)
+            rr = self.rr * (1 + self.hrv * (0.6 * np.sin(2 * np.pi * 0.1 * t)
+                                            + 0.6 * np.sin(2 * np.pi * 0.25 * t)
+                                            + 0.4 * self._beat_rng.standard_normal(n)))
+            pvc = self._beat_rng.random(n) < self.pvc
+            # No PVC right after a PVC
+            pvc &= ~np.concatenate([[self._last_was_pvc], pvc[:-1]])
+            intervals = np.where(pvc, PVC_COUPLING * rr, rr)
+            after = np.concatenate([[self._last_was_pvc], pvc[:-1]])
+            intervals[after] = (2 - PVC_COUPLING) * rr[after]
+            times = self._last_time + np.cumsum(intervals)
+
+            self._times = np.concatenate([self._times, times])
+            self._pvc = np.concatenate([self._pvc, pvc])
+            self.beat_times.extend(times.tolist())
+            self.beat_pvc.extend(pvc.tolist())
+            self._last_time = float(times[-1])
+            self._last_was_pvc = bool(pvc[-1])
+
+    def chunk(self, n):
+        """
+        Next n samples
+
+        Returns:
+            (n, leads) float64 array in mV
+        """
+        fs = self.fs
+        leads = self.leads
+        start = self.position
+        t0, t1 = start / fs, (start + n) / fs
+        self._schedule(t1 + SUPPORT[1] - SUPPORT[0])
+
+        # Beats whose waves reach into this chunk: scatter-add their templates
+        lo, hi = np.searchsorted(self._times, (t0 - SUPPORT[1], t1 - SUPPORT[0]))
+        times, pvc = self._times[lo:hi], self._pvc[lo:hi]
+        if len(times):
+            index = np.round(times * fs).astype(np.int64)[:, None] + self._offsets   # (beats, L)
+            inside = (index >= start) & (index < start + n)
+            beat, pos = np.nonzero(inside)
+            values = self._templates[pvc.astype(np.int64)[beat], pos]                 # (hits, leads)
+            slots = (index[beat, pos] - start)[:, None] * leads + np.arange(leads)
+            out = np.bincount(slots.ravel(), values.ravel(), minlength=n * leads).reshape(n, leads)
+        else:
+            out = np.zeros((n, leads))
+
+        # Forget beats that are fully behind us
+        keep = np.searchsorted(self._times, t1 - SUPPORT[1])
+        self._times, self._pvc = self._times[keep:], self._pvc[keep:]
+
+        if self.wander:
+            # sin(wt + phase) per lead from one sin/cos per sample
+            t = (start + np.arange(n)) / fs
+            for weight, f, k in ((0.7, 0.15, 0), (0.3, 0.33, 1)):
+                w = 2 * np.pi * f * t
+                out += (self.wander * weight) * (np.outer(np.sin(w), self._wander_cos[k])
+                                                 + np.outer(np.cos(w), self._wander_sin[k]))
+        if self.noise:
+            out += self.noise * self._noise_rng.standard_normal((n, self.leads))
+        self.position += n
+        return out
+
+    def chunks(self, size, total=None):
+        """Yield (size, leads) chunks, forever or until total samples"""
+        while total is None or self.position < total:
+            yield self.chunk(size if total is None else min(size, total - self.position))
+
+    def annotations(self, stop=None):
+        """
+        Beats scheduled so far (up to sample stop), in read_annotation_file() form
+        """
+        samples = np.round(np.array(self.beat_times) * self.fs).astype(np.int64)
+        codes = np.where(self.beat_pvc, 5, 1).astype(np.uint8)
+        if stop is not None:
+            keep = samples < stop
+            samples, codes = samples[keep], codes[keep]
+        return {
+            'sample': samples,
+            'code': codes,
+            'symbol': np.array([BEAT_SYMBOLS[c] for c in codes.tolist()], dtype='<U1'),
+            'aux': [''] * len(samples),
+        }
+
+
+class SynthReader:
+    """MITBIHReader look-alike for a "synth:..." pseudo-record"""
+
+    def __init__(self, record_path):
+        """
+        Args:
+            record_path: "synth:key=value,..." (see DEFAULTS)
+        """
+        self.record_path = Path(SYNTH_PREFIX.rstrip(':'))
+        self.spec = str(record_path)
+        self.options = parse_synth_path(record_path)
+        self.num_signals = self.options['leads']
+        self.sample_rate = self.options['fs']
+        self.num_samples = int(round(self.options['duration'] * self.sample_rate))
+        self.signal_info = [{'filename': self.spec, 'format': 16, 'gain': ADC_GAIN,
+                             'baseline': 0, 'units': 0, 'adc_res': 16, 'adc_zero': 0,
+                             'description': f'synth lead {i}'} for i in range(self.num_signals)]
+        self._signals = None
+        self._source = None
+        print(f"✓ Synthetic record: {self.num_signals} leads, {self.sample_rate} Hz, "
+              f"{self.num_samples} samples ({self.spec})")
+
+    def read_signals(self):
+        """(num_samples, leads) float array in mV (generated once)"""
+        if self._signals is None:
+            self._source = SynthECG(**self.options)
+            self._signals = self._source.chunk(self.num_samples)
+        return self._signals
+
+    def read_signal(self, signal_num=0):
+        """One lead in mV"""
+        if signal_num >= self.num_signals:
+            raise ValueError(f"Signal {signal_num} not found (only {self.num_signals} signals)")
+        signal = self.read_signals()[:, signal_num]
+        print(f"✓ Read signal {signal_num}: {len(signal)} samples")
+        return signal
+
+    def read_raw(self):
+        """(num_samples, leads) int32 ADC counts (ADC_GAIN per mV)"""
+        return np.round(self.read_signals() * ADC_GAIN).astype(np.int32)
+
+    def read_annotations(self, extension='atr'):
+        """The beats placed by the generator ('N' and 'V')"""
+        self.read_signals()
+        ann = self._source.annotations(self.num_samples)
+        print(f"✓ {len(ann['sample'])} synthetic beats ({int((ann['code'] == 5).sum())} PVCs)")
+        return ann
+
+    def get_info(self):
+        """Get record information"""
+        return {
+            'num_signals': self.num_signals,
+            'sample_rate': self.sample_rate,
+            'num_samples': self.num_samples,
+            'signal_names': [s['description'] for s in self.signal_info]
+        }
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Synthetic ECG generator for load and soak tests',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # One hour at 360 Hz with 5% PVCs: generation speed and beat counts
+  python ecg_synth.py "synth:pvc=0.05" --seconds 3600
+
+  # High-rate, 12-lead, in 1 s chunks
+  python ecg_synth.py "synth:fs=10000,leads=12" --seconds 600 --chunk 10000
+
+  # Write a CSV any streamer can load
+  python ecg_synth.py "synth:hr=110,noise=0.03" --seconds 60 --csv data/synth_110bpm.csv
+        """
+    )
+
+    parser.add_argument('spec', nargs='?', default=SYNTH_PREFIX,
+                        help=f'synth: options, e.g. "synth:hr=80,pvc=0.1" (keys: {", ".join(DEFAULTS)})')
+    parser.add_argument('--seconds', type=float, default=600.0,
+                        help='Seconds of signal to generate (default: 600)')
+    parser.add_argument('--chunk', type=int, default=0,
+                        help='Generate in chunks of this many samples (default: one block)')
+    parser.add_argument('--csv', help='Write lead 0 to this CSV (column ECG, mV)')
+
+    args = parser.parse_args()
+
+    try:
+        options = parse_synth_path(args.spec)
+    except ValueError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    source = SynthECG(**options)
+    total = int(round(args.seconds * options['fs']))
+    start = time.perf_counter()
+    parts = list(source.chunks(args.chunk or total, total))
+    elapsed = time.perf_counter() - start
+    signal = np.concatenate(parts) if parts else np.empty((0, options['leads']))
+
+    ann = source.annotations(total)
+    pvcs = int((ann['code'] == 5).sum())
+    print(f"✓ {total} samples x {options['leads']} leads at {options['fs']} Hz in {elapsed:.2f} s "
+          f"({args.seconds / max(elapsed, 1e-9):.0f}x real time)")
+    print(f"  {len(ann['sample'])} beats ({60 * len(ann['sample']) / args.seconds:.1f} bpm), "
+          f"{pvcs} PVCs, range {signal.min():.2f} to {signal.max():.2f} mV")
+
+    if args.csv:
+        Path(args.csv).parent.mkdir(parents=True, exist_ok=True)
+        np.savetxt(args.csv, signal[:, 0], fmt='%.5f', header='ECG', comments='')
+        print(f"✓ Saved {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
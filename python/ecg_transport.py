@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+ECG Transport - Pluggable byte transports for the streamers
+
+Every streamer writes its 2-byte samples through open_transport(), which
+selects a backend from the port string:
+
+    COM3, /dev/ttyUSB0        local serial port
+    socket://host:port        raw TCP socket (e.g. ser2net on the lab PC)
+    rfc2217://host:port       RFC2217 remote serial port
+    loop://                   pyserial loopback (testing)
+    relay://host:port         batched, timestamped frames to ecg_relay.py
+
+The first four are handled by pyserial's serial_for_url(). The relay backend
+collects samples into frames stamped with the sender's send times; the relay
+server on the lab machine re-creates that timing against its own clock and
+paces the local COM port, so network jitter never reaches the UART.
+
+ResilientSerial wraps any of these so that an adapter reset during an
+overnight loop does not kill the streamer. A failed write closes the port,
+re-opens it with exponential backoff and retries the same sample, so streaming
+resumes at the last written sample offset from the already-prepared buffer.
+Every outage is recorded as a gap marker in the transport telemetry.
+
+Usage:
+    from ecg_transport import open_transport
+    ser = open_transport('relay://labpc:5000', 115200, reconnect=True)
+    ser.write(bytes([0xA3, 0x05]))
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import time
+import socket
+import struct
+import serial
+
+# Bytes per 12-bit ECG sample on the UART (see send_sample)
+BYTES_PER_SAMPLE = 2
+
+# Relay frame header: magic, sequence, first sample offset,
+# send time of first / last sample in the frame, payload length
+RELAY_MAGIC = b'ECGF'
+RELAY_HEADER = struct.Struct('<4sIQddI')
+RELAY_SCHEME = 'relay://'
+
+
+def parse_host_port(address, default_port=5000):
+    """Split 'host:port' (port optional)"""
+    host, _, port = address.rpartition(':')
+    if not host:
+        return address, default_port
+    return host, int(port)
+
+
+def open_transport(url, baud=115200, timeout=1, reconnect=False, **relay_options):
+    """
+    Open a transport for the given port string
+
+    Args:
+        url: Port name or URL (see module docstring)
+        baud: Baud rate (serial backends)
+        timeout: Read timeout in seconds
+        reconnect: Wrap in ResilientSerial (reconnect and resume on failure)
+        relay_options: batch_ms / max_batch passed to RelayClient
+
+    Returns:
+        Object with write(), close() and is_open
+
+    Raises:
+        serial.SerialException if the transport cannot be opened
+    """
+    def opener(write_timeout=None):
+        if url.startswith(RELAY_SCHEME):
+            host, port = parse_host_port(url[len(RELAY_SCHEME):])
+            return RelayClient(host, port, **relay_options)
+        return serial.serial_for_url(url, baud, timeout=timeout,
+                                     write_timeout=write_timeout)
+
+    if reconnect:
+        return ResilientSerial(url, baud, timeout=timeout, opener=opener)
+    return opener()
+
+
+class RelayClient:
+    """Send samples to ecg_relay.py as batched, timestamped frames"""
+
+    def __init__(self, host, port, batch_ms=50.0, max_batch=4096, connect_timeout=5.0):
+        """
+        Connect to a relay server
+
+        Args:
+            host, port: Relay server address
+            batch_ms: Flush a frame once its first sample is this old
+            max_batch: Flush a frame once it holds this many bytes
+            connect_timeout: TCP connect timeout in seconds
+
+        Raises:
+            serial.SerialException if the connection fails
+        """
+        self.address = (host, port)
+        self.batch_s = batch_ms / 1000.0
+        self.max_batch = max_batch
+
+        self.seq = 0
+        self.sample_offset = 0       # offset of first sample in pending frame
+        self.pending = bytearray()
+        self.first_time = 0.0
+        self.last_time = 0.0
+
+        try:
+            self.sock = socket.create_connection(self.address, timeout=connect_timeout)
+        except OSError as e:
+            raise serial.SerialException(f"Could not connect to relay {host}:{port}: {e}")
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(None)
+
+    @property
+    def is_open(self):
+        return self.sock is not None
+
+    def write(self, data):
+        """Queue bytes for the current frame, stamping their send time"""
+        now = time.time()
+        if not self.pending:
+            self.first_time = now
+        self.last_time = now
+        self.pending += data
+
+        if (len(self.pending) >= self.max_batch or
+                now - self.first_time >= self.batch_s):
+            try:
+                self.flush()
+            except serial.SerialException:
+                # Un-queue so a retried write() does not duplicate the sample
+                del self.pending[-len(data):]
+                raise
+        return len(data)
+
+    def flush(self):
+        """Send the pending frame"""
+        if not self.pending:
+            return
+
+        header = RELAY_HEADER.pack(RELAY_MAGIC, self.seq, self.sample_offset,
+                                   self.first_time, self.last_time, len(self.pending))
+        try:
+            self.sock.sendall(header + self.pending)
+        except OSError as e:
+            raise serial.SerialException(f"Relay connection lost: {e}")
+
+        self.seq += 1
+        self.sample_offset += len(self.pending) // BYTES_PER_SAMPLE
+        self.pending.clear()
+
+    def adopt(self, previous):
+        """Take over the unsent frame and sample offset of a dropped client"""
+        self.pending = bytearray(previous.pending)
+        self.first_time = previous.first_time
+        self.last_time = previous.last_time
+        self.sample_offset = previous.sample_offset
+        self.seq = previous.seq
+
+    def close(self):
+        """Flush and close the connection"""
+        if self.sock is None:
+            return
+        try:
+            self.flush()
+        except serial.SerialException:
+            pass
+        self.sock.close()
+        self.sock = None
+
+
+class ResilientSerial:
+    """Serial port wrapper that reconnects and resumes after write failures"""
+
+    def __init__(self, port, baud=115200, timeout=1, write_timeout=2.0,
+                 initial_backoff=0.25, max_backoff=8.0, max_retries=None,
+                 verbose=True, opener=None):
+        """
+        Open the serial port
+
+        Args:
+            port: COM port or transport URL (see open_transport)
+            baud: Baud rate (default 115200)
+            timeout: Read timeout in seconds
+            write_timeout: Write timeout in seconds, so a stalled adapter
+                           raises instead of blocking forever
+            initial_backoff: First reconnect delay in seconds
+            max_backoff: Upper bound for the reconnect delay in seconds
+            max_retries: Give up after this many reconnect attempts
+                         (None = retry forever)
+            verbose: Print connection events
+            opener: Callable(write_timeout) returning a new transport
+                    (default: pyserial serial_for_url)
+
+        Raises:
+            serial.SerialException if the port cannot be opened initially
+        """
+        self.port = port
+        self.baud = baud
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.verbose = verbose
+        self.opener = opener
+
+        # Telemetry
+        self.bytes_written = 0
+        self.reconnects = 0
+        self.telemetry = []     # gap markers, one dict per outage
+
+        self.ser = self._open()
+
+    def _open(self):
+        """Open the underlying port"""
+        if self.opener is not None:
+            return self.opener(write_timeout=self.write_timeout)
+        return serial.serial_for_url(self.port, self.baud, timeout=self.timeout,
+                                     write_timeout=self.write_timeout)
+
+    @property
+    def is_open(self):
+        return self.ser is not None and self.ser.is_open
+
+    @property
+    def sample_offset(self):
+        """Number of complete samples written so far"""
+        return self.bytes_written // BYTES_PER_SAMPLE
+
+    def write(self, data):
+        """
+        Write bytes, reconnecting and retrying until they are delivered
+
+        Args:
+            data: bytes to send (one or more whole samples)
+
+        Returns:
+            Number of bytes written (len(data))
+
+        Raises:
+            serial.SerialException if max_retries is exhausted
+        """
+        data = memoryview(data)
+        written = 0
+        while written < len(data):
+            try:
+                # Only the rest: resending bytes that went out would shift
+                # the 2-byte sample framing
+                count = self.ser.write(data[written:])
+            except (serial.SerialException, OSError) as e:
+                self._reconnect(e)
+                continue
+            written += count
+            self.bytes_written += count
+        return written
+
+    def _reconnect(self, error):
+        """Close the broken port and re-open it with exponential backoff"""
+        gap_start = time.perf_counter()
+        offset = self.sample_offset
+
+        if self.verbose:
+            print(f"\n⚠ Write failed at sample {offset}: {error}")
+            print(f"  Reconnecting to {self.port}...")
+
+        previous = self.ser
+        try:
+            self.ser.close()
+        except (serial.SerialException, OSError):
+            pass
+
+        delay = self.initial_backoff
+        attempts = 0
+        while True:
+            attempts += 1
+            time.sleep(delay)
+            try:
+                self.ser = self._open()
+                break
+            except (serial.SerialException, OSError) as e:
+                if self.max_retries is not None and attempts >= self.max_retries:
+                    self._record_gap(offset, gap_start, attempts, str(error), recovered=False)
+                    raise serial.SerialException(
+                        f"Gave up reconnecting to {self.port} after {attempts} attempts: {e}")
+                delay = min(delay * 2, self.max_backoff)
+
+        # Relay frames not yet delivered move to the new connection
+        if hasattr(self.ser, 'adopt'):
+            self.ser.adopt(previous)
+
+        self.reconnects += 1
+        gap = self._record_gap(offset, gap_start, attempts, str(error), recovered=True)
+
+        if self.verbose:
+            print(f"✓ Reconnected after {gap['duration']:.2f}s "
+                  f"({attempts} attempt{'s' if attempts != 1 else ''}), "
+                  f"resuming at sample {offset}")
+
+    def _record_gap(self, offset, gap_start, attempts, reason, recovered):
+        """Append a gap marker to the telemetry"""
+        gap = {
+            'event': 'gap',
+            'sample_offset': offset,
+            'wall_time': time.time(),
+            'duration': time.perf_counter() - gap_start,
+            'attempts': attempts,
+            'reason': reason,
+            'recovered': recovered,
+        }
+        self.telemetry.append(gap)
+        return gap
+
+    def gap_summary(self):
+        """One-line summary of recorded outages"""
+        if not self.telemetry:
+            return "no gaps"
+        total = sum(g['duration'] for g in self.telemetry)
+        return f"{len(self.telemetry)} gap(s), {total:.1f}s total downtime"
+
+    def close(self):
+        """Close serial port"""
+        if self.ser is not None:
+            self.ser.close()
@@ -5,6 +5,9 @@ For demonstration and testing purposes
 
 Usage:
     python ecg_visualizer.py --file data/normal_ecg.csv --loop
+    python ecg_visualizer.py --file "../ECG signals/Normal/100" --browse
+    python ecg_visualizer.py --file "../ECG signals/PVC/208" --leads all
+    python ecg_visualizer.py --file "../ECG signals/Normal/100" --export 100.mp4 --speed 10
     python ecg_visualizer.py --file "../ECG signals/15814" --signal 0 --max-samples 5000
 
 Author: Marly
@@ -13,10 +16,10 @@ Version: 1.0
 """
 
 import numpy as np
-import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from collections import deque
+from matplotlib.collections import LineCollection
+from matplotlib.patches import Polygon
 import time
 import argparse
 import sys
@@ -24,18 +27,43 @@ from pathlib import Path
 
 # Import MIT-BIH reader
 try:
-    from ecg_dat_reader import MITBIHReader
+    from ecg_dat_reader import MITBIHReader, open_record, record_name
 except ImportError:
     MITBIHReader = None
 
+import ecg_csv
+from ecg_synth import is_synth_path
+from ecg_annotations import AnnotationIndex, AnnotationOverlay
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_export import add_export_args, run_export
+from ecg_lod import LODPyramid
+from ecg_ring_buffer import RingBuffer
+
+# Multi-lead display: each lead gets a lane of height 1 (lead 0 on top) and
+# is scaled to fill +/- LANE_HALF_HEIGHT of it
+LANE_HALF_HEIGHT = 0.45
+# Fraction per frame by which a lane's scale relaxes toward a smaller range
+# (a larger range is adopted immediately, so peaks are never clipped)
+SCALE_RELEASE = 0.02
+
 
 class ECGVisualizer:
     """Display live scrolling ECG waveform"""
     
-    def __init__(self, window_size=1000):
-        """Initialize visualizer"""
+    def __init__(self, window_size=1000, num_leads=1, lead_names=None, annotations=None):
+        """
+        Initialize visualizer
+        
+        Args:
+            window_size: Display window size in samples
+            num_leads: Leads per frame; more than 1 stacks them in lanes
+            lead_names: Optional lane labels for multi-lead display
+            annotations: Optional AnnotationIndex; beat labels follow the window
+        """
         self.window_size = window_size
         self.sample_rate = 360
+        self.num_leads = num_leads
+        self.multi_lead = num_leads > 1
         
         # Data storage
         self.ecg_data = None
@@ -44,22 +72,26 @@ class ECGVisualizer:
         self.start_time = None
         self.loop_mode = False
         
-        # Display buffers
-        self.plot_buffer = deque(maxlen=window_size)
-        self.x_buffer = deque(maxlen=window_size)
+        # Display buffers (one (frames x leads) ring shared by all leads)
+        self.plot_buffer = RingBuffer(window_size,
+                                      width=num_leads if self.multi_lead else None)
         
         # Set up plot
         plt.style.use('seaborn-v0_8-darkgrid')
         self.fig, self.ax = plt.subplots(figsize=(14, 7))
-        self.line, = self.ax.plot([], [], 'g-', linewidth=2, label='ECG Signal')
         
         self.ax.set_xlim(0, window_size)
-        self.ax.set_ylim(-1.2, 1.2)
         self.ax.set_xlabel('Sample Number', fontsize=13, fontweight='bold')
-        self.ax.set_ylabel('Amplitude (normalized)', fontsize=13, fontweight='bold')
         self.ax.set_title('ECG Live Streaming Visualization', fontsize=16, fontweight='bold')
         self.ax.grid(True, alpha=0.4, linestyle='--', linewidth=0.8)
-        self.ax.legend(loc='upper right', fontsize=11)
+        
+        if self.multi_lead:
+            self._setup_lanes(lead_names)
+        else:
+            self.line, = self.ax.plot([], [], 'g-', linewidth=2, label='ECG Signal')
+            self.ax.set_ylim(-1.2, 1.2)
+            self.ax.set_ylabel('Amplitude (normalized)', fontsize=13, fontweight='bold')
+            self.ax.legend(loc='upper right', fontsize=11)
         
         # Status display
         self.status_text = self.ax.text(
@@ -70,21 +102,91 @@ class ECGVisualizer:
         )
         
         plt.tight_layout()
+        
+        # Draw a min/max envelope at ~2 points per pixel column (per lead)
+        self.envelope = MinMaxEnvelope(window_size, pixel_columns(self.ax),
+                                       leads=num_leads if self.multi_lead else None)
+        self._segments = None
+        self.fig.canvas.mpl_connect('resize_event', self._on_resize)
+        
+        self.overlay = AnnotationOverlay(self.ax, annotations) if annotations is not None else None
     
-    def load_csv(self, filename, max_samples=None):
-        """Load ECG from CSV"""
-        df = pd.read_csv(filename)
+    def _setup_lanes(self, lead_names):
+        """One LineCollection for all leads, stacked in lanes"""
+        n = self.num_leads
+        names = list(lead_names or [])
+        names += [f'Signal {k}' for k in range(len(names), n)]
+        
+        # Lead k is centred on n-1-k so lead 0 is on top
+        self.lane_offsets = np.arange(n - 1, -1, -1, dtype=np.float64)
+        colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
         
-        ecg_col = None
-        for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-            if col in df.columns:
-                ecg_col = col
-                break
+        # A single artist: every frame is one draw call and one blit,
+        # however many leads are shown
+        self.line = LineCollection([], colors=[colors[k % len(colors)] for k in range(n)],
+                                   linewidths=1.5)
+        self.ax.add_collection(self.line)
         
-        if ecg_col is None:
-            data = df.iloc[:, 0].values
+        self.ax.set_ylim(-0.6, n - 0.4)
+        self.ax.set_yticks(self.lane_offsets)
+        self.ax.set_yticklabels(names[:n])
+        self.ax.set_ylabel('Lead', fontsize=13, fontweight='bold')
+        
+        # Running per-lead range of the window (see _scale_leads)
+        self._lead_lo = None
+        self._lead_hi = None
+    
+    def _on_resize(self, event):
+        """Re-bucket the envelope for the new axes width"""
+        self.envelope.rebuild(self.plot_buffer, pixel_columns(self.ax))
+    
+    def _scale_leads(self, y):
+        """
+        Update each lead's display range from its envelope points
+        
+        The envelope already holds the window's extremes at ~2 points per
+        pixel column, so the per-lead min/max costs O(columns) regardless of
+        window size, for all leads in one call. A larger range is adopted
+        at once; a smaller one is approached by SCALE_RELEASE per frame so
+        lanes do not jump when a large beat scrolls out.
+        
+        Args:
+            y: (points, leads) envelope values
+        
+        Returns:
+            (gain, centre) arrays of length num_leads
+        """
+        lo = y.min(axis=0)
+        hi = y.max(axis=0)
+        if self._lead_lo is None:
+            self._lead_lo, self._lead_hi = lo.copy(), hi.copy()
         else:
-            data = df[ecg_col].values
+            self._lead_lo += SCALE_RELEASE * (lo - self._lead_lo)
+            self._lead_hi += SCALE_RELEASE * (hi - self._lead_hi)
+            np.minimum(self._lead_lo, lo, out=self._lead_lo)
+            np.maximum(self._lead_hi, hi, out=self._lead_hi)
+        span = np.maximum(self._lead_hi - self._lead_lo, 1e-9)
+        return 2 * LANE_HALF_HEIGHT / span, (self._lead_hi + self._lead_lo) / 2
+    
+    def _update_lanes(self):
+        """Map every lead's envelope into its lane and hand them over at once"""
+        x, y = self.envelope.envelope()
+        m = len(x)
+        if self._segments is None or self._segments.shape[1] < self.envelope.max_points:
+            self._segments = np.empty((self.num_leads, self.envelope.max_points, 2))
+        
+        gain, centre = self._scale_leads(y)
+        seg = self._segments[:, :m]
+        seg[:, :, 0] = x.T
+        np.subtract(y.T, centre[:, None], out=seg[:, :, 1])
+        seg[:, :, 1] *= gain[:, None]
+        seg[:, :, 1] += self.lane_offsets[:, None]
+        self.line.set_segments(seg)
+    
+    @staticmethod
+    def load_csv(filename, max_samples=None):
+        """Load ECG from CSV"""
+        data = ecg_csv.load_csv(filename)
         
         if max_samples and len(data) > max_samples:
             data = data[:max_samples]
@@ -98,7 +200,7 @@ class ECGVisualizer:
             print("✗ MIT-BIH reader not available")
             sys.exit(1)
         
-        reader = MITBIHReader(record_path)
+        reader = open_record(record_path)
         signal = reader.read_signal(signal_num)
         info = reader.get_info()
         
@@ -110,23 +212,61 @@ class ECGVisualizer:
         print(f"✓ Loaded MIT-BIH: {len(signal)} samples @ {self.sample_rate} Hz")
         return signal
     
-    def normalize(self, data):
-        """Normalize to [-1, 1] range"""
-        normalized = (data - np.mean(data)) / np.std(data)
+    @staticmethod
+    def load_dat_leads(record_path, leads=None, max_samples=None):
+        """
+        Load several leads of a MIT-BIH record as one (samples x leads) array
+        
+        Args:
+            record_path: Record path without extension
+            leads: List of signal numbers (None = all)
+            max_samples: Optional limit
+        
+        Returns:
+            (signals, lead_names, sample_rate)
+        """
+        if MITBIHReader is None:
+            print("✗ MIT-BIH reader not available")
+            sys.exit(1)
+        
+        reader = open_record(record_path)
+        info = reader.get_info()
+        if leads is None:
+            leads = list(range(info['num_signals']))
+        for lead in leads:
+            if not 0 <= lead < info['num_signals']:
+                raise ValueError(f"Signal {lead} not found (only {info['num_signals']} signals)")
+        
+        signals = reader.read_signals()[:max_samples, leads]
+        names = [info['signal_names'][k] for k in leads]
+        
+        print(f"✓ Loaded MIT-BIH: {len(signals)} samples x {len(leads)} leads "
+              f"@ {info['sample_rate']} Hz ({', '.join(names)})")
+        return signals, names, info['sample_rate']
+    
+    @staticmethod
+    def normalize(data):
+        """Normalize to [-1, 1] range (each lead separately)"""
+        normalized = (data - np.mean(data, axis=0)) / np.std(data, axis=0)
         normalized = np.clip(normalized, -1.0, 1.0)
         print(f"✓ Normalized: range {normalized.min():.2f} to {normalized.max():.2f}")
         return normalized
     
+    def _artists(self):
+        """Artists redrawn (blitted) each frame"""
+        if self.overlay is None:
+            return self.line, self.status_text
+        return (self.line, *self.overlay.artists, self.status_text)
+    
     def update_frame(self, frame):
         """Animation update callback"""
         if self.ecg_data is None or len(self.ecg_data) == 0:
-            return self.line, self.status_text
+            return self._artists()
         
         # Add next sample
         if self.current_index < len(self.ecg_data):
             sample = self.ecg_data[self.current_index]
             self.plot_buffer.append(sample)
-            self.x_buffer.append(self.sample_count)
             
             self.current_index += 1
             self.sample_count += 1
@@ -139,17 +279,25 @@ class ECGVisualizer:
             else:
                 # Stop animation
                 print(f"\n✓ Finished playback ({self.sample_count} samples)")
-                return self.line, self.status_text
+                return self._artists()
         
-        # Update line
+        # Update line(s)
         if len(self.plot_buffer) > 0:
-            self.line.set_data(list(self.x_buffer), list(self.plot_buffer))
+            self.envelope.sync(self.plot_buffer)
+            if self.multi_lead:
+                self._update_lanes()
+            else:
+                self.line.set_data(*self.envelope.envelope())
             
             # Update x-axis to follow
-            if len(self.x_buffer) > 0:
-                x_max = self.x_buffer[-1]
+            if len(self.plot_buffer) > 0:
+                x_max = self.envelope.last_index
                 x_min = max(0, x_max - self.window_size)
                 self.ax.set_xlim(x_min, x_max)
+                
+                # Beat labels (sample numbers keep counting across loops)
+                if self.overlay is not None:
+                    self.overlay.update(x_min, x_max + 1, period=len(self.ecg_data))
             
             # Update status
             if self.start_time:
@@ -167,7 +315,7 @@ class ECGVisualizer:
             rate = self.sample_count / elapsed
             print(f"  Samples: {self.sample_count:6d} | Time: {elapsed:5.1f}s | Rate: {rate:6.1f} Hz")
         
-        return self.line, self.status_text
+        return self._artists()
     
     def visualize(self, ecg_data, loop=False):
         """Start visualization"""
@@ -181,6 +329,8 @@ class ECGVisualizer:
         print(f"  ECG LIVE VISUALIZATION (PC Display Only)")
         print(f"{'='*60}")
         print(f"  Samples: {len(ecg_data)}")
+        if self.multi_lead:
+            print(f"  Leads: {self.num_leads}")
         print(f"  Sample Rate: {self.sample_rate} Hz")
         print(f"  Window Size: {self.window_size} samples")
         print(f"  Loop Mode: {'ON' if loop else 'OFF'}")
@@ -216,6 +366,172 @@ class ECGVisualizer:
             print(f"{'='*60}\n")
 
 
+class ECGBrowser:
+    """
+    Zoom/pan through a whole record using its LOD pyramid
+
+    Only the data, the beat labels, the status and the x axis (ticks,
+    labels, grid) change with the view. They are animated artists: a full
+    draw (first show, resize, toolbar) caches everything else, and each
+    zoom/pan restores that background and blits just those artists.
+    """
+    
+    def __init__(self, pyramid, lead=0, annotations=None):
+        """
+        Args:
+            pyramid: ecg_lod.LODPyramid of the record
+            lead: Lead (column) to display
+            annotations: Optional AnnotationIndex for beat labels
+        """
+        self.pyramid = pyramid
+        self.lead = lead
+        self.fs = pyramid.sample_rate
+        self.duration = pyramid.num_samples / self.fs
+        self._request_time = None
+        self._background = None
+        
+        plt.style.use('seaborn-v0_8-darkgrid')
+        self.fig, self.ax = plt.subplots(figsize=(14, 7))
+        self.line, = self.ax.plot([], [], 'g-', linewidth=1, label='ECG Signal', animated=True)
+        
+        # Zoomed out, the min/max envelope is drawn as one filled band: much
+        # cheaper for Agg than stroking a zig-zag line through every bucket.
+        # It has no edge (stroking the outline costs 3x the fill); the edges
+        # are pushed out by half a pixel instead, so flat stretches stay visible.
+        self.band = Polygon(np.zeros((1, 2)), closed=True, facecolor='g',
+                            edgecolor='none', visible=False, animated=True)
+        self.ax.add_patch(self.band)
+        
+        name = (pyramid.lead_names[lead] if lead < len(pyramid.lead_names)
+                else f'Signal {lead}')
+        self.ax.set_xlabel('Time (seconds)', fontsize=13, fontweight='bold')
+        self.ax.set_ylabel('Amplitude', fontsize=13, fontweight='bold')
+        self.ax.set_title(f'ECG Record Browser - {name}', fontsize=16, fontweight='bold')
+        self.ax.grid(True, alpha=0.4, linestyle='--', linewidth=0.8)
+        
+        lo, hi = pyramid.lead_range(lead)
+        margin = 0.05 * (hi - lo or 1.0)
+        self.ax.set_ylim(lo - margin, hi + margin)
+        
+        self.status_text = self.ax.text(
+            0.02, 0.98, '', transform=self.ax.transAxes,
+            verticalalignment='top', fontsize=11,
+            bbox=dict(boxstyle='round', facecolor='lightyellow', alpha=0.9, edgecolor='black'),
+            family='monospace', animated=True
+        )
+        plt.tight_layout()
+        self.ax.xaxis.set_animated(True)
+        
+        self.overlay = (AnnotationOverlay(self.ax, annotations, animated=True)
+                        if annotations is not None else None)
+        self._artists = [self.ax.xaxis, self.band, self.line]
+        if self.overlay is not None:
+            self._artists += self.overlay.artists
+        
+        # Refetch on any x-range change (toolbar zoom/pan, keys, scroll)
+        self.ax.callbacks.connect('xlim_changed', self._on_xlim)
+        self.fig.canvas.mpl_connect('key_press_event', self._on_key)
+        self.fig.canvas.mpl_connect('scroll_event', self._on_scroll)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+        
+        self.ax.set_xlim(0, self.duration)
+    
+    def _on_xlim(self, ax):
+        """Fetch only the visible range at the matching pyramid level"""
+        self._request_time = time.perf_counter()
+        t0, t1 = ax.get_xlim()
+        x, y, level = self.pyramid.fetch(t0 * self.fs, t1 * self.fs,
+                                         pixel_columns(ax), self.lead)
+        if level == 0:
+            self.line.set_data(x / self.fs, y)
+        else:
+            # Upper edge (max) left to right, lower edge (min) back
+            y0, y1 = ax.get_ylim()
+            half_pixel = 0.5 * (y1 - y0) / max(ax.bbox.height, 1.0)
+            n = len(x) // 2
+            xy = np.empty((2 * n, 2))
+            xy[:n, 0] = x[::2] / self.fs
+            xy[:n, 1] = y[1::2] + half_pixel
+            xy[n:, 0] = xy[n - 1::-1, 0]
+            xy[n:, 1] = y[-2::-2] - half_pixel
+            self.band.set_xy(xy)
+        self.line.set_visible(level == 0)
+        self.band.set_visible(level != 0)
+        detail = 'raw samples' if level == 0 else f'level {level} (1:{1 << level})'
+        self._status = f'{t0:9.1f}-{t1:9.1f}s | {detail} | {len(x)} pts'
+        if self.overlay is not None:
+            beats = self.overlay.update(t0 * self.fs, t1 * self.fs, scale=1.0 / self.fs)
+            self._status += f' | {beats} beats'
+    
+    def _on_draw(self, event):
+        """A full redraw: cache the static background, then paint the view"""
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._blit()
+    
+    def _blit(self):
+        """Repaint the x axis, the data and the status over the cached background"""
+        canvas = self.fig.canvas
+        canvas.restore_region(self._background)
+        for artist in self._artists:
+            self.ax.draw_artist(artist)
+        if self._request_time is not None:
+            # Redraw latency: fetch + render of the new view
+            ms = (time.perf_counter() - self._request_time) * 1000
+            self._request_time = None
+            self.status_text.set_text(f'{self._status} | {ms:.0f} ms')
+        self.ax.draw_artist(self.status_text)
+        canvas.blit(self.fig.bbox)
+    
+    def _set_view(self, t0, t1):
+        """Clamp to the record and apply"""
+        span = min(t1 - t0, self.duration)
+        span = max(span, 10.0 / self.fs)
+        t0 = min(max(t0, 0.0), self.duration - span)
+        self.ax.set_xlim(t0, t0 + span)
+        if self._background is None:
+            self.fig.canvas.draw_idle()
+        else:
+            self._blit()
+    
+    def _zoom(self, factor, center=None):
+        t0, t1 = self.ax.get_xlim()
+        if center is None:
+            center = (t0 + t1) / 2
+        self._set_view(center - (center - t0) * factor, center + (t1 - center) * factor)
+    
+    def _on_key(self, event):
+        """Arrows pan, +/- or up/down zoom, Home shows the whole record"""
+        t0, t1 = self.ax.get_xlim()
+        span = t1 - t0
+        if event.key == 'right':
+            self._set_view(t0 + span / 2, t1 + span / 2)
+        elif event.key == 'left':
+            self._set_view(t0 - span / 2, t1 - span / 2)
+        elif event.key in ('+', '=', 'up'):
+            self._zoom(0.5)
+        elif event.key in ('-', 'down'):
+            self._zoom(2.0)
+        elif event.key in ('home', '0'):
+            self._set_view(0, self.duration)
+    
+    def _on_scroll(self, event):
+        """Zoom around the cursor"""
+        if event.inaxes is not self.ax:
+            return
+        self._zoom(0.8 if event.button == 'up' else 1.25, event.xdata)
+    
+    def run(self):
+        """Show the browser (blocking)"""
+        print(f"\n{'='*60}")
+        print(f"  ECG RECORD BROWSER")
+        print(f"{'='*60}")
+        print(f"  Samples: {self.pyramid.num_samples} @ {self.fs} Hz "
+              f"({self.duration/60:.1f} min)")
+        print(f"  ←/→ pan | +/- or ↑/↓ zoom | scroll zoom | Home: whole record")
+        print(f"{'='*60}\n")
+        plt.show()
+
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(
@@ -227,6 +543,17 @@ Examples:
   python ecg_visualizer.py --file data/normal_ecg.csv --loop
   python ecg_visualizer.py --file "../ECG signals/15814" --signal 0 --max-samples 5000
   python ecg_visualizer.py --file "../ECG signals/15814" --signal 0 --max-samples 10000 --loop --window 2000
+  
+  # All leads of a record stacked in one window
+  python ecg_visualizer.py --file "../ECG signals/PVC/208" --leads all
+  python ecg_visualizer.py --file "../ECG signals/15814" --leads 0,2 --max-samples 20000
+  
+  # Headless export, rendered as fast as the CPU allows (no window)
+  python ecg_visualizer.py --file "../ECG signals/Normal/100" --export 100.mp4 --speed 10 --workers 4
+  python ecg_visualizer.py --file "../ECG signals/PVC/208" --leads all --export strips/208
+  
+  # Zoom/pan through a whole record (min/max pyramid cached next to the record)
+  python ecg_visualizer.py --file "../ECG signals/Normal/100" --browse --signal 1
         """
     )
     
@@ -240,18 +567,82 @@ Examples:
                         help='Limit samples (default: all)')
     parser.add_argument('--loop', '-l', action='store_true',
                         help='Loop playback')
+    parser.add_argument('--leads', default=None,
+                        help="Stack several leads of a .dat record: 'all' or e.g. 0,1")
+    parser.add_argument('--browse', action='store_true',
+                        help='Browse the whole record with zoom/pan instead of playback')
+    parser.add_argument('--no-annotations', action='store_true',
+                        help="Hide beat labels from the record's .atr file")
+    parser.add_argument('--rebuild-lod', action='store_true',
+                        help='Recompute the browse pyramid even if it is up to date')
+    add_export_args(parser)
     
     args = parser.parse_args()
     
     try:
+        file_path = Path(args.file)
+        is_synth = is_synth_path(args.file)         # ecg_synth.py pseudo-record
+        is_record = is_synth or file_path.suffix in ['.dat', '.hea'] or not file_path.suffix
+        record_path = args.file if is_synth else str(file_path.with_suffix(''))
+        stem = record_name(record_path) if is_record else file_path.stem
+        
+        # Beat labels from <record>.atr, when present
+        annotations = None
+        if is_record and not args.no_annotations:
+            annotations = AnnotationIndex.for_record(record_path)
+        
+        if args.browse:
+            if is_record:
+                pyramid = LODPyramid.for_record(record_path,
+                                                rebuild=args.rebuild_lod)
+                lead = args.signal
+            else:
+                data = ECGVisualizer.load_csv(args.file)
+                pyramid = LODPyramid.for_signal(data, args.file, 360,
+                                                rebuild=args.rebuild_lod)
+                lead = 0
+            if lead >= pyramid.num_leads:
+                print(f"✗ Signal {lead} not found (only {pyramid.num_leads} signals)")
+                sys.exit(1)
+            ECGBrowser(pyramid, lead, annotations).run()
+            return
+        
+        if args.leads and not is_record:
+            print("✗ --leads needs a MIT-BIH record (.dat)")
+            sys.exit(1)
+        leads = None if args.leads == 'all' else [int(k) for k in (args.leads or '').split(',') if k]
+        
+        if args.export:
+            # Headless: no window, Agg only
+            if is_record:
+                signals, names, rate = ECGVisualizer.load_dat_leads(
+                    record_path, leads if args.leads else [args.signal],
+                    args.max_samples)
+                if signals.shape[1] == 1:
+                    signals = signals[:, 0]
+            else:
+                signals, names, rate = ECGVisualizer.load_csv(args.file, args.max_samples), None, 360
+            run_export(args, ECGVisualizer.normalize(signals), rate, args.window, names,
+                       title=f'ECG {stem}', stem=stem,
+                       annotations=annotations)
+            return
+        
+        if args.leads:
+            signals, names, rate = ECGVisualizer.load_dat_leads(
+                record_path, leads, args.max_samples)
+            if signals.shape[1] == 1:
+                signals = signals[:, 0]         # one lead: the scalar ring buffer
+            viz = ECGVisualizer(window_size=args.window, num_leads=len(names),
+                                lead_names=names, annotations=annotations)
+            viz.sample_rate = rate
+            viz.visualize(viz.normalize(signals), args.loop)
+            return
+        
         # Create visualizer
-        viz = ECGVisualizer(window_size=args.window)
+        viz = ECGVisualizer(window_size=args.window, annotations=annotations)
         
         # Load data
-        file_path = Path(args.file)
-        
-        if file_path.suffix in ['.dat', '.hea'] or not file_path.suffix:
-            record_path = str(file_path.with_suffix(''))
+        if is_record:
             ecg_data_raw = viz.load_dat(record_path, args.signal, args.max_samples)
         else:
             ecg_data_raw = viz.load_csv(args.file, args.max_samples)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+MIF I/O - Read and write Quartus memory initialization files with NumPy
+
+The CNN weight ROMs (quartus_de2/weights/*.mif) hold one "addr : value;"
+line per 16-bit word. The array shape only appears in a comment
+("-- Original shape: (8, 1, 3)").
+
+read_mif() decodes the whole content block at once. The hex digits of every
+line go through a lookup table into a (words, digits) array, so parsing does
+not call int() per word. write_mif() does the reverse, building every line
+as rows of one uint8 array, and writes files byte-identical to the existing
+ones.
+
+load_weight_set() reads a whole directory of .mif files and caches it in
+one .npz next to them (weights_cache.npz). The cache is keyed by the
+SHA-1 of every .mif file, so editing, adding or removing a file rebuilds it.
+
+Usage:
+    weights = load_weight_set('../quartus_de2/weights')  # {'conv0_weight': int16 (8, 1, 3), ...}
+    write_mif('conv0_weight.mif', array)
+    python mif_io.py --check
+    python mif_io.py --from-npy ../quartus_de2/weights/npy --out ../quartus_de2/weights
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+WEIGHTS_DIR = Path(__file__).resolve().parent.parent / 'quartus_de2' / 'weights'
+CACHE_NAME = 'weights_cache.npz'
+FRAC_BITS = 8       # Q8.8
+
+_HEX_DIGITS = np.frombuffer(b'0123456789ABCDEF', dtype=np.uint8)
+_HEX_VALUE = np.full(256, 255, dtype=np.uint8)
+_HEX_VALUE[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX_VALUE[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+_HEX_VALUE[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+
+_RADIX = {'HEX': 16, 'DEC': 10, 'UNS': 10, 'BIN': 2, 'OCT': 8}
+_ENTRY = re.compile(rb'([0-9A-Fa-f]+)\s*:\s*(-?[0-9A-Fa-f]+)\s*;')
+_RANGE = re.compile(rb'\[\s*([0-9A-Fa-f]+)\s*\.\.\s*([0-9A-Fa-f]+)\s*\]\s*:\s*(-?[0-9A-Fa-f]+)\s*;')
+
+
+def _header_value(header, key, default=None):
+    match = re.search(rb'\b' + key + rb'\s*=\s*(\w+)\s*;', header)
+    return match.group(1).decode() if match else default
+
+
+def _hex_to_int(tokens):
+    """Decode a list of hex strings (bytes) to int64 without a per-item int()"""
+    if not tokens:
+        return np.empty(0, dtype=np.int64)
+    width = max(len(t) for t in tokens)
+    digits = np.char.rjust(np.array(tokens, dtype=f'S{width}'), width, b'0')
+    values = _HEX_VALUE[digits.view(np.uint8).reshape(len(tokens), width)]
+    if (values == 255).any():
+        raise ValueError("Invalid hex digit in MIF content")
+    return values.astype(np.int64) @ (16 ** np.arange(width - 1, -1, -1, dtype=np.int64))
+
+
+def _hex_columns(values, digits):
+    """Upper-case hex digits of int64 values as a (len, digits) uint8 array"""
+    shifts = 4 * np.arange(digits - 1, -1, -1, dtype=np.int64)
+    return _HEX_DIGITS[(values[:, None] >> shifts) & 0xF]
+
+
+def _text_columns(text, rows):
+    return np.broadcast_to(np.frombuffer(text, dtype=np.uint8), (rows, len(text)))
+
+
+def read_mif(path):
+    """
+    Read a .mif file into a signed array
+
+    Args:
+        path: .mif file
+
+    Returns:
+        int16 array (int32 if WIDTH > 16) with the shape from the
+        "-- Original shape" comment, or 1-D with DEPTH entries
+    """
+    data = Path(path).read_bytes()
+    begin = data.find(b'CONTENT')
+    if begin < 0:
+        raise ValueError(f"{path}: no CONTENT BEGIN block")
+    header, body = data[:begin], data[data.index(b'BEGIN', begin) + 5:]
+    end = body.rfind(b'END')
+    body = body[:end] if end >= 0 else body
+
+    width = int(_header_value(header, rb'WIDTH', '16'))
+    depth = int(_header_value(header, rb'DEPTH', '0'))
+    address_radix = _RADIX[_header_value(header, rb'ADDRESS_RADIX', 'HEX')]
+    data_radix = _RADIX[_header_value(header, rb'DATA_RADIX', 'HEX')]
+
+    words = np.zeros(depth, dtype=np.int64)
+
+    # Rare "[a..b] : value;" runs, then the plain entries
+    for match in _RANGE.finditer(body):
+        lo, hi = int(match.group(1), address_radix), int(match.group(2), address_radix)
+        words[lo:hi + 1] = int(match.group(3), data_radix)
+    if b'[' in body:
+        body = _RANGE.sub(b'', body)
+
+    entries = _ENTRY.findall(body)
+    if entries:
+        addresses, values = zip(*entries)
+        if address_radix == 16:
+            addresses = _hex_to_int(list(addresses))
+        else:
+            addresses = np.array([int(a, address_radix) for a in addresses], dtype=np.int64)
+        if data_radix == 16:
+            values = _hex_to_int(list(values))
+        else:
+            values = np.array([int(v, data_radix) for v in values], dtype=np.int64)
+        if depth == 0:
+            words = np.zeros(addresses.max() + 1, dtype=np.int64)
+        words[addresses] = values
+
+    # Two's complement of WIDTH bits
+    words &= (1 << width) - 1
+    words -= (words >> (width - 1)) << width
+    words = words.astype(np.int16 if width <= 16 else np.int32)
+
+    shape = re.search(rb'Original shape:\s*\(([^)]*)\)', header)
+    if shape:
+        dims = [int(d) for d in shape.group(1).split(b',') if d.strip()]
+        words = words[:int(np.prod(dims))].reshape(dims)
+    return words
+
+
+def write_mif(path, array, name=None, width=16):
+    """
+    Write an integer array as a .mif file (HEX radix, one word per line)
+
+    Args:
+        path: Output .mif file
+        array: Integer array, any shape (stored flattened, C order)
+        name: Name for the first comment line (default: file stem)
+        width: Word width in bits
+    """
+    path = Path(path)
+    array = np.asarray(array)
+    flat = array.reshape(-1).astype(np.int64) & ((1 << width) - 1)
+    depth = len(flat)
+
+    data_digits = (width + 3) // 4
+    address_digits = max(4, len(f'{max(depth - 1, 0):X}'))
+    shape = '(' + ', '.join(str(d) for d in array.shape) + (',)' if array.ndim == 1 else ')')
+
+    # Every line "  AAAA : VVVV;\n" as one row of a uint8 array
+    rows = np.concatenate([
+        _text_columns(b'  ', depth),
+        _hex_columns(np.arange(depth, dtype=np.int64), address_digits),
+        _text_columns(b' : ', depth),
+        _hex_columns(flat, data_digits),
+        _text_columns(b';\n', depth),
+    ], axis=1)
+
+    header = (f"-- {name or path.stem}\n"
+              f"-- Original shape: {shape}\n"
+              f"DEPTH = {depth};\n"
+              f"WIDTH = {width};\n"
+              "ADDRESS_RADIX = HEX;\n"
+              "DATA_RADIX = HEX;\n"
+              "CONTENT BEGIN\n").encode()
+    path.write_bytes(header + rows.tobytes() + b'END;\n')
+
+
+def quantize(array, frac_bits=FRAC_BITS, width=16):
+    """
+    Round float weights to fixed point, saturating to the word width
+
+    Args:
+        array: Float weights (e.g. from a retrained model)
+        frac_bits: Fractional bits (8 for the engines' Q8.8)
+        width: Word width in bits
+
+    Returns:
+        int16 array (int32 if width > 16)
+    """
+    limit = 1 << (width - 1)
+    fixed = np.clip(np.round(np.asarray(array, dtype=np.float64) * (1 << frac_bits)), -limit, limit - 1)
+    return fixed.astype(np.int16 if width <= 16 else np.int32)
+
+
+def _directory_key(files):
+    """SHA-1 over the names and contents of all .mif files"""
+    digest = hashlib.sha1()
+    for f in files:
+        digest.update(f.name.encode() + b'\0' + hashlib.sha1(f.read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def load_weight_set(directory=WEIGHTS_DIR, cache=True):
+    """
+    Load every .mif file in a directory, through the .npz cache
+
+    Args:
+        directory: Directory with the .mif files
+        cache: Use and refresh <directory>/weights_cache.npz
+
+    Returns:
+        dict {file stem: array}
+    """
+    directory = Path(directory)
+    files = sorted(directory.glob('*.mif'))
+    if not files:
+        raise FileNotFoundError(f"No .mif files in {directory}")
+    key = _directory_key(files)
+    cache_path = directory / CACHE_NAME
+
+    if cache and cache_path.exists():
+        try:
+            with np.load(cache_path) as bundle:
+                if str(bundle['__key__']) == key:
+                    return {k: bundle[k] for k in bundle.files if k != '__key__'}
+        except (OSError, ValueError, KeyError):
+            pass                                    # unreadable cache: rebuild
+
+    weights = {f.stem: read_mif(f) for f in files}
+    if cache:
+        try:
+            # Write to a temp file first so a concurrent reader never sees half a cache
+            fd, tmp = tempfile.mkstemp(suffix='.npz', dir=directory)
+            with os.fdopen(fd, 'wb') as out:
+                np.savez(out, __key__=np.array(key), **weights)
+            os.replace(tmp, cache_path)
+        except OSError as e:
+            print(f"⚠ Could not write weight cache {cache_path}: {e}")
+    return weights
+
+
+def save_weight_set(directory, weights, width=16):
+    """
+    Write one .mif file per array (e.g. after retraining)
+
+    Args:
+        directory: Output directory (created if missing)
+        weights: dict {name: integer array}, see quantize() for float weights
+        width: Word width in bits
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, array in weights.items():
+        write_mif(directory / f'{name}.mif', array, name=name, width=width)
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Read, cache and regenerate the CNN weight .mif files',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Load the weight set (builds the cache the first time) and time it
+  python mif_io.py --check
+
+  # Regenerate the .mif files from .npy arrays (float arrays are quantized to Q8.8)
+  python mif_io.py --from-npy ../quartus_de2/weights/npy --out ../quartus_de2/weights
+        """
+    )
+
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--check', action='store_true',
+                        help='Load the weight set, time it and check a write/read round trip')
+    parser.add_argument('--from-npy', metavar='DIR', default=None,
+                        help='Write .mif files from the .npy arrays in DIR')
+    parser.add_argument('--out', default=None,
+                        help='Output directory for --from-npy (default: --weights)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Parse the .mif files even if the cache is current')
+
+    args = parser.parse_args()
+
+    if not (args.check or args.from_npy):
+        parser.print_help()
+        sys.exit(1)
+
+    if args.from_npy:
+        arrays = {}
+        for f in sorted(Path(args.from_npy).glob('*.npy')):
+            array = np.load(f)
+            arrays[f.stem] = array if np.issubdtype(array.dtype, np.integer) else quantize(array)
+        if not arrays:
+            print(f"✗ No .npy files in {args.from_npy}")
+            sys.exit(1)
+        start = time.perf_counter()
+        save_weight_set(args.out or args.weights, arrays)
+        print(f"✓ Wrote {len(arrays)} .mif files to {args.out or args.weights} "
+              f"in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    if args.check:
+        try:
+            start = time.perf_counter()
+            weights = load_weight_set(args.weights, cache=not args.no_cache)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            load_weight_set(args.weights, cache=not args.no_cache)
+            second = time.perf_counter() - start
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        params = sum(w.size for w in weights.values())
+        print(f"✓ Loaded {len(weights)} arrays ({params} words): "
+              f"{first * 1e3:.1f} ms, then {second * 1e3:.1f} ms")
+        for name, w in weights.items():
+            print(f"  {name:20s} {str(w.shape):14s} [{w.min()}, {w.max()}]")
+
+        # Writing back must reproduce the files byte for byte
+        with tempfile.TemporaryDirectory() as tmp:
+            save_weight_set(tmp, weights)
+            changed = [n for n in weights
+                       if (Path(tmp) / f'{n}.mif').read_bytes() != (Path(args.weights) / f'{n}.mif').read_bytes()]
+        if changed:
+            print(f"⚠ Round trip differs from the original for: {', '.join(changed)}")
+        else:
+            print("✓ Round trip reproduces every .mif file byte for byte")
+
+
+if __name__ == '__main__':
+    main()
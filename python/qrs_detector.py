@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+"""
+QRS Detector - Streaming Pan-Tompkins R-peak detection
+
+Finds heartbeats in the sample stream so the CNN can run on beat-centred
+128-sample windows, instead of windows cut blindly from the stream. At
+normal heart rates that is about one window per second instead of 2.8
+(stride 128) or 11 (stride 32).
+
+QRSDetector takes the samples in chunks of any size. Filter tails and
+thresholds carry over from one chunk to the next, so the output does not
+depend on how the stream is split. Every stage is O(1) per sample:
+
+    band-pass   Pan-Tompkins low-pass (two boxcars) and high-pass (all-pass
+                minus a boxcar), scaled from 200 Hz to the sample rate
+                and applied as a single linear-phase FIR (delay known exactly)
+    derivative  5-point, then squared
+    integrator  150 ms moving window
+    decision    MWI peaks against adaptive signal/noise levels (SPKI, NPKI),
+                200 ms refractory, T-wave slope check within 360 ms and
+                search-back at THR/2 after 1.66 average RR without a beat.
+                The R peak is the largest band-pass excursion under the
+                integrator window, moved back by the filter delay.
+
+BeatMarkers runs the detector a little ahead of a streaming loop and says
+which sample completes a beat-centred window. The streamers then set bit 4
+of the second UART byte on that sample (uart_receiver.vhd ignores bits 7..4).
+
+Feed the detector the physical signal, not the 12-bit samples: the
+streamer clips those at +-1 SD, which flattens the R waves (F1 drops to
+87% on 208 and 75% on 214).
+
+Usage:
+    detector = QRSDetector(360)
+    for chunk in chunks:
+        peaks = detector.process(chunk)       # absolute sample numbers
+    python qrs_detector.py "../ECG signals/PVC/208"
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+
+from ecg_dat_reader import BEAT_CODES, bundled_records, open_record, read_annotation_file
+from ecg_synth import is_synth_path
+
+WINDOW = 128
+
+# Bit set in the second UART byte of a sample that completes a beat window
+BEAT_FLAG = 0x10
+
+# Match tolerance for detections against annotations (ANSI/AAMI EC57)
+MATCH_TOLERANCE = 0.150
+
+
+def _boxcar(length):
+    return np.ones(length) / length
+
+
+def bandpass_kernel(sample_rate):
+    """
+    Pan-Tompkins band-pass (about 5-15 Hz) as one FIR
+
+    Returns:
+        (taps, delay in samples)
+    """
+    scale = sample_rate / 200.0
+    low = max(1, round(6 * scale))
+    high = 2 * round(16 * scale) + 1           # odd, so the delay is an integer
+    allpass = np.zeros(high)
+    allpass[high // 2] = 1.0
+    taps = np.convolve(np.convolve(_boxcar(low), _boxcar(low)), allpass - _boxcar(high))
+    return taps, (low - 1) + high // 2
+
+
+class _FIR:
+    """FIR filter that keeps its input tail between chunks"""
+
+    def __init__(self, taps):
+        self.taps = taps
+        self.tail = None
+
+    def __call__(self, x):
+        if self.tail is None:
+            # Start as if the signal had always been at its first value
+            self.tail = np.full(len(self.taps) - 1, x[0] if len(x) else 0.0)
+        ext = np.concatenate([self.tail, x])
+        self.tail = ext[len(ext) - len(self.taps) + 1:]
+        return np.convolve(ext, self.taps, mode='valid')
+
+
+class QRSDetector:
+    """Incremental Pan-Tompkins QRS detector"""
+
+    def __init__(self, sample_rate=360, learning=2.0):
+        """
+        Args:
+            sample_rate: Samples per second
+            learning: Seconds used to set the first thresholds
+        """
+        self.fs = sample_rate
+        taps, self.delay = bandpass_kernel(sample_rate)
+        self.integration = max(1, round(0.150 * sample_rate))
+        self.refractory = round(0.200 * sample_rate)
+        self.t_wave = round(0.360 * sample_rate)
+        self.learn_until = round(learning * sample_rate)
+
+        self._bandpass = _FIR(taps)
+        self._derivative = _FIR(np.array([1.0, 2.0, 0.0, -2.0, -1.0]) / 8)
+        self._integrator = _FIR(_boxcar(self.integration))
+        self._history = self.integration + 8
+        self._bp = np.zeros(0)          # recent band-pass / derivative values
+        self._der = np.zeros(0)
+        self._edge = np.zeros(2)        # last two integrator values
+        self.position = 0               # samples seen so far
+
+        # Decision state
+        self._learning = []             # candidates until the levels exist
+        self._learn_max = 0.0
+        self._learn_sum = 0.0
+        self.spki = self.npki = None
+        self.rr = deque(maxlen=8)
+        self._last = None               # integrator index of the last QRS
+        self._last_slope = 0.0
+        self._best_noise = None         # search-back candidate
+        self._found = []
+
+    @property
+    def threshold(self):
+        """THR_I1 of the integrated signal"""
+        return self.npki + 0.25 * (self.spki - self.npki)
+
+    def _rr_mean(self):
+        return np.mean(self.rr) if self.rr else self.fs
+
+    def _accept(self, index, peak, slope):
+        if self._last is not None:
+            self.rr.append(index - self._last)
+        self._last = index
+        self._last_slope = slope
+        self._best_noise = None
+        self._found.append(peak)
+
+    def _search_back(self, now):
+        """Take the best sub-threshold peak if a beat is overdue"""
+        if (self._best_noise is not None and self._last is not None
+                and now - self._last > 1.66 * self._rr_mean()):
+            value, index, peak, slope = self._best_noise
+            self.spki = 0.25 * value + 0.75 * self.spki
+            self._accept(index, peak, slope)
+
+    def _decide(self, value, index, peak, slope):
+        """Pan-Tompkins rules for one integrator peak"""
+        self._search_back(index)
+        since = index - self._last if self._last is not None else None
+        if since is not None and since < self.refractory:
+            return
+        threshold = self.threshold
+        if value > threshold:
+            if since is not None and since < self.t_wave and slope < 0.5 * self._last_slope:
+                self.npki = 0.125 * value + 0.875 * self.npki    # T wave
+                return
+            self.spki = 0.125 * value + 0.875 * self.spki
+            self._accept(index, peak, slope)
+        else:
+            self.npki = 0.125 * value + 0.875 * self.npki
+            if value > 0.5 * threshold and (self._best_noise is None or value > self._best_noise[0]):
+                self._best_noise = (value, index, peak, slope)
+
+    def process(self, chunk):
+        """
+        Feed the next samples of the stream
+
+        Args:
+            chunk: Samples (any numeric dtype, any length)
+
+        Returns:
+            int64 array of R-peak sample numbers found so far in this call
+        """
+        x = np.asarray(chunk, dtype=np.float64)
+        if not len(x):
+            return np.zeros(0, dtype=np.int64)
+        start = self.position
+        self.position += len(x)
+
+        bp = self._bandpass(x)
+        der = self._derivative(bp)
+        mwi = self._integrator(der * der)
+
+        # Recent history, indexed from `base`, to locate peaks near the chunk start
+        bp_ext = np.concatenate([self._bp, bp])
+        der_ext = np.abs(np.concatenate([self._der, der]))
+        base = start - len(self._bp)
+        self._bp, self._der = bp_ext[-self._history:], der_ext[-self._history:]
+
+        # Integrator peaks: y[m-1] < y[m] >= y[m+1], m from start - 1
+        ext = np.concatenate([self._edge, mwi])
+        self._edge = ext[-2:]
+        k = np.flatnonzero((ext[1:-1] > ext[:-2]) & (ext[1:-1] >= ext[2:])) + 1
+        indices = start - 2 + k
+
+        for index, value in zip(indices.tolist(), ext[k].tolist()):
+            lo = max(index - self.integration - 4, base) - base
+            hi = index + 1 - base
+            if hi <= lo:
+                continue
+            peak = lo + int(np.argmax(np.abs(bp_ext[lo:hi]))) + base - self.delay
+            slope = float(der_ext[lo:hi].max())
+            if self.spki is None:
+                self._learning.append((value, index, peak, slope))
+            else:
+                self._decide(value, index, peak, slope)
+
+        if self.spki is None:
+            learn = mwi[:self.learn_until - start]
+            self._learn_max = max(self._learn_max, float(learn.max()))
+            self._learn_sum += float(learn.sum())
+            if self.position >= self.learn_until:
+                self.spki = self._learn_max / 3
+                self.npki = self._learn_sum / self.learn_until / 2
+                for candidate in self._learning:
+                    self._decide(*candidate)
+                self._learning = []
+        else:
+            self._search_back(self.position - 1)
+
+        found = np.array(sorted(p for p in self._found if p >= 0), dtype=np.int64)
+        self._found = []
+        return found
+
+
+def detect(samples, sample_rate=360, chunk=None):
+    """
+    R peaks of a whole signal
+
+    Args:
+        samples: Signal
+        sample_rate: Samples per second
+        chunk: Feed in chunks of this many samples (default: all at once)
+
+    Returns:
+        int64 array of R-peak sample numbers
+    """
+    detector = QRSDetector(sample_rate)
+    chunk = chunk or max(1, len(samples))
+    parts = [detector.process(samples[i:i + chunk]) for i in range(0, len(samples), chunk)]
+    return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+def beat_windows(peaks, length, window=WINDOW):
+    """
+    Start samples of windows centred on each beat
+
+    Args:
+        peaks: R-peak sample numbers
+        length: Signal length (windows must fit inside)
+        window: Window length
+
+    Returns:
+        int64 array of window starts
+    """
+    starts = np.asarray(peaks, dtype=np.int64) - window // 2
+    return starts[(starts >= 0) & (starts <= length - window)]
+
+
+class BeatMarkers:
+    """Per-sample beat-window flags for a streaming loop"""
+
+    def __init__(self, samples, sample_rate=360, window=WINDOW, lookahead=2.0):
+        """
+        Args:
+            samples: The whole signal being streamed
+            sample_rate: Samples per second
+            window: CNN window length
+            lookahead: Seconds the detector runs ahead of the sender
+        """
+        self.samples = samples
+        self.fs = sample_rate
+        self.window = window
+        self.lookahead = round(lookahead * sample_rate)
+        self.step = max(1, sample_rate // 10)
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        self.detector = QRSDetector(self.fs)
+        self.fed = 0
+        self.last = -1
+        self.pending = deque()
+
+    def __call__(self, i):
+        """
+        True if sample i is the last sample of a beat-centred window
+
+        Call with increasing i; a smaller i (looped playback) restarts.
+        """
+        if i < self.last:
+            self._reset()
+        self.last = i
+        target = min(len(self.samples), i + self.lookahead + 1)
+        while self.fed < target:
+            chunk = self.samples[self.fed:self.fed + self.step]
+            self.fed += len(chunk)
+            for start in beat_windows(self.detector.process(chunk), len(self.samples), self.window):
+                self.pending.append(int(start) + self.window - 1)
+        while self.pending and self.pending[0] < i:
+            self.pending.popleft()                      # found too late
+        if self.pending and self.pending[0] == i:
+            self.pending.popleft()
+            self.count += 1
+            return True
+        return False
+
+
+def match_beats(reference, detected, tolerance):
+    """
+    One-to-one matching of detections to annotated beats
+
+    Args:
+        reference, detected: Sorted sample numbers
+        tolerance: Largest distance of a match, in samples
+
+    Returns:
+        (true positives, false positives, false negatives)
+    """
+    i = j = tp = 0
+    while i < len(reference) and j < len(detected):
+        if abs(detected[j] - reference[i]) <= tolerance:
+            tp += 1
+            i += 1
+            j += 1
+        elif detected[j] < reference[i]:
+            j += 1
+        else:
+            i += 1
+    return tp, len(detected) - tp, len(reference) - tp
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Streaming Pan-Tompkins QRS detection, scored against .atr annotations',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Detection F1 on every bundled record, fed in 1 s chunks
+  python qrs_detector.py
+
+  # One record, chunks of 100 ms as the streamer would feed them
+  python qrs_detector.py "../ECG signals/PVC/208" --chunk 36
+        """
+    )
+
+    parser.add_argument('records', nargs='*',
+                        help='MIT-BIH records (default: every bundled record)')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Signal index to use (default: 0)')
+    parser.add_argument('--chunk', type=int, default=360,
+                        help='Samples per detector call (default: 360)')
+    parser.add_argument('--tolerance', type=float, default=MATCH_TOLERANCE,
+                        help=f'Match tolerance in seconds (default: {MATCH_TOLERANCE})')
+    parser.add_argument('--stride', type=int, default=WINDOW,
+                        help=f'Blind window stride to compare the CNN work with (default: {WINDOW})')
+
+    args = parser.parse_args()
+
+    if args.chunk < 1 or args.stride < 1:
+        print("✗ --chunk and --stride must be at least 1")
+        sys.exit(1)
+
+    records = [Path(r) for r in args.records]
+    if not records:
+        records, missing = bundled_records()
+        for record in missing:
+            print(f"⚠ Skipping {record.name}: no .dat file")
+
+    totals = np.zeros(3, dtype=np.int64)
+    for record in records:
+        print(f"\n▶ {record}")
+        try:
+            reader = open_record(record)
+            signal = reader.read_signal(args.lead)
+        except (FileNotFoundError, ValueError, NotImplementedError) as e:
+            print(f"✗ {e}")
+            continue
+        fs = reader.sample_rate
+
+        start = time.perf_counter()
+        peaks = detect(signal, fs, args.chunk)
+        elapsed = time.perf_counter() - start
+        print(f"✓ {len(peaks)} beats in {elapsed:.2f} s "
+              f"({len(signal) / elapsed / 1e6:.1f} M samples/s, chunks of {args.chunk})")
+        if not np.array_equal(peaks, detect(signal, fs)):
+            print("⚠ Chunked detections differ from a single pass")
+
+        blind = (len(signal) - WINDOW) // args.stride + 1
+        beats = len(beat_windows(peaks, len(signal)))
+        print(f"  CNN windows: {beats} beat-centred vs {blind} at stride {args.stride} "
+              f"({blind / max(beats, 1):.1f}x fewer)")
+
+        if is_synth_path(record):
+            ann, source = reader.read_annotations(), 'generator beats'
+        else:
+            atr = record.with_suffix('.atr')
+            if not atr.exists():
+                continue
+            ann, source = read_annotation_file(atr), atr.name
+        reference = ann['sample'][np.isin(ann['code'], list(BEAT_CODES))]
+        tp, fp, fn = match_beats(reference, peaks, round(args.tolerance * fs))
+        totals += (tp, fp, fn)
+        print(f"  vs {source}: TP {tp}  FP {fp}  FN {fn}  "
+              f"Se {100 * tp / max(tp + fn, 1):.2f}%  +P {100 * tp / max(tp + fp, 1):.2f}%  "
+              f"F1 {200 * tp / max(2 * tp + fp + fn, 1):.2f}%")
+
+    tp, fp, fn = totals.tolist()
+    if tp + fp + fn:
+        print(f"\n✓ Overall: Se {100 * tp / max(tp + fn, 1):.2f}%  +P {100 * tp / max(tp + fp, 1):.2f}%  "
+              f"F1 {200 * tp / max(2 * tp + fp + fn, 1):.2f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ Usage:
     python ecg_stream_and_visualize.py --port COM3 --file data/normal_ecg.csv
     python ecg_stream_and_visualize.py --port COM3 --file data/normal_ecg.csv --loop
     python ecg_stream_and_visualize.py --port COM3 --file "../ECG signals/15814" --signal 0
+    python runner.py --file "../ECG signals/Normal/100" --export 100.mp4 --speed 10
 
 Author: Marly
 Date: March 2026
@@ -18,10 +19,8 @@ Version: 1.0
 
 import serial
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as pltcd sc
+import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
-from collections import deque
 import threading
 import queue
 import time
@@ -31,16 +30,31 @@ from pathlib import Path
 
 # Optional MIT-BIH reader
 try:
-    from ecg_dat_reader import MITBIHReader
+    from ecg_dat_reader import MITBIHReader, open_record, record_name
 except ImportError:
     MITBIHReader = None
 
+from ecg_csv import load_csv
+from ecg_synth import is_synth_path
+from ecg_realtime import add_realtime_args, apply_realtime
+from ecg_annotations import AnnotationIndex, AnnotationOverlay
+from ecg_decimate import MinMaxEnvelope, pixel_columns
+from ecg_export import add_export_args, run_export
+from qrs_detector import BEAT_FLAG, BeatMarkers
+from ecg_ring_buffer import RingBuffer
+from ecg_shm import ShmRingWriter
+from ecg_transport import ResilientSerial, open_transport
+
 
 # ---------------------------------------------------------------------------
 # Shared state between streamer thread and visualizer (main thread)
 # ---------------------------------------------------------------------------
-sample_queue: queue.Queue = queue.Queue(maxsize=2000)   # streamer → visualizer
+# The streamer hands over (first sample number, chunk) pairs, where chunk is
+# a NumPy view into the prepared display array - no per-sample objects.
+HANDOFF_HZ = 60                                           # chunks per second
+sample_queue: queue.Queue = queue.Queue(maxsize=600)     # streamer → visualizer
 stop_event: threading.Event = threading.Event()          # signal shutdown
+handoff_stats = {'chunks': 0, 'dropped': 0}              # dropped = samples
 
 
 # ---------------------------------------------------------------------------
@@ -48,43 +62,41 @@ stop_event: threading.Event = threading.Event()          # signal shutdown
 # ---------------------------------------------------------------------------
 
 class ECGStreamer:
-    """Stream ECG data to FPGA via UART and push each sample to sample_queue."""
+    """Stream ECG data to FPGA via UART and push sample chunks to sample_queue."""
 
-    def __init__(self, port, baud=115200):
+    def __init__(self, port, baud=115200, reconnect=False):
         try:
-            self.ser = serial.Serial(port, baud, timeout=1)
+            # reconnect=True survives adapter resets: reconnects and resumes in place
+            self.ser = open_transport(port, baud, timeout=1, reconnect=reconnect)
             print(f"✓ Connected to {port} at {baud} baud")
         except serial.SerialException as e:
             print(f"✗ Error opening serial port: {e}")
             sys.exit(1)
 
-    def load_ecg_csv(self, filename):
+    @staticmethod
+    def load_ecg_csv(filename):
         try:
-            df = pd.read_csv(filename)
-            ecg_col = None
-            for col in ['ECG', 'ecg', 'signal', 'value', '0']:
-                if col in df.columns:
-                    ecg_col = col
-                    break
-            data = df.iloc[:, 0].values if ecg_col is None else df[ecg_col].values
+            data = load_csv(filename)
             print(f"✓ Loaded {len(data)} samples from {filename}")
             return data
         except Exception as e:
             print(f"✗ Error loading CSV: {e}")
             sys.exit(1)
 
-    def load_dat(self, record_path, signal_num=0, max_samples=None):
+    @staticmethod
+    def load_dat(record_path, signal_num=0, max_samples=None):
         if MITBIHReader is None:
             print("✗ MIT-BIH reader not available")
             sys.exit(1)
-        reader = MITBIHReader(record_path)
+        reader = open_record(record_path)
         signal = reader.read_signal(signal_num)
         if max_samples and len(signal) > max_samples:
             signal = signal[:max_samples]
         print(f"✓ Loaded MIT-BIH: {len(signal)} samples")
         return signal
 
-    def convert_to_12bit(self, ecg_data):
+    @staticmethod
+    def convert_to_12bit(ecg_data):
         ecg_norm = (ecg_data - np.mean(ecg_data)) / np.std(ecg_data)
         ecg_norm = np.clip(ecg_norm, -1.0, 1.0)
         ecg_12bit = (ecg_norm * 2047).astype(int)
@@ -92,8 +104,8 @@ class ECGStreamer:
         print(f"✓ Converted to 12-bit: min={ecg_12bit.min()}, max={ecg_12bit.max()}")
         return ecg_12bit, ecg_norm   # also return normalized floats for display
 
-    def send_sample(self, sample_int):
-        """Send one 12-bit signed sample as 2 bytes via UART."""
+    def send_sample(self, sample_int, marker=False):
+        """Send one 12-bit signed sample as 2 bytes via UART (marker: beat flag bit)."""
         if sample_int < 0:
             sample_u = (1 << 12) + sample_int
         else:
@@ -101,36 +113,67 @@ class ECGStreamer:
         sample_u &= 0xFFF
         byte1 = sample_u & 0xFF
         byte2 = (sample_u >> 8) & 0x0F
+        if marker:
+            byte2 |= BEAT_FLAG
         self.ser.write(bytes([byte1, byte2]))
 
-    def stream_ecg(self, ecg_12bit, ecg_norm, sample_rate=360, loop=False):
+    def stream_ecg(self, ecg_12bit, ecg_norm, sample_rate=360, loop=False,
+                   cpu=None, rt_priority=None, rt_policy='fifo', shm_writer=None,
+                   markers=None):
         """
-        Stream to FPGA and push normalized float to sample_queue for display.
+        Stream to FPGA and hand chunks of ecg_norm to sample_queue for display.
         Runs until stop_event is set or data ends (if not looping).
+        cpu / rt_priority / rt_policy pin and prioritise this thread.
+        With shm_writer (ecg_shm.ShmRingWriter) chunks go to the shared
+        memory ring instead, for out-of-process viewers.
+        With markers (qrs_detector.BeatMarkers) the last sample of each
+        beat-centred window carries the beat flag.
         """
+        apply_realtime(cpu, rt_priority, rt_policy)
+
         period = 1.0 / sample_rate
         count = 0
         start = time.perf_counter()
 
+        # Publish roughly HANDOFF_HZ chunks per second, independent of rate
+        chunk_size = max(1, round(sample_rate / HANDOFF_HZ))
+        handoff_stats['chunks'] = 0
+        handoff_stats['dropped'] = 0
+
+        def publish(first, stop):
+            """Queue ecg_norm[first:stop] (a view) tagged with its sample number"""
+            n = stop - first
+            if n <= 0:
+                return
+            if shm_writer is not None:
+                shm_writer.write(ecg_norm[first:stop])
+                handoff_stats['chunks'] += 1
+                return
+            try:
+                sample_queue.put_nowait((count - n, ecg_norm[first:stop]))
+                handoff_stats['chunks'] += 1
+            except queue.Full:
+                handoff_stats['dropped'] += n   # visualizer stalled; count, don't block
+
         print(f"\n▶ Streaming {len(ecg_12bit)} samples at {sample_rate} Hz")
         print(f"  Loop: {loop}  |  Press Ctrl-C or close plot to stop\n")
 
         try:
             while not stop_event.is_set():
+                chunk_start = sent = 0
                 for i in range(len(ecg_12bit)):
                     if stop_event.is_set():
                         break
 
                     # 1. Send over UART
-                    self.send_sample(int(ecg_12bit[i]))
-
-                    # 2. Push normalized float to visualizer queue (non-blocking)
-                    try:
-                        sample_queue.put_nowait(float(ecg_norm[i]))
-                    except queue.Full:
-                        pass   # visualizer is falling behind; drop sample
-
+                    self.send_sample(int(ecg_12bit[i]), markers is not None and markers(i))
                     count += 1
+                    sent = i + 1
+
+                    # 2. Hand a chunk to the visualizer (non-blocking)
+                    if sent - chunk_start >= chunk_size:
+                        publish(chunk_start, sent)
+                        chunk_start = sent
 
                     if count % sample_rate == 0:
                         elapsed = time.perf_counter() - start
@@ -141,6 +184,9 @@ class ECGStreamer:
                     # Pace the loop
                     time.sleep(period)
 
+                # Chunks never straddle the end of the array
+                publish(chunk_start, sent)
+
                 if not loop:
                     break
                 print("  ↻ Looping playback...")
@@ -151,6 +197,12 @@ class ECGStreamer:
             elapsed = time.perf_counter() - start
             print(f"\n✓ Streamer stopped | {count} samples sent | "
                   f"{elapsed:.1f}s | avg {count/max(elapsed,1e-9):.1f} Hz")
+            print(f"  Display hand-off: {handoff_stats['chunks']} chunks, "
+                  f"{handoff_stats['dropped']} samples dropped")
+            if markers is not None:
+                print(f"  Beat markers: {markers.count}")
+            if isinstance(self.ser, ResilientSerial):
+                print(f"  Link: {self.ser.gap_summary()}")
             stop_event.set()   # tell visualizer we are done
             self.ser.close()
             print("✓ Serial port closed")
@@ -163,14 +215,19 @@ class ECGStreamer:
 class ECGVisualizer:
     """Live scrolling ECG display fed from sample_queue."""
 
-    def __init__(self, window_size=1000, sample_rate=360):
+    def __init__(self, window_size=1000, sample_rate=360, fps=30,
+                 annotations=None, record_length=None):
+        """
+        annotations (ecg_annotations.AnnotationIndex) adds beat labels;
+        record_length maps looped sample numbers back onto the record.
+        """
         self.window_size = window_size
         self.sample_rate = sample_rate
+        self.fps = fps                 # display rate, independent of sample rate
         self.sample_count = 0
         self.start_time = None
 
-        self.plot_buffer = deque(maxlen=window_size)
-        self.x_buffer = deque(maxlen=window_size)
+        self.plot_buffer = RingBuffer(window_size)
 
         plt.style.use('seaborn-v0_8-darkgrid')
         self.fig, self.ax = plt.subplots(figsize=(14, 7))
@@ -193,48 +250,65 @@ class ECGVisualizer:
         )
         plt.tight_layout()
 
+        # Draw a min/max envelope at ~2 points per pixel column
+        self.envelope = MinMaxEnvelope(window_size, pixel_columns(self.ax))
+        self.fig.canvas.mpl_connect('resize_event', self._on_resize)
+
         # Close handler: stop streamer when user closes the window
         self.fig.canvas.mpl_connect('close_event', self._on_close)
 
+        self.overlay = None
+        self.record_length = record_length
+        if annotations is not None:
+            self.overlay = AnnotationOverlay(self.ax, annotations)
+
+    def _on_resize(self, event):
+        self.envelope.rebuild(self.plot_buffer, pixel_columns(self.ax))
+
     def _on_close(self, event):
         print("\n  Plot window closed — signalling streamer to stop…")
         stop_event.set()
 
     def update_frame(self, frame):
         """Called by FuncAnimation on every interval tick."""
-        # Drain as many samples as arrived since last frame
-        drained = 0
-        while not sample_queue.empty() and drained < 20:
+        # Drain every chunk that arrived since the last frame
+        while True:
             try:
-                sample = sample_queue.get_nowait()
-                self.plot_buffer.append(sample)
-                self.x_buffer.append(self.sample_count)
-                self.sample_count += 1
-                drained += 1
+                first, chunk = sample_queue.get_nowait()
             except queue.Empty:
                 break
+            n = len(chunk)
+            self.plot_buffer.extend(chunk)
+            self.envelope.extend(chunk, first)   # a gap starts a new bucket
+            self.sample_count = first + n   # sample numbers include dropped ones
 
         if len(self.plot_buffer) > 0:
-            self.line.set_data(list(self.x_buffer), list(self.plot_buffer))
-            x_max = self.x_buffer[-1]
+            self.line.set_data(*self.envelope.envelope())
+            x_max = self.envelope.last_index
             x_min = max(0, x_max - self.window_size)
             self.ax.set_xlim(x_min, x_max)
 
+            if self.overlay is not None:
+                self.overlay.update(x_min, x_max + 1, period=self.record_length)
+
             if self.start_time:
                 elapsed = time.time() - self.start_time
                 rate = self.sample_count / elapsed if elapsed > 0 else 0
                 self.status_text.set_text(
                     f'Samples: {self.sample_count:6d} | '
                     f'Time: {elapsed:6.1f}s | '
-                    f'Rate: {rate:6.1f} Hz'
+                    f'Rate: {rate:6.1f} Hz | '
+                    f'Dropped: {handoff_stats["dropped"]}'
                 )
 
+        if self.overlay is not None:
+            return (self.line, *self.overlay.artists, self.status_text)
         return self.line, self.status_text
 
     def run(self):
         """Start the animation loop (blocking — call from main thread)."""
         self.start_time = time.time()
-        interval_ms = max(1, int(1000.0 / self.sample_rate))
+        interval_ms = max(1, int(1000.0 / self.fps))
 
         ani = FuncAnimation(
             self.fig,
@@ -260,12 +334,24 @@ Examples:
   python ecg_stream_and_visualize.py --port COM3 --file data/normal_ecg.csv
   python ecg_stream_and_visualize.py --port COM3 --file data/normal_ecg.csv --loop
   python ecg_stream_and_visualize.py --port COM3 --file "../ECG signals/15814" --signal 0
+
+  # Display in a separate process (no GUI work in the streaming process)
+  python runner.py --port COM3 --file data/normal_ecg.csv --loop --shm ecg
+  python ecg_shm_viewer.py --shm ecg
+
+  # Headless export of what the live plot would show (no port, no window)
+  python runner.py --file "../ECG signals/Normal/100" --export 100.mp4 --speed 10 --workers 4
+  python runner.py --file data/normal_ecg.csv --export strips/
+
+  # Flag the last sample of each beat-centred 128-sample window (qrs_detector.py)
+  python runner.py --port COM3 --file "../ECG signals/PVC/208" --beat-markers
         """
     )
-    parser.add_argument('--port', '-p', required=True,
-                        help='Serial port (e.g., COM3, /dev/ttyUSB0)')
+    parser.add_argument('--port', '-p', default=None,
+                        help='Serial port or URL (e.g., COM3, socket://host:port, relay://host:port); '
+                             'required unless --export')
     parser.add_argument('--file', '-f', required=True,
-                        help='ECG data file (.csv or MIT-BIH .dat)')
+                        help='ECG data file (.csv, MIT-BIH .dat or "synth:...", see ecg_synth.py)')
     parser.add_argument('--signal', '-s', type=int, default=0,
                         help='Signal index for .dat files (default: 0)')
     parser.add_argument('--rate', '-r', type=int, default=360,
@@ -276,36 +362,90 @@ Examples:
                         help='Loop playback indefinitely')
     parser.add_argument('--window', '-w', type=int, default=1000,
                         help='Display window size in samples (default: 1000)')
+    parser.add_argument('--fps', type=int, default=30,
+                        help='Display refresh rate in frames per second (default: 30)')
     parser.add_argument('--max-samples', '-m', type=int, default=None,
                         help='Limit number of samples loaded (default: all)')
+    parser.add_argument('--reconnect', action='store_true',
+                        help='Re-open the port and resume if the adapter resets')
+    parser.add_argument('--no-annotations', action='store_true',
+                        help="Hide beat labels from the record's .atr file")
+    parser.add_argument('--shm', metavar='NAME', default=None,
+                        help='No local plot: publish to shared memory NAME for '
+                             'ecg_shm_viewer.py')
+    parser.add_argument('--beat-markers', action='store_true',
+                        help='Set bit 4 of the second byte on the sample that completes '
+                             'a beat-centred window')
+    add_realtime_args(parser)
+    add_export_args(parser)
 
     args = parser.parse_args()
 
+    if args.port is None and not args.export:
+        parser.error('--port is required (unless --export)')
+
     # ── Validate inputs ────────────────────────────────────────────────────
     file_path = Path(args.file)
-    is_dat = file_path.suffix in ['.dat', '.hea'] or not file_path.suffix
+    is_synth = is_synth_path(args.file)             # ecg_synth.py pseudo-record
+    is_dat = is_synth or file_path.suffix in ['.dat', '.hea'] or not file_path.suffix
 
     if not is_dat and not file_path.exists():
         print(f"✗ File not found: {args.file}")
         sys.exit(1)
 
     # ── Load data ──────────────────────────────────────────────────────────
-    streamer = ECGStreamer(args.port, args.baud)
-
     if is_dat:
-        record_path = str(file_path.with_suffix(''))
-        ecg_raw = streamer.load_dat(record_path, args.signal, args.max_samples)
+        record_path = args.file if is_synth else str(file_path.with_suffix(''))
+        ecg_raw = ECGStreamer.load_dat(record_path, args.signal, args.max_samples)
     else:
-        ecg_raw = streamer.load_ecg_csv(args.file)
+        ecg_raw = ECGStreamer.load_ecg_csv(args.file)
         if args.max_samples and len(ecg_raw) > args.max_samples:
             ecg_raw = ecg_raw[:args.max_samples]
 
-    ecg_12bit, ecg_norm = streamer.convert_to_12bit(ecg_raw)
+    ecg_12bit, ecg_norm = ECGStreamer.convert_to_12bit(ecg_raw)
+
+    # Beat labels from <record>.atr, when present
+    annotations = None
+    if is_dat and not args.no_annotations:
+        annotations = AnnotationIndex.for_record(record_path)
+
+    # ── Headless export: render the display offline, nothing is streamed ──
+    if args.export:
+        stem = record_name(record_path) if is_dat else file_path.stem
+        run_export(args, ecg_norm, args.rate, args.window,
+                   title=f'ECG {stem}', stem=stem,
+                   annotations=annotations)
+        return
+
+    streamer = ECGStreamer(args.port, args.baud, args.reconnect)
+    # Detection runs on the unclipped signal, ahead of the sender
+    markers = BeatMarkers(ecg_raw, args.rate) if args.beat_markers else None
+
+    # ── Split mode: stream on the main thread, viewers in other processes ──
+    if args.shm:
+        try:
+            writer = ShmRingWriter(args.shm, sample_rate=args.rate)
+        except FileExistsError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        print(f"✓ Publishing to shared memory '{args.shm}' "
+              f"(view with: python ecg_shm_viewer.py --shm {args.shm})")
+        try:
+            streamer.stream_ecg(ecg_12bit, ecg_norm, args.rate, args.loop,
+                                args.cpu, args.rt_priority, args.rt_policy,
+                                shm_writer=writer, markers=markers)
+        except KeyboardInterrupt:
+            print("\n✓ Interrupted by user")
+        finally:
+            writer.close()
+        print("\n✓ All done.")
+        return
 
     # ── Launch streamer thread ─────────────────────────────────────────────
     stream_thread = threading.Thread(
         target=streamer.stream_ecg,
-        args=(ecg_12bit, ecg_norm, args.rate, args.loop),
+        args=(ecg_12bit, ecg_norm, args.rate, args.loop,
+              args.cpu, args.rt_priority, args.rt_policy, None, markers),
         daemon=True,   # dies automatically when main thread exits
         name='ECGStreamer'
     )
@@ -313,7 +453,8 @@ Examples:
     print("✓ Streamer thread started")
 
     # ── Run visualizer on main thread (blocking) ───────────────────────────
-    viz = ECGVisualizer(window_size=args.window, sample_rate=args.rate)
+    viz = ECGVisualizer(window_size=args.window, sample_rate=args.rate, fps=args.fps,
+                        annotations=annotations, record_length=len(ecg_norm))
     print("✓ Visualizer starting (close the plot window to quit)\n")
     viz.run()   # returns when user closes the plot
 
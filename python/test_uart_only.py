@@ -10,10 +10,11 @@ Author: Marly
 Date: February 27, 2026
 """
 
-import serial
 import time
 import argparse
 
+from ecg_transport import open_transport
+
 def test_uart_streaming(port, baud=115200):
     """Test UART streaming with simple pattern"""
     
@@ -23,7 +24,7 @@ def test_uart_streaming(port, baud=115200):
     
     # Connect
     try:
-        ser = serial.Serial(port, baud, timeout=1)
+        ser = open_transport(port, baud, timeout=1)
         print(f"✓ Connected to {port} at {baud} baud\n")
     except Exception as e:
         print(f"✗ Error: {e}")
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Weight Image - One packed SDRAM image of all CNN weights, with its address map
+
+Each weight_rom in zolotyhnet_complete_9engines.vhd reserves 16K words
+(ADDR_WIDTH => 14), even an 8-entry bias vector. In SDRAM the same 18 ROMs
+fit in under 15K words. This script lays them out contiguously and writes:
+
+    <prefix>.bin          little-endian int16 image (SDRAM word 0 first)
+    <prefix>.mif          the same image as a Quartus .mif
+    weight_map_pkg.vhd    VHDL package with the base address and length
+                          of every block (src/sdram/)
+
+Layers come in the order the engines run (conv0..conv4, linear0..linear2,
+classifier). Within a layer the bias block comes before the weights, because
+conv1d_engine/linear_engine need bias[o] right after the weights of output o.
+A sequential prefetch therefore already holds all biases when the weight
+rows stream in. Every weight block keeps the engines' own address order
+(out * IN * K + in * K + k for conv, out * IN + in for linear), so an engine
+reads BASE + weight_addr. Every block starts on a burst boundary
+(--burst, default 8 words = the controller's longest burst), so a burst
+never straddles two blocks or an SDRAM row.
+
+weight_uploader.py sends the weights to the same addresses.
+
+Usage:
+    python weight_image.py
+    python weight_image.py --weights retrained/ --burst 4 --map
+    python weight_image.py --check
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from mif_io import write_mif
+from zolotyhnet_model import LAYER_NAMES, WEIGHTS_DIR, load_weights
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+VHDL_PACKAGE = ROOT_DIR / 'src' / 'sdram' / 'weight_map_pkg.vhd'
+IMAGE_PREFIX = ROOT_DIR / 'quartus_de2' / 'weight_image'
+
+# Words per SDRAM burst (sdram_controller BURST_LENGTH 1, 2, 4 or 8)
+BURST_WORDS = 8
+# Words reserved per weight_rom instance today (ADDR_WIDTH => 14)
+ROM_WORDS = 1 << 14
+
+
+def layout(weights, base=0, burst=BURST_WORDS):
+    """
+    SDRAM placement of every weight and bias block
+
+    Args:
+        weights: dict from load_weights()
+        base: SDRAM word address of the first block (multiple of burst)
+        burst: Block alignment in words
+
+    Returns:
+        list of (name, address, int16 words) in image order
+    """
+    if burst < 1 or base % burst:
+        raise ValueError(f"Base 0x{base:X} is not aligned to a {burst}-word burst")
+    blocks = []
+    address = base
+    for layer in LAYER_NAMES:
+        for kind in ('bias', 'weight'):
+            name = f'{layer}_{kind}'
+            words = np.asarray(weights[name]).astype(np.int16).ravel()
+            blocks.append((name, address, words))
+            address += -(-len(words) // burst) * burst
+    return blocks
+
+
+def image_words(blocks):
+    """The image as one int16 array (padding is zero), starting at the first block"""
+    start = blocks[0][1]
+    end = blocks[-1][1] + len(blocks[-1][2])
+    image = np.zeros(end - start, dtype=np.int16)
+    for _, address, words in blocks:
+        image[address - start:address - start + len(words)] = words
+    return image
+
+
+def vhdl_package(blocks, burst=BURST_WORDS):
+    """Text of weight_map_pkg.vhd for a layout"""
+    words = len(image_words(blocks))
+    used = sum(len(w) for _, _, w in blocks)
+    lines = [
+        '-' * 80,
+        '-- Weight Map Package',
+        '-- SDRAM base addresses and lengths of the CNN weight blocks',
+        '--',
+        '-- GENERATED by python/weight_image.py - do not edit by hand.',
+        '-- Regenerate after retraining: python weight_image.py',
+        '--',
+        f'-- {len(blocks)} blocks, {used} words + {words - used} words burst padding',
+        '-- Engines read BASE + their own weight_addr / bias_addr.',
+        '-' * 80,
+        '',
+        'package weight_map_pkg is',
+        '',
+        f'    constant WEIGHT_BURST_WORDS : integer := {burst};',
+        f'    constant WEIGHT_IMAGE_BASE  : integer := {blocks[0][1]};',
+        f'    constant WEIGHT_IMAGE_WORDS : integer := {words};',
+        '',
+    ]
+    width = max(len(name) for name, _, _ in blocks) + 5
+    for name, address, w in blocks:
+        lines.append(f'    constant {(name.upper() + "_BASE"):<{width}} : integer := {address};')
+        lines.append(f'    constant {(name.upper() + "_LEN"):<{width}} : integer := {len(w)};')
+    lines += ['', 'end package weight_map_pkg;', '']
+    return '\n'.join(lines)
+
+
+def write_image(blocks, prefix=IMAGE_PREFIX):
+    """
+    Write <prefix>.bin and <prefix>.mif
+
+    Returns:
+        (bin path, mif path)
+    """
+    prefix = Path(prefix)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    image = image_words(blocks)
+    bin_path = prefix.with_suffix('.bin')
+    mif_path = prefix.with_suffix('.mif')
+    bin_path.write_bytes(image.astype('<i2').tobytes())
+    write_mif(mif_path, image, name=f'{prefix.name} (SDRAM image, see weight_map_pkg.vhd)')
+    return bin_path, mif_path
+
+
+def print_map(blocks):
+    """Print the address map and the saving over one 16K-word ROM per block"""
+    print(f"\n{'Block':<18} {'Base':>9} {'Words':>6}")
+    for name, address, words in blocks:
+        print(f"{name:<18} 0x{address:06X}  {len(words):>6}")
+    total = len(image_words(blocks))
+    used = sum(len(w) for _, _, w in blocks)
+    print(f"{'image':<18} {'':>9} {total:>6}  ({total - used} padding)")
+    print(f"  vs {len(blocks)} x {ROM_WORDS} ROM words: {len(blocks) * ROM_WORDS / total:.0f}x smaller")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Packed SDRAM weight image and VHDL address map',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Image and VHDL package for the current weights
+  python weight_image.py
+
+  # Retrained weights, 4-word bursts, print the map
+  python weight_image.py --weights retrained/ --burst 4 --map
+
+  # Fail if the committed package no longer matches the weights
+  python weight_image.py --check
+        """
+    )
+
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--burst', type=int, default=BURST_WORDS,
+                        help=f'Block alignment in words (default: {BURST_WORDS})')
+    parser.add_argument('--base', type=lambda v: int(v, 0), default=0,
+                        help='SDRAM word address of the image (default: 0)')
+    parser.add_argument('--out', default=str(IMAGE_PREFIX),
+                        help='Image path without extension (default: quartus_de2/weight_image)')
+    parser.add_argument('--vhdl', default=str(VHDL_PACKAGE),
+                        help='Generated package path (default: src/sdram/weight_map_pkg.vhd)')
+    parser.add_argument('--map', action='store_true',
+                        help='Print the address map')
+    parser.add_argument('--check', action='store_true',
+                        help='Only compare the package with the weights, write nothing')
+
+    args = parser.parse_args()
+
+    try:
+        blocks = layout(load_weights(args.weights), args.base, args.burst)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    package = vhdl_package(blocks, args.burst)
+    vhdl_path = Path(args.vhdl)
+    if args.check:
+        if not vhdl_path.exists() or vhdl_path.read_text() != package:
+            print(f"✗ {vhdl_path} is out of date, run: python weight_image.py")
+            sys.exit(1)
+        print(f"✓ {vhdl_path} matches the weights")
+        return
+
+    if args.map:
+        print_map(blocks)
+    bin_path, mif_path = write_image(blocks, args.out)
+    vhdl_path.write_text(package)
+    print(f"✓ {len(image_words(blocks))} words: {bin_path}, {mif_path}")
+    print(f"✓ Address map: {vhdl_path}")
+
+
+if __name__ == '__main__':
+    main()
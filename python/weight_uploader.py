@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Weight Uploader - Swap the CNN weights on a running DE2 board over UART
+
+Changing the weights used to mean regenerating the .mif files and a full
+Quartus recompile. This script sends the weight bundle straight into the
+board's SDRAM instead, through the UART command mode of
+src/sdram/weight_upload_rx.vhd and weight_loader.vhd.
+
+The 18 weight/bias ROMs go to the addresses of weight_image.py, the map in
+src/sdram/weight_map_pkg.vhd. Each one becomes one or more write frames:
+
+    A5 5A | 'W' | COUNT[2] | ADDR[3] | COUNT int16 words | CRC[2]
+
+(little-endian, CRC-16/CCITT-FALSE over 'W'..payload). The frames together
+are the binary image (--save); it goes out in a single bulk write at line
+rate. The board answers every frame with "A5 5A 'w' STATUS", and frames
+with a bad CRC are sent again. With verification on, every ROM is then read
+back with 'R' frames and compared word for word. A read-back the board cannot
+finish (an SDRAM word lost for 100 us) is cut short and followed by
+"A5 5A 'r' 02"; the reply then times out here.
+
+At 115200 baud the upload takes about 2.6 s, and the read-back as long again.
+Stop streaming ECG data first: the upload shares the UART.
+
+Usage:
+    python weight_uploader.py --port COM4
+    python weight_uploader.py --weights retrained/ --save weights.bin
+    python weight_uploader.py --port COM4 --image weights.bin --no-verify
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import struct
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import serial
+
+from ecg_transport import RELAY_SCHEME, open_transport
+import weight_image
+from zolotyhnet_model import WEIGHTS_DIR, load_weights
+
+# Frame layout (see weight_upload_rx.vhd)
+SYNC = b'\xA5\x5A'
+CMD_WRITE = b'W'
+CMD_READ = b'R'
+REPLY_WRITE = b'w'
+REPLY_READ = b'r'
+STATUS_OK = 0
+STATUS_NAMES = {0: 'OK', 1: 'CRC mismatch', 2: 'SDRAM read timeout'}
+HEADER = struct.Struct('<cH3s')     # command, word count, 24-bit address
+READ_HEADER = 5                     # word count and address in a read-back reply
+
+# Words per frame: a resend after a CRC error costs at most ~0.7 s
+MAX_FRAME_WORDS = 4096
+# SDRAM word address range of the controller
+ADDRESS_LIMIT = 1 << 23
+# UART bits per byte (8N1)
+BITS_PER_BYTE = 10
+
+
+def _crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else (crc << 1)
+        table.append(crc & 0xFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF), as in weight_upload_rx.vhd"""
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC_TABLE[(crc >> 8) ^ byte]
+    return crc
+
+
+def _frame(command, address, count, payload=b''):
+    if not 0 <= address < ADDRESS_LIMIT or address + count > ADDRESS_LIMIT:
+        raise ValueError(f"Address range 0x{address:06X}+{count} outside the SDRAM")
+    body = HEADER.pack(command, count, address.to_bytes(3, 'little')) + payload
+    return SYNC + body + struct.pack('<H', crc16(body))
+
+
+def write_frame(address, words):
+    """One write frame: int16 words to SDRAM address onwards"""
+    words = np.asarray(words, dtype='<i2').ravel()
+    return _frame(CMD_WRITE, address, len(words), words.tobytes())
+
+
+def read_frame(address, count):
+    """One read-back request for count words from address"""
+    return _frame(CMD_READ, address, count)
+
+
+def memory_map(weights, base=0):
+    """
+    SDRAM placement of the weight ROMs (see weight_image.layout)
+
+    Args:
+        weights: dict from load_weights()
+        base: SDRAM word address of the first ROM
+
+    Returns:
+        list of (name, address, int16 words)
+    """
+    return weight_image.layout(weights, base)
+
+
+def build_image(layout, max_words=MAX_FRAME_WORDS):
+    """
+    Framed, checksummed upload image of a memory map
+
+    Returns:
+        list of (address, words, frame bytes); b''.join() of the frames
+        is the image file
+    """
+    frames = []
+    for _, address, words in layout:
+        for start in range(0, len(words), max_words):
+            part = words[start:start + max_words]
+            frames.append((address + start, part, write_frame(address + start, part)))
+    return frames
+
+
+def parse_image(image):
+    """
+    Split an image file back into its write frames, checking every CRC
+
+    Returns:
+        list of (address, words, frame bytes)
+
+    Raises:
+        ValueError on a malformed image
+    """
+    frames = []
+    pos = 0
+    while pos < len(image):
+        if image[pos:pos + 2] != SYNC:
+            raise ValueError(f"No frame sync at byte {pos}")
+        command, count, address = HEADER.unpack_from(image, pos + 2)
+        end = pos + 2 + HEADER.size + 2 * count
+        if command != CMD_WRITE or end + 2 > len(image):
+            raise ValueError(f"Bad write frame at byte {pos}")
+        (crc,) = struct.unpack_from('<H', image, end)
+        if crc != crc16(image[pos + 2:end]):
+            raise ValueError(f"CRC mismatch in frame at byte {pos}")
+        words = np.frombuffer(image, dtype='<i2', count=count, offset=pos + 2 + HEADER.size)
+        frames.append((int.from_bytes(address, 'little'), words.astype(np.int16), image[pos:end + 2]))
+        pos = end + 2
+    return frames
+
+
+def line_time(nbytes, baud):
+    """Seconds to send nbytes over 8N1 UART"""
+    return nbytes * BITS_PER_BYTE / baud
+
+
+class WeightUploader:
+    """Sends upload images and reads SDRAM back through the board's UART"""
+
+    def __init__(self, port, baud=115200, timeout=2.0):
+        """
+        Args:
+            port: Open transport with write() and read() (see ecg_transport)
+            baud: Line rate, for the reply deadlines
+            timeout: Extra seconds allowed on top of the line time
+        """
+        self.port = port
+        self.baud = baud
+        self.timeout = timeout
+
+    def _read_exact(self, count, deadline):
+        data = bytearray()
+        while len(data) < count:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Board did not answer ({len(data)}/{count} bytes)")
+            data += self.port.read(count - len(data))
+        return bytes(data)
+
+    def _reply(self, kind, deadline):
+        """Next reply of the given kind, skipping anything before its sync"""
+        window = b''
+        while window != SYNC:
+            window = (window + self._read_exact(1, deadline))[-2:]
+        got, status = self._read_exact(2, deadline)
+        if bytes([got]) != kind:
+            raise ValueError(f"Unexpected reply {chr(got)!r}, expected {kind.decode()!r}")
+        return status
+
+    def upload(self, frames, retries=3):
+        """
+        Send all write frames in one bulk write and collect the acks
+
+        Frames the board rejects are sent again, up to retries times.
+
+        Returns:
+            (frames sent, bytes sent)
+        """
+        sent_frames = sent_bytes = 0
+        pending = frames
+        for _ in range(retries + 1):
+            data = b''.join(f[2] for f in pending)
+            self.port.write(data)
+            sent_frames += len(pending)
+            sent_bytes += len(data)
+            deadline = time.monotonic() + line_time(len(data), self.baud) + self.timeout
+            failed = []
+            for frame in pending:
+                status = self._reply(REPLY_WRITE, deadline)
+                if status != STATUS_OK:
+                    failed.append(frame)
+            if not failed:
+                return sent_frames, sent_bytes
+            print(f"⚠ {len(failed)} frame(s) rejected by the board, resending")
+            pending = failed
+        raise IOError(f"{len(pending)} frame(s) still rejected after {retries} retries")
+
+    def read_back(self, address, count):
+        """
+        Read count words from SDRAM
+
+        Returns:
+            int16 array
+        """
+        self.port.write(read_frame(address, count))
+        deadline = time.monotonic() + line_time(2 * count + 20, self.baud) + self.timeout
+        status = self._reply(REPLY_READ, deadline)
+        if status != STATUS_OK:
+            raise IOError(f"Read-back request rejected: {STATUS_NAMES.get(status, status)}")
+        header = self._read_exact(READ_HEADER, deadline)
+        payload = self._read_exact(2 * count, deadline)
+        (crc,) = struct.unpack('<H', self._read_exact(2, deadline))
+        if crc != crc16(REPLY_READ + bytes([status]) + header + payload):
+            raise IOError(f"Read-back CRC mismatch at 0x{address:06X}")
+        return np.frombuffer(payload, dtype='<i2').astype(np.int16)
+
+    def verify(self, frames):
+        """
+        Read every frame's words back and compare
+
+        Returns:
+            list of (address, expected, got) for the first mismatch of each frame
+        """
+        mismatches = []
+        for address, words, _ in frames:
+            got = self.read_back(address, len(words))
+            bad = np.flatnonzero(got != words)
+            if len(bad):
+                i = bad[0]
+                mismatches.append((address + int(i), int(words[i]), int(got[i])))
+        return mismatches
+
+
+def print_map(layout):
+    """Print the SDRAM memory map"""
+    print(f"\n{'ROM':<18} {'Address':>9} {'Words':>6}")
+    for name, address, words in layout:
+        print(f"{name:<18} 0x{address:06X}  {len(words):>6}")
+    total = sum(len(words) for _, _, words in layout)
+    print(f"{'total':<18} {'':>9} {total:>6}")
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Upload CNN weights into the DE2 SDRAM over UART',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Upload the default weights and verify them by read-back
+  python weight_uploader.py --port COM4
+
+  # Build the image offline from retrained weights and show the memory map
+  python weight_uploader.py --weights retrained/ --save weights.bin --map
+
+  # Send a saved image, skip the read-back
+  python weight_uploader.py --port COM4 --image weights.bin --no-verify
+        """
+    )
+
+    parser.add_argument('--port', help='Serial port (e.g. COM4, /dev/ttyUSB0, socket://host:port)')
+    parser.add_argument('--baud', type=int, default=115200,
+                        help='Baud rate (default: 115200)')
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--image', help='Send this saved image instead of --weights')
+    parser.add_argument('--save', help='Write the upload image to this file')
+    parser.add_argument('--base', type=lambda v: int(v, 0), default=0,
+                        help='SDRAM word address of the first ROM (default: 0)')
+    parser.add_argument('--map', action='store_true',
+                        help='Print the SDRAM memory map')
+    parser.add_argument('--no-verify', action='store_true',
+                        help='Skip the read-back verification')
+    parser.add_argument('--retries', type=int, default=3,
+                        help='Resends of frames rejected by the board (default: 3)')
+
+    args = parser.parse_args()
+
+    try:
+        if args.image:
+            frames = parse_image(Path(args.image).read_bytes())
+            layout = [(f'frame {i}', address, words) for i, (address, words, _) in enumerate(frames)]
+        else:
+            layout = memory_map(load_weights(args.weights), args.base)
+            frames = build_image(layout)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+
+    image = b''.join(f[2] for f in frames)
+    words = sum(len(f[1]) for f in frames)
+    print(f"✓ Image: {words} words in {len(frames)} frames, {len(image)} bytes "
+          f"({line_time(len(image), args.baud):.2f} s at {args.baud} baud)")
+    if args.map:
+        print_map(layout)
+    if args.save:
+        Path(args.save).write_bytes(image)
+        print(f"✓ Saved {args.save}")
+    if not args.port:
+        if not args.save and not args.map:
+            print("⚠ No --port given, nothing sent")
+        return
+    if args.port.startswith(RELAY_SCHEME):
+        print("✗ The relay transport cannot carry the board's replies, use a serial port")
+        sys.exit(1)
+
+    try:
+        ser = open_transport(args.port, args.baud, timeout=0.1)
+    except serial.SerialException as e:
+        print(f"✗ Could not open {args.port}: {e}")
+        sys.exit(1)
+
+    try:
+        ser.reset_input_buffer()
+        uploader = WeightUploader(ser, args.baud)
+        print(f"\n▶ Uploading to {args.port}...")
+        start = time.perf_counter()
+        sent_frames, sent_bytes = uploader.upload(frames, args.retries)
+        elapsed = time.perf_counter() - start
+        resent = f", {sent_frames - len(frames)} resent" if sent_frames > len(frames) else ""
+        print(f"✓ {len(frames)} frames acknowledged in {elapsed:.2f} s "
+              f"({sent_bytes / elapsed / 1024:.1f} KB/s{resent})")
+
+        if not args.no_verify:
+            print("▶ Reading back...")
+            start = time.perf_counter()
+            mismatches = uploader.verify(frames)
+            elapsed = time.perf_counter() - start
+            if mismatches:
+                for address, expected, got in mismatches:
+                    print(f"✗ 0x{address:06X}: wrote {expected}, read {got}")
+                sys.exit(1)
+            print(f"✓ {words} words verified in {elapsed:.2f} s")
+    except (TimeoutError, IOError, ValueError) as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    finally:
+        ser.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,569 @@
+#!/usr/bin/env python3
+"""
+ZolotyhNet Model - Fixed-point NumPy model of the FPGA CNN datapath
+
+Models the engines of src/cnn/zolotyhnet_complete_9engines.vhd
+(conv1d_engine.vhd, linear_engine.vhd) with the same 16-bit weights
+(quartus_de2/weights/*.mif), so classifications can be studied without a
+synthesis run or the board. It is not a bit-accurate model of the current
+top level (see below): --verify checks the batched layers against
+reference_forward(), a scalar transcription written from the same reading
+of the engines, not against an RTL simulation.
+
+Topology (one 128-sample window in, one of 8 classes out):
+
+    upper path  conv0 1->8 @128, pool, conv1 8->16 @64, pool,
+                conv2 16->32 @32, pool, conv3 32->32 @16, pool,
+                conv4 32->1 @8                       -> 8 values
+    lower path  linear0 128->64, linear1 64->16, linear2 16->8
+    fusion      upper + lower (16-bit add), classifier 8->8, argmax
+
+Arithmetic is that of conv1d_engine.vhd / linear_engine.vhd:
+    - samples are 12-bit two's complement, sign-extended and shifted
+      right by 4 into Q8.8 (buffer_128.vhd)
+    - each product w * x (Q16.16) has its low 8 bits cleared before it
+      is added to a 32-bit accumulator (wraps on overflow)
+    - the bias is added as bias << 8, a negative result gives 0 (ReLU,
+      also after the classifier) and bits 23..8 are kept. This is a
+      truncation with no saturation: a result >= 128.0 wraps
+    - max pooling and argmax use signed compares, argmax keeps the first
+      maximum (strict >)
+
+This is the network the engines are meant to compute. The current RTL
+differs from it in these known ways, none of which is modelled:
+    - input_reg (engines, MULTIPLY) is loaded and read in the same cycle:
+      each product takes the operand of the previous MAC. The first MAC
+      of an output takes the last operand of the previous output, or of
+      the previous window
+    - bias_reg (conv1d WRITE_OUTPUT, linear APPLY_RELU) likewise: linear
+      output o gets bias[o - 1], conv position 0 of channel c gets
+      bias[c - 1], and output/channel 0 the last bias of the previous run
+      (0 after reset)
+    - the top FSM leaves every engine state on a fixed layer_counter
+      timeout before the engine is done: CONV1 gives up after 5000 of the
+      15363 cycles it needs, and all nine engines stop early
+      (cnn_perf_model.py lists them)
+    - there are no buffers between layers: each engine's input_data is the
+      previous engine's output_data port, whatever it is driving at the
+      time, and LINEAR1 reads the sample buffer at CONV1's address, not at
+      its own input_addr
+    - the maxpool1d inputs are never driven and their outputs are unused
+    - only upper_final(0), lower_final(0) and class_scores(0) are latched;
+      fusion_result is not connected to the classifier, whose
+      classifier_input_data is never driven
+    - with class_scores(1..7) stuck at 0 and class_scores(0) >= 0 after the
+      ReLU, the strict-> argmax returns class 0 for every window
+The first two carry state from one window into the next, which a batch
+model cannot reproduce. Until the RTL is fixed, board results will not
+match this model.
+
+Each layer runs over a whole batch. Convolutions use an im2col view
+(sliding_window_view). The sum of truncated products is computed exactly as
+    sum((w*x >> 8) << 8) = sum(w*x) - sum((w*x) mod 256)
+The first term is a float64 BLAS matmul; it is exact because every partial
+sum is an integer below 2**53. The second only needs the low bytes of w and
+x, so it is a uint8 product tensor summed in uint16.
+
+ZolotyhNet(formats=...) also models a narrower datapath, per layer
+(width, fractional bits) instead of Q8.8. Weights are rounded and
+saturated offline. Each product is truncated to the layer's output
+precision, the bias is aligned with the accumulator and the output keeps
+`width` bits (wraps), as the 16-bit engines do. cnn_bitwidth_sweep.py
+uses this.
+
+Usage:
+    model = ZolotyhNet.from_mif()
+    classes = model.classify(windows_12bit)       # (N, 128) -> (N,)
+    python zolotyhnet_model.py --verify 8
+    python zolotyhnet_model.py --record "../ECG signals/PVC/208"
+
+Author: Marly
+Date: October 2026
+Version: 1.0
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from mif_io import WEIGHTS_DIR, load_weight_set
+
+WINDOW = 128
+NUM_CLASSES = 8
+KERNEL_SIZE = 3
+
+# (weight file prefix, in channels, out channels, input length)
+CONV_LAYERS = [
+    ('conv0', 1, 8, 128),
+    ('conv1', 8, 16, 64),
+    ('conv2', 16, 32, 32),
+    ('conv3', 32, 32, 16),
+    ('conv4', 32, 1, 8),
+]
+# (weight file prefix, input features, output features)
+LINEAR_LAYERS = [
+    ('linear0', 128, 64),
+    ('linear1', 64, 16),
+    ('linear2', 16, 8),
+]
+CLASSIFIER = ('classifier', 8, 8)
+LAYER_NAMES = [layer[0] for layer in CONV_LAYERS + LINEAR_LAYERS] + [CLASSIFIER[0]]
+
+# (word width, fractional bits) of the engines: DATA_WIDTH => 16, Q8.8
+BASE_FORMAT = (16, 8)
+
+# 3-bit class -> 2-bit display group (cnn_interface.vhd)
+CLASS_GROUPS = ['Normal', 'PVC/Abnormal', 'PVC/Abnormal', 'PVC/Abnormal',
+                'AFib/Other', 'AFib/Other', 'AFib/Other', 'Unknown']
+
+
+def load_weights(directory=WEIGHTS_DIR):
+    """
+    Load all weight and bias ROMs of the network (cached, see mif_io)
+
+    Returns:
+        dict like {'conv0_weight': int16 (8, 1, 3), 'conv0_bias': int16 (8,), ...}
+    """
+    rom = load_weight_set(directory)
+    keys = [f'{n}_{kind}' for n in LAYER_NAMES for kind in ('weight', 'bias')]
+    missing = [k for k in keys if k not in rom]
+    if missing:
+        raise FileNotFoundError(f"Missing in {directory}: {', '.join(k + '.mif' for k in missing)}")
+    return {k: rom[k] for k in keys}
+
+
+def to_uart_samples(signal):
+    """
+    Scale a signal to the 12-bit samples the streamer sends
+    (same as ECGStreamer.convert_to_12bit in runner.py)
+    """
+    norm = np.clip((signal - np.mean(signal)) / np.std(signal), -1.0, 1.0)
+    return np.clip((norm * 2047).astype(np.int32), -2048, 2047)
+
+
+def to_q88(samples):
+    """
+    Convert 12-bit samples to the Q8.8 values buffer_128.vhd feeds the CNN
+
+    Args:
+        samples: 12-bit two's complement samples (signed, or raw 0..4095)
+
+    Returns:
+        int16 array: sign-extended sample >> 4
+    """
+    raw = np.asarray(samples).astype(np.int32) & 0xFFF
+    raw -= (raw & 0x800) << 1
+    return (raw >> 4).astype(np.int16)
+
+
+def _wrap(values, width):
+    """Keep the low width bits of values as a signed number"""
+    if width >= 16:
+        return values.astype(np.int16)
+    half = 1 << (width - 1)
+    return (((values.astype(np.int32) + half) & ((1 << width) - 1)) - half).astype(np.int16)
+
+
+def rescale(values, from_frac, to_frac, width=16):
+    """
+    Move activations to another fixed-point format the way the datapath would:
+    an arithmetic shift (truncation) and the low width bits kept (wraps)
+
+    Returns:
+        int16 array
+    """
+    values = np.asarray(values).astype(np.int32)
+    shift = to_frac - from_frac
+    values = values << shift if shift >= 0 else values >> -shift
+    return _wrap(values, width)
+
+
+def quantize_weights(values, frac, width=16, from_frac=8):
+    """
+    Re-quantize Q8.8 ROM contents to (width, frac): round to nearest and
+    saturate, as an offline weight export would
+
+    Returns:
+        int16 array
+    """
+    values = np.asarray(values).astype(np.int64)
+    shift = frac - from_frac
+    if shift >= 0:
+        values = values << shift
+    else:
+        values = (values + (1 << (-shift - 1))) >> -shift
+    limit = 1 << (width - 1)
+    return np.clip(values, -limit, limit - 1).astype(np.int16)
+
+
+def _activate(acc, bias, shift=8, width=16):
+    """
+    Bias, ReLU and output truncation of an engine
+
+    Args:
+        acc: Accumulator values (int64, exact)
+        bias: int16 bias per output (last axis)
+        shift: Fractional bits of the layer input (8 for Q8.8)
+        width: Output word width (16)
+
+    Returns:
+        (int16 outputs, number of results that wrapped)
+    """
+    result = (acc + (bias.astype(np.int64) << shift)).astype(np.int32)   # 32-bit wrap
+    out = _wrap(np.where(result < 0, 0, result >> shift), width)         # keep bits 23..8
+    return out, int(np.count_nonzero(result >= 1 << (shift + width - 1)))
+
+
+def check_formats(formats=None):
+    """
+    Complete and validate a per-layer format table
+
+    Args:
+        formats: {layer name or 'input': (width, fractional bits)}, may be partial
+
+    Returns:
+        dict with an entry for 'input' and every layer
+    """
+    formats = dict(formats or {})
+    unknown = set(formats) - set(LAYER_NAMES) - {'input'}
+    if unknown:
+        raise ValueError(f"Unknown layers in formats: {', '.join(sorted(unknown))}")
+    table = {name: tuple(formats.get(name, BASE_FORMAT)) for name in ['input'] + LAYER_NAMES}
+    for name, (width, frac) in table.items():
+        if not (2 <= width <= 16 and 0 <= frac <= 16):
+            raise ValueError(f"{name}: unsupported format ({width}, {frac}), "
+                             f"width must be 2..16 and fractional bits 0..16")
+    return table
+
+
+class _Layer:
+    """Weights of one engine, prepared for the batched MAC"""
+
+    def __init__(self, name, weight, bias, fmt=BASE_FORMAT, in_frac=8):
+        """
+        Args:
+            name: Weight file prefix
+            weight, bias: Q8.8 ROM contents
+            fmt: (width, fractional bits) of the weights and of the outputs
+            in_frac: Fractional bits of the layer input
+        """
+        self.name = name
+        self.width, frac = fmt
+        if fmt != BASE_FORMAT:
+            weight = quantize_weights(weight, frac, self.width)
+            bias = quantize_weights(bias, frac, self.width)
+        self.bias = bias
+        # Each product keeps the output precision: its low in_frac bits are cleared
+        self.shift = in_frac
+        self.mask = (1 << in_frac) - 1
+        self.low_dtype = np.uint8 if in_frac <= 8 else np.uint16
+        w = weight.reshape(len(weight), -1)          # (out, in * kernel)
+        self.w_t = w.T.astype(np.float64)            # exact products up to 2**30
+        self.w_lo = w.astype(self.low_dtype)         # low byte(s), for the truncated bits
+        self.sum_dtype = np.uint16 if w.shape[1] * self.mask < 1 << 16 else np.int32
+
+    def mac(self, cols):
+        """
+        Sum of truncated products for every output
+
+        Args:
+            cols: int16 (..., in * kernel) operands
+
+        Returns:
+            int64 (..., out) accumulator values, i.e. sum((w * x >> 8) << 8)
+        """
+        full = (cols.astype(np.float64) @ self.w_t).astype(np.int64)
+        if not self.shift:
+            return full
+        low = cols.astype(self.low_dtype)[..., None, :] * self.w_lo  # (w * x) mod 256
+        if self.mask != np.iinfo(self.low_dtype).max:
+            low &= self.mask
+        return full - low.sum(axis=-1, dtype=self.sum_dtype)
+
+
+class ZolotyhNet:
+    """Fixed-point ZolotyhNet, vectorized over a batch of windows"""
+
+    def __init__(self, weights, batch=256, formats=None):
+        """
+        Args:
+            weights: dict from load_weights()
+            batch: Windows per internal chunk (bounds the temporary memory)
+            formats: Optional {layer or 'input': (width, fractional bits)}
+                     for a narrower datapath; missing entries stay Q8.8
+        """
+        self.batch = batch
+        self.formats = check_formats(formats)
+        fmt = self.formats
+
+        def layer(name, in_frac):
+            return _Layer(name, weights[f'{name}_weight'], weights[f'{name}_bias'],
+                          fmt[name], in_frac)
+
+        frac = fmt['input'][1]
+        self.conv = []
+        for n, _, _, length in CONV_LAYERS:
+            self.conv.append((layer(n, frac), length))
+            frac = fmt[n][1]
+        frac = fmt['input'][1]
+        self.linear = []
+        for n, _, _ in LINEAR_LAYERS:
+            self.linear.append(layer(n, frac))
+            frac = fmt[n][1]
+        # The fusion add works in the lower path's format
+        self.classifier = layer(CLASSIFIER[0], frac)
+        self.overflow = {}      # layer -> wrapped results so far
+
+    @classmethod
+    def from_mif(cls, directory=WEIGHTS_DIR, **kwargs):
+        """Build the model from the .mif files in directory"""
+        return cls(load_weights(directory), **kwargs)
+
+    def _count(self, layer, wrapped):
+        self.overflow[layer.name] = self.overflow.get(layer.name, 0) + wrapped
+
+    def _conv(self, x, layer):
+        """(B, in, L) -> (B, out, L), kernel 3, padding 1"""
+        padded = np.pad(x, ((0, 0), (0, 0), (1, 1)))
+        cols = sliding_window_view(padded, KERNEL_SIZE, axis=2)      # (B, in, L, k)
+        cols = cols.transpose(0, 2, 1, 3).reshape(x.shape[0], x.shape[2], -1)
+        out, wrapped = _activate(layer.mac(cols), layer.bias,      # (B, L, out)
+                                 layer.shift, layer.width)
+        self._count(layer, wrapped)
+        return out.transpose(0, 2, 1)
+
+    def _linear(self, x, layer):
+        """(B, in) -> (B, out)"""
+        out, wrapped = _activate(layer.mac(x), layer.bias, layer.shift, layer.width)
+        self._count(layer, wrapped)
+        return out
+
+    def _forward(self, q, keep):
+        """One chunk of Q8.8 windows (B, 128) -> class scores (B, 8)"""
+        layers = {}
+        if self.formats['input'] != BASE_FORMAT:
+            q = rescale(q, 8, self.formats['input'][1], self.formats['input'][0])
+        x = q[:, None, :]
+        for i, (layer, _) in enumerate(self.conv):
+            x = self._conv(x, layer)
+            if i < len(self.conv) - 1:
+                x = x.reshape(x.shape[0], x.shape[1], -1, 2).max(axis=3)   # maxpool 2
+            if keep:
+                layers[layer.name] = x
+        upper = x.reshape(len(x), -1)
+
+        x = q
+        for layer in self.linear:
+            x = self._linear(x, layer)
+            if keep:
+                layers[layer.name] = x
+
+        upper_fmt, lower_fmt = self.formats[CONV_LAYERS[-1][0]], self.formats[LINEAR_LAYERS[-1][0]]
+        if upper_fmt != lower_fmt:
+            upper = rescale(upper, upper_fmt[1], lower_fmt[1], lower_fmt[0])
+        fused = _wrap(upper.astype(np.int32) + x, lower_fmt[0])     # 16-bit add, wraps
+        scores = self._linear(fused, self.classifier)
+        if keep:
+            layers['fusion'] = fused
+            layers['classifier'] = scores
+        return scores, layers
+
+    def forward(self, q88, return_layers=False):
+        """
+        Run the network on Q8.8 windows
+
+        Args:
+            q88: int16 (N, 128) windows (see to_q88)
+            return_layers: Also return every layer's output
+
+        Returns:
+            int16 (N, 8) class scores, plus a dict of layer outputs if asked
+        """
+        q88 = np.asarray(q88, dtype=np.int16).reshape(-1, WINDOW)
+        chunks = [self._forward(q88[i:i + self.batch], return_layers)
+                  for i in range(0, len(q88), self.batch)] or [self._forward(q88, return_layers)]
+        scores = np.concatenate([c[0] for c in chunks])
+        if not return_layers:
+            return scores
+        return scores, {k: np.concatenate([c[1][k] for c in chunks]) for k in chunks[0][1]}
+
+    def classify(self, windows):
+        """
+        Classify 12-bit sample windows
+
+        Args:
+            windows: (N, 128) 12-bit samples as sent over UART
+
+        Returns:
+            int (N,) class per window
+        """
+        return np.argmax(self.forward(to_q88(windows)), axis=1)
+
+
+def reference_forward(weights, q88):
+    """
+    Scalar transcription of the engine loops for one window (slow)
+
+    Every MAC, the 32-bit accumulator wrap and each bias/ReLU/truncation
+    step is done in plain Python integers, in the engines' loop order.
+    It only exists to check ZolotyhNet.
+
+    Returns:
+        list of 8 class scores
+    """
+    def wrap(v, bits):
+        half = 1 << (bits - 1)
+        return ((v + half) % (1 << bits)) - half
+
+    def finish(acc, bias):
+        result = wrap(acc + (bias << 8), 32)
+        return 0 if result < 0 else wrap(result >> 8, 16)
+
+    def conv(x, name, channels_out, length):
+        w, b = weights[f'{name}_weight'].tolist(), weights[f'{name}_bias'].tolist()
+        out = []
+        for o in range(channels_out):
+            row = []
+            for pos in range(length):
+                acc = 0
+                for i in range(len(x)):
+                    for k in range(KERNEL_SIZE):
+                        j = pos + k - 1
+                        value = x[i][j] if 0 <= j < length else 0
+                        acc = wrap(acc + (((w[o][i][k] * value) >> 8) << 8), 32)
+                row.append(finish(acc, b[o]))
+            out.append(row)
+        return out
+
+    def linear(x, name):
+        w, b = weights[f'{name}_weight'].tolist(), weights[f'{name}_bias'].tolist()
+        out = []
+        for o in range(len(w)):
+            acc = 0
+            for i, value in enumerate(x):
+                acc = wrap(acc + (((w[o][i] * value) >> 8) << 8), 32)
+            out.append(finish(acc, b[o]))
+        return out
+
+    q = [int(v) for v in q88]
+    x = [q]
+    for i, (name, _, channels_out, length) in enumerate(CONV_LAYERS):
+        x = conv(x, name, channels_out, length)
+        if i < len(CONV_LAYERS) - 1:
+            x = [[max(ch[p], ch[p + 1]) for p in range(0, length, 2)] for ch in x]
+    upper = x[0]
+
+    lower = q
+    for name, _, _ in LINEAR_LAYERS:
+        lower = linear(lower, name)
+
+    fused = [wrap(u + l, 16) for u, l in zip(upper, lower)]
+    return linear(fused, CLASSIFIER[0])
+
+
+def record_windows(record_path, lead=0, stride=WINDOW):
+    """
+    12-bit windows of an MIT-BIH record, as streamed to the board
+
+    Returns:
+        (N, 128) view of the record's UART samples
+    """
+    from ecg_dat_reader import open_record
+    samples = to_uart_samples(open_record(record_path).read_signal(lead))
+    return sliding_window_view(samples, WINDOW)[::stride]
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description='Fixed-point model of the ZolotyhNet CNN datapath',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  # Check the vectorized model against the scalar engine transcription
+  python zolotyhnet_model.py --verify 8
+
+  # Classify a record in 128-sample windows and print the class counts
+  python zolotyhnet_model.py --record "../ECG signals/PVC/208"
+
+  # Throughput on random windows
+  python zolotyhnet_model.py --benchmark 20000
+        """
+    )
+
+    parser.add_argument('--weights', default=str(WEIGHTS_DIR),
+                        help='Directory with the .mif weight files')
+    parser.add_argument('--record', default=None,
+                        help='MIT-BIH record to classify (path without extension)')
+    parser.add_argument('--lead', type=int, default=0,
+                        help='Record lead to use (default: 0)')
+    parser.add_argument('--stride', type=int, default=WINDOW,
+                        help=f'Samples between windows (default: {WINDOW})')
+    parser.add_argument('--verify', type=int, default=0, metavar='N',
+                        help='Compare N windows with the scalar reference')
+    parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                        help='Time the model on N random windows')
+
+    args = parser.parse_args()
+
+    if not (args.record or args.verify or args.benchmark):
+        parser.print_help()
+        sys.exit(1)
+
+    try:
+        weights = load_weights(args.weights)
+    except FileNotFoundError as e:
+        print(f"✗ {e}")
+        sys.exit(1)
+    model = ZolotyhNet(weights)
+    params = sum(w.size for w in weights.values())
+    print(f"✓ Loaded {len(weights)} weight ROMs ({params} parameters)")
+
+    rng = np.random.default_rng(0)
+    windows = record_windows(args.record, args.lead, args.stride) if args.record else None
+
+    if args.verify:
+        # Record windows when given, otherwise random 12-bit input
+        if windows is not None:
+            picks = windows[np.linspace(0, len(windows) - 1, args.verify).astype(int)]
+        else:
+            picks = rng.integers(-2048, 2048, (args.verify, WINDOW))
+        q = to_q88(picks)
+        fast = model.forward(q)
+        mismatches = 0
+        for i, window in enumerate(q):
+            if reference_forward(weights, window) != fast[i].tolist():
+                mismatches += 1
+        if mismatches:
+            print(f"✗ {mismatches}/{len(q)} windows differ from the scalar reference")
+            sys.exit(1)
+        print(f"✓ {len(q)} windows identical to the scalar reference (not an RTL simulation)")
+
+    if args.benchmark:
+        q = to_q88(rng.integers(-2048, 2048, (args.benchmark, WINDOW)))
+        model.forward(q[:model.batch])
+        start = time.perf_counter()
+        model.forward(q)
+        elapsed = time.perf_counter() - start
+        print(f"✓ {args.benchmark} windows in {elapsed:.2f} s "
+              f"({args.benchmark / elapsed:.0f} windows/s, {elapsed / args.benchmark * 1e6:.0f} µs/window)")
+
+    if windows is not None:
+        start = time.perf_counter()
+        classes = model.classify(windows)
+        elapsed = time.perf_counter() - start
+        print(f"✓ Classified {len(classes)} windows in {elapsed:.2f} s")
+        counts = np.bincount(classes, minlength=NUM_CLASSES)
+        for c in np.flatnonzero(counts):
+            print(f"  class {c} ({CLASS_GROUPS[c]}): {counts[c]} ({100 * counts[c] / len(classes):.1f}%)")
+
+    wrapped = {k: v for k, v in model.overflow.items() if v}
+    if wrapped:
+        print(f"⚠ Results >= 128.0 wrapped (no saturation in the engines): {wrapped}")
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,7 @@
 library IEEE;
 use IEEE.STD_LOGIC_1164.ALL;
 use IEEE.NUMERIC_STD.ALL;
+use work.weight_map_pkg.all;
 
 entity zolotyhnet_top is
     port (
@@ -214,10 +215,10 @@ begin
     --------------------------------------------------------------------------------
 
     -- SDRAM-based weight ROMs (weights stored in external SDRAM)
-    -- BASE_ADDR values create memory map in SDRAM
+    -- BASE_ADDR values come from weight_map_pkg.vhd (python/weight_image.py)
 
     linear0_weight_sdram : weight_rom_sdram
-        generic map (DATA_WIDTH => 16, ADDR_WIDTH => 14, BASE_ADDR => 0, SIZE => 8192)
+        generic map (DATA_WIDTH => 16, ADDR_WIDTH => 14, BASE_ADDR => LINEAR0_WEIGHT_BASE, SIZE => LINEAR0_WEIGHT_LEN)
         port map (
             clk => clk,
             addr_a => linear1_weight_addr, data_a => linear0_weight_data,
@@ -228,7 +229,7 @@ begin
         );
 
     linear0_bias_sdram : weight_rom_sdram
-        generic map (DATA_WIDTH => 16, ADDR_WIDTH => 14, BASE_ADDR => 8192, SIZE => 64)
+        generic map (DATA_WIDTH => 16, ADDR_WIDTH => 14, BASE_ADDR => LINEAR0_BIAS_BASE, SIZE => LINEAR0_BIAS_LEN)
         port map (
             clk => clk,
             addr_a => linear1_bias_addr, data_a => linear0_bias_data,
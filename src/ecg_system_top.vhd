@@ -10,6 +10,8 @@
 --   2. VGA Controller - Displays scrolling ECG waveform
 --   3. User Interface - Button control and LED status
 --   4. CNN Interface - Connects to Ayoub's CNN classifier
+--   5. Weight Upload - UART command mode that writes new CNN weights into
+--      SDRAM on a running board (python/weight_uploader.py)
 --
 -- Author: Marly
 -- Date: January 21, 2026
@@ -33,6 +35,7 @@ entity ecg_system_top is
         
         -- UART Interface (from PC)
         uart_rx      : in  std_logic;
+        uart_tx      : out std_logic;  -- Weight upload acks / read-back
         
         -- User Interface
         btn          : in  std_logic_vector(0 downto 0);  -- Pause button
@@ -80,12 +83,78 @@ architecture Behavioral of ecg_system_top is
             clk          : in  std_logic;
             reset_n      : in  std_logic;
             uart_rx      : in  std_logic;
+            hold         : in  std_logic;
             ecg_sample   : out std_logic_vector(11 downto 0);
             sample_valid : out std_logic;
+            rx_byte       : out std_logic_vector(7 downto 0);
+            rx_byte_valid : out std_logic;
             uart_error   : out std_logic;
             uart_active  : out std_logic
         );
     end component;
+
+    component uart_transmitter
+        generic (
+            CLK_FREQ  : integer;
+            BAUD_RATE : integer
+        );
+        port (
+            clk          : in  std_logic;
+            reset_n      : in  std_logic;
+            tx_data      : in  std_logic_vector(7 downto 0);
+            tx_start     : in  std_logic;
+            tx_busy      : out std_logic;
+            uart_tx      : out std_logic
+        );
+    end component;
+
+    component weight_upload_rx
+        generic (
+            CLK_FREQ        : integer
+        );
+        port (
+            clk             : in  std_logic;
+            reset_n         : in  std_logic;
+            rx_byte         : in  std_logic_vector(7 downto 0);
+            rx_byte_valid   : in  std_logic;
+            rx_hold         : out std_logic;
+            host_mode       : out std_logic;
+            host_addr       : out std_logic_vector(22 downto 0);
+            host_data       : out std_logic_vector(15 downto 0);
+            host_valid      : out std_logic;
+            sdram_addr      : out std_logic_vector(22 downto 0);
+            sdram_read_req  : out std_logic;
+            sdram_data_in   : in  std_logic_vector(15 downto 0);
+            sdram_data_valid: in  std_logic;
+            sdram_data_ack  : out std_logic;
+            sdram_busy      : in  std_logic;
+            tx_data         : out std_logic_vector(7 downto 0);
+            tx_start        : out std_logic;
+            tx_busy         : in  std_logic;
+            upload_active   : out std_logic;
+            readback_active : out std_logic;
+            upload_error    : out std_logic
+        );
+    end component;
+
+    component weight_loader
+        port (
+            clk             : in  std_logic;
+            reset_n         : in  std_logic;
+            start_load      : in  std_logic;
+            sdram_addr      : out std_logic_vector(22 downto 0);
+            sdram_data_out  : out std_logic_vector(15 downto 0);
+            sdram_write_req : out std_logic;
+            sdram_busy      : in  std_logic;
+            host_mode       : in  std_logic;
+            host_addr       : in  std_logic_vector(22 downto 0);
+            host_data       : in  std_logic_vector(15 downto 0);
+            host_valid      : in  std_logic;
+            host_ready      : out std_logic;
+            load_done       : out std_logic;
+            load_progress   : out integer range 0 to 16383
+        );
+    end component;
     
     component vga_timing_generator
         port (
@@ -201,6 +270,12 @@ architecture Behavioral of ecg_system_top is
     signal sample_valid_uart : std_logic;
     signal uart_error_int    : std_logic;
     signal uart_active_int   : std_logic;
+    signal rx_byte_int       : std_logic_vector(7 downto 0);
+    signal rx_byte_valid_int : std_logic;
+    signal uart_hold_int     : std_logic;
+    signal tx_data_int       : std_logic_vector(7 downto 0);
+    signal tx_start_int      : std_logic;
+    signal tx_busy_int       : std_logic;
     
     -- VGA timing signals
     signal pixel_x_int     : std_logic_vector(9 downto 0);
@@ -226,6 +301,28 @@ architecture Behavioral of ecg_system_top is
     signal sdram_busy_int      : std_logic;
     signal sdram_init_done_int : std_logic;
 
+    -- SDRAM master requests (CNN, or the weight upload path while active)
+    signal cnn_sdram_addr      : std_logic_vector(22 downto 0);
+    signal cnn_sdram_data      : std_logic_vector(15 downto 0);
+    signal cnn_sdram_read_req  : std_logic;
+    signal cnn_sdram_write_req : std_logic;
+    signal cnn_sdram_busy      : std_logic;
+    signal loader_addr         : std_logic_vector(22 downto 0);
+    signal loader_data         : std_logic_vector(15 downto 0);
+    signal loader_write_req    : std_logic;
+    signal readback_addr       : std_logic_vector(22 downto 0);
+    signal readback_read_req   : std_logic;
+    signal readback_valid      : std_logic := '0';  -- data_valid held for the 50 MHz side
+    signal readback_ack        : std_logic;
+
+    -- Weight upload signals
+    signal host_mode_int       : std_logic;
+    signal host_addr_int       : std_logic_vector(22 downto 0);
+    signal host_data_int       : std_logic_vector(15 downto 0);
+    signal host_valid_int      : std_logic;
+    signal upload_active_int   : std_logic;
+    signal readback_active_int : std_logic;
+
 begin
     
     -- PLL: 50 MHz → 100 MHz (SDRAM) and 50 MHz (system)
@@ -279,11 +376,104 @@ begin
             clk          => clk_50mhz,
             reset_n      => reset_n,
             uart_rx      => uart_rx,
+            hold         => uart_hold_int,
             ecg_sample   => ecg_sample_uart,
             sample_valid => sample_valid_uart,
+            rx_byte       => rx_byte_int,
+            rx_byte_valid => rx_byte_valid_int,
             uart_error   => uart_error_int,
             uart_active  => uart_active_int
         );
+
+    -- UART Transmitter: Weight upload replies to PC
+    uart_tx_inst : uart_transmitter
+        generic map (
+            CLK_FREQ  => CLK_FREQ,
+            BAUD_RATE => UART_BAUD
+        )
+        port map (
+            clk      => clk_50mhz_pll,
+            reset_n  => reset_n,
+            tx_data  => tx_data_int,
+            tx_start => tx_start_int,
+            tx_busy  => tx_busy_int,
+            uart_tx  => uart_tx
+        );
+
+    -- Weight Upload: UART write/read-back frames for runtime weight swaps
+    upload_rx_inst : weight_upload_rx
+        generic map (
+            CLK_FREQ => CLK_FREQ
+        )
+        port map (
+            clk              => clk_50mhz_pll,
+            reset_n          => reset_n,
+            rx_byte          => rx_byte_int,
+            rx_byte_valid    => rx_byte_valid_int,
+            rx_hold          => uart_hold_int,
+            host_mode        => host_mode_int,
+            host_addr        => host_addr_int,
+            host_data        => host_data_int,
+            host_valid       => host_valid_int,
+            sdram_addr       => readback_addr,
+            sdram_read_req   => readback_read_req,
+            sdram_data_in    => sdram_data_out_int,
+            sdram_data_valid => readback_valid,
+            sdram_data_ack   => readback_ack,
+            sdram_busy       => sdram_busy_int,
+            tx_data          => tx_data_int,
+            tx_start         => tx_start_int,
+            tx_busy          => tx_busy_int,
+            upload_active    => upload_active_int,
+            readback_active  => readback_active_int,
+            upload_error     => open
+        );
+
+    -- Weight Loader: Writes the uploaded words into SDRAM
+    -- (ROM staging path not wired yet, weights come from the host)
+    weight_loader_inst : weight_loader
+        port map (
+            clk             => clk_50mhz_pll,
+            reset_n         => reset_n,
+            start_load      => '0',
+            sdram_addr      => loader_addr,
+            sdram_data_out  => loader_data,
+            sdram_write_req => loader_write_req,
+            sdram_busy      => sdram_busy_int,
+            host_mode       => host_mode_int,
+            host_addr       => host_addr_int,
+            host_data       => host_data_int,
+            host_valid      => host_valid_int,
+            host_ready      => open,
+            load_done       => open,
+            load_progress   => open
+        );
+
+    -- SDRAM master select: the upload path owns the SDRAM during a frame,
+    -- the CNN sees it busy meanwhile
+    sdram_addr_int      <= readback_addr when readback_active_int = '1' else
+                           loader_addr when upload_active_int = '1' else
+                           cnn_sdram_addr;
+    sdram_data_in_int   <= loader_data when upload_active_int = '1' else cnn_sdram_data;
+    sdram_read_req_int  <= readback_read_req when upload_active_int = '1' else cnn_sdram_read_req;
+    sdram_write_req_int <= loader_write_req when upload_active_int = '1' else cnn_sdram_write_req;
+    cnn_sdram_busy      <= sdram_busy_int or upload_active_int;
+
+    -- Read-back data_valid: the controller pulses it for one 100 MHz cycle,
+    -- which a 50 MHz edge can miss. Hold it until the upload path takes the
+    -- word (readback_ack lasts one 50 MHz cycle, two 100 MHz edges).
+    process(clk_100mhz, reset_n)
+    begin
+        if reset_n = '0' then
+            readback_valid <= '0';
+        elsif rising_edge(clk_100mhz) then
+            if sdram_data_valid_int = '1' and readback_active_int = '1' then
+                readback_valid <= '1';
+            elsif readback_ack = '1' or readback_active_int = '0' then
+                readback_valid <= '0';
+            end if;
+        end if;
+    end process;
     
     -- VGA Timing Generator: Generates sync signals and pixel coordinates
     vga_timing_inst : vga_timing_generator
@@ -345,13 +535,13 @@ begin
             cnn_valid        => cnn_valid_int,
             cnn_result       => cnn_result_int,
             cnn_result_valid => cnn_result_valid_int,
-            sdram_addr       => sdram_addr_int,
+            sdram_addr       => cnn_sdram_addr,
             sdram_data_in    => sdram_data_out_int,
-            sdram_data_out   => sdram_data_in_int,
-            sdram_read_req   => sdram_read_req_int,
-            sdram_write_req  => sdram_write_req_int,
+            sdram_data_out   => cnn_sdram_data,
+            sdram_read_req   => cnn_sdram_read_req,
+            sdram_write_req  => cnn_sdram_write_req,
             sdram_data_valid => sdram_data_valid_int,
-            sdram_busy       => sdram_busy_int
+            sdram_busy       => cnn_sdram_busy
         );
     
 end Behavioral;
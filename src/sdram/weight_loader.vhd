@@ -8,9 +8,19 @@
 -- 3. Assert done when complete
 --
 -- Memory Map in SDRAM:
--- 0x000000: conv0_weight.mif
--- 0x000030: conv0_bias.mif
--- ... (continues for all 18 files)
+-- weight_map_pkg.vhd (generated by python/weight_image.py), e.g.
+-- 0x000000: conv0_bias.mif
+-- 0x000008: conv0_weight.mif
+-- ... (all 18 files, burst-aligned, WEIGHT_IMAGE_WORDS in total)
+--
+-- Host mode (runtime upload, no recompile):
+--   While host_mode = '1' the words come from the PC instead of ROM.
+--   weight_upload_rx.vhd parses the UART write frames and presents one
+--   word at a time on host_addr/host_data with a host_valid pulse; the
+--   address map is chosen by the host (python/weight_uploader.py).
+--   load_done drops while host mode is active and rises again once the
+--   last pending word has been written, so a new model can be swapped in
+--   on a running board.
 --
 -- Author: Marly Capstone
 -- Date: March 2026
@@ -19,6 +29,7 @@
 library IEEE;
 use IEEE.STD_LOGIC_1164.ALL;
 use IEEE.NUMERIC_STD.ALL;
+use work.weight_map_pkg.all;
 
 entity weight_loader is
     port (
@@ -32,6 +43,13 @@ entity weight_loader is
         sdram_write_req : out std_logic;
         sdram_busy      : in  std_logic;
 
+        -- Host upload interface (weight_upload_rx)
+        host_mode       : in  std_logic := '0';
+        host_addr       : in  std_logic_vector(22 downto 0) := (others => '0');
+        host_data       : in  std_logic_vector(15 downto 0) := (others => '0');
+        host_valid      : in  std_logic := '0';
+        host_ready      : out std_logic;  -- '0' while a host word is pending
+
         -- Status
         load_done       : out std_logic;
         load_progress   : out integer range 0 to 16383  -- Current address being loaded
@@ -40,10 +58,10 @@ end weight_loader;
 
 architecture Behavioral of weight_loader is
 
-    -- Total weights to load: 14,705 parameters
-    constant TOTAL_PARAMS : integer := 14705;
+    -- Total words to load: 14,705 parameters + burst padding
+    constant TOTAL_PARAMS : integer := WEIGHT_IMAGE_WORDS;
 
-    type state_type is (IDLE, LOADING, DONE);
+    type state_type is (IDLE, LOADING, HOST, DONE);
     signal state : state_type := IDLE;
 
     signal addr_counter : integer range 0 to 16383 := 0;
@@ -51,6 +69,11 @@ architecture Behavioral of weight_loader is
     -- Simple: For now, write zeros (will be replaced with actual weight ROM reads)
     signal weight_data : std_logic_vector(15 downto 0) := (others => '0');
 
+    -- Host mode: one word in flight (UART delivers a word every ~17 us)
+    signal host_pending  : std_logic := '0';
+    signal pending_addr  : std_logic_vector(22 downto 0) := (others => '0');
+    signal pending_data  : std_logic_vector(15 downto 0) := (others => '0');
+
 begin
 
     process(clk, reset_n)
@@ -60,6 +83,7 @@ begin
             addr_counter <= 0;
             load_done <= '0';
             sdram_write_req <= '0';
+            host_pending <= '0';
 
         elsif rising_edge(clk) then
 
@@ -68,7 +92,11 @@ begin
             case state is
 
                 when IDLE =>
-                    if start_load = '1' then
+                    if host_mode = '1' then
+                        state <= HOST;
+                        addr_counter <= 0;
+                        load_done <= '0';
+                    elsif start_load = '1' then
                         state <= LOADING;
                         addr_counter <= 0;
                         load_done <= '0';
@@ -87,9 +115,34 @@ begin
                         state <= DONE;
                     end if;
 
+                when HOST =>
+                    -- Write the pending word as soon as the SDRAM is free
+                    if host_pending = '1' and sdram_busy = '0' then
+                        sdram_addr <= pending_addr;
+                        sdram_data_out <= pending_data;
+                        sdram_write_req <= '1';
+                        host_pending <= '0';
+                        if addr_counter < 16383 then
+                            addr_counter <= addr_counter + 1;
+                        end if;
+                    end if;
+
+                    if host_valid = '1' then
+                        pending_addr <= host_addr;
+                        pending_data <= host_data;
+                        host_pending <= '1';
+                    elsif host_mode = '0' and host_pending = '0' then
+                        state <= DONE;
+                    end if;
+
                 when DONE =>
                     load_done <= '1';
-                    -- Stay in DONE state
+                    -- Stay in DONE state until the host uploads again
+                    if host_mode = '1' then
+                        state <= HOST;
+                        addr_counter <= 0;
+                        load_done <= '0';
+                    end if;
 
                 when others =>
                     state <= IDLE;
@@ -101,4 +154,6 @@ begin
         end if;
     end process;
 
+    host_ready <= not host_pending;
+
 end Behavioral;
@@ -0,0 +1,55 @@
+--------------------------------------------------------------------------------
+-- Weight Map Package
+-- SDRAM base addresses and lengths of the CNN weight blocks
+--
+-- GENERATED by python/weight_image.py - do not edit by hand.
+-- Regenerate after retraining: python weight_image.py
+--
+-- 18 blocks, 14705 words + 7 words burst padding
+-- Engines read BASE + their own weight_addr / bias_addr.
+--------------------------------------------------------------------------------
+
+package weight_map_pkg is
+
+    constant WEIGHT_BURST_WORDS : integer := 8;
+    constant WEIGHT_IMAGE_BASE  : integer := 0;
+    constant WEIGHT_IMAGE_WORDS : integer := 14712;
+
+    constant CONV0_BIAS_BASE        : integer := 0;
+    constant CONV0_BIAS_LEN         : integer := 8;
+    constant CONV0_WEIGHT_BASE      : integer := 8;
+    constant CONV0_WEIGHT_LEN       : integer := 24;
+    constant CONV1_BIAS_BASE        : integer := 32;
+    constant CONV1_BIAS_LEN         : integer := 16;
+    constant CONV1_WEIGHT_BASE      : integer := 48;
+    constant CONV1_WEIGHT_LEN       : integer := 384;
+    constant CONV2_BIAS_BASE        : integer := 432;
+    constant CONV2_BIAS_LEN         : integer := 32;
+    constant CONV2_WEIGHT_BASE      : integer := 464;
+    constant CONV2_WEIGHT_LEN       : integer := 1536;
+    constant CONV3_BIAS_BASE        : integer := 2000;
+    constant CONV3_BIAS_LEN         : integer := 32;
+    constant CONV3_WEIGHT_BASE      : integer := 2032;
+    constant CONV3_WEIGHT_LEN       : integer := 3072;
+    constant CONV4_BIAS_BASE        : integer := 5104;
+    constant CONV4_BIAS_LEN         : integer := 1;
+    constant CONV4_WEIGHT_BASE      : integer := 5112;
+    constant CONV4_WEIGHT_LEN       : integer := 96;
+    constant LINEAR0_BIAS_BASE      : integer := 5208;
+    constant LINEAR0_BIAS_LEN       : integer := 64;
+    constant LINEAR0_WEIGHT_BASE    : integer := 5272;
+    constant LINEAR0_WEIGHT_LEN     : integer := 8192;
+    constant LINEAR1_BIAS_BASE      : integer := 13464;
+    constant LINEAR1_BIAS_LEN       : integer := 16;
+    constant LINEAR1_WEIGHT_BASE    : integer := 13480;
+    constant LINEAR1_WEIGHT_LEN     : integer := 1024;
+    constant LINEAR2_BIAS_BASE      : integer := 14504;
+    constant LINEAR2_BIAS_LEN       : integer := 8;
+    constant LINEAR2_WEIGHT_BASE    : integer := 14512;
+    constant LINEAR2_WEIGHT_LEN     : integer := 128;
+    constant CLASSIFIER_BIAS_BASE   : integer := 14640;
+    constant CLASSIFIER_BIAS_LEN    : integer := 8;
+    constant CLASSIFIER_WEIGHT_BASE : integer := 14648;
+    constant CLASSIFIER_WEIGHT_LEN  : integer := 64;
+
+end package weight_map_pkg;
@@ -0,0 +1,466 @@
+--------------------------------------------------------------------------------
+-- Weight Upload Receiver
+-- UART command mode for loading CNN weights into SDRAM at runtime
+--
+-- Lets python/weight_uploader.py replace the weights on a running board
+-- in a few seconds instead of regenerating the MIFs and recompiling.
+--
+-- Host -> board frame (multi-byte fields little-endian):
+--   A5 5A | CMD | COUNT[2] | ADDR[3] | payload | CRC[2]
+--   CMD 'W' (0x57): payload is COUNT 16-bit words, written to SDRAM
+--                   ADDR .. ADDR+COUNT-1 through weight_loader (host mode)
+--   CMD 'R' (0x52): no payload, read COUNT words back from ADDR
+--   CRC: CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) over CMD..payload
+--
+-- Board -> host replies (uart_transmitter):
+--   'W' -> A5 5A 'w' STATUS
+--   'R' -> A5 5A 'r' STATUS COUNT[2] ADDR[3] data CRC[2]  (STATUS = 0)
+--          A5 5A 'r' STATUS                             (STATUS /= 0)
+--   STATUS: 0x00 = OK, 0x01 = CRC mismatch, 0x02 = SDRAM read timeout
+--
+-- Sample traffic never has two consecutive bytes above 0x1F, so the A5 5A
+-- sync cannot appear inside an ECG stream. From the sync to the end of the
+-- frame the UART receiver is held, so no samples are assembled from it.
+-- Words are written as they arrive; a CRC mismatch does not undo them, it
+-- is reported in the ack (and upload_error) and the host sends the frame
+-- again. A frame that stops for more than 20 ms is abandoned.
+--
+-- The SDRAM controller runs at 100 MHz and pulses data_valid for one of its
+-- cycles, which this 50 MHz side can miss. ecg_system_top holds the pulse
+-- until sdram_data_ack. A read-back word that does not arrive within
+-- 100 us ends the reply: the data sent so far is followed by the short
+-- "A5 5A 'r' 02" frame, and the UART is released.
+--
+-- Author: Marly
+-- Date: October 2026
+-- Version: 1.0
+--------------------------------------------------------------------------------
+
+library IEEE;
+use IEEE.STD_LOGIC_1164.ALL;
+use IEEE.NUMERIC_STD.ALL;
+
+entity weight_upload_rx is
+    generic (
+        CLK_FREQ        : integer := 50_000_000   -- 50 MHz system clock
+    );
+    port (
+        clk             : in  std_logic;
+        reset_n         : in  std_logic;
+
+        -- Raw bytes from uart_receiver
+        rx_byte         : in  std_logic_vector(7 downto 0);
+        rx_byte_valid   : in  std_logic;
+        rx_hold         : out std_logic;  -- Suspend sample assembly
+
+        -- To weight_loader (host mode)
+        host_mode       : out std_logic;
+        host_addr       : out std_logic_vector(22 downto 0);
+        host_data       : out std_logic_vector(15 downto 0);
+        host_valid      : out std_logic;
+
+        -- SDRAM read-back
+        sdram_addr      : out std_logic_vector(22 downto 0);
+        sdram_read_req  : out std_logic;
+        sdram_data_in   : in  std_logic_vector(15 downto 0);
+        sdram_data_valid: in  std_logic;  -- Held until sdram_data_ack
+        sdram_data_ack  : out std_logic;  -- sdram_data_in taken
+        sdram_busy      : in  std_logic;
+
+        -- To uart_transmitter
+        tx_data         : out std_logic_vector(7 downto 0);
+        tx_start        : out std_logic;
+        tx_busy         : in  std_logic;
+
+        -- Status
+        upload_active   : out std_logic;  -- Upload path owns the SDRAM
+        readback_active : out std_logic;  -- Read-back owns the SDRAM address
+        upload_error    : out std_logic   -- Last write frame failed its CRC
+    );
+end weight_upload_rx;
+
+architecture Behavioral of weight_upload_rx is
+
+    constant SYNC_0      : std_logic_vector(7 downto 0) := x"A5";
+    constant SYNC_1      : std_logic_vector(7 downto 0) := x"5A";
+    constant CMD_WRITE   : std_logic_vector(7 downto 0) := x"57";  -- 'W'
+    constant CMD_READ    : std_logic_vector(7 downto 0) := x"52";  -- 'R'
+    constant REPLY_WRITE : std_logic_vector(7 downto 0) := x"77";  -- 'w'
+    constant REPLY_READ  : std_logic_vector(7 downto 0) := x"72";  -- 'r'
+    constant STATUS_OK   : std_logic_vector(7 downto 0) := x"00";
+    constant STATUS_CRC  : std_logic_vector(7 downto 0) := x"01";
+    constant STATUS_TIMEOUT : std_logic_vector(7 downto 0) := x"02";
+
+    -- Inter-byte timeout inside a frame (20 ms)
+    constant TIMEOUT_CLKS : integer := CLK_FREQ / 50;
+    -- Read-back: longest wait for one SDRAM word (100 us)
+    constant READ_TIMEOUT_CLKS : integer := CLK_FREQ / 10_000;
+
+    -- CRC-16/CCITT-FALSE, one byte (MSB first)
+    function crc16_update(crc : std_logic_vector(15 downto 0);
+                          data : std_logic_vector(7 downto 0))
+        return std_logic_vector is
+        variable c : std_logic_vector(15 downto 0);
+    begin
+        c := crc xor (data & x"00");
+        for i in 0 to 7 loop
+            if c(15) = '1' then
+                c := (c(14 downto 0) & '0') xor x"1021";
+            else
+                c := c(14 downto 0) & '0';
+            end if;
+        end loop;
+        return c;
+    end function;
+
+    -- Frame parser
+    type rx_state_type is (WAIT_SYNC0, WAIT_SYNC1, GET_CMD, GET_COUNT0, GET_COUNT1,
+                           GET_ADDR0, GET_ADDR1, GET_ADDR2, GET_DATA_LO, GET_DATA_HI,
+                           GET_CRC0, GET_CRC1, READ_BACK);
+    signal rx_state : rx_state_type := WAIT_SYNC0;
+
+    signal cmd         : std_logic_vector(7 downto 0) := (others => '0');
+    signal count       : unsigned(15 downto 0) := (others => '0');
+    signal remaining   : unsigned(15 downto 0) := (others => '0');
+    signal frame_addr  : unsigned(22 downto 0) := (others => '0');
+    signal word_addr   : unsigned(22 downto 0) := (others => '0');
+    signal word_lo     : std_logic_vector(7 downto 0) := (others => '0');
+    signal crc_calc    : std_logic_vector(15 downto 0) := (others => '1');
+    signal crc_lo      : std_logic_vector(7 downto 0) := (others => '0');
+    signal idle_clks   : integer range 0 to TIMEOUT_CLKS := 0;
+
+    -- Reply request from the parser to the transmit sequencer
+    signal reply_start  : std_logic := '0';
+    signal reply_kind   : std_logic_vector(7 downto 0) := (others => '0');
+    signal reply_status : std_logic_vector(7 downto 0) := (others => '0');
+    signal reply_done   : std_logic := '0';
+
+    -- Reply transmit sequencer
+    type tx_state_type is (TX_IDLE, TX_HEADER, TX_READ_REQ, TX_READ_WAIT,
+                           TX_DATA_LO, TX_DATA_HI, TX_CRC_LO, TX_CRC_HI, TX_SEND);
+    signal tx_state  : tx_state_type := TX_IDLE;
+    signal tx_next   : tx_state_type := TX_IDLE;
+    signal tx_phase  : integer range 0 to 2 := 0;
+    signal tx_index  : integer range 0 to 15 := 0;
+    signal tx_byte   : std_logic_vector(7 downto 0) := (others => '0');
+    signal tx_crc_en : std_logic := '0';  -- tx_byte counts towards the reply CRC
+    signal tx_crc    : std_logic_vector(15 downto 0) := (others => '1');
+    signal rb_addr   : unsigned(22 downto 0) := (others => '0');
+    signal rb_left   : unsigned(15 downto 0) := (others => '0');
+    signal rb_word   : std_logic_vector(15 downto 0) := (others => '0');
+    signal rb_active : std_logic := '0';
+    signal rb_wait   : integer range 0 to READ_TIMEOUT_CLKS := 0;
+    signal rb_timeout: std_logic := '0';  -- Reply ends with STATUS_TIMEOUT
+
+    signal host_mode_int    : std_logic := '0';
+    signal upload_error_int : std_logic := '0';
+
+begin
+
+    -- Frame parser: bytes -> weight_loader words and reply requests
+    process(clk, reset_n)
+    begin
+        if reset_n = '0' then
+            rx_state <= WAIT_SYNC0;
+            host_mode_int <= '0';
+            host_valid <= '0';
+            reply_start <= '0';
+            upload_error_int <= '0';
+            idle_clks <= 0;
+
+        elsif rising_edge(clk) then
+            host_valid <= '0';   -- Default
+            reply_start <= '0';  -- Default
+
+            -- Abandon a frame the host stopped sending
+            if rx_state = WAIT_SYNC0 or rx_state = READ_BACK or rx_byte_valid = '1' then
+                idle_clks <= 0;
+            elsif idle_clks < TIMEOUT_CLKS then
+                idle_clks <= idle_clks + 1;
+            else
+                idle_clks <= 0;
+                host_mode_int <= '0';
+                rx_state <= WAIT_SYNC0;
+            end if;
+
+            if rx_state = READ_BACK then
+                -- Hold the UART until the read-back reply has been sent
+                if reply_done = '1' then
+                    rx_state <= WAIT_SYNC0;
+                end if;
+
+            elsif rx_byte_valid = '1' then
+
+                case rx_state is
+
+                    when WAIT_SYNC0 =>
+                        if rx_byte = SYNC_0 then
+                            rx_state <= WAIT_SYNC1;
+                        end if;
+
+                    when WAIT_SYNC1 =>
+                        if rx_byte = SYNC_1 then
+                            crc_calc <= x"FFFF";
+                            rx_state <= GET_CMD;
+                        elsif rx_byte /= SYNC_0 then
+                            rx_state <= WAIT_SYNC0;
+                        end if;
+
+                    when GET_CMD =>
+                        if rx_byte = CMD_WRITE or rx_byte = CMD_READ then
+                            cmd <= rx_byte;
+                            crc_calc <= crc16_update(crc_calc, rx_byte);
+                            rx_state <= GET_COUNT0;
+                        else
+                            rx_state <= WAIT_SYNC0;  -- Unknown command
+                        end if;
+
+                    when GET_COUNT0 =>
+                        count(7 downto 0) <= unsigned(rx_byte);
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        rx_state <= GET_COUNT1;
+
+                    when GET_COUNT1 =>
+                        count(15 downto 8) <= unsigned(rx_byte);
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        rx_state <= GET_ADDR0;
+
+                    when GET_ADDR0 =>
+                        frame_addr(7 downto 0) <= unsigned(rx_byte);
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        rx_state <= GET_ADDR1;
+
+                    when GET_ADDR1 =>
+                        frame_addr(15 downto 8) <= unsigned(rx_byte);
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        rx_state <= GET_ADDR2;
+
+                    when GET_ADDR2 =>
+                        frame_addr(22 downto 16) <= unsigned(rx_byte(6 downto 0));
+                        word_addr <= unsigned(rx_byte(6 downto 0)) & frame_addr(15 downto 0);
+                        remaining <= count;
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        if cmd = CMD_WRITE and count /= 0 then
+                            host_mode_int <= '1';
+                            rx_state <= GET_DATA_LO;
+                        else
+                            rx_state <= GET_CRC0;
+                        end if;
+
+                    when GET_DATA_LO =>
+                        word_lo <= rx_byte;
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        rx_state <= GET_DATA_HI;
+
+                    when GET_DATA_HI =>
+                        host_addr <= std_logic_vector(word_addr);
+                        host_data <= rx_byte & word_lo;
+                        host_valid <= '1';
+                        word_addr <= word_addr + 1;
+                        remaining <= remaining - 1;
+                        crc_calc <= crc16_update(crc_calc, rx_byte);
+                        if remaining = 1 then
+                            rx_state <= GET_CRC0;
+                        else
+                            rx_state <= GET_DATA_LO;
+                        end if;
+
+                    when GET_CRC0 =>
+                        crc_lo <= rx_byte;
+                        rx_state <= GET_CRC1;
+
+                    when GET_CRC1 =>
+                        host_mode_int <= '0';
+                        reply_start <= '1';
+                        if (rx_byte & crc_lo) = crc_calc then
+                            reply_status <= STATUS_OK;
+                        else
+                            reply_status <= STATUS_CRC;
+                        end if;
+
+                        if cmd = CMD_WRITE then
+                            reply_kind <= REPLY_WRITE;
+                            if (rx_byte & crc_lo) = crc_calc then
+                                upload_error_int <= '0';
+                            else
+                                upload_error_int <= '1';
+                            end if;
+                            rx_state <= WAIT_SYNC0;
+                        else
+                            reply_kind <= REPLY_READ;
+                            rx_state <= READ_BACK;
+                        end if;
+
+                    when others =>
+                        rx_state <= WAIT_SYNC0;
+
+                end case;
+            end if;
+        end if;
+    end process;
+
+    -- Reply sequencer: acks and read-back frames through uart_transmitter
+    process(clk, reset_n)
+    begin
+        if reset_n = '0' then
+            tx_state <= TX_IDLE;
+            tx_phase <= 0;
+            tx_start <= '0';
+            sdram_read_req <= '0';
+            sdram_data_ack <= '0';
+            reply_done <= '0';
+            rb_active <= '0';
+            rb_timeout <= '0';
+
+        elsif rising_edge(clk) then
+            tx_start <= '0';        -- Default
+            sdram_read_req <= '0';  -- Default
+            sdram_data_ack <= '0';  -- Default
+            reply_done <= '0';      -- Default
+
+            case tx_state is
+
+                when TX_IDLE =>
+                    if reply_start = '1' then
+                        tx_index <= 0;
+                        tx_crc <= x"FFFF";
+                        rb_addr <= frame_addr;
+                        rb_left <= count;
+                        rb_timeout <= '0';
+                        tx_state <= TX_HEADER;
+                    end if;
+
+                -- A5 5A kind status [count addr], CRC from kind onwards
+                when TX_HEADER =>
+                    case tx_index is
+                        when 0 => tx_byte <= SYNC_0;
+                        when 1 => tx_byte <= SYNC_1;
+                        when 2 => tx_byte <= reply_kind;
+                        when 3 =>
+                            if rb_timeout = '1' then
+                                tx_byte <= STATUS_TIMEOUT;
+                            else
+                                tx_byte <= reply_status;
+                            end if;
+                        when 4 => tx_byte <= std_logic_vector(count(7 downto 0));
+                        when 5 => tx_byte <= std_logic_vector(count(15 downto 8));
+                        when 6 => tx_byte <= std_logic_vector(frame_addr(7 downto 0));
+                        when 7 => tx_byte <= std_logic_vector(frame_addr(15 downto 8));
+                        when others => tx_byte <= '0' & std_logic_vector(frame_addr(22 downto 16));
+                    end case;
+                    if tx_index >= 2 then
+                        tx_crc_en <= '1';
+                    else
+                        tx_crc_en <= '0';
+                    end if;
+                    tx_index <= tx_index + 1;
+                    tx_state <= TX_SEND;
+
+                    if tx_index = 3 and (reply_kind = REPLY_WRITE or reply_status /= STATUS_OK
+                                         or rb_timeout = '1') then
+                        tx_next <= TX_IDLE;  -- Short reply ends here
+                    elsif tx_index = 8 then
+                        rb_active <= '1';
+                        rb_wait <= 0;
+                        tx_next <= TX_READ_REQ;
+                    else
+                        tx_next <= TX_HEADER;
+                    end if;
+
+                when TX_READ_REQ =>
+                    if rb_left = 0 then
+                        rb_active <= '0';
+                        tx_state <= TX_CRC_LO;
+                    elsif rb_wait = READ_TIMEOUT_CLKS then
+                        rb_active <= '0';     -- SDRAM never went idle
+                        rb_timeout <= '1';
+                        tx_index <= 0;
+                        tx_state <= TX_HEADER;
+                    else
+                        rb_wait <= rb_wait + 1;
+                        if sdram_busy = '0' then
+                            sdram_addr <= std_logic_vector(rb_addr);
+                            sdram_read_req <= '1';
+                            tx_state <= TX_READ_WAIT;
+                        end if;
+                    end if;
+
+                when TX_READ_WAIT =>
+                    if sdram_data_valid = '1' then
+                        rb_word <= sdram_data_in;
+                        sdram_data_ack <= '1';
+                        rb_addr <= rb_addr + 1;
+                        rb_left <= rb_left - 1;
+                        rb_wait <= 0;
+                        tx_state <= TX_DATA_LO;
+                    elsif rb_wait = READ_TIMEOUT_CLKS then
+                        rb_active <= '0';     -- Word lost: end with an error frame
+                        rb_timeout <= '1';
+                        tx_index <= 0;
+                        tx_state <= TX_HEADER;
+                    else
+                        rb_wait <= rb_wait + 1;
+                    end if;
+
+                when TX_DATA_LO =>
+                    tx_byte <= rb_word(7 downto 0);
+                    tx_crc_en <= '1';
+                    tx_next <= TX_DATA_HI;
+                    tx_state <= TX_SEND;
+
+                when TX_DATA_HI =>
+                    tx_byte <= rb_word(15 downto 8);
+                    tx_crc_en <= '1';
+                    tx_next <= TX_READ_REQ;
+                    tx_state <= TX_SEND;
+
+                when TX_CRC_LO =>
+                    tx_byte <= tx_crc(7 downto 0);
+                    tx_crc_en <= '0';
+                    tx_next <= TX_CRC_HI;
+                    tx_state <= TX_SEND;
+
+                when TX_CRC_HI =>
+                    tx_byte <= tx_crc(15 downto 8);
+                    tx_crc_en <= '0';
+                    tx_next <= TX_IDLE;
+                    tx_state <= TX_SEND;
+
+                -- Send tx_byte: start, wait for busy, wait for idle
+                when TX_SEND =>
+                    case tx_phase is
+                        when 0 =>
+                            if tx_busy = '0' then
+                                tx_start <= '1';
+                                tx_phase <= 1;
+                            end if;
+                        when 1 =>
+                            if tx_busy = '1' then
+                                tx_phase <= 2;
+                            end if;
+                        when others =>
+                            if tx_busy = '0' then
+                                tx_phase <= 0;
+                                if tx_crc_en = '1' then
+                                    tx_crc <= crc16_update(tx_crc, tx_byte);
+                                end if;
+                                if tx_next = TX_IDLE then
+                                    reply_done <= '1';
+                                end if;
+                                tx_state <= tx_next;
+                            end if;
+                    end case;
+
+            end case;
+        end if;
+    end process;
+
+    -- Output assignments
+    tx_data         <= tx_byte;
+    host_mode       <= host_mode_int;
+    rx_hold         <= '0' when rx_state = WAIT_SYNC0 or rx_state = WAIT_SYNC1 else '1';
+    upload_active   <= '0' when rx_state = WAIT_SYNC0 or rx_state = WAIT_SYNC1 else '1';
+    readback_active <= rb_active;
+    upload_error    <= upload_error_int;
+
+end Behavioral;
@@ -6,6 +6,12 @@
 --   Byte 1: ecg_sample[7:0]  (lower 8 bits)
 --   Byte 2: 0000 + ecg_sample[11:8]  (upper 4 bits + padding)
 --
+-- Bit 4 of byte 2 may carry the host's beat marker and is ignored here.
+-- A pair whose byte 2 has any of bits 7..5 set is not a sample and is
+-- dropped; this keeps the A5 5A sync of a weight upload frame
+-- (sdram/weight_upload_rx.vhd) off the display and CNN. While hold = '1'
+-- the raw bytes still appear on rx_byte, but no samples are assembled.
+--
 -- Author: Marly
 -- Date: January 21, 2026
 -- Version: 1.0
@@ -26,11 +32,16 @@ entity uart_receiver is
         
         -- UART input
         uart_rx      : in  std_logic;
+        hold         : in  std_logic := '0'; -- Suspend sample assembly
         
         -- ECG output (12-bit samples)
         ecg_sample   : out std_logic_vector(11 downto 0);
         sample_valid : out std_logic;        -- Pulses high when new sample ready
         
+        -- Raw byte output (weight upload command parser)
+        rx_byte       : out std_logic_vector(7 downto 0);
+        rx_byte_valid : out std_logic;       -- Pulses high when a byte arrives
+        
         -- Status/debugging
         uart_error   : out std_logic;        -- Frame error
         uart_active  : out std_logic         -- Currently receiving
@@ -168,7 +179,11 @@ begin
         elsif rising_edge(clk) then
             sample_valid_int <= '0';  -- Default: no new sample
             
-            if byte_received = '1' then
+            if hold = '1' then
+                -- Upload frame in progress: restart pairing afterwards
+                byte_state <= WAIT_BYTE1;
+                
+            elsif byte_received = '1' then
                 
                 case byte_state is
                     
@@ -181,11 +196,13 @@ begin
                         -- Receive second byte (upper 4 bits)
                         byte2_data <= rx_data;
                         
-                        -- Assemble 12-bit sample
-                        ecg_sample_int <= rx_data(3 downto 0) & byte1_data;
-                        
-                        -- Signal new sample is ready
-                        sample_valid_int <= '1';
+                        -- Assemble 12-bit sample (not a sample if bits 7..5 are set)
+                        if rx_data(7 downto 5) = "000" then
+                            ecg_sample_int <= rx_data(3 downto 0) & byte1_data;
+                            
+                            -- Signal new sample is ready
+                            sample_valid_int <= '1';
+                        end if;
                         
                         -- Back to waiting for next sample
                         byte_state <= WAIT_BYTE1;
@@ -198,6 +215,8 @@ begin
     -- Output assignments
     ecg_sample   <= ecg_sample_int;
     sample_valid <= sample_valid_int;
+    rx_byte       <= rx_data;
+    rx_byte_valid <= byte_received;
     uart_error   <= uart_error_int;
     uart_active  <= uart_active_int;
     
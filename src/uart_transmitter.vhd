@@ -0,0 +1,131 @@
+--------------------------------------------------------------------------------
+-- UART Transmitter Module
+-- Sends bytes back to the PC via UART (115200 baud, 8N1)
+--
+-- Used by the weight upload path (sdram/weight_upload_rx.vhd) for its
+-- acknowledge and read-back frames.
+--
+-- Interface:
+--   Pulse tx_start for one clock with tx_data valid while tx_busy = '0'.
+--   tx_busy stays high until the stop bit has been sent.
+--
+-- Author: Marly
+-- Date: October 2026
+-- Version: 1.0
+--------------------------------------------------------------------------------
+
+library IEEE;
+use IEEE.STD_LOGIC_1164.ALL;
+use IEEE.NUMERIC_STD.ALL;
+
+entity uart_transmitter is
+    generic (
+        CLK_FREQ  : integer := 50_000_000;   -- 50 MHz system clock
+        BAUD_RATE : integer := 115200        -- UART baud rate
+    );
+    port (
+        clk          : in  std_logic;
+        reset_n      : in  std_logic;
+
+        -- Byte input
+        tx_data      : in  std_logic_vector(7 downto 0);
+        tx_start     : in  std_logic;        -- Pulse to send tx_data
+        tx_busy      : out std_logic;        -- High while a byte is being sent
+
+        -- UART output
+        uart_tx      : out std_logic
+    );
+end uart_transmitter;
+
+architecture Behavioral of uart_transmitter is
+
+    -- UART timing constants
+    constant CLKS_PER_BIT : integer := CLK_FREQ / BAUD_RATE;  -- ~434 for 115200
+
+    -- UART transmitter state machine
+    type uart_state_type is (IDLE, START_BIT, DATA_BITS, STOP_BIT);
+    signal uart_state : uart_state_type := IDLE;
+
+    signal tx_shift    : std_logic_vector(7 downto 0) := (others => '0');
+    signal bit_index   : integer range 0 to 7 := 0;
+    signal clk_count   : integer range 0 to CLKS_PER_BIT-1 := 0;
+
+    signal uart_tx_int : std_logic := '1';  -- Idle high
+    signal tx_busy_int : std_logic := '0';
+
+begin
+
+    process(clk, reset_n)
+    begin
+        if reset_n = '0' then
+            uart_state <= IDLE;
+            tx_shift <= (others => '0');
+            bit_index <= 0;
+            clk_count <= 0;
+            uart_tx_int <= '1';
+            tx_busy_int <= '0';
+
+        elsif rising_edge(clk) then
+
+            case uart_state is
+
+                when IDLE =>
+                    uart_tx_int <= '1';
+                    clk_count <= 0;
+                    bit_index <= 0;
+
+                    if tx_start = '1' then
+                        tx_shift <= tx_data;
+                        tx_busy_int <= '1';
+                        uart_state <= START_BIT;
+                    else
+                        tx_busy_int <= '0';
+                    end if;
+
+                when START_BIT =>
+                    uart_tx_int <= '0';
+
+                    if clk_count < CLKS_PER_BIT-1 then
+                        clk_count <= clk_count + 1;
+                    else
+                        clk_count <= 0;
+                        uart_state <= DATA_BITS;
+                    end if;
+
+                when DATA_BITS =>
+                    -- LSB first
+                    uart_tx_int <= tx_shift(bit_index);
+
+                    if clk_count < CLKS_PER_BIT-1 then
+                        clk_count <= clk_count + 1;
+                    else
+                        clk_count <= 0;
+
+                        if bit_index < 7 then
+                            bit_index <= bit_index + 1;
+                        else
+                            bit_index <= 0;
+                            uart_state <= STOP_BIT;
+                        end if;
+                    end if;
+
+                when STOP_BIT =>
+                    uart_tx_int <= '1';
+
+                    if clk_count < CLKS_PER_BIT-1 then
+                        clk_count <= clk_count + 1;
+                    else
+                        clk_count <= 0;
+                        tx_busy_int <= '0';
+                        uart_state <= IDLE;
+                    end if;
+
+            end case;
+        end if;
+    end process;
+
+    -- Output assignments
+    uart_tx <= uart_tx_int;
+    tx_busy <= tx_busy_int;
+
+end Behavioral;